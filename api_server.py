@@ -0,0 +1,363 @@
+import json
+import uuid
+import logging
+import threading
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Optional, Dict, Any, Callable, Tuple, List
+from urllib.parse import urlsplit, parse_qs
+
+from backend.rank_data import RANK_NAMES
+from main import (ACTIVE_COMMANDER_SQL, PILOT_STATUS_EVENTS, PROFIT_EVENTS, MATERIAL_CHANGE_EVENTS,
+                  RANK_EVENTS, ActiveCommanderWatch)
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+DEFAULT_API_HOST = '127.0.0.1'
+DEFAULT_API_PORT = 8765
+
+# Quantidade de eventos recentes mantidos em memória para /api/events
+RECENT_EVENTS_SIZE = 100
+
+# Padrões das consultas de rotas comerciais (/api/trade/...)
+DEFAULT_TRADE_JUMPS = 3
+DEFAULT_JUMP_RANGE_LY = 20.0
+MAX_TRADE_RESULTS = 50
+
+# Eventos de início de sessão: podem trocar o comandante ativo, cujos dados
+# todos os recursos mostram
+SESSION_EVENT_TYPES = {'Commander', 'LoadGame'}
+
+# Tipos de evento que alteram cada recurso. Um evento só invalida os recursos
+# que ele realmente afeta (os mesmos tipos dos handlers de process_event que
+# gravam as tabelas lidas); 'events' muda a cada evento novo. Quando o
+# comandante ativo pode ter mudado (ActiveCommanderWatch), todos mudam.
+RESOURCE_EVENT_TYPES: Dict[str, set] = {
+    'status': PILOT_STATUS_EVENTS | SESSION_EVENT_TYPES,
+    'ranks': RANK_EVENTS | SESSION_EVENT_TYPES,
+    'materials': {'Materials'} | MATERIAL_CHANGE_EVENTS | SESSION_EVENT_TYPES,
+    'profit': PROFIT_EVENTS | SESSION_EVENT_TYPES,
+    'commanders': SESSION_EVENT_TYPES,
+}
+
+RANK_COLUMNS: Dict[str, Tuple[str, str]] = {
+    'Combat': ('rank_combat', 'progress_combat'),
+    'Trade': ('rank_trade', 'progress_trade'),
+    'Explore': ('rank_explore', 'progress_explore'),
+    'CQC': ('rank_cqc', 'progress_cqc'),
+    'Federation': ('rank_federation', 'progress_federation'),
+    'Empire': ('rank_empire', 'progress_empire'),
+}
+
+
+class StateCache:
+    """Cache em memória das respostas da API, invalidado por eventos commitados.
+
+    Cada recurso tem um contador de versão incrementado pelos eventos que o
+    afetam. O JSON só é recalculado (com uma consulta ao banco) quando a
+    versão muda; enquanto isso o ETag é estável e requisições com
+    If-None-Match recebem 304 sem tocar no banco.
+    """
+
+    def __init__(self, backend_core, recent_events_size: int = RECENT_EVENTS_SIZE):
+        self.backend_core = backend_core
+        # Identificador da execução: ETags de um processo anterior nunca coincidem
+        self.boot_id = uuid.uuid4().hex[:8]
+        self.lock = threading.Lock()
+        # Serializa reconstruções para que vários clientes não repitam a mesma consulta
+        self.build_lock = threading.Lock()
+        self.versions: Dict[str, int] = {name: 0 for name in list(RESOURCE_EVENT_TYPES) + ['events']}
+        self.recent_events = deque(maxlen=recent_events_size)
+        self.active_commander = ActiveCommanderWatch()
+        # recurso -> (versão, etag, corpo JSON em bytes)
+        self.cache: Dict[str, Tuple[int, str, bytes]] = {}
+        self.builders: Dict[str, Callable[[], Any]] = {
+            'status': self._build_status,
+            'ranks': self._build_ranks,
+            'materials': self._build_materials,
+            'profit': self._build_profit,
+            'commanders': self._build_commanders,
+            'events': self._build_events,
+        }
+
+    def attach(self) -> None:
+        """Passa a receber os eventos commitados pelo BackendCore."""
+        self.backend_core.add_event_listener(self.on_event)
+
+    def detach(self) -> None:
+        self.backend_core.remove_event_listener(self.on_event)
+
+    def on_event(self, event_data: Dict[str, Any]) -> None:
+        """Listener de eventos: só incrementa versões (roda na thread de ingestão)."""
+        event_type = event_data.get('event')
+        commander = self.backend_core.current_commander()
+        with self.lock:
+            self.recent_events.append(event_data)
+            self.versions['events'] += 1
+            # Todos os recursos mostram o comandante ativo: se ele pode ter mudado, todos mudam
+            switched = self.active_commander.changed(event_data, commander)
+            for resource, event_types in RESOURCE_EVENT_TYPES.items():
+                if switched or event_type in event_types:
+                    self.versions[resource] += 1
+
+    def get_etag(self, resource: str) -> Optional[str]:
+        """Retorna o ETag atual do recurso sem calcular o corpo."""
+        with self.lock:
+            if resource not in self.versions:
+                return None
+            return self._make_etag(resource, self.versions[resource])
+
+    def get(self, resource: str) -> Optional[Tuple[str, bytes]]:
+        """Retorna (etag, corpo) do recurso, recalculando só se a versão mudou."""
+        builder = self.builders.get(resource)
+        if builder is None:
+            return None
+
+        with self.build_lock:
+            with self.lock:
+                version = self.versions[resource]
+                cached = self.cache.get(resource)
+                if cached and cached[0] == version:
+                    return cached[1], cached[2]
+
+            # Consulta fora de self.lock: a thread de ingestão nunca espera pelo banco.
+            # Se chegar um evento durante a consulta, a versão antiga fica no cache
+            # e a próxima requisição reconstrói o recurso.
+            body = json.dumps(builder(), ensure_ascii=False).encode('utf-8')
+            etag = self._make_etag(resource, version)
+            with self.lock:
+                self.cache[resource] = (version, etag, body)
+            return etag, body
+
+    def _make_etag(self, resource: str, version: int) -> str:
+        return f'"{self.boot_id}-{resource}-{version}"'
+
+    # --- Construção dos Recursos (consultas ao banco) ---
+
+    def _query(self, sql: str) -> List[Dict[str, Any]]:
+        conn = self.backend_core.get_db_connection()
+        if not conn:
+            return []
+        try:
+            return [dict(row) for row in conn.execute(sql).fetchall()]
+        except Exception as e:
+            logging.error(f"Erro ao consultar estado para a API: {e}")
+            return []
+        finally:
+            conn.close()
+
+    def _build_status(self) -> Dict[str, Any]:
+        rows = self._query(f"SELECT * FROM pilot_status WHERE pilot_name = {ACTIVE_COMMANDER_SQL}")
+        return rows[0] if rows else {}
+
+    def _build_ranks(self) -> Dict[str, Any]:
+        rows = self._query(f"SELECT * FROM pilot_status WHERE pilot_name = {ACTIVE_COMMANDER_SQL}")
+        if not rows:
+            return {}
+        status = rows[0]
+        ranks = {}
+        for rank_type, (rank_col, progress_col) in RANK_COLUMNS.items():
+            rank_value = status.get(rank_col) or 0
+            names = RANK_NAMES.get(rank_type, [])
+            ranks[rank_type] = {
+                'rank': rank_value,
+                'name': names[rank_value] if 0 <= rank_value < len(names) else None,
+                'progress': status.get(progress_col) or 0.0,
+            }
+        return {'pilot_name': status.get('pilot_name'), 'ranks': ranks}
+
+    def _build_materials(self) -> List[Dict[str, Any]]:
+        return self._query(f"SELECT material_name, category, count FROM pilot_materials "
+                           f"WHERE pilot_name = {ACTIVE_COMMANDER_SQL} ORDER BY category, material_name")
+
+    def _build_profit(self) -> Dict[str, Any]:
+        rows = self._query(f"SELECT profit_type, SUM(amount) AS total FROM pilot_profit "
+                           f"WHERE pilot_name = {ACTIVE_COMMANDER_SQL} GROUP BY profit_type")
+        totals = {row['profit_type']: row['total'] for row in rows}
+        return {'totals': totals, 'total': sum(totals.values())}
+
+    def _build_commanders(self) -> List[Dict[str, Any]]:
+        return self._query("SELECT pilot_name, last_update, system_name, ship_name FROM pilot_status "
+                           "ORDER BY last_update DESC")
+
+    def _build_events(self) -> List[Dict[str, Any]]:
+        with self.lock:
+            return list(self.recent_events)
+
+
+class APIRequestHandler(BaseHTTPRequestHandler):
+    """Handler HTTP somente leitura; self.server.state_cache fornece os dados."""
+
+    # Keep-alive: overlays que fazem polling reutilizam a mesma conexão
+    protocol_version = 'HTTP/1.1'
+
+    ROUTES = {
+        '/api/status': 'status',
+        '/api/ranks': 'ranks',
+        '/api/materials': 'materials',
+        '/api/profit': 'profit',
+        '/api/commanders': 'commanders',
+        '/api/events': 'events',
+    }
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        path = url.path.rstrip('/')
+        if path == '/api/health':
+            self._send_json(200, b'{"status": "ok"}')
+            return
+
+        if path == '/metrics':
+            self._send_metrics()
+            return
+
+        if path == '/api/events/stream':
+            self._stream_events(url.query)
+            return
+
+        if path.startswith('/api/trade/'):
+            self._trade_query(path, url.query)
+            return
+
+        resource = self.ROUTES.get(path)
+        if resource is None:
+            self._send_json(404, b'{"error": "not found"}')
+            return
+
+        state_cache: StateCache = self.server.state_cache
+
+        # Caminho rápido: ETag inalterado -> 304 sem consultar o banco
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match and if_none_match == state_cache.get_etag(resource):
+            self.send_response(304)
+            self.send_header('ETag', if_none_match)
+            self.end_headers()
+            return
+
+        etag, body = state_cache.get(resource)
+        self._send_json(200, body, etag)
+
+    def _stream_events(self, query: str) -> None:
+        """Server-sent events: envia cada evento commitado, filtrado por ?types=A,B."""
+        event_stream = getattr(self.server, 'event_stream', None)
+        if event_stream is None:
+            self._send_json(404, b'{"error": "event stream disabled"}')
+            return
+
+        types_param = parse_qs(query).get('types', [''])[0]
+        event_types = [t.strip() for t in types_param.split(',') if t.strip()]
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.wfile.flush()
+        self.close_connection = True
+
+        # O envio passa para o EventStream (uma thread para todos os clientes);
+        # esta thread só espera o cliente sair, sem consumir CPU.
+        client = event_stream.add_client(self.connection, event_types)
+        try:
+            client.done.wait()
+        finally:
+            event_stream.remove_client(client)
+
+    def _trade_query(self, path: str, query: str) -> None:
+        """Rotas comerciais: /api/trade/sell?commodity=X&market=N, /api/trade/hop e /api/trade/loop."""
+        finder = getattr(self.server, 'trade_finder', None)
+        if finder is None:
+            self._send_json(404, b'{"error": "trade routes disabled"}')
+            return
+
+        params = {key: values[0] for key, values in parse_qs(query).items()}
+        try:
+            market_id = int(params['market'])
+            jumps = int(params.get('jumps', DEFAULT_TRADE_JUMPS))
+            jump_range = float(params.get('range', DEFAULT_JUMP_RANGE_LY))
+            cargo = int(params.get('cargo', 1))
+            limit = min(int(params.get('limit', 10)), MAX_TRADE_RESULTS)
+        except (KeyError, ValueError):
+            self._send_json(400, b'{"error": "invalid parameters"}')
+            return
+
+        if path == '/api/trade/sell':
+            commodity = params.get('commodity', '').lower()
+            if not commodity:
+                self._send_json(400, b'{"error": "missing commodity"}')
+                return
+            result = finder.best_sell(commodity, market_id, jumps, jump_range, limit)
+        elif path == '/api/trade/hop':
+            result = finder.best_hops(market_id, jumps, jump_range, cargo, limit)
+        elif path == '/api/trade/loop':
+            result = finder.best_loops(market_id, jumps, jump_range, cargo, limit)
+        else:
+            self._send_json(404, b'{"error": "not found"}')
+            return
+        self._send_json(200, json.dumps(result, ensure_ascii=False).encode('utf-8'))
+
+    def _send_metrics(self) -> None:
+        """Métricas da ingestão no formato texto do Prometheus."""
+        metrics = getattr(self.server, 'metrics', None)
+        if metrics is None:
+            self._send_json(404, b'{"error": "metrics disabled"}')
+            return
+        body = metrics.render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, body: bytes, etag: Optional[str] = None) -> None:
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-cache')
+        if etag:
+            self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Polling frequente de overlays não deve poluir o log
+        logging.debug(f"API {self.address_string()} - {format % args}")
+
+
+class APIServer:
+    """Servidor HTTP local da API JSON, executado em uma thread própria."""
+
+    def __init__(self, state_cache: StateCache, host: str = DEFAULT_API_HOST, port: int = DEFAULT_API_PORT,
+                 event_stream=None, trade_finder=None, metrics=None):
+        self.state_cache = state_cache
+        self.event_stream = event_stream
+        self.trade_finder = trade_finder
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self.httpd: Optional[ThreadingHTTPServer] = None
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self.httpd = ThreadingHTTPServer((self.host, self.port), APIRequestHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.state_cache = self.state_cache
+        self.httpd.event_stream = self.event_stream
+        self.httpd.trade_finder = self.trade_finder
+        self.httpd.metrics = self.metrics
+        # Porta 0 = porta livre escolhida pelo sistema
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='edlt-api', daemon=True)
+        self.thread.start()
+        logging.info(f"API HTTP disponível em http://{self.host}:{self.port}/api/")
+
+    def stop(self) -> None:
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+        if self.thread:
+            self.thread.join(timeout=2.0)
+            self.thread = None
+        logging.info("API HTTP parada.")
@@ -1,24 +1,64 @@
 import sys
 import os
+import time
+import importlib.util
+
+# Marco zero da medição de inicialização (ver --startup-timing)
+_STARTUP_T0 = time.perf_counter()
+
+
+# ============================================================================
+# MEDIÇÃO DE INICIALIZAÇÃO
+# ============================================================================
+class StartupTimer:
+    """Registra o tempo de cada fase da inicialização em relação ao marco zero."""
+
+    def __init__(self, t0: float):
+        self.t0 = t0
+        self.last = t0
+        self.phases = []  # Lista de (fase, duração_ms, acumulado_ms)
+
+    def mark(self, phase: str) -> None:
+        now = time.perf_counter()
+        self.phases.append((phase, (now - self.last) * 1000.0, (now - self.t0) * 1000.0))
+        self.last = now
+
+    def mark_background(self, phase: str) -> None:
+        """Marca uma fase concluída fora do caminho crítico (ex: thread do DB)."""
+        now = time.perf_counter()
+        self.phases.append((phase, None, (now - self.t0) * 1000.0))
+
+    def elapsed_ms(self, phase: str) -> float:
+        for name, _, total_ms in self.phases:
+            if name == phase:
+                return total_ms
+        return 0.0
+
+    def report(self) -> str:
+        lines = ["Tempos de inicialização:"]
+        for phase, duration_ms, total_ms in self.phases:
+            duration = f"{duration_ms:8.1f} ms" if duration_ms is not None else "  (fundo)  "
+            lines.append(f"  {phase:<24} {duration}   t={total_ms:8.1f} ms")
+        return "\n".join(lines)
+
+
+STARTUP_TIMER = StartupTimer(_STARTUP_T0)
+
 
 # ============================================================================
 # VERIFICAÇÃO DE DEPENDÊNCIAS
 # ============================================================================
 def check_and_handle_dependencies():
-    """Verifica dependências críticas antes de iniciar o aplicativo."""
-    missing = []
+    """Verifica dependências críticas antes de iniciar o aplicativo.
 
-    # Verifica PySide6
-    try:
-        import PySide6
-    except ImportError:
-        missing.append('PySide6')
+    Usa find_spec para não importar os pacotes aqui; eles só são carregados
+    quando realmente usados.
+    """
+    missing = []
 
-    # Verifica watchdog
-    try:
-        import watchdog
-    except ImportError:
-        missing.append('watchdog')
+    for module_name in ('PySide6', 'watchdog'):
+        if importlib.util.find_spec(module_name) is None:
+            missing.append(module_name)
 
     if missing:
         print("=" * 70)
@@ -54,6 +94,7 @@ def check_and_handle_dependencies():
 
 # Executar verificação de dependências antes de importar qualquer módulo
 check_and_handle_dependencies()
+STARTUP_TIMER.mark('dependency_check')
 
 # ============================================================================
 # IMPORTS
@@ -66,23 +107,33 @@ from typing import Optional
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QPushButton, QTextEdit, QLineEdit, QLabel, QListWidget, QStackedWidget, QFileDialog,
-    QMessageBox, QListWidgetItem, QGridLayout, QProgressBar
+    QMessageBox, QListWidgetItem, QGridLayout, QProgressBar,
+    QTableWidget, QTableWidgetItem, QHeaderView, QCheckBox, QComboBox, QSpinBox
 )
-from PySide6.QtCore import QObject, Signal, Slot, QThread, Qt
+from PySide6.QtCore import QObject, Signal, Slot, QThread, QTimer, Qt
 from PySide6.QtGui import QFont
 
+STARTUP_TIMER.mark('qt_imports')
+
 # Adiciona o diretório do backend ao path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), ".")))
 
 # Importa o core do backend
-from main import BackendCore, JOURNAL_DIR, SQLITE_DB_PATH
-from csv_exporter import CSVExporter
+from main import BackendCore, JOURNAL_DIR, SQLITE_DB_PATH, ACTIVE_COMMANDER_SQL, active_commander, ActiveCommanderWatch
+from csv_exporter import CSVExporter, EXPORT_FORMATS
+from event_type_exporter import EventTypeExporter
 from backend.rank_data import RANK_NAMES, PILOTS_FEDERATION_RANKS, SUPERPOWER_RANKS
-from backend.material_limits import MATERIAL_LIMITS
+from backend.material_limits import get_material
+from backend.blueprint_data import get_blueprint_names, get_blueprint_max_grade
+from engineering_planner import EngineeringPlanner, INVENTORY_EVENTS, blueprint_targets
+from rank_progress import rank_forecasts
+from ingest_process import IngestProcess, PilotState
 
 # FIX: Combinar as listas de ranks
 ALL_RANK_TYPES = PILOTS_FEDERATION_RANKS + SUPERPOWER_RANKS
 
+STARTUP_TIMER.mark('backend_imports')
+
 # --- Classes de Visualização (Views) ---
 
 class ConfigView(QWidget):
@@ -96,6 +147,10 @@ class ConfigView(QWidget):
         self.journal_path_input.setPlaceholderText(
             "Ex: C:\\Users\\SeuUsuario\\Saved Games\\Frontier Developments\\Elite Dangerous"
         )
+        self.journal_path_input.setToolTip(
+            f"Várias contas: separe os diretórios com '{os.pathsep}'. "
+            "Os dados exibidos são os do comandante que jogou por último."
+        )
         
         self.browse_button = QPushButton("Procurar Diretório")
         
@@ -132,10 +187,37 @@ class ControlView(QWidget):
         h_layout.addWidget(self.stop_button)
         layout.addLayout(h_layout)
 
+        # Estado atual do piloto, publicado pela ingestão (sem consultas ao banco)
+        self.pilot_state_label = QLabel("Piloto: -")
+        layout.addWidget(self.pilot_state_label)
+
+        # Importa todos os diários dos diretórios configurados
+        self.backfill_button = QPushButton("Importar Histórico")
+        self.backfill_button.setEnabled(False)
+        layout.addWidget(self.backfill_button)
+
         self.export_button = QPushButton("Exportar Dados para CSV")
         self.export_button.setEnabled(True)
         layout.addWidget(self.export_button)
 
+        # Acrescenta só os eventos novos aos CSVs já exportados no diretório
+        self.incremental_checkbox = QCheckBox("Exportação incremental (somente registros novos)")
+        self.incremental_checkbox.setChecked(True)
+
+        # CSV, Parquet, Arrow IPC ou JSON Lines compactado (gzip/zstd)
+        self.format_combo = QComboBox()
+        self.format_combo.addItems(list(EXPORT_FORMATS))
+        export_options = QHBoxLayout()
+        export_options.addWidget(self.incremental_checkbox)
+        export_options.addStretch()
+        export_options.addWidget(QLabel("Formato:"))
+        export_options.addWidget(self.format_combo)
+        layout.addLayout(export_options)
+
+        # Também grava uma tabela plana por tipo de evento (FSDJump.csv, Scan.csv...)
+        self.by_type_checkbox = QCheckBox("Eventos do Journal em uma tabela por tipo")
+        layout.addWidget(self.by_type_checkbox)
+
         # FIX: Indicador de progresso para operações longas
         self.progress_bar = QProgressBar()
         self.progress_bar.setVisible(False)
@@ -231,7 +313,8 @@ class ProfitTrackerView(QWidget):
 
         try:
             cursor = conn.cursor()
-            sql = "SELECT profit_type, SUM(amount) as total_profit FROM pilot_profit GROUP BY profit_type"
+            sql = (f"SELECT profit_type, SUM(amount) as total_profit FROM pilot_profit "
+                   f"WHERE pilot_name = {ACTIVE_COMMANDER_SQL} GROUP BY profit_type")
             cursor.execute(sql)
             profit_data = {row['profit_type']: row['total_profit'] for row in cursor.fetchall()}
             
@@ -300,25 +383,28 @@ class MaterialsInventoryView(QWidget):
 
         try:
             cursor = conn.cursor()
-            # Seleciona todos os materiais, ordenados por tipo e nome
-            sql = "SELECT material_name, material_type, count FROM pilot_materials ORDER BY material_type, material_name"
+            # Materiais do comandante ativo, ordenados por categoria e nome
+            sql = (f"SELECT material_name, category, count FROM pilot_materials "
+                   f"WHERE pilot_name = {ACTIVE_COMMANDER_SQL} ORDER BY category, material_name")
             cursor.execute(sql)
             materials_data = cursor.fetchall()
             
             self.table_widget.setRowCount(len(materials_data))
             
             for row_num, row_data in enumerate(materials_data):
-                material_name, material_type, count = row_data
+                material_name, category, count = row_data
+                # O Journal grava o símbolo ("chemicalstorageunits"); o catálogo traz nome e capacidade
+                info = get_material(material_name)
                 
                 # 1. Material Name
-                self.table_widget.setItem(row_num, 0, QTableWidgetItem(material_name))
+                self.table_widget.setItem(row_num, 0, QTableWidgetItem(info.name if info else material_name))
                 
                 # 2. Material Type
-                self.table_widget.setItem(row_num, 1, QTableWidgetItem(material_type))
+                self.table_widget.setItem(row_num, 1, QTableWidgetItem(category))
                 
                 # 3. Quantidade (com barra de progresso)
-                # Busca a capacidade máxima do material (se existir)
-                max_capacity = MATERIAL_LIMITS.get(material_name, 0)
+                # Capacidade máxima do grau do material (0 se desconhecido)
+                max_capacity = info.capacity if info else 0
                 
                 progress_bar = QProgressBar()
                 progress_bar.setRange(0, max_capacity if max_capacity > 0 else 1)
@@ -356,6 +442,113 @@ class MaterialsInventoryView(QWidget):
             if conn:
                 conn.close()
 
+class EngineeringPlannerView(QWidget):
+    """Planejador de engenharia: materiais faltantes para os blueprints escolhidos e trocas sugeridas."""
+    # Emitido pela thread do monitor; a conexão enfileirada recalcula na thread da GUI
+    inventory_changed = Signal()
+
+    def __init__(self, backend_core: BackendCore, parent=None):
+        super().__init__(parent)
+        self.backend_core = backend_core
+        self.planner = EngineeringPlanner(backend_core.db_path)
+        self.targets = []
+        # O inventário planejado é o do comandante ativo, que outra conta pode trocar
+        self.active_commander = ActiveCommanderWatch()
+        self.setup_ui()
+        self.inventory_changed.connect(self.update_plan_display)
+        self.backend_core.add_event_listener(self.on_event)
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+
+        title = QLabel("Planejador de Engenharia")
+        title.setFont(QFont("Arial", 16, QFont.Bold))
+        layout.addWidget(title)
+
+        form_layout = QHBoxLayout()
+        self.blueprint_combo = QComboBox()
+        self.blueprint_combo.addItems(get_blueprint_names())
+        form_layout.addWidget(self.blueprint_combo, 1)
+        form_layout.addWidget(QLabel("Até o grau:"))
+        self.grade_spin = QSpinBox()
+        self.grade_spin.setRange(1, 5)
+        self.grade_spin.setValue(5)
+        form_layout.addWidget(self.grade_spin)
+        form_layout.addWidget(QLabel("Rolagens por grau:"))
+        self.rolls_spin = QSpinBox()
+        self.rolls_spin.setRange(1, 20)
+        self.rolls_spin.setValue(3)
+        form_layout.addWidget(self.rolls_spin)
+        self.add_button = QPushButton("Adicionar")
+        form_layout.addWidget(self.add_button)
+        self.clear_button = QPushButton("Limpar")
+        form_layout.addWidget(self.clear_button)
+        layout.addLayout(form_layout)
+
+        self.targets_label = QLabel("Nenhum blueprint selecionado.")
+        self.targets_label.setWordWrap(True)
+        layout.addWidget(self.targets_label)
+
+        self.table_widget = QTableWidget()
+        self.table_widget.setColumnCount(4)
+        self.table_widget.setHorizontalHeaderLabels(["Material", "Necessário", "Faltando", "Após Trocas"])
+        self.table_widget.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        for column in range(1, 4):
+            self.table_widget.horizontalHeader().setSectionResizeMode(column, QHeaderView.ResizeToContents)
+        layout.addWidget(self.table_widget)
+
+        layout.addWidget(QLabel("Trocas sugeridas (Material Trader):"))
+        self.trades_list = QListWidget()
+        layout.addWidget(self.trades_list)
+
+        self.add_button.clicked.connect(self.add_target)
+        self.clear_button.clicked.connect(self.clear_targets)
+
+    def on_event(self, event_data):
+        """Listener do BackendCore (thread do monitor): só sinaliza eventos que mudam o inventário."""
+        switched = self.active_commander.changed(event_data, self.backend_core.current_commander())
+        if self.targets and (switched or event_data.get('event') in INVENTORY_EVENTS):
+            self.inventory_changed.emit()
+
+    @Slot()
+    def add_target(self):
+        blueprint = self.blueprint_combo.currentText()
+        max_grade = min(self.grade_spin.value(), get_blueprint_max_grade(blueprint))
+        self.targets = [target for target in self.targets if target[0] != blueprint]
+        self.targets += blueprint_targets(blueprint, max_grade, self.rolls_spin.value())
+        self.update_plan_display()
+
+    @Slot()
+    def clear_targets(self):
+        self.targets = []
+        self.update_plan_display()
+
+    @Slot()
+    def update_plan_display(self):
+        grades = {}
+        for blueprint, grade, rolls in self.targets:
+            grades[blueprint] = (max(grade, grades.get(blueprint, (0, 0))[0]), rolls)
+        self.targets_label.setText(
+            "; ".join(f"{blueprint} G1-G{grade} ({rolls} rolagens por grau)"
+                      for blueprint, (grade, rolls) in sorted(grades.items()))
+            or "Nenhum blueprint selecionado."
+        )
+
+        plan = self.planner.plan(self.targets) if self.targets else {
+            'required': {}, 'missing': {}, 'trades': [], 'unresolved': {}}
+        required = sorted(plan['required'].items())
+        self.table_widget.setRowCount(len(required))
+        for row_num, (material, count) in enumerate(required):
+            self.table_widget.setItem(row_num, 0, QTableWidgetItem(material))
+            self.table_widget.setItem(row_num, 1, QTableWidgetItem(str(count)))
+            self.table_widget.setItem(row_num, 2, QTableWidgetItem(str(plan['missing'].get(material, 0))))
+            self.table_widget.setItem(row_num, 3, QTableWidgetItem(str(plan['unresolved'].get(material, 0))))
+
+        self.trades_list.clear()
+        for trade in plan['trades']:
+            self.trades_list.addItem(f"{trade['paid']} {trade['source']} -> {trade['received']} {trade['target']}")
+
+
 class PilotRanksView(QWidget):
     """Visualização para exibir o status e progresso dos ranques do piloto."""
     def __init__(self, backend_core: BackendCore, parent=None):
@@ -363,6 +556,7 @@ class PilotRanksView(QWidget):
         self.backend_core = backend_core
         self.rank_labels = {}
         self.progress_bars = {}
+        self.forecast_labels = {}
         self.setup_ui()
 
     def setup_ui(self):
@@ -381,6 +575,7 @@ class PilotRanksView(QWidget):
         self.grid_layout.addWidget(QLabel("Ranque Atual"), 0, 1, Qt.AlignmentFlag.AlignLeft)
         self.grid_layout.addWidget(QLabel("Progresso para o Próximo"), 0, 2, 
                                   Qt.AlignmentFlag.AlignLeft)
+        self.grid_layout.addWidget(QLabel("Previsão"), 0, 3, Qt.AlignmentFlag.AlignLeft)
         
         row = 1
         for rank_type in ALL_RANK_TYPES:
@@ -395,6 +590,10 @@ class PilotRanksView(QWidget):
             self.progress_bars[rank_type].setValue(0)
             self.grid_layout.addWidget(self.progress_bars[rank_type], row, 2)
             
+            self.forecast_labels[rank_type] = QLabel("")
+            self.grid_layout.addWidget(self.forecast_labels[rank_type], row, 3,
+                                      Qt.AlignmentFlag.AlignLeft)
+            
             row += 1
             
         layout.addLayout(self.grid_layout)
@@ -402,6 +601,21 @@ class PilotRanksView(QWidget):
         
         self.update_button.clicked.connect(self.update_ranks_display)
 
+    @staticmethod
+    def format_forecast(forecast) -> str:
+        """Texto da previsão: "≈ 12 h para Dangerous · ≈ 340 h para Elite"."""
+        if not forecast:
+            return "Sem histórico"
+        if forecast['hours_to_target'] == 0:
+            return f"{forecast['target_rank']} alcançado"
+        if forecast['hours_to_target'] is None:
+            return "Sem progresso recente"
+        parts = []
+        if forecast['hours_to_next'] is not None and forecast['next_rank'] != forecast['target_rank']:
+            parts.append(f"≈ {forecast['hours_to_next']:.0f} h para {forecast['next_rank']}")
+        parts.append(f"≈ {forecast['hours_to_target']:.0f} h para {forecast['target_rank']}")
+        return " · ".join(parts)
+
     @Slot()
     def update_ranks_display(self):
         conn = self.backend_core.get_db_connection()
@@ -412,10 +626,10 @@ class PilotRanksView(QWidget):
 
         try:
             cursor = conn.cursor()
-            sql = """SELECT rank_combat, progress_combat, rank_trade, progress_trade, 
+            sql = f"""SELECT rank_combat, progress_combat, rank_trade, progress_trade, 
                      rank_explore, progress_explore, rank_cqc, progress_cqc, 
                      rank_federation, progress_federation, rank_empire, progress_empire 
-                     FROM pilot_status LIMIT 1"""
+                     FROM pilot_status WHERE pilot_name = {ACTIVE_COMMANDER_SQL}"""
             cursor.execute(sql)
             data = cursor.fetchone()
             
@@ -451,6 +665,11 @@ class PilotRanksView(QWidget):
                     self.rank_labels[rank_type].setText("N/A")
                     self.progress_bars[rank_type].setValue(0)
                     self.progress_bars[rank_type].setFormat("N/A")
+
+            # Previsão lida do estado incremental (uma linha por tipo, sem varrer o histórico)
+            forecasts = rank_forecasts(conn, active_commander(conn))
+            for rank_type in ALL_RANK_TYPES:
+                self.forecast_labels[rank_type].setText(self.format_forecast(forecasts.get(rank_type)))
                     
         except Exception as e:
             QMessageBox.critical(self, "Erro de Consulta", f"Erro ao buscar dados de ranques: {e}")
@@ -459,6 +678,148 @@ class PilotRanksView(QWidget):
                 conn.close()
 
 
+class DiagnosticsView(QWidget):
+    """Métricas da ingestão: latência por etapa e por handler, contadores e erros."""
+
+    # Intervalo de atualização enquanto a visualização está visível
+    REFRESH_MS = 1000
+
+    def __init__(self, backend_core: BackendCore, parent=None):
+        super().__init__(parent)
+        self.backend_core = backend_core
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(self.REFRESH_MS)
+        self.refresh_timer.timeout.connect(self.update_metrics_display)
+        self.setup_ui()
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+
+        title = QLabel("Diagnóstico da Ingestão")
+        title.setFont(QFont("Arial", 16, QFont.Bold))
+        layout.addWidget(title)
+
+        controls = QHBoxLayout()
+        self.reset_button = QPushButton("Zerar Métricas")
+        self.reset_button.clicked.connect(self.reset_metrics)
+        controls.addWidget(self.reset_button)
+        self.profile_seconds = QSpinBox()
+        self.profile_seconds.setRange(5, 600)
+        self.profile_seconds.setValue(30)
+        self.profile_seconds.setSuffix(" s")
+        controls.addWidget(self.profile_seconds)
+        self.profile_button = QPushButton("Perfilar Ingestão")
+        self.profile_button.clicked.connect(self.start_profiling)
+        controls.addWidget(self.profile_button)
+        self.trace_sql_checkbox = QCheckBox("Rastrear SQL lento")
+        self.trace_sql_checkbox.setChecked(self.backend_core.trace_sql)
+        self.trace_sql_checkbox.toggled.connect(self.set_trace_sql)
+        controls.addWidget(self.trace_sql_checkbox)
+        self.dump_button = QPushButton("Salvar Eventos Lentos")
+        self.dump_button.clicked.connect(self.dump_diagnostics)
+        controls.addWidget(self.dump_button)
+        layout.addLayout(controls)
+
+        self.latency_table = QTableWidget(0, 6)
+        self.latency_table.setHorizontalHeaderLabels(["Métrica", "Etapa", "Amostras", "p50", "p99", "Total (s)"])
+        self.latency_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.latency_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.latency_table)
+
+        self.counter_table = QTableWidget(0, 3)
+        self.counter_table.setHorizontalHeaderLabels(["Contador", "Rótulos", "Valor"])
+        self.counter_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.counter_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.counter_table)
+
+        self.slow_label = QLabel()
+        layout.addWidget(self.slow_label)
+        self.slow_table = QTableWidget(0, 5)
+        self.slow_table.setHorizontalHeaderLabels(["Horário", "Evento", "Tamanho", "Total", "Etapa mais lenta"])
+        self.slow_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.slow_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.slow_table)
+
+    @staticmethod
+    def format_seconds(seconds: Optional[float]) -> str:
+        """Limite da faixa do histograma em unidade legível ("≤ 250 µs", "≤ 2.5 ms")."""
+        if seconds is None:
+            return "-"
+        if seconds == float('inf'):
+            return "> 1 s"
+        if seconds < 0.001:
+            return f"≤ {seconds * 1e6:g} µs"
+        return f"≤ {seconds * 1e3:g} ms"
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.update_metrics_display()
+        self.refresh_timer.start()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.refresh_timer.stop()
+
+    @Slot()
+    def reset_metrics(self):
+        self.backend_core.metrics.reset()
+        self.backend_core.slow_events.clear()
+        self.backend_core.slow_sql.clear()
+        self.update_metrics_display()
+
+    @Slot()
+    def start_profiling(self):
+        # O resultado é gravado em segundo plano; o caminho aparece no log
+        self.backend_core.start_profiling(self.profile_seconds.value())
+
+    @Slot(bool)
+    def set_trace_sql(self, enabled: bool):
+        self.backend_core.trace_sql = enabled
+
+    @Slot()
+    def dump_diagnostics(self):
+        directory = QFileDialog.getExistingDirectory(self, "Selecione o Diretório do Diagnóstico",
+                                                     self.backend_core.diagnostics_dir())
+        if not directory:
+            return
+        paths = self.backend_core.dump_diagnostics(directory)
+        if paths:
+            QMessageBox.information(self, "Diagnóstico Salvo", "\n".join(paths))
+
+    @Slot()
+    def update_metrics_display(self):
+        snapshot = self.backend_core.metrics.snapshot()
+
+        histograms = snapshot['histograms']
+        self.latency_table.setRowCount(len(histograms))
+        for row, series in enumerate(histograms):
+            label = ", ".join(series['labels'].values())
+            values = [series['name'], label, str(series['count']), self.format_seconds(series['p50']),
+                      self.format_seconds(series['p99']), f"{series['sum']:.3f}"]
+            for column, value in enumerate(values):
+                self.latency_table.setItem(row, column, QTableWidgetItem(value))
+
+        counters = snapshot['counters'] + snapshot['gauges']
+        self.counter_table.setRowCount(len(counters))
+        for row, series in enumerate(counters):
+            label = ", ".join(f"{name}={value}" for name, value in series['labels'].items())
+            values = [series['name'], label, f"{series['value']:g}"]
+            for column, value in enumerate(values):
+                self.counter_table.setItem(row, column, QTableWidgetItem(value))
+
+        slow_events = self.backend_core.slow_events.snapshot()
+        self.slow_label.setText(f"Eventos lentos (≥ {self.backend_core.slow_events.threshold_ms:g} ms): "
+                                f"{len(slow_events)}; SQL lento: {len(self.backend_core.slow_sql.snapshot())}")
+        self.slow_table.setRowCount(len(slow_events))
+        # Mais recentes primeiro
+        for row, entry in enumerate(reversed(slow_events)):
+            slowest = max(entry['timings_ms'].items(), key=lambda item: item[1], default=('-', 0.0))
+            values = [entry['timestamp'] or '', entry['event'] or '', f"{entry['size']} B", f"{entry['ms']:.1f} ms",
+                      f"{slowest[0]} ({slowest[1]:.1f} ms)"]
+            for column, value in enumerate(values):
+                self.slow_table.setItem(row, column, QTableWidgetItem(value))
+
+
 # --- Handlers e Workers ---
 
 class LogSignalHandler(logging.Handler, QObject):
@@ -474,9 +835,240 @@ class LogSignalHandler(logging.Handler, QObject):
         self.log_record_signal.emit(msg)
 
 
-class BackendWorker(QObject):
-    finished = Signal()
+class IngestBridge(QObject):
+    """Ponte thread-safe entre o núcleo assíncrono da ingestão e a GUI.
+
+    Os listeners do BackendCore rodam na thread do SQLite; a ponte agrega os
+    eventos e mantém no máximo um sinal pendente, então uma rajada de
+    eventos vira uma única atualização na thread da GUI.
+    """
+    events_committed = Signal(int, str)  # (eventos desde o último sinal, tipo do último)
+    monitoring_changed = Signal(bool)
+    error = Signal(str)
+    # Estado atual dos pilotos (PilotState.snapshot), mantido em memória pelos eventos
+    state_changed = Signal(object)
+    backfill_finished = Signal(int)  # eventos novos importados
+    # Internos: emitidos das threads do SQLite e da importação, entregues na
+    # thread da GUI (conexão enfileirada); os sinais públicos saem só de lá
+    flush_requested = Signal()
+    backfill_done = Signal(int, str)  # (eventos novos, erro)
+
+    def __init__(self, backend_core: BackendCore, parent=None):
+        super().__init__(parent)
+        self.backend_core = backend_core
+        self.lock = threading.Lock()
+        self.pending_count = 0
+        self.last_event = ""
+        self.signal_pending = False
+        self.state = PilotState()
+        self.state_dirty = False
+        self.state_seeded = False
+        self.backfill_thread: Optional[threading.Thread] = None
+        self.flush_requested.connect(self.flush)
+        self.backfill_done.connect(self.finish_backfill)
+        self.backend_core.add_event_listener(self.on_event)
+
+    @property
+    def is_running(self) -> bool:
+        return self.backend_core.is_running
+
+    def on_event(self, event_data):
+        with self.lock:
+            self.pending_count += 1
+            self.last_event = event_data.get('event', '')
+            self.state.apply(event_data, self.backend_core.current_commander())
+            self.state_dirty = True
+            if self.signal_pending:
+                return
+            self.signal_pending = True
+        self.flush_requested.emit()
+
+    @Slot()
+    def flush(self):
+        with self.lock:
+            count, last_event = self.pending_count, self.last_event
+            self.pending_count = 0
+            self.signal_pending = False
+            state = self.state.snapshot() if self.state_dirty else None
+            self.state_dirty = False
+        if count:
+            self.events_committed.emit(count, last_event)
+        if state is not None:
+            self.state_changed.emit(state)
+
+    def seed_state(self) -> None:
+        """Carrega o estado dos pilotos já gravado (uma única consulta, depois só eventos)."""
+        if self.state_seeded:
+            return
+        conn = self.backend_core.get_db_connection()
+        if not conn:
+            return
+        try:
+            with self.lock:
+                self.state.seed(conn)
+            self.state_seeded = True
+        except sqlite3.Error as e:
+            logging.error(f"Erro ao carregar o estado do piloto: {e}")
+        finally:
+            conn.close()
+        self.update_state()
+
+    def update_state(self, **fields) -> None:
+        """Altera campos de controle do estado (monitoring, backfill_running) e agenda o sinal."""
+        with self.lock:
+            for name, value in fields.items():
+                setattr(self.state, name, value)
+            self.state_dirty = True
+            if self.signal_pending:
+                return
+            self.signal_pending = True
+        self.flush_requested.emit()
+
+    def backfill(self) -> None:
+        """Importa o histórico em uma thread (compete pelo GIL com a GUI; ver --ingest-process)."""
+        if self.backfill_thread and self.backfill_thread.is_alive():
+            return
+        self.update_state(backfill_running=True)
+
+        def run():
+            try:
+                self.backfill_done.emit(self.backend_core.backfill(), "")
+            except Exception as e:
+                self.backfill_done.emit(0, f"Erro na importação do histórico: {e}")
+
+        self.backfill_thread = threading.Thread(target=run, name='edlt-backfill', daemon=True)
+        self.backfill_thread.start()
+
+    @Slot(int, str)
+    def finish_backfill(self, imported: int, error_message: str):
+        self.update_state(backfill_running=False)
+        if error_message:
+            self.error.emit(error_message)
+        self.backfill_finished.emit(imported)
+
+    def start(self) -> bool:
+        """Inicia o monitoramento; o event loop da ingestão roda na sua própria thread."""
+        try:
+            self.backend_core.start_monitoring()
+        except Exception as e:
+            self.error.emit(f"Erro fatal no backend: {e}")
+            return False
+        if not self.backend_core.is_running:
+            self.error.emit("Nenhum arquivo de diário encontrado para monitorar.")
+            return False
+        self.update_state(monitoring=True)
+        self.monitoring_changed.emit(True)
+        return True
+
+    def stop(self) -> None:
+        """Para o monitoramento; os eventos já lidos são gravados antes."""
+        if self.backend_core.is_running:
+            self.backend_core.stop_monitoring()
+            self.flush()
+            self.update_state(monitoring=False)
+            self.monitoring_changed.emit(False)
+
+    def shutdown(self) -> None:
+        self.stop()
+
+
+class IngestProcessBridge(QObject):
+    """Ponte entre a GUI e a ingestão em um processo filho (ver ingest_process).
+
+    Um QTimer por quadro lê o estado na memória compartilhada (sem consultar o
+    banco) e os lotes de eventos do Pipe. Os eventos são repassados aos
+    listeners do BackendCore da GUI (planejador, API), como no modo em thread,
+    com o comandante da sessão que o filho registrou para cada evento.
+    """
+    events_committed = Signal(int, str)
+    monitoring_changed = Signal(bool)
     error = Signal(str)
+    state_changed = Signal(object)
+    backfill_finished = Signal(int)
+
+    # Intervalo de leitura: um quadro a 60 Hz
+    POLL_INTERVAL_MS = 16
+
+    def __init__(self, backend_core: BackendCore, parent=None):
+        super().__init__(parent)
+        self.backend_core = backend_core
+        self.process: Optional[IngestProcess] = None
+        self.monitoring = False
+        self.poll_timer = QTimer(self)
+        self.poll_timer.setInterval(self.POLL_INTERVAL_MS)
+        self.poll_timer.timeout.connect(self.poll)
+
+    @property
+    def is_running(self) -> bool:
+        return self.monitoring
+
+    def ensure_process(self) -> IngestProcess:
+        """Inicia o processo filho na primeira vez (depois que o banco foi inicializado)."""
+        if self.process is None:
+            self.process = IngestProcess(self.backend_core.journal_dirs, self.backend_core.db_path)
+            self.process.start()
+            self.poll_timer.start()
+        self.process.journal_dirs = list(self.backend_core.journal_dirs)
+        return self.process
+
+    def seed_state(self) -> None:
+        """O filho carrega o estado ao iniciar; aqui só o processo é iniciado."""
+        self.ensure_process()
+
+    @Slot()
+    def poll(self):
+        for message in self.process.poll():
+            kind, payload = message[0], message[1]
+            if kind == 'events':
+                for event_data, commander in payload:
+                    self.backend_core.notify_event_listeners(event_data, commander)
+                self.events_committed.emit(len(payload), payload[-1][0].get('event', ''))
+            elif kind == 'backfill_finished':
+                self.backfill_finished.emit(payload)
+            elif kind == 'error':
+                if self.monitoring:
+                    self.monitoring = False
+                    self.monitoring_changed.emit(False)
+                self.error.emit(payload)
+        state = self.process.read_state()
+        if state is not None:
+            self.state_changed.emit(state)
+        if not self.process.is_alive():
+            self.poll_timer.stop()
+            self.process.shutdown()
+            self.process = None
+            if self.monitoring:
+                self.monitoring = False
+                self.monitoring_changed.emit(False)
+            self.error.emit("O processo de ingestão terminou inesperadamente.")
+
+    def backfill(self) -> None:
+        self.ensure_process().backfill()
+
+    def start(self) -> bool:
+        self.ensure_process().start_monitoring()
+        self.monitoring = True
+        self.monitoring_changed.emit(True)
+        return True
+
+    def stop(self) -> None:
+        if self.monitoring:
+            self.process.stop_monitoring()
+            self.monitoring = False
+            self.monitoring_changed.emit(False)
+
+    def shutdown(self) -> None:
+        """Encerra o processo filho (os eventos já lidos são gravados antes)."""
+        self.monitoring = False
+        self.poll_timer.stop()
+        if self.process is not None:
+            self.process.shutdown()
+            self.process = None
+
+
+class DBInitWorker(QObject):
+    """Inicializa o banco de dados (schema e migrações) fora da thread da GUI."""
+    finished = Signal(bool)
 
     def __init__(self, backend_core: BackendCore):
         super().__init__()
@@ -485,11 +1077,10 @@ class BackendWorker(QObject):
     @Slot()
     def run(self):
         try:
-            self.backend_core.start_monitoring()
+            self.finished.emit(self.backend_core.initialize_db())
         except Exception as e:
-            self.error.emit(f"Erro fatal no backend: {e}")
-        finally:
-            self.finished.emit()
+            logging.error(f"Erro ao inicializar o banco de dados: {e}")
+            self.finished.emit(False)
 
 
 class CSVExportWorker(QObject):
@@ -497,19 +1088,33 @@ class CSVExportWorker(QObject):
     error = Signal(str)
     progress = Signal(int)
 
-    def __init__(self, output_dir: str):
+    def __init__(self, output_dir: str, incremental: bool = False, export_format: str = 'csv',
+                 by_event_type: bool = False):
         super().__init__()
         self.output_dir = output_dir
+        self.incremental = incremental
+        self.export_format = export_format
+        self.by_event_type = by_event_type
 
     @Slot()
     def run(self):
         try:
             exporter = CSVExporter(SQLITE_DB_PATH)
             # FIX: Passa callback para emitir progresso durante a exportação
+            # Com a exportação por tipo, cada etapa ocupa metade da barra
+            scale = 2 if self.by_event_type else 1
             exported_files = exporter.export_all_data(
                 self.output_dir,
-                progress_callback=lambda percent: self.progress.emit(percent)
+                progress_callback=lambda percent: self.progress.emit(percent // scale),
+                incremental=self.incremental,
+                export_format=self.export_format
             )
+            if self.by_event_type:
+                exported_files += EventTypeExporter(SQLITE_DB_PATH).export(
+                    os.path.join(self.output_dir, 'eventos_por_tipo'),
+                    progress_callback=lambda percent: self.progress.emit(50 + percent // 2),
+                    incremental=self.incremental
+                )
             self.finished.emit(exported_files)
         except Exception as e:
             self.error.emit(f"Erro durante a exportação CSV: {e}")
@@ -519,7 +1124,7 @@ class CSVExportWorker(QObject):
 # --- Janela Principal ---
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, ingest_process: bool = False):
         super().__init__()
         self.setWindowTitle("Elite Dangerous Log Tracker (EDLT)")
         self.setGeometry(100, 100, 1000, 750)
@@ -529,12 +1134,30 @@ class MainWindow(QMainWindow):
         logging.getLogger().addHandler(self.log_handler)
         logging.getLogger().setLevel(logging.INFO)
 
-        self.backend_core = BackendCore(JOURNAL_DIR)
-        self.backend_thread: Optional[QThread] = None
-        self.backend_worker: Optional[BackendWorker] = None
+        # O schema é aplicado em segundo plano (ver start_db_initialization)
+        self.backend_core = BackendCore(JOURNAL_DIR, initialize=False)
+        self.backend_core.load_plugins()
+        # --ingest-process: a ingestão roda em um processo filho, fora do GIL da GUI
+        bridge_class = IngestProcessBridge if ingest_process else IngestBridge
+        self.ingest_bridge = bridge_class(self.backend_core, self)
+        self.ingest_bridge.events_committed.connect(self.handle_events_committed)
+        self.ingest_bridge.error.connect(self.handle_backend_error)
+        self.ingest_bridge.state_changed.connect(self.handle_state_changed)
+        self.ingest_bridge.backfill_finished.connect(self.handle_backfill_finished)
+        self.committed_events = 0
+        self.pilot_state: dict = {}
+        self.db_init_thread: Optional[QThread] = None
+        self.db_init_worker: Optional[DBInitWorker] = None
+        self.db_ready = False
+
+        # Estado aplicado às visualizações quando forem criadas
+        self.views = {}
+        self.status_message = ""
+        self.journal_configured = False
 
         self.setup_ui()
         self.connect_signals()
+        self.nav_menu.setCurrentRow(0)
         
         self.update_status("Pronto para configurar e iniciar.")
 
@@ -552,24 +1175,28 @@ class MainWindow(QMainWindow):
         self.stacked_widget = QStackedWidget()
         self.main_layout.addWidget(self.stacked_widget)
 
-        # Adiciona as visualizações
-        self.config_view = ConfigView()
-        self.control_view = ControlView()
-        self.profit_tracker_view = ProfitTrackerView(self.backend_core)
-        self.pilot_ranks_view = PilotRanksView(self.backend_core)
-        
-        self.stacked_widget.addWidget(self.config_view)
-        self.stacked_widget.addWidget(self.control_view)
-        self.materials_inventory_view = MaterialsInventoryView(self.backend_core)
-        self.stacked_widget.addWidget(self.materials_inventory_view)
-        self.stacked_widget.addWidget(self.profit_tracker_view)
-        self.stacked_widget.addWidget(self.pilot_ranks_view)
-
-        self.nav_menu.addItem("Configuração")
-        self.nav_menu.addItem("Controle")
-        self.nav_menu.addItem("Inventário de Materiais")
-        self.nav_menu.addItem("Rastreamento de Lucro")
-        self.nav_menu.addItem("Ranques do Piloto")
+        # Visualizações criadas sob demanda, na primeira seleção no nav_menu.
+        # Até lá cada posição do stacked_widget guarda um placeholder vazio.
+        self.config_view: Optional[ConfigView] = None
+        self.control_view: Optional[ControlView] = None
+        self.materials_inventory_view: Optional[MaterialsInventoryView] = None
+        self.profit_tracker_view: Optional[ProfitTrackerView] = None
+        self.pilot_ranks_view: Optional[PilotRanksView] = None
+        self.engineering_planner_view: Optional[EngineeringPlannerView] = None
+        self.diagnostics_view: Optional[DiagnosticsView] = None
+
+        self.view_factories = [
+            ("Configuração", self.create_config_view),
+            ("Controle", self.create_control_view),
+            ("Inventário de Materiais", self.create_materials_inventory_view),
+            ("Planejador de Engenharia", self.create_engineering_planner_view),
+            ("Rastreamento de Lucro", self.create_profit_tracker_view),
+            ("Ranques do Piloto", self.create_pilot_ranks_view),
+            ("Diagnóstico", self.create_diagnostics_view),
+        ]
+        for title, _ in self.view_factories:
+            self.nav_menu.addItem(title)
+            self.stacked_widget.addWidget(QWidget())
 
         # Log Viewer
         log_layout = QVBoxLayout()
@@ -587,19 +1214,101 @@ class MainWindow(QMainWindow):
         log_layout.addWidget(self.watermark_label)
 
     def connect_signals(self):
-        self.nav_menu.currentRowChanged.connect(self.stacked_widget.setCurrentIndex)
-        
-        # Configuração
+        self.nav_menu.currentRowChanged.connect(self.show_view)
+
+    # --- Criação Sob Demanda das Visualizações ---
+
+    @Slot(int)
+    def show_view(self, row: int):
+        if row < 0:
+            return
+        self.stacked_widget.setCurrentWidget(self.ensure_view(row))
+
+    def ensure_view(self, row: int) -> QWidget:
+        """Cria a visualização da linha `row` na primeira vez que é pedida."""
+        view = self.views.get(row)
+        if view is None:
+            title, factory = self.view_factories[row]
+            start = time.perf_counter()
+            view = factory()
+
+            placeholder = self.stacked_widget.widget(row)
+            self.stacked_widget.removeWidget(placeholder)
+            placeholder.deleteLater()
+            self.stacked_widget.insertWidget(row, view)
+
+            self.views[row] = view
+            logging.debug(f"Visualização '{title}' criada em {(time.perf_counter() - start) * 1000:.1f} ms")
+        return view
+
+    def create_config_view(self) -> QWidget:
+        self.config_view = ConfigView()
         self.config_view.browse_button.clicked.connect(self.browse_journal_path)
         self.config_view.save_config_button.clicked.connect(self.save_config)
-        
-        # Controle
+        return self.config_view
+
+    def create_control_view(self) -> QWidget:
+        self.control_view = ControlView()
+        self.control_view.status_label.setText(f"Status: {self.status_message}")
+        self.control_view.start_button.setEnabled(
+            self.journal_configured and not self.ingest_bridge.is_running
+        )
+        self.control_view.stop_button.setEnabled(self.ingest_bridge.is_running)
+        self.control_view.backfill_button.setEnabled(
+            self.journal_configured and not self.pilot_state.get('backfill_running', False)
+        )
+        self.control_view.pilot_state_label.setText(format_pilot_state(self.pilot_state))
         self.control_view.start_button.clicked.connect(self.start_backend_worker)
         self.control_view.stop_button.clicked.connect(self.stop_backend_worker)
+        self.control_view.backfill_button.clicked.connect(self.start_backfill)
         self.control_view.export_button.clicked.connect(self.start_csv_export_worker)
+        return self.control_view
+
+    def create_materials_inventory_view(self) -> QWidget:
+        self.materials_inventory_view = MaterialsInventoryView(self.backend_core)
+        return self.materials_inventory_view
+
+    def create_engineering_planner_view(self) -> QWidget:
+        self.engineering_planner_view = EngineeringPlannerView(self.backend_core)
+        return self.engineering_planner_view
+
+    def create_profit_tracker_view(self) -> QWidget:
+        self.profit_tracker_view = ProfitTrackerView(self.backend_core)
+        return self.profit_tracker_view
 
-        # Conecta o botão de atualização da nova view
-        self.materials_inventory_view.update_button.clicked.connect(self.materials_inventory_view.update_materials_display)
+    def create_pilot_ranks_view(self) -> QWidget:
+        self.pilot_ranks_view = PilotRanksView(self.backend_core)
+        return self.pilot_ranks_view
+
+    def create_diagnostics_view(self) -> QWidget:
+        self.diagnostics_view = DiagnosticsView(self.backend_core)
+        return self.diagnostics_view
+
+    # --- Inicialização do Banco de Dados em Segundo Plano ---
+
+    def start_db_initialization(self):
+        """Aplica schema e migrações em uma QThread depois que a janela aparece."""
+        self.db_init_thread = QThread()
+        self.db_init_worker = DBInitWorker(self.backend_core)
+        self.db_init_worker.moveToThread(self.db_init_thread)
+
+        self.db_init_thread.started.connect(self.db_init_worker.run)
+        self.db_init_worker.finished.connect(self.db_init_thread.quit)
+        self.db_init_worker.finished.connect(self.db_init_worker.deleteLater)
+        self.db_init_thread.finished.connect(self.db_init_thread.deleteLater)
+        self.db_init_worker.finished.connect(self.handle_db_initialized)
+
+        self.db_init_thread.start()
+
+    @Slot(bool)
+    def handle_db_initialized(self, success: bool):
+        self.db_ready = success
+        STARTUP_TIMER.mark_background('db_initialized')
+        if success:
+            self.ingest_bridge.seed_state()
+        else:
+            QMessageBox.critical(self, "Erro no Banco de Dados",
+                                 "Não foi possível inicializar o banco de dados SQLite. Verifique os logs.")
 
     @Slot()
     def browse_journal_path(self):
@@ -611,26 +1320,32 @@ class MainWindow(QMainWindow):
 
     @Slot()
     def save_config(self):
-        new_journal_dir = self.config_view.journal_path_input.text().strip()
+        # Várias contas: diretórios separados por os.pathsep (';' no Windows)
+        journal_dirs = [path.strip() for path in self.config_view.journal_path_input.text().split(os.pathsep)
+                        if path.strip()]
         
         # FIX: Validação do diretório
-        if not new_journal_dir:
+        if not journal_dirs:
             QMessageBox.warning(self, "Caminho Vazio", "Por favor, especifique um diretório.")
             return
         
-        if not os.path.isdir(new_journal_dir):
-            QMessageBox.warning(self, "Diretório Inválido", 
-                              "O diretório especificado não existe.")
-            return
-        
-        if not os.access(new_journal_dir, os.R_OK):
-            QMessageBox.warning(self, "Sem Permissão", 
-                              "Sem permissão de leitura no diretório especificado.")
-            return
+        for journal_dir in journal_dirs:
+            if not os.path.isdir(journal_dir):
+                QMessageBox.warning(self, "Diretório Inválido", 
+                                  f"O diretório especificado não existe: {journal_dir}")
+                return
+            
+            if not os.access(journal_dir, os.R_OK):
+                QMessageBox.warning(self, "Sem Permissão", 
+                                  f"Sem permissão de leitura no diretório especificado: {journal_dir}")
+                return
         
-        self.backend_core.JOURNAL_DIR = new_journal_dir
-        self.update_status(f"Configurações salvas. Caminho: {new_journal_dir}")
-        self.control_view.start_button.setEnabled(True)
+        self.backend_core.journal_dirs = journal_dirs
+        self.journal_configured = True
+        self.update_status(f"Configurações salvas. Caminho: {os.pathsep.join(journal_dirs)}")
+        if self.control_view:
+            self.control_view.start_button.setEnabled(not self.ingest_bridge.is_running)
+            self.control_view.backfill_button.setEnabled(True)
         QMessageBox.information(self, "Sucesso", 
                               "Configurações salvas. Você pode iniciar o monitoramento.")
 
@@ -644,39 +1359,61 @@ class MainWindow(QMainWindow):
 
     @Slot(str)
     def update_status(self, message: str):
-        self.control_view.status_label.setText(f"Status: {message}")
+        self.status_message = message
+        if self.control_view:
+            self.control_view.status_label.setText(f"Status: {message}")
 
     @Slot()
     def start_backend_worker(self):
-        if self.backend_core.is_running:
+        if self.ingest_bridge.is_running:
             QMessageBox.warning(self, "Aviso", "O monitoramento já está em execução.")
             return
 
-        self.backend_thread = QThread()
-        self.backend_worker = BackendWorker(self.backend_core)
-        self.backend_worker.moveToThread(self.backend_thread)
-
-        self.backend_thread.started.connect(self.backend_worker.run)
-        self.backend_worker.finished.connect(self.backend_thread.quit)
-        self.backend_worker.finished.connect(self.backend_worker.deleteLater)
-        self.backend_thread.finished.connect(self.backend_thread.deleteLater)
-        self.backend_worker.error.connect(self.handle_backend_error)
+        if not self.db_ready:
+            QMessageBox.warning(self, "Aviso", "O banco de dados ainda está sendo inicializado.")
+            return
 
-        self.backend_thread.start()
+        if not self.ingest_bridge.start():
+            return
+        self.committed_events = 0
         self.update_status("Monitoramento Iniciado...")
         self.control_view.start_button.setEnabled(False)
         self.control_view.stop_button.setEnabled(True)
 
     @Slot()
     def stop_backend_worker(self):
-        if self.backend_core.is_running:
-            self.backend_core.stop_monitoring()
-            if self.backend_thread:
-                self.backend_thread.quit()
-                self.backend_thread.wait(2000)
+        if self.ingest_bridge.is_running:
+            self.ingest_bridge.stop()
             self.update_status("Monitoramento Parado.")
-            self.control_view.start_button.setEnabled(True)
-            self.control_view.stop_button.setEnabled(False)
+            if self.control_view:
+                self.control_view.start_button.setEnabled(True)
+                self.control_view.stop_button.setEnabled(False)
+
+    @Slot(int, str)
+    def handle_events_committed(self, count: int, last_event: str):
+        self.committed_events += count
+        self.update_status(f"Monitorando: {self.committed_events} eventos gravados (último: {last_event})")
+
+    @Slot(object)
+    def handle_state_changed(self, state: dict):
+        self.pilot_state = state
+        if self.control_view:
+            self.control_view.pilot_state_label.setText(format_pilot_state(state))
+
+    @Slot()
+    def start_backfill(self):
+        if not self.db_ready:
+            QMessageBox.warning(self, "Aviso", "O banco de dados ainda está sendo inicializado.")
+            return
+        self.control_view.backfill_button.setEnabled(False)
+        self.update_status("Importando o histórico...")
+        self.ingest_bridge.backfill()
+
+    @Slot(int)
+    def handle_backfill_finished(self, imported: int):
+        self.update_status(f"Importação concluída: {imported} eventos novos.")
+        if self.control_view:
+            self.control_view.backfill_button.setEnabled(True)
 
     @Slot(str)
     def handle_backend_error(self, error_message: str):
@@ -698,7 +1435,9 @@ class MainWindow(QMainWindow):
         self.control_view.progress_bar.setValue(0)
         
         export_thread = QThread()
-        export_worker = CSVExportWorker(output_dir)
+        export_worker = CSVExportWorker(output_dir, self.control_view.incremental_checkbox.isChecked(),
+                                        self.control_view.format_combo.currentText(),
+                                        self.control_view.by_type_checkbox.isChecked())
         export_worker.moveToThread(export_thread)
 
         export_thread.started.connect(export_worker.run)
@@ -736,11 +1475,85 @@ class MainWindow(QMainWindow):
 
     def closeEvent(self, event):
         self.stop_backend_worker()
+        self.ingest_bridge.shutdown()
         event.accept()
 
 
+def format_pilot_state(state: dict) -> str:
+    """Resumo do comandante ativo para o ControlView (a partir de PilotState.snapshot)."""
+    active = state.get('active')
+    status = state.get('commanders', {}).get(active) if active else None
+    if not status:
+        return "Piloto: -"
+    ship = status.get('ship_name') or status.get('ship_model') or '-'
+    text = f"Piloto: {active} | Sistema: {status.get('system_name') or '-'} | Nave: {ship}"
+    if state.get('backfill_running'):
+        text += f" | Importando ({state.get('events', 0)} eventos)"
+    return text
+
+
+def report_startup_timing(app: QApplication, budget_ms: Optional[float]) -> None:
+    """Imprime os tempos por fase e encerra o modo de medição (--startup-timing)."""
+    print(STARTUP_TIMER.report())
+    total_ms = STARTUP_TIMER.elapsed_ms('first_event_loop')
+    if budget_ms is not None and total_ms > budget_ms:
+        print(f"Orçamento de inicialização excedido: {total_ms:.1f} ms > {budget_ms:.1f} ms")
+        app.exit(1)
+    else:
+        app.exit(0)
+
+
+def parse_profile_arg(argv: list) -> Optional[float]:
+    """Segundos de --profile=N: perfila a ingestão desde o início (resultado em diagnostics/)."""
+    for arg in argv:
+        if arg.startswith('--profile='):
+            return float(arg.split('=', 1)[1])
+    return None
+
+
+def parse_ingest_process_arg(argv: list) -> bool:
+    """--ingest-process (ou EDLT_INGEST_PROCESS=1): ingestão em um processo filho."""
+    return '--ingest-process' in argv or os.environ.get('EDLT_INGEST_PROCESS') == '1'
+
+
+def parse_startup_args(argv: list) -> tuple:
+    """Retorna (modo_medição, orçamento_ms) a partir de --startup-timing e --startup-budget-ms=N."""
+    measure = '--startup-timing' in argv or os.environ.get('EDLT_STARTUP_TIMING') == '1'
+    budget_ms = None
+    for arg in argv:
+        if arg.startswith('--startup-budget-ms='):
+            budget_ms = float(arg.split('=', 1)[1])
+    return measure, budget_ms
+
+
 if __name__ == '__main__':
+    measure_startup, startup_budget_ms = parse_startup_args(sys.argv[1:])
+
     app = QApplication(sys.argv)
-    window = MainWindow()
+    STARTUP_TIMER.mark('qapplication')
+    window = MainWindow(ingest_process=parse_ingest_process_arg(sys.argv[1:]))
+    STARTUP_TIMER.mark('main_window')
     window.show()
+    STARTUP_TIMER.mark('window_show')
+
+    profile_seconds = parse_profile_arg(sys.argv[1:])
+    if profile_seconds:
+        window.backend_core.start_profiling(profile_seconds)
+
+    # O banco só é tocado depois que a janela está visível
+    window.start_db_initialization()
+
+    def on_first_event_loop():
+        STARTUP_TIMER.mark('first_event_loop')
+        if not measure_startup:
+            return
+        # Aguarda a inicialização do banco para reportar também essa fase
+        def wait_for_db():
+            if window.db_init_thread is not None and STARTUP_TIMER.elapsed_ms('db_initialized') == 0.0:
+                QTimer.singleShot(10, wait_for_db)
+                return
+            report_startup_timing(app, startup_budget_ms)
+        wait_for_db()
+
+    QTimer.singleShot(0, on_first_event_loop)
     sys.exit(app.exec())
@@ -0,0 +1,357 @@
+"""
+Núcleo assíncrono da ingestão.
+
+Um único event loop asyncio, em uma thread própria, coordena:
+  - um JournalTailer por diretório de diário (uma conta do jogo): o
+    watchdog só repassa os avisos do sistema de arquivos para o loop
+    (call_soon_threadsafe), e a leitura, a decodificação, a troca de arquivo
+    (JournalFileMonitor) e o comandante da sessão (CommanderTracker)
+    acontecem no loop;
+  - uma faixa de gravação (WriterLane) por fonte, com fila limitada própria
+    (contrapressão: só o tailer da fonte atrasada espera);
+  - um gravador que atende as faixas em rodízio, entregando lotes pequenos
+    de cada uma ao BackendCore em um executor de uma thread só, dedicada ao
+    SQLite.
+
+O SQLite aceita um escritor por vez, então as fontes são separadas nas filas
+e no agendamento, não no escritor: com várias threads gravando, a espera
+pelo lock (busy handler com recuo de até 100 ms) faria uma conta ocupada
+atrasar as outras. No rodízio, um evento de uma conta espera no máximo um
+lote de cada uma das outras.
+
+stop() encerra de forma ordenada: para o watchdog, faz a última leitura de
+cada fonte, grava o que estiver na fila (e o que a política de ingestão
+guardou para coalescer) e só então fecha o loop.
+
+Uma falha em uma leitura, em um lote ou em um passo de manutenção é
+registrada (log e edlt_errors_total) sem encerrar a tarefa: um tailer ou o
+gravador parado deixaria a fonte sem ingestão até reiniciar o programa.
+
+Quando nenhuma fonte tem eventos, o gravador usa a conexão mantida aberta
+(keeper) para passos curtos de manutenção do banco: retenção, compactação
+incremental e ANALYZE (ver maintenance).
+"""
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Dict, Any, Callable, List, Tuple
+
+from watchdog.events import FileSystemEventHandler
+
+from journal_monitor import JournalFileMonitor
+from main import CommanderTracker
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Eventos lidos aguardando gravação, por fonte
+INGEST_QUEUE_SIZE = 10000
+
+# Eventos de uma fonte entregues por vez ao executor do SQLite: limita quanto
+# uma fonte ocupada atrasa as demais
+WRITE_BATCH_SIZE = 64
+
+# Releitura periódica mesmo sem aviso do watchdog (avisos podem se perder,
+# por exemplo em pastas de rede)
+POLL_INTERVAL = 1.0
+
+# Tempo de manutenção do banco (maintenance.DatabaseMaintenance) por volta
+# ociosa do gravador (POLL_INTERVAL sem eventos), em passos de poucos ms
+MAINTENANCE_IDLE_BUDGET = 0.2
+
+# Tempo máximo de espera pelo encerramento ordenado
+STOP_TIMEOUT = 10.0
+
+
+class _WatchdogForwarder(FileSystemEventHandler):
+    """Repassa os avisos do watchdog ao tailer, na thread do event loop."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, tailer: 'JournalTailer'):
+        self.loop = loop
+        self.tailer = tailer
+
+    def dispatch(self, event):
+        if event.event_type in ('modified', 'created') and not event.is_directory:
+            self.loop.call_soon_threadsafe(self.tailer.notify, event)
+
+
+class WriterLane:
+    """Fila de gravação de uma fonte: (evento, comandante) na ordem de leitura."""
+
+    def __init__(self, name: str, ready: asyncio.Event):
+        self.name = name
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=INGEST_QUEUE_SIZE)
+        # Compartilhado entre as faixas: acorda o gravador
+        self.ready = ready
+
+    async def put(self, item: Tuple[Dict[str, Any], Optional[str]]) -> None:
+        await self.queue.put(item)
+        self.ready.set()
+
+    def take(self, limit: int) -> List[Tuple[Dict[str, Any], Optional[str]]]:
+        batch = []
+        while len(batch) < limit and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        return batch
+
+    def done(self, count: int) -> None:
+        for _ in range(count):
+            self.queue.task_done()
+
+
+class JournalTailer:
+    """Segue os diários de um diretório e coloca os eventos decodificados na sua faixa."""
+
+    def __init__(self, directory: str, journal_path: str, metrics=None):
+        self.directory = directory
+        # Comandante da sessão: lido do diário atual antes de segui-lo pelo final
+        self.commander = CommanderTracker()
+        self.commander.scan(journal_path)
+        self.pending: List[Dict[str, Any]] = []
+        self.monitor = JournalFileMonitor(journal_path, self.pending.append, metrics)
+        self.fs_events: List[Any] = []
+        self.metrics = metrics
+        self.wakeup = asyncio.Event()
+        self.stopping = False
+        self.watch = None
+
+    def notify(self, fs_event=None) -> None:
+        """Chamado no loop a cada aviso do watchdog (ou sem aviso, para forçar uma leitura)."""
+        if fs_event is not None:
+            self.fs_events.append(fs_event)
+        self.wakeup.set()
+
+    def stop(self) -> None:
+        self.stopping = True
+        self.wakeup.set()
+
+    async def run(self, lane: WriterLane) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            try:
+                await self._read(lane)
+            except Exception as e:
+                # Tenta de novo na próxima volta (aviso do watchdog ou POLL_INTERVAL)
+                if self.metrics:
+                    self.metrics.inc('edlt_errors_total', type=type(e).__name__)
+                logging.error(f"Erro ao ler o diário em {self.directory}: {e}")
+            if self.stopping:
+                break
+        self.monitor.stop()
+
+    async def _read(self, lane: WriterLane) -> None:
+        fs_events, self.fs_events = self.fs_events, []
+        for fs_event in fs_events:
+            # Troca de parte do diário: termina o arquivo atual e passa ao novo
+            if fs_event.event_type == 'created':
+                self.monitor.on_created(fs_event)
+        # Vários avisos de modificação acumulados valem uma leitura só
+        self.monitor.read_new_lines()
+        if not self.pending:
+            return
+        events = list(self.pending)
+        del self.pending[:]
+        for event_data in events:
+            await lane.put((event_data, self.commander.update(event_data)))
+
+
+class IngestLoop:
+    """Event loop da ingestão: tailers, faixas de gravação, gravador e executor do SQLite."""
+
+    def __init__(self, backend_core):
+        self.backend_core = backend_core
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.thread: Optional[threading.Thread] = None
+        # Uma thread só: todo o SQLite da ingestão acontece em sequência nela
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='edlt-sqlite')
+        self.observer = None
+        self.ready: Optional[asyncio.Event] = None
+        self.lanes: List[WriterLane] = []
+        self.tailers: List[JournalTailer] = []
+        self.tasks: List[asyncio.Task] = []
+        self.writer_task: Optional[asyncio.Task] = None
+        # Definido em _shutdown: terminados os tailers, o gravador esvazia as faixas e termina
+        self.stopping = False
+        self.keeper_conn = None
+        self.loop_started = threading.Event()
+
+    # --- Controle (chamado de qualquer thread) ---
+
+    def start(self) -> None:
+        """Inicia a thread do loop, o watchdog e o gravador."""
+        from watchdog.observers import Observer
+
+        self.thread = threading.Thread(target=self._run_loop, name='edlt-ingest-loop', daemon=True)
+        self.thread.start()
+        self.loop_started.wait()
+        self.observer = Observer()
+        self.observer.start()
+        self.run_in_writer(self._open_keeper).result()
+        self.submit(self._start_writer()).result()
+
+    def add_source(self, directory: str, journal_path: str) -> JournalTailer:
+        """Passa a seguir `journal_path` e as próximas partes do diário em `directory`, com faixa própria."""
+        tailer = self.submit(self._add_tailer(directory, journal_path)).result()
+        tailer.watch = self.observer.schedule(_WatchdogForwarder(self.loop, tailer), directory, recursive=False)
+        return tailer
+
+    def submit(self, coroutine) -> Future:
+        """Executa uma corrotina no loop da ingestão (seguro entre threads)."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def run_in_writer(self, function: Callable, *args) -> Future:
+        """Executa `function` na thread do SQLite, em ordem com a gravação dos eventos."""
+        return self.executor.submit(function, *args)
+
+    def stop(self, timeout: float = STOP_TIMEOUT) -> None:
+        """Para o watchdog, grava os eventos pendentes e encerra o loop e o executor."""
+        if self.observer:
+            self.observer.stop()
+            self.observer.join(timeout=2.0)
+            self.observer = None
+        if self.loop and self.loop.is_running():
+            try:
+                self.submit(self._shutdown()).result(timeout)
+            except Exception as e:
+                logging.error(f"Encerramento da ingestão incompleto: {e}")
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        if self.thread:
+            self.thread.join(timeout=2.0)
+            self.thread = None
+        self.executor.submit(self._close_keeper)
+        self.executor.shutdown(wait=True)
+
+    # --- Thread do loop ---
+
+    def _run_loop(self) -> None:
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.loop_started.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.close()
+
+    async def _start_writer(self) -> None:
+        # Criado dentro do loop (no Python 3.8 filas e eventos se associam ao loop atual)
+        self.ready = asyncio.Event()
+        self.writer_task = asyncio.ensure_future(self._writer())
+        self.writer_task.add_done_callback(self._task_done)
+
+    async def _add_tailer(self, directory: str, journal_path: str) -> JournalTailer:
+        tailer = JournalTailer(directory, journal_path, self.backend_core.metrics)
+        lane = WriterLane(directory, self.ready)
+        self.tailers.append(tailer)
+        self.lanes.append(lane)
+        task = asyncio.ensure_future(tailer.run(lane))
+        task.add_done_callback(self._task_done)
+        self.tasks.append(task)
+        return tailer
+
+    def _task_done(self, task: asyncio.Task) -> None:
+        """Registra uma tarefa (tailer ou gravador) que terminou com erro ou antes do encerramento."""
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None:
+            self.backend_core.metrics.inc('edlt_errors_total', type=type(error).__name__)
+            logging.error(f"Tarefa da ingestão encerrada por erro: {error!r}")
+        elif not self.stopping:
+            logging.error(f"Tarefa da ingestão encerrada antes de stop(): {task!r}")
+
+    async def _writer(self) -> None:
+        metrics = self.backend_core.metrics
+        policy = self.backend_core.ingest_policy
+        while True:
+            try:
+                await asyncio.wait_for(self.ready.wait(), POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                if self._drained():
+                    return
+                try:
+                    # Ocioso: grava os eventos do coalesce cuja janela já fechou
+                    if policy.has_pending():
+                        await self.loop.run_in_executor(self.executor, self.backend_core.flush_ingest_policy, True)
+                    await self._maintain()
+                except Exception as e:
+                    metrics.inc('edlt_errors_total', type=type(e).__name__)
+                    logging.error(f"Erro na volta ociosa do gravador: {e}")
+                continue
+            self.ready.clear()
+            # Rodízio: um lote de cada faixa com eventos, até todas esvaziarem
+            wrote = True
+            while wrote:
+                wrote = False
+                for lane in list(self.lanes):
+                    batch = lane.take(WRITE_BATCH_SIZE)
+                    if not batch:
+                        continue
+                    wrote = True
+                    metrics.set_gauge('edlt_queue_depth', lane.queue.qsize(), queue='ingest', source=lane.name)
+                    try:
+                        await self.loop.run_in_executor(self.executor, self._write_batch, batch)
+                    finally:
+                        lane.done(len(batch))
+            if self._drained():
+                return
+
+    def _drained(self) -> bool:
+        """Em stop(), os tailers já terminaram e o rodízio acabou de esvaziar as faixas."""
+        return self.stopping and all(task.done() for task in self.tasks)
+
+    async def _maintain(self) -> None:
+        """
+        Passos curtos de manutenção do banco enquanto nenhuma fonte tem
+        eventos, até MAINTENANCE_IDLE_BUDGET por volta ociosa: um evento que
+        chega espera no máximo o passo em andamento.
+        """
+        maintenance = self.backend_core.maintenance
+        if self.keeper_conn is None:
+            return
+        deadline = self.loop.time() + MAINTENANCE_IDLE_BUDGET
+        while not self.ready.is_set() and self.loop.time() < deadline:
+            worked = await self.loop.run_in_executor(self.executor, maintenance.step, self.keeper_conn)
+            if not worked:
+                break
+
+    def _write_batch(self, batch: List[Tuple[Dict[str, Any], Optional[str]]]) -> None:
+        for event_data, commander in batch:
+            # Um evento com erro não descarta o resto do lote
+            try:
+                self.backend_core.process_event(event_data, commander)
+            except Exception as e:
+                self.backend_core.metrics.inc('edlt_errors_total', type=type(e).__name__)
+                logging.error(f"Erro ao gravar o evento '{event_data.get('event')}': {e}")
+
+    async def _shutdown(self) -> None:
+        # Última leitura de cada fonte, depois esvazia as faixas antes de parar o gravador
+        self.stopping = True
+        for tailer in self.tailers:
+            tailer.stop()
+        if self.tasks:
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+        # O gravador esvazia as faixas e termina sozinho: cancelar a tarefa
+        # dentro de wait_for pode ter o cancelamento perdido (Python < 3.12)
+        if self.writer_task:
+            self.ready.set()
+            await asyncio.gather(self.writer_task, return_exceptions=True)
+        # Eventos ainda guardados pelo coalesce da política de ingestão
+        await self.loop.run_in_executor(self.executor, self.backend_core.flush_ingest_policy)
+
+    # --- Thread do SQLite ---
+
+    def _open_keeper(self) -> None:
+        # Conexão ociosa mantida durante o monitoramento: process_event abre e
+        # fecha a sua por evento, e fechar a última conexão faz o SQLite
+        # executar checkpoint do WAL a cada evento
+        self.keeper_conn = self.backend_core.get_db_connection()
+
+    def _close_keeper(self) -> None:
+        if self.keeper_conn:
+            self.keeper_conn.close()
+            self.keeper_conn = None
@@ -0,0 +1,43 @@
+"""
+Receitas de blueprints de engenharia do Elite Dangerous (materiais por rolagem).
+Fonte: Elite Dangerous Wiki - https://elite-dangerous.fandom.com/wiki/Blueprints
+
+Conjunto inicial; novas receitas seguem o mesmo formato
+{blueprint: {grau: {material: quantidade}}} com os nomes de exibição do
+catálogo de backend.material_limits.
+"""
+
+from typing import Dict, List
+
+BLUEPRINTS: Dict[str, Dict[int, Dict[str, int]]] = {
+    'FSD Increased Range': {
+        1: {'Atypical Disrupted Wake Echoes': 1},
+        2: {'Atypical Disrupted Wake Echoes': 1, 'Chemical Processors': 1, 'Phosphorus': 1},
+        3: {'Chemical Processors': 1, 'Phosphorus': 1, 'Strange Wake Solutions': 1},
+        4: {'Chemical Distillery': 1, 'Eccentric Hyperspace Trajectories': 1, 'Manganese': 1},
+        5: {'Arsenic': 1, 'Chemical Manipulators': 1, 'Datamined Wake Exceptions': 1},
+    },
+    'Dirty Drives': {
+        1: {'Specialised Legacy Firmware': 1},
+        2: {'Mechanical Scrap': 1, 'Specialised Legacy Firmware': 1},
+        3: {'Chromium': 1, 'Mechanical Scrap': 1, 'Specialised Legacy Firmware': 1},
+        4: {'Mechanical Equipment': 1, 'Modified Consumer Firmware': 1, 'Selenium': 1},
+        5: {'Cadmium': 1, 'Cracked Industrial Firmware': 1, 'Mechanical Components': 1},
+    },
+}
+
+
+def get_blueprint_names() -> List[str]:
+    """Retorna os nomes dos blueprints conhecidos, em ordem alfabética."""
+    return sorted(BLUEPRINTS)
+
+
+def get_blueprint_max_grade(blueprint: str) -> int:
+    """
+    Retorna o maior grau disponível de um blueprint (0 se desconhecido).
+
+    Example:
+        >>> get_blueprint_max_grade("Dirty Drives")
+        5
+    """
+    return max(BLUEPRINTS.get(blueprint, {0: {}}))
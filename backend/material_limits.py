@@ -3,7 +3,9 @@ Dados de limites de capacidade de materiais de engenharia do Elite Dangerous.
 Fonte: Elite Dangerous Wiki - https://elite-dangerous.fandom.com/wiki/Materials
 """
 
-from typing import Dict, List, Optional, Tuple
+import re
+from types import MappingProxyType
+from typing import Dict, List, Mapping, NamedTuple, Optional, Tuple
 
 # Limites de capacidade por grau de material
 MATERIAL_CAPACITY: Dict[int, int] = {
@@ -18,7 +20,7 @@ MATERIAL_CAPACITY: Dict[int, int] = {
 MATERIAL_CATEGORIES: Dict[str, List[str]] = {
     'Raw': [
         'Carbon', 'Phosphorus', 'Sulphur', 'Iron', 'Nickel', 'Rhenium', 'Lead', 
-        'Vanadium', 'Chromium', 'Molybdenum', 'Zinc', 'Germanium', 'Arsenic', 
+        'Vanadium', 'Chromium', 'Manganese', 'Molybdenum', 'Zinc', 'Germanium', 'Arsenic', 
         'Zirconium', 'Niobium', 'Technetium', 'Cadmium', 'Tin', 'Tungsten', 
         'Mercury', 'Boron', 'Yttrium', 'Ruthenium', 'Selenium', 'Tellurium', 
         'Polonium', 'Antimony'
@@ -131,11 +133,171 @@ MATERIAL_TO_GRADE: Dict[str, int] = {
     'Modified Embedded Firmware': 5
 }
 
-# FIX: Criar mapeamento reverso (categoria do material)
-MATERIAL_TO_CATEGORY: Dict[str, str] = {}
-for category, materials in MATERIAL_CATEGORIES.items():
-    for material in materials:
-        MATERIAL_TO_CATEGORY[material] = category
+# Famílias do Material Trader, em ordem de grau. Dentro de uma família a
+# troca sobe ou desce de grau; entre famílias do mesmo tipo custa mais.
+# Meta-Alloys não pertence a nenhuma família (não pode ser trocado).
+MATERIAL_FAMILIES: Dict[str, List[str]] = {
+    'Raw 1': ['Carbon', 'Vanadium', 'Niobium', 'Yttrium'],
+    'Raw 2': ['Phosphorus', 'Chromium', 'Molybdenum', 'Technetium'],
+    'Raw 3': ['Sulphur', 'Manganese', 'Cadmium', 'Ruthenium'],
+    'Raw 4': ['Iron', 'Zinc', 'Tin', 'Selenium'],
+    'Raw 5': ['Nickel', 'Germanium', 'Tungsten', 'Tellurium'],
+    'Raw 6': ['Rhenium', 'Arsenic', 'Mercury', 'Polonium'],
+    'Raw 7': ['Lead', 'Zirconium', 'Boron', 'Antimony'],
+
+    'Chemical': ['Chemical Storage Units', 'Chemical Processors', 'Chemical Distillery',
+                 'Chemical Manipulators', 'Pharmaceutical Isolators'],
+    'Thermic': ['Tempered Alloys', 'Heat Resistant Ceramics', 'Precipitated Alloys',
+                'Thermic Alloys', 'Military Grade Alloys'],
+    'Heat': ['Heat Conduction Wiring', 'Heat Dispersion Plate', 'Heat Exchangers',
+             'Heat Vanes', 'Proto Heat Radiators'],
+    'Conductive': ['Basic Conductors', 'Conductive Components', 'Conductive Ceramics',
+                   'Conductive Polymers', 'Biotech Conductors'],
+    'Mechanical Components': ['Mechanical Scrap', 'Mechanical Equipment', 'Mechanical Components',
+                              'Configurable Components', 'Improvised Components'],
+    'Capacitors': ['Grid Resistors', 'Hybrid Capacitors', 'Electrochemical Arrays',
+                   'Polymer Capacitors', 'Military Supercapacitors'],
+    'Shielding': ['Worn Shield Emitters', 'Shield Emitters', 'Shielding Sensors',
+                  'Compound Shielding', 'Imperial Shielding'],
+    'Composite': ['Compact Composites', 'Filament Composites', 'High Density Composites',
+                  'Proprietary Composites', 'Core Dynamics Composites'],
+    'Crystals': ['Crystal Shards', 'Flawed Focus Crystals', 'Focus Crystals',
+                 'Refined Focus Crystals', 'Exquisite Focus Crystals'],
+    'Alloys': ['Salvaged Alloys', 'Galvanising Alloys', 'Phase Alloys',
+               'Proto Light Alloys', 'Proto Radiolic Alloys'],
+
+    'Emission Data': ['Exceptional Scrambled Emission Data', 'Irregular Emission Data',
+                      'Unexpected Emission Data', 'Decoded Emission Data', 'Abnormal Compact Emissions Data'],
+    'Wake Scans': ['Atypical Disrupted Wake Echoes', 'Anomalous FSD Telemetry', 'Strange Wake Solutions',
+                   'Eccentric Hyperspace Trajectories', 'Datamined Wake Exceptions'],
+    'Shield Data': ['Distorted Shield Cycle Recordings', 'Inconsistent Shield Soak Analysis',
+                    'Untypical Shield Scans', 'Aberrant Shield Pattern Analysis', 'Peculiar Shield Frequency Data'],
+    'Encryption Files': ['Unusual Encrypted Files', 'Tagged Encryption Codes', 'Open Symmetric Keys',
+                         'Atypical Encryption Archives', 'Adaptive Encryptors Capture'],
+    'Data Archives': ['Anomalous Bulk Scan Data', 'Unidentified Scan Archives', 'Classified Scan Databanks',
+                      'Divergent Scan Data', 'Classified Scan Fragment'],
+    'Encoded Firmware': ['Specialised Legacy Firmware', 'Modified Consumer Firmware',
+                         'Cracked Industrial Firmware', 'Security Firmware Patch', 'Modified Embedded Firmware'],
+}
+
+# Símbolos do Journal que não derivam do nome de exibição. Os demais são o
+# nome em minúsculas, sem espaços nem hífens ("Chemical Storage Units" ->
+# "chemicalstorageunits", "Meta-Alloys" -> "metaalloys").
+MATERIAL_SYMBOLS: Dict[str, str] = {
+    'Proprietary Composites': 'fedproprietarycomposites',
+    'Core Dynamics Composites': 'fedcorecomposites',
+    'Flawed Focus Crystals': 'uncutfocuscrystals',
+
+    'Exceptional Scrambled Emission Data': 'scrambledemissiondata',
+    'Irregular Emission Data': 'archivedemissiondata',
+    'Unexpected Emission Data': 'emissiondata',
+    'Abnormal Compact Emissions Data': 'compactemissionsdata',
+    'Atypical Disrupted Wake Echoes': 'disruptedwakeechoes',
+    'Anomalous FSD Telemetry': 'fsdtelemetry',
+    'Strange Wake Solutions': 'wakesolutions',
+    'Eccentric Hyperspace Trajectories': 'hyperspacetrajectories',
+    'Datamined Wake Exceptions': 'dataminedwake',
+    'Distorted Shield Cycle Recordings': 'shieldcyclerecordings',
+    'Inconsistent Shield Soak Analysis': 'shieldsoakanalysis',
+    'Untypical Shield Scans': 'shielddensityreports',
+    'Aberrant Shield Pattern Analysis': 'shieldpatternanalysis',
+    'Peculiar Shield Frequency Data': 'shieldfrequencydata',
+    'Unusual Encrypted Files': 'encryptedfiles',
+    'Tagged Encryption Codes': 'encryptioncodes',
+    'Open Symmetric Keys': 'symmetrickeys',
+    'Atypical Encryption Archives': 'encryptionarchives',
+    'Adaptive Encryptors Capture': 'adaptiveencryptors',
+    'Anomalous Bulk Scan Data': 'bulkscandata',
+    'Unidentified Scan Archives': 'scanarchives',
+    'Classified Scan Databanks': 'scandatabanks',
+    'Divergent Scan Data': 'encodedscandata',
+    'Classified Scan Fragment': 'classifiedscandata',
+    'Specialised Legacy Firmware': 'legacyfirmware',
+    'Modified Consumer Firmware': 'consumerfirmware',
+    'Cracked Industrial Firmware': 'industrialfirmware',
+    'Security Firmware Patch': 'securityfirmware',
+    'Modified Embedded Firmware': 'embeddedfirmware',
+}
+
+_NON_ALPHANUMERIC = re.compile(r'[^0-9a-z]+')
+
+
+class MaterialInfo(NamedTuple):
+    """Entrada imutável do catálogo de materiais."""
+    name: str       # Nome de exibição ("Chemical Storage Units")
+    symbol: str     # Símbolo do Journal ("chemicalstorageunits")
+    grade: int
+    category: str   # Raw, Manufactured ou Encoded
+    capacity: int
+    family: Optional[str] = None  # Família do Material Trader (None: não negociável)
+
+
+def normalize_material_key(material_name: str) -> str:
+    """
+    Normaliza um nome de material para busca no catálogo: minúsculas, sem
+    espaços, hífens ou pontuação. Serve para o símbolo do Journal, o nome
+    localizado em inglês (Name_Localised) e o nome de exibição.
+
+    Example:
+        >>> normalize_material_key("Chemical Storage Units")
+        'chemicalstorageunits'
+    """
+    return _NON_ALPHANUMERIC.sub('', material_name.lower())
+
+
+def _build_catalog() -> Tuple[Mapping[str, MaterialInfo], Mapping[int, Tuple[str, ...]],
+                              Mapping[str, Tuple[str, ...]]]:
+    """Monta, uma única vez na importação, o catálogo e os índices por grau e categoria."""
+    catalog: Dict[str, MaterialInfo] = {}
+    by_grade: Dict[int, List[str]] = {grade: [] for grade in MATERIAL_CAPACITY}
+    by_category: Dict[str, List[str]] = {}
+    families = {name: family for family, names in MATERIAL_FAMILIES.items() for name in names}
+    for category, materials in MATERIAL_CATEGORIES.items():
+        by_category[category] = list(materials)
+        for name in materials:
+            grade = MATERIAL_TO_GRADE[name]
+            symbol = MATERIAL_SYMBOLS.get(name, normalize_material_key(name))
+            info = MaterialInfo(name, symbol, grade, category, MATERIAL_CAPACITY[grade], families.get(name))
+            by_grade[grade].append(name)
+            # Símbolo, nome de exibição e sua forma normalizada apontam para a mesma entrada
+            catalog[symbol] = info
+            catalog[name] = info
+            catalog[normalize_material_key(name)] = info
+    return (MappingProxyType(catalog),
+            MappingProxyType({grade: tuple(names) for grade, names in by_grade.items()}),
+            MappingProxyType({category: tuple(names) for category, names in by_category.items()}))
+
+
+# Catálogo indexado por símbolo e nome (exato e normalizado) e índices imutáveis
+MATERIAL_CATALOG, MATERIALS_BY_GRADE, MATERIALS_BY_CATEGORY = _build_catalog()
+
+# Mapeamento reverso (categoria do material por nome de exibição)
+MATERIAL_TO_CATEGORY: Mapping[str, str] = MappingProxyType({
+    name: category for category, names in MATERIALS_BY_CATEGORY.items() for name in names
+})
+
+
+def get_material(material_name: str) -> Optional[MaterialInfo]:
+    """
+    Retorna a entrada do catálogo para um símbolo do Journal, nome localizado
+    ou nome de exibição, em O(1).
+
+    Args:
+        material_name: Símbolo ("chemicalstorageunits") ou nome ("Chemical Storage Units")
+
+    Returns:
+        MaterialInfo ou None se o material não for conhecido
+
+    Example:
+        >>> get_material("uncutfocuscrystals").name
+        'Flawed Focus Crystals'
+    """
+    if not material_name:
+        return None
+    info = MATERIAL_CATALOG.get(material_name)
+    if info is None:
+        info = MATERIAL_CATALOG.get(normalize_material_key(material_name))
+    return info
 
 
 def get_material_grade(material_name: str) -> Optional[int]:
@@ -143,7 +305,7 @@ def get_material_grade(material_name: str) -> Optional[int]:
     Retorna o grau (1-5) de um material.
     
     Args:
-        material_name: Nome do material
+        material_name: Nome ou símbolo do material
         
     Returns:
         Grau do material (1-5) ou None se não encontrado
@@ -151,10 +313,11 @@ def get_material_grade(material_name: str) -> Optional[int]:
     Example:
         >>> get_material_grade("Carbon")
         1
-        >>> get_material_grade("Pharmaceutical Isolators")
+        >>> get_material_grade("pharmaceuticalisolators")
         5
     """
-    return MATERIAL_TO_GRADE.get(material_name)
+    info = get_material(material_name)
+    return info.grade if info else None
 
 
 def get_material_capacity(material_name: str) -> Optional[int]:
@@ -173,11 +336,8 @@ def get_material_capacity(material_name: str) -> Optional[int]:
         >>> get_material_capacity("Pharmaceutical Isolators")
         100  # Grade 5
     """
-    grade = get_material_grade(material_name)
-    if grade is None:
-        return None
-    
-    return MATERIAL_CAPACITY.get(grade)
+    info = get_material(material_name)
+    return info.capacity if info else None
 
 
 def get_material_category(material_name: str) -> Optional[str]:
@@ -196,7 +356,8 @@ def get_material_category(material_name: str) -> Optional[str]:
         >>> get_material_category("Chemical Storage Units")
         'Manufactured'
     """
-    return MATERIAL_TO_CATEGORY.get(material_name)
+    info = get_material(material_name)
+    return info.category if info else None
 
 
 def get_material_info(material_name: str) -> Optional[Dict[str, any]]:
@@ -213,14 +374,14 @@ def get_material_info(material_name: str) -> Optional[Dict[str, any]]:
         >>> get_material_info("Carbon")
         {'grade': 1, 'category': 'Raw', 'capacity': 300}
     """
-    grade = get_material_grade(material_name)
-    if grade is None:
+    info = get_material(material_name)
+    if info is None:
         return None
     
     return {
-        'grade': grade,
-        'category': get_material_category(material_name),
-        'capacity': MATERIAL_CAPACITY[grade]
+        'grade': info.grade,
+        'category': info.category,
+        'capacity': info.capacity
     }
 
 
@@ -300,7 +461,7 @@ def validate_material_count(material_name: str, count: int) -> Tuple[bool, Optio
     return True, None
 
 
-def get_all_materials_by_category(category: str) -> List[str]:
+def get_all_materials_by_category(category: str) -> Tuple[str, ...]:
     """
     Retorna lista de todos os materiais de uma categoria.
     
@@ -308,17 +469,17 @@ def get_all_materials_by_category(category: str) -> List[str]:
         category: Categoria (Raw, Manufactured, Encoded)
         
     Returns:
-        Lista de nomes de materiais ou lista vazia se categoria inválida
+        Tupla de nomes de materiais ou tupla vazia se categoria inválida
         
     Example:
         >>> materials = get_all_materials_by_category("Raw")
         >>> len(materials)
-        27
+        28
     """
-    return MATERIAL_CATEGORIES.get(category, [])
+    return MATERIALS_BY_CATEGORY.get(category, ())
 
 
-def get_all_materials_by_grade(grade: int) -> List[str]:
+def get_all_materials_by_grade(grade: int) -> Tuple[str, ...]:
     """
     Retorna lista de todos os materiais de um grau específico.
     
@@ -326,17 +487,14 @@ def get_all_materials_by_grade(grade: int) -> List[str]:
         grade: Grau do material (1-5)
         
     Returns:
-        Lista de nomes de materiais
+        Tupla de nomes de materiais (pré-calculada na importação)
         
     Example:
         >>> materials = get_all_materials_by_grade(5)
         >>> "Pharmaceutical Isolators" in materials
         True
     """
-    return [
-        material for material, mat_grade in MATERIAL_TO_GRADE.items()
-        if mat_grade == grade
-    ]
+    return MATERIALS_BY_GRADE.get(grade, ())
 
 
 # Constantes de compatibilidade
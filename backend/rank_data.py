@@ -13,13 +13,13 @@ RANK_NAMES: Dict[str, List[str]] = {
         "Expert", "Master", "Dangerous", "Deadly", "Elite"
     ],
     "Trade": [
-        "Penniless", "Mostly Penniless", "Dealer", "Merchant", 
+        "Penniless", "Mostly Penniless", "Peddler", "Dealer", "Merchant", 
         "Broker", "Entrepreneur", "Tycoon", "Elite", 
         "Elite I", "Elite II", "Elite III", "Elite IV", "Elite V"
     ],
     "Explore": [
         "Aimless", "Mostly Aimless", "Scout", "Surveyor", 
-        "Trailblazer", "Pathfinder", "Pioneer", "Elite", 
+        "Trailblazer", "Pathfinder", "Ranger", "Pioneer", "Elite", 
         "Elite I", "Elite II", "Elite III", "Elite IV", "Elite V"
     ],
     "CQC": [
@@ -65,7 +65,7 @@ ELITE_V_RANKS: List[str] = ["Trade", "Explore"]
 ELITE_V_RANKS_NAMES: List[str] = ["Elite I", "Elite II", "Elite III", "Elite IV", "Elite V"]
 
 # Índices dos ranques Elite estendidos nas listas de ranques
-ELITE_V_RANKS_INDEX: List[int] = [8, 9, 10, 11, 12]
+ELITE_V_RANKS_INDEX: List[int] = [9, 10, 11, 12, 13]
 
 
 def get_rank_name(rank_type: str, rank_value: int) -> str:
@@ -152,6 +152,30 @@ def get_next_rank_name(rank_type: str, current_rank: int) -> str:
     return get_rank_name(rank_type, current_rank + 1)
 
 
+def get_elite_rank_value(rank_type: str) -> int:
+    """
+    Retorna o índice do ranque "Elite" de um tipo (ou o máximo, para os
+    ranques de superpotência), usado como alvo das previsões de progresso.
+    
+    Args:
+        rank_type: Tipo do ranque
+        
+    Returns:
+        Índice do ranque alvo ou -1 se tipo inválido
+        
+    Example:
+        >>> get_elite_rank_value("Trade")
+        8
+        >>> get_elite_rank_value("Empire")
+        14  # King
+    """
+    ranks = RANK_NAMES.get(rank_type)
+    if ranks is None:
+        return -1
+    
+    return ranks.index("Elite") if "Elite" in ranks else len(ranks) - 1
+
+
 def validate_rank_data(rank_type: str, rank_value: int, progress: float) -> bool:
     """
     Valida se os dados de ranque estão consistentes.
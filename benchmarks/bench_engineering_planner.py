@@ -0,0 +1,76 @@
+"""
+Benchmark do planejador de engenharia: inventários sintéticos (semente fixa)
+com todos os materiais do catálogo e todos os blueprints conhecidos como alvo.
+Mede o plano frio, o plano repetido (memorizado) e uma sequência de coletas
+de material, como chegam ao vivo pelo Journal, e confere que nenhuma troca
+sugerida gasta mais do que o excedente do inventário.
+
+    python benchmarks/bench_engineering_planner.py --events 2000
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.blueprint_data import BLUEPRINTS, get_blueprint_max_grade
+from backend.material_limits import MATERIAL_CATALOG
+from engineering_planner import EngineeringPlanner, blueprint_targets
+
+
+def valid_plan(plan, inventory) -> bool:
+    """Cada material é gasto no máximo até o excedente (inventário além do exigido)."""
+    paid = {}
+    for trade in plan['trades']:
+        paid[trade['source']] = paid.get(trade['source'], 0) + trade['paid']
+    return all(amount <= inventory.get(source, 0) - plan['required'].get(source, 0)
+               for source, amount in paid.items())
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=int, default=2000, help="Coletas de material simuladas")
+    parser.add_argument('--rolls', type=int, default=4, help="Rolagens por grau")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    infos = sorted(set(MATERIAL_CATALOG.values()), key=lambda info: info.name)
+    inventory = {info.name: rng.randrange(info.capacity // 3) for info in infos}
+    targets = [target for blueprint in BLUEPRINTS
+               for target in blueprint_targets(blueprint, get_blueprint_max_grade(blueprint), args.rolls)]
+    planner = EngineeringPlanner()
+
+    start = time.perf_counter()
+    plan = planner.plan(targets, inventory)
+    cold = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(1000):
+        planner.plan(targets, inventory)
+    cached = (time.perf_counter() - start) / 1000
+    ok = valid_plan(plan, inventory)
+    print(f"Plano: {len(plan['required'])} materiais, {len(plan['missing'])} faltando, "
+          f"{len(plan['trades'])} trocas, {len(plan['unresolved'])} sem solução")
+    print(f"  frio {cold * 1e3:.2f} ms   memorizado {cached * 1e6:.1f} us")
+
+    latencies = []
+    for _ in range(args.events):
+        info = rng.choice(infos)
+        inventory[info.name] = min(info.capacity, inventory[info.name] + rng.randint(1, 3))
+        start = time.perf_counter()
+        plan = planner.plan(targets, inventory)
+        latencies.append(time.perf_counter() - start)
+        ok &= valid_plan(plan, inventory)
+    latencies.sort()
+    print(f"Ao vivo ({args.events} coletas): mediana {statistics.median(latencies) * 1e3:.2f} ms  "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1e3:.2f} ms  "
+          f"cache {planner.hits} acertos / {planner.misses} cálculos; trocas válidas: {ok}")
+    return 0 if ok and cached < cold else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""
+Harness do stream de eventos: mede a vazão de BackendCore.process_event com
+centenas de assinantes simulados e compara com a ingestão sem assinantes.
+
+Cada assinante é um par de sockets ligado ao EventStream, exatamente como
+um cliente SSE. Os rápidos são lidos por um processo separado (como clientes
+reais, sem disputar o GIL do rastreador); os lentos nunca leem, enchem o
+buffer do socket e devem ser desconectados sem afetar a ingestão.
+
+Em máquinas de um núcleo o processo leitor divide a CPU com a ingestão, então
+parte da queda medida vem do próprio "cliente" e não do rastreador.
+
+    python benchmarks/bench_event_stream.py --subscribers 500 --events 3000
+"""
+
+import os
+import sys
+import time
+import shutil
+import socket
+import argparse
+import selectors
+import tempfile
+import multiprocessing
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from main import BackendCore
+from event_stream import EventStream
+
+EVENT_TYPES = ['FSDJump', 'Scan', 'Bounty', 'Music', 'ReceiveText']
+
+
+def make_events(count: int, offset: int):
+    for i in range(count):
+        event_type = EVENT_TYPES[i % len(EVENT_TYPES)]
+        yield {
+            'timestamp': f"2026-01-01T00:00:{i % 60:02d}Z",
+            'event': event_type,
+            'StarSystem': 'Sol',
+            'BodyName': f"Body {offset + i}",
+            'Reward': 100,
+            'Seq': offset + i,
+        }
+
+
+def run_ingest(core: BackendCore, count: int, offset: int) -> float:
+    start = time.perf_counter()
+    for event_data in make_events(count, offset):
+        core.process_event(event_data)
+    return count / (time.perf_counter() - start)
+
+
+def reader_loop(sockets: list, received, stop) -> None:
+    """Lê todos os clientes rápidos (executado em um processo filho)."""
+    selector = selectors.DefaultSelector()
+    for sock in sockets:
+        selector.register(sock, selectors.EVENT_READ)
+    count = 0
+    while not stop.is_set():
+        for key, _ in selector.select(timeout=0.2):
+            try:
+                data = key.fileobj.recv(65536)
+            except OSError:
+                data = b''
+            if not data:
+                selector.unregister(key.fileobj)
+                continue
+            count += data.count(b"\n\n")
+    received.value = count
+    selector.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--subscribers', type=int, default=500)
+    parser.add_argument('--slow-fraction', type=float, default=0.2,
+                        help="Fração de assinantes que nunca leem o socket")
+    parser.add_argument('--events', type=int, default=3000)
+    parser.add_argument('--max-degradation', type=float, default=0.25,
+                        help="Queda máxima de vazão aceita (fração)")
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp(prefix='edlt-bench-')
+    pairs = []
+    try:
+        core = BackendCore(temp_dir, db_path=os.path.join(temp_dir, 'bench.db'))
+
+        baseline = run_ingest(core, args.events, 0)
+        print(f"Sem assinantes:            {baseline:10.1f} eventos/s")
+
+        event_stream = EventStream()
+        event_stream.attach(core)
+        event_stream.start()
+
+        slow_count = int(args.subscribers * args.slow_fraction)
+        fast_sockets = []
+        for index in range(args.subscribers):
+            server_side, client_side = socket.socketpair()
+            # Buffer pequeno: clientes lentos enchem o socket rapidamente
+            server_side.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 16384)
+            pairs.append((server_side, client_side))
+            types = None if index % 2 == 0 else [EVENT_TYPES[index % len(EVENT_TYPES)]]
+            event_stream.add_client(server_side, types)
+            if index >= slow_count:
+                fast_sockets.append(client_side)
+
+        # 'fork' herda os sockets; é o modo padrão no Linux
+        context = multiprocessing.get_context('fork')
+        received = context.Value('q', 0)
+        stop = context.Event()
+        reader = context.Process(target=reader_loop, args=(fast_sockets, received, stop), daemon=True)
+        reader.start()
+
+        with_subscribers = run_ingest(core, args.events, args.events)
+        # Aguarda a distribuição terminar antes de coletar os números
+        while event_stream.inbox:
+            time.sleep(0.05)
+        time.sleep(0.5)
+        stop.set()
+        reader.join()
+
+        connected = event_stream.client_count()
+        event_stream.detach(core)
+        event_stream.stop()
+
+        degradation = 1.0 - with_subscribers / baseline
+        print(f"Com {args.subscribers} assinantes:     {with_subscribers:10.1f} eventos/s "
+              f"(queda de {degradation * 100:.1f}%)")
+        print(f"Eventos entregues aos rápidos: {received.value}")
+        print(f"Clientes ainda conectados:     {connected} "
+              f"({args.subscribers - connected} desconectados por lentidão)")
+        print(f"Eventos descartados na entrada: {event_stream.inbox_dropped}")
+
+        return 0 if degradation <= args.max_degradation else 1
+    finally:
+        for server_side, client_side in pairs:
+            server_side.close()
+            client_side.close()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
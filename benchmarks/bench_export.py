@@ -0,0 +1,170 @@
+"""
+Benchmark da exportação: preenche um banco temporário com eventos sintéticos
+(semente fixa) e compara o CSVExporter com o laço antigo (célula por célula)
+e com a velocidade de escrita sequencial do disco. Depois acrescenta uma
+fração de eventos novos e mede a exportação incremental, conferindo que o
+resultado é igual a uma exportação completa. Por fim compara tamanho e tempo
+de escrita de cada formato (CSV, Parquet, Arrow IPC, JSON Lines gzip/zstd)
+e mede a exportação de uma tabela plana por tipo de evento (tempo e pico
+de memória, que deve ficar limitado independentemente do número de eventos).
+
+    python benchmarks/bench_export.py --events 500000 --new-fraction 0.01
+    python benchmarks/bench_export.py --formats csv,parquet
+"""
+
+import os
+import csv
+import sys
+import json
+import time
+import random
+import shutil
+import sqlite3
+import argparse
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from main import BackendCore
+from csv_exporter import CSVExporter, ALLOWED_TABLES, EXPORT_FORMATS
+from event_type_exporter import EventTypeExporter
+
+EVENT_TYPES = ['FSDJump', 'Scan', 'Bounty', 'MarketSell', 'Docked', 'Materials', 'Music']
+
+
+def fill_database(db_path: str, events: int, seed: int, offset: int = 0) -> None:
+    rng = random.Random(seed)
+    conn = sqlite3.connect(db_path)
+    rows = []
+    for i in range(offset, offset + events):
+        event_type = rng.choice(EVENT_TYPES)
+        timestamp = f"2026-01-{1 + i // 86400 % 28:02d}T{i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}Z"
+        data = {'timestamp': timestamp, 'event': event_type, 'StarSystem': f"System {rng.randrange(5000)}",
+                'SystemAddress': rng.randrange(10 ** 12), 'StarPos': [rng.uniform(-1000, 1000) for _ in range(3)],
+                'Body': f"Body {rng.randrange(100)}", 'Reward': rng.randrange(10 ** 6)}
+        rows.append((timestamp, event_type, json.dumps(data), f"{i:064x}"))
+        if len(rows) >= 50000:
+            conn.executemany("INSERT INTO journal_events (timestamp, event_type, event_data, event_hash) "
+                             "VALUES (?, ?, ?, ?)", rows)
+            rows = []
+    conn.executemany("INSERT INTO journal_events (timestamp, event_type, event_data, event_hash) "
+                     "VALUES (?, ?, ?, ?)", rows)
+    conn.executemany("INSERT INTO pilot_profit (timestamp, profit_type, amount) VALUES (?, ?, ?)",
+                     [('2026-01-01T00:00:00Z', 'TRADE', i) for i in range(events // 10)])
+    conn.commit()
+    conn.close()
+
+
+def legacy_export(db_path: str, output_dir: str) -> None:
+    """Exportação anterior: uma tabela por vez, str() célula por célula."""
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    for table_name in ALLOWED_TABLES:
+        cursor = conn.execute(f"SELECT * FROM {table_name}")
+        with open(os.path.join(output_dir, f"{table_name}.csv"), 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.writer(f)
+            writer.writerow([d[0] for d in cursor.description])
+            for row in cursor:
+                writer.writerow([str(item) if item is not None else '' for item in row])
+    conn.close()
+
+
+def directory_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def disk_write_seconds(path: str, size: int) -> float:
+    """Tempo para gravar `size` bytes sequenciais (com fsync), o limite do disco."""
+    chunk = os.urandom(1024 * 1024)
+    start = time.perf_counter()
+    with open(path, 'wb') as f:
+        for _ in range(max(1, size // len(chunk))):
+            f.write(chunk)
+        f.flush()
+        os.fsync(f.fileno())
+    elapsed = time.perf_counter() - start
+    os.remove(path)
+    return elapsed
+
+
+def timed_export(label: str, export, output_dir: str) -> float:
+    os.makedirs(output_dir, exist_ok=True)
+    start = time.perf_counter()
+    export(output_dir)
+    elapsed = time.perf_counter() - start
+    size = directory_size(output_dir)
+    print(f"  {label:<24} {elapsed:7.2f} s  {size / 1e6:8.1f} MB  {size / 1e6 / elapsed:7.1f} MB/s")
+    return elapsed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=int, default=500000)
+    parser.add_argument('--new-fraction', type=float, default=0.01,
+                        help="Fração de eventos novos antes da exportação incremental")
+    parser.add_argument('--formats', default=','.join(EXPORT_FORMATS),
+                        help="Formatos comparados, separados por vírgula")
+    parser.add_argument('--max-by-type-mb', type=float, default=64.0,
+                        help="Pico de memória aceito na exportação por tipo de evento")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp(prefix='edlt-export-')
+    try:
+        db_path = os.path.join(temp_dir, 'bench.db')
+        BackendCore(temp_dir, db_path=db_path)
+        fill_database(db_path, args.events, args.seed)
+        print(f"Banco com {args.events} eventos: {os.path.getsize(db_path) / 1e6:.1f} MB")
+
+        legacy_dir = os.path.join(temp_dir, 'legacy')
+        csv_dir = os.path.join(temp_dir, 'csv')
+        updates = []
+        legacy = timed_export('laço antigo', lambda out: legacy_export(db_path, out), legacy_dir)
+        streaming = timed_export('CSVExporter',
+                                 lambda out: CSVExporter(db_path).export_all_data(out, updates.append), csv_dir)
+
+        identical = all(open(os.path.join(legacy_dir, f"{t}.csv"), 'rb').read()
+                        == open(os.path.join(csv_dir, f"{t}.csv"), 'rb').read() for t in ALLOWED_TABLES)
+        fill_database(db_path, int(args.events * args.new_fraction), args.seed + 1, offset=args.events)
+        incremental = timed_export('incremental (+{:.0%})'.format(args.new_fraction),
+                                   lambda out: CSVExporter(db_path).export_all_data(out, incremental=True), csv_dir)
+        full_dir = os.path.join(temp_dir, 'full')
+        timed_export('completa após inserções', lambda out: CSVExporter(db_path).export_all_data(out), full_dir)
+        identical &= all(open(os.path.join(full_dir, f"{t}.csv"), 'rb').read()
+                         == open(os.path.join(csv_dir, f"{t}.csv"), 'rb').read() for t in ALLOWED_TABLES)
+
+        disk = disk_write_seconds(os.path.join(temp_dir, 'disk.bin'), directory_size(csv_dir))
+        print(f"  {'escrita sequencial':<24} {disk:7.2f} s")
+        print(f"Aceleração: {legacy / streaming:.1f}x; arquivos idênticos: {identical}; "
+              f"atualizações de progresso: {len(updates)} (última {updates[-1] if updates else None}%)")
+        print(f"Incremental: {incremental:.2f} s ({streaming / incremental:.0f}x mais rápida que a completa)")
+
+        print("Formatos (exportação completa):")
+        all_formats = True
+        for export_format in args.formats.split(','):
+            format_dir = os.path.join(temp_dir, f"format-{export_format}")
+            exported = []
+            timed_export(export_format, lambda out: exported.extend(
+                CSVExporter(db_path).export_all_data(out, export_format=export_format)), format_dir)
+            all_formats &= len(exported) == len(ALLOWED_TABLES)
+        identical &= all_formats
+
+        by_type_dir = os.path.join(temp_dir, 'by-type')
+        files = []
+        timed_export('por tipo de evento', lambda out: files.extend(EventTypeExporter(db_path).export(out)),
+                     by_type_dir)
+        tracemalloc.start()
+        EventTypeExporter(db_path).export(os.path.join(temp_dir, 'by-type-memory'))
+        peak = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+        print(f"Por tipo de evento: {len(files)} arquivos, pico de memória {peak:.1f} MB")
+        identical &= len(files) == len(EVENT_TYPES) and peak <= args.max_by_type_mb
+        return 0 if identical and streaming < legacy and incremental < streaming \
+            and updates and updates[-1] == 100 else 1
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
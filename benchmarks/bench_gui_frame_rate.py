@@ -0,0 +1,148 @@
+"""
+Fluidez da GUI durante uma importação completa do histórico (backfill):
+um QTimer de um quadro (16 ms) faz um trabalho fixo de "renderização" em
+Python e atualiza um QLabel com o estado do piloto recebido da ingestão,
+enquanto a importação roda
+  - thread: no mesmo processo (IngestBridge), disputando o GIL;
+  - process: em um processo filho (IngestProcessBridge, --ingest-process),
+    com o estado lido da memória compartilhada.
+Mede o intervalo entre quadros (p50/p99/máx, fração de quadros acima de
+33 ms, isto é, abaixo de 30 fps) e o tempo da importação.
+
+    python benchmarks/bench_gui_frame_rate.py --events 50000 --frame-work-ms 2
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+from typing import Any, Dict, List
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from PySide6.QtCore import QTimer
+from PySide6.QtWidgets import QApplication, QLabel
+
+from main import BackendCore
+from app import IngestBridge, IngestProcessBridge, format_pilot_state
+from journal_generator import JournalGenerator, SCENARIOS
+
+MODES = {'thread': IngestBridge, 'process': IngestProcessBridge}
+
+# Intervalo do quadro (60 Hz) e limite de um quadro "perdido" (30 fps)
+FRAME_MS = 16
+SLOW_FRAME_MS = 33
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+def write_journals(directory: str, args: argparse.Namespace) -> None:
+    generator = JournalGenerator(args.seed, args.scenario)
+    per_file = max(1, args.events // args.files)
+    for part in range(args.files):
+        path = os.path.join(directory, f"Journal.2026-01-{part + 1:02d}T000000.01.log")
+        with open(path, 'w', encoding='utf-8') as f:
+            for event in generator.events(per_file):
+                f.write(json.dumps(event) + '\n')
+
+
+def run(app: QApplication, mode: str, journal_dir: str, temp_dir: str, args: argparse.Namespace) -> Dict[str, Any]:
+    db_path = os.path.join(temp_dir, f"{mode}.db")
+    core = BackendCore(journal_dir, db_path=db_path)
+    bridge = MODES[mode](core)
+    label = QLabel()
+    label.resize(600, 40)
+    label.show()
+    bridge.state_changed.connect(lambda state: label.setText(format_pilot_state(state)))
+
+    intervals: List[float] = []
+    result: Dict[str, Any] = {}
+    last = {'time': 0.0}
+    busy_until = args.frame_work_ms / 1e3
+
+    def frame() -> None:
+        now = time.perf_counter()
+        if last['time']:
+            intervals.append((now - last['time']) * 1e3)
+        last['time'] = now
+        # Trabalho de "renderização" do quadro, em Python (segura o GIL)
+        while time.perf_counter() - now < busy_until:
+            pass
+        label.repaint()
+
+    def finished(imported: int) -> None:
+        result['imported'] = imported
+        result['backfill_seconds'] = round(time.perf_counter() - result['start'], 3)
+        app.quit()
+
+    timer = QTimer()
+    timer.setInterval(FRAME_MS)
+    timer.timeout.connect(frame)
+    bridge.backfill_finished.connect(finished)
+    bridge.seed_state()
+    timer.start()
+    result['start'] = time.perf_counter()
+    bridge.backfill()
+    QTimer.singleShot(int(args.timeout * 1000), app.quit)
+    app.exec()
+    timer.stop()
+    bridge.shutdown()
+    label.close()
+
+    slow = sum(1 for interval in intervals if interval > SLOW_FRAME_MS)
+    return {
+        'imported': result.get('imported'),
+        'backfill_seconds': result.get('backfill_seconds'),
+        'frames': len(intervals),
+        'frame_p50_ms': round(percentile(intervals, 0.50), 3),
+        'frame_p99_ms': round(percentile(intervals, 0.99), 3),
+        'frame_max_ms': round(max(intervals, default=0.0), 3),
+        'slow_frame_ratio': round(slow / len(intervals), 4) if intervals else 0.0,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=int, default=50000, help="Eventos no histórico importado")
+    parser.add_argument('--files', type=int, default=10, help="Arquivos Journal.*.log do histórico")
+    parser.add_argument('--frame-work-ms', type=float, default=2.0, help="Trabalho em Python por quadro")
+    parser.add_argument('--modes', nargs='+', choices=list(MODES), default=list(MODES))
+    parser.add_argument('--scenario', choices=SCENARIOS, default='mixed')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--timeout', type=float, default=600.0, help="Segundos máximos por modo")
+    parser.add_argument('--output', help="Grava os resultados neste arquivo JSON")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    temp_dir = tempfile.mkdtemp(prefix='edlt-frames-')
+    try:
+        journal_dir = os.path.join(temp_dir, 'journals')
+        os.makedirs(journal_dir)
+        write_journals(journal_dir, args)
+        results = {'parameters': vars(args)}
+        for mode in args.modes:
+            phase = run(app, mode, journal_dir, temp_dir, args)
+            results[mode] = phase
+            print(f"  {mode:<8} {phase['imported']} eventos em {phase['backfill_seconds']} s; quadros: "
+                  f"p50 {phase['frame_p50_ms']:.1f} ms  p99 {phase['frame_p99_ms']:.1f} ms  "
+                  f"máx {phase['frame_max_ms']:.1f} ms  acima de {SLOW_FRAME_MS} ms: "
+                  f"{phase['slow_frame_ratio']:.1%}")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Resultados gravados em {args.output}")
+    return 0 if all(results[mode]['imported'] for mode in args.modes) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,209 @@
+"""
+Suíte de benchmarks da ingestão, com diários sintéticos reproduzíveis
+(journal_generator.py). Mede, cada uma em um banco novo:
+  - process_event: eventos/s e latência p50/p99 por evento, com e sem uma
+    conexão mantida aberta (sem ela, cada evento fecha a última conexão e o
+    SQLite faz checkpoint do WAL);
+  - backfill: importação completa dos arquivos Journal.*.log;
+  - live: start_monitoring (watchdog) seguindo um arquivo gravado em ritmo
+    fixo (latência da escrita da linha até o commit);
+e o tamanho do banco. Os resultados podem ser gravados em JSON (--output)
+e comparados com os de outro commit (--compare).
+
+    python benchmarks/bench_ingest.py --events 20000 --output /tmp/ingest-novo.json --compare /tmp/ingest-base.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import sqlite3
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from main import BackendCore
+from ingest_policy import IngestPolicy
+from journal_generator import JournalGenerator, SCENARIOS
+
+# Métricas em que um valor maior é melhor (as demais: menor é melhor)
+HIGHER_IS_BETTER = {'events_per_second'}
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+def database_size(db_path: str) -> int:
+    return sum(os.path.getsize(db_path + suffix) for suffix in ('', '-wal') if os.path.exists(db_path + suffix))
+
+
+def summarize(count: int, elapsed: float, latencies: List[float], db_path: str) -> Dict[str, Any]:
+    return {
+        'events': count,
+        'seconds': round(elapsed, 3),
+        'events_per_second': round(count / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50) * 1e3, 3) if latencies else None,
+        'p99_ms': round(percentile(latencies, 0.99) * 1e3, 3) if latencies else None,
+        'db_bytes': database_size(db_path),
+    }
+
+
+def bench_process_event(temp_dir: str, events: List[Dict[str, Any]], keep_connection: bool) -> Dict[str, Any]:
+    db_path = os.path.join(temp_dir, f"process-{int(keep_connection)}.db")
+    core = BackendCore(temp_dir, db_path=db_path)
+    keeper = core.get_db_connection() if keep_connection else None
+    latencies = []
+    start = time.perf_counter()
+    for event in events:
+        event_start = time.perf_counter()
+        core.process_event(event)
+        latencies.append(time.perf_counter() - event_start)
+    elapsed = time.perf_counter() - start
+    if keeper:
+        keeper.close()
+    return summarize(len(events), elapsed, latencies, db_path)
+
+
+def bench_backfill(temp_dir: str, journal_dir: str) -> Dict[str, Any]:
+    """Importação completa pelo BackendCore.backfill (só vazão: a latência é a de process_event)."""
+    db_path = os.path.join(temp_dir, 'backfill.db')
+    core = BackendCore(journal_dir, db_path=db_path)
+    start = time.perf_counter()
+    imported = core.backfill(journal_dir)
+    elapsed = time.perf_counter() - start
+    return summarize(imported, elapsed, [], db_path)
+
+
+def bench_live(temp_dir: str, events: List[Dict[str, Any]], rate: float) -> Dict[str, Any]:
+    """Grava as linhas em ritmo fixo no diário seguido por start_monitoring e mede a latência até o commit."""
+    live_dir = os.path.join(temp_dir, 'live')
+    os.makedirs(live_dir)
+    db_path = os.path.join(temp_dir, 'live.db')
+    journal_path = os.path.join(live_dir, 'Journal.2026-01-01T000000.01.log')
+    open(journal_path, 'w').close()
+    core = BackendCore(live_dir, db_path=db_path)
+    # Todas as linhas gravadas chegam aos listeners: sem descartar, amostrar
+    # ou agrupar eventos pela política de ingestão padrão
+    core.ingest_policy = IngestPolicy({}, core.metrics)
+
+    written: Dict[int, float] = {}
+    latencies: List[float] = []
+    done = threading.Event()
+
+    def committed(event_data: Dict[str, Any]) -> None:
+        latencies.append(time.perf_counter() - written[event_data['BenchSeq']])
+        if len(latencies) >= len(events):
+            done.set()
+
+    core.add_event_listener(committed)
+    core.start_monitoring()
+    try:
+        start = time.perf_counter()
+        with open(journal_path, 'a', encoding='utf-8') as f:
+            for index, event in enumerate(events):
+                line = json.dumps(dict(event, BenchSeq=index)) + '\n'
+                # Ritmo fixo: espera o instante previsto para esta linha
+                delay = start + index / rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                written[index] = time.perf_counter()
+                f.write(line)
+                f.flush()
+        done.wait(timeout=60 + len(events) / rate)
+        elapsed = time.perf_counter() - start
+    finally:
+        core.stop_monitoring()
+    result = summarize(len(latencies), elapsed, latencies, db_path)
+    result['lost_events'] = len(events) - len(latencies)
+    return result
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    """Imprime a variação de cada métrica em relação a um resultado anterior."""
+    print(f"Comparação com {baseline.get('commit')} ({baseline.get('created_at')}):")
+    for name, metrics in results['benchmarks'].items():
+        previous = baseline.get('benchmarks', {}).get(name)
+        if not previous:
+            continue
+        for metric in ('events_per_second', 'p50_ms', 'p99_ms', 'db_bytes'):
+            old, new = previous.get(metric), metrics.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old * 100
+            better = change > 0 if metric in HIGHER_IS_BETTER else change < 0
+            print(f"  {name:<26} {metric:<18} {old:>12} -> {new:>12}  {change:+6.1f}%"
+                  f"{'  (melhor)' if better and abs(change) >= 5 else '  (pior)' if abs(change) >= 5 else ''}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=int, default=20000, help="Eventos para process_event e backfill")
+    parser.add_argument('--scenario', choices=SCENARIOS, default='mixed')
+    parser.add_argument('--live-events', type=int, default=2000)
+    parser.add_argument('--live-rate', type=float, default=200.0, help="Linhas por segundo no teste ao vivo")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Grava os resultados neste arquivo JSON")
+    parser.add_argument('--compare', help="Resultados JSON de outro commit para comparação")
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp(prefix='edlt-ingest-')
+    try:
+        events = list(JournalGenerator(args.seed, args.scenario).events(args.events))
+        journal_dir = os.path.join(temp_dir, 'journals')
+        JournalGenerator(args.seed, args.scenario).write_journals(journal_dir, args.events)
+        live_events = list(JournalGenerator(args.seed + 1, args.scenario).events(args.live_events))
+
+        benchmarks = {
+            'process_event': bench_process_event(temp_dir, events, keep_connection=False),
+            'process_event_keeper': bench_process_event(temp_dir, events, keep_connection=True),
+            'backfill': bench_backfill(temp_dir, journal_dir),
+            'live_tail': bench_live(temp_dir, live_events, args.live_rate),
+        }
+        results = {
+            'commit': git_commit(),
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'parameters': vars(args),
+            'benchmarks': benchmarks,
+        }
+
+        for name, metrics in benchmarks.items():
+            latency = (f"p50 {metrics['p50_ms']:7.3f} ms  p99 {metrics['p99_ms']:7.3f} ms"
+                       if metrics['p50_ms'] is not None else ' ' * 31)
+            print(f"  {name:<22} {metrics['events_per_second']:9.1f} eventos/s  {latency}  "
+                  f"banco {metrics['db_bytes'] / 1e6:6.1f} MB")
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+            print(f"Resultados gravados em {args.output}")
+        if args.compare:
+            with open(args.compare, 'r', encoding='utf-8') as f:
+                compare(results, json.load(f))
+
+        ok = (benchmarks['backfill']['events'] == benchmarks['process_event']['events']
+              and benchmarks['live_tail']['lost_events'] == 0)
+        return 0 if ok else 1
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
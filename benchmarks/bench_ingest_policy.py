@@ -0,0 +1,153 @@
+"""
+Espaço em disco e gravação da política de ingestão (ingest_policy.py):
+importa o mesmo histórico sintético com
+  - store: tudo gravado como antes (IngestPolicy({}));
+  - default: DEFAULT_INGEST_POLICY (drop, compressão, coalesce e sample);
+e compara linhas e bytes de JSON em journal_events, o tamanho do banco, os
+bytes escritos pelo processo (/proc/self/io, quando existe) e o tempo da
+importação. As tabelas derivadas dos handlers (status, materiais, lucro,
+sistemas, módulos e histórico de ranques) precisam ficar idênticas; o
+resultado é 1 se não ficarem.
+
+    python benchmarks/bench_ingest_policy.py --events 50000 --scenarios mixed exploration
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import sqlite3
+import argparse
+import tempfile
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from main import BackendCore
+from ingest_policy import IngestPolicy
+from journal_generator import JournalGenerator, SCENARIOS
+
+POLICIES = ('store', 'default')
+
+# Tabelas escritas pelos handlers, sem as colunas de identidade (id)
+DERIVED_TABLES = ('pilot_status', 'pilot_materials', 'pilot_profit', 'system_data',
+                  'ship_modules', 'rank_progress_history')
+
+
+def database_size(db_path: str) -> int:
+    return sum(os.path.getsize(db_path + suffix) for suffix in ('', '-wal') if os.path.exists(db_path + suffix))
+
+
+def written_bytes() -> Optional[int]:
+    """write_bytes do processo (Linux); None se indisponível."""
+    try:
+        with open('/proc/self/io', 'r', encoding='ascii') as f:
+            for line in f:
+                if line.startswith('write_bytes:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def write_journals(directory: str, scenario: str, args: argparse.Namespace) -> None:
+    generator = JournalGenerator(args.seed, scenario)
+    per_file = max(1, args.events // args.files)
+    for part in range(args.files):
+        path = os.path.join(directory, f"Journal.2026-01-{part + 1:02d}T000000.01.log")
+        with open(path, 'w', encoding='utf-8') as f:
+            for event in generator.events(per_file):
+                f.write(json.dumps(event) + '\n')
+
+
+def derived_rows(conn: sqlite3.Connection) -> Dict[str, List[tuple]]:
+    rows = {}
+    for table in DERIVED_TABLES:
+        columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})") if row[1] != 'id']
+        rows[table] = sorted(conn.execute(f"SELECT {', '.join(columns)} FROM {table}").fetchall(), key=repr)
+    return rows
+
+
+def run(policy: str, journal_dir: str, db_path: str) -> Dict[str, Any]:
+    core = BackendCore(journal_dir, db_path=db_path)
+    if policy == 'store':
+        core.ingest_policy = IngestPolicy({}, core.metrics)
+    before = written_bytes()
+    start = time.perf_counter()
+    imported = core.backfill()
+    elapsed = time.perf_counter() - start
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        rows, payload = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(length(event_data)), 0) FROM journal_events").fetchone()
+        derived = derived_rows(conn)
+    finally:
+        conn.close()
+    after = written_bytes()
+    counters = {f"{series['labels']['action']}:{series['labels']['event']}": series['value']
+                for series in core.metrics.snapshot()['counters'] if series['name'] == 'edlt_policy_events_total'}
+    return {
+        'imported': imported,
+        'backfill_seconds': round(elapsed, 3),
+        'journal_rows': rows,
+        'event_data_bytes': payload,
+        'database_bytes': database_size(db_path),
+        'written_bytes': after - before if before is not None and after is not None else None,
+        'policy_events': counters,
+        'derived': derived,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=int, default=50000, help="Eventos no histórico importado")
+    parser.add_argument('--files', type=int, default=10, help="Arquivos Journal.*.log do histórico")
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Grava os resultados neste arquivo JSON")
+    args = parser.parse_args()
+
+    results: Dict[str, Any] = {'parameters': vars(args)}
+    consistent = True
+    temp_dir = tempfile.mkdtemp(prefix='edlt-policy-')
+    try:
+        for scenario in args.scenarios:
+            journal_dir = os.path.join(temp_dir, scenario)
+            os.makedirs(journal_dir)
+            write_journals(journal_dir, scenario, args)
+            phases = {policy: run(policy, journal_dir, os.path.join(temp_dir, f"{scenario}-{policy}.db"))
+                      for policy in POLICIES}
+            mismatched = [table for table in DERIVED_TABLES
+                          if phases['store']['derived'][table] != phases['default']['derived'][table]]
+            consistent = consistent and not mismatched
+            print(f"{scenario}:")
+            for policy in POLICIES:
+                phase = phases[policy]
+                written = phase['written_bytes']
+                print(f"  {policy:<8} {phase['journal_rows']} linhas, JSON {phase['event_data_bytes'] / 1e6:.2f} MB, "
+                      f"banco {phase['database_bytes'] / 1e6:.2f} MB, "
+                      f"escrita {'-' if written is None else f'{written / 1e6:.2f} MB'}, "
+                      f"{phase['backfill_seconds']} s")
+            store, default = phases['store'], phases['default']
+            print(f"  redução: linhas {1 - default['journal_rows'] / max(1, store['journal_rows']):.1%}  "
+                  f"JSON {1 - default['event_data_bytes'] / max(1, store['event_data_bytes']):.1%}  "
+                  f"banco {1 - default['database_bytes'] / max(1, store['database_bytes']):.1%}")
+            print(f"  tabelas derivadas: {'idênticas' if not mismatched else 'DIFERENTES: ' + ', '.join(mismatched)}")
+            for phase in phases.values():
+                del phase['derived']
+            phases['mismatched_tables'] = mismatched
+            results[scenario] = phases
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Resultados gravados em {args.output}")
+    return 0 if consistent else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
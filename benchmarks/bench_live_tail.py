@@ -0,0 +1,242 @@
+"""
+Latência ponta a ponta do monitoramento ao vivo, simulando o jogo gravando
+o diário: linhas em ritmo realista e em rajadas, parte delas gravadas em
+dois flushes (linha incompleta no meio, metade delas cortada dentro de um
+caractere UTF-8 de vários bytes) e rotação para uma nova parte
+Journal.*.log (começando com Fileheader, como o jogo faz).
+
+Cada linha leva um número de sequência e o instante em que foi gravada por
+completo. O BackendCore monitora a pasta por start_monitoring e a latência
+é dividida em etapas, mostradas como histogramas:
+  - aviso: gravação -> aviso do watchdog entregue ao event loop da ingestão;
+  - leitura: aviso -> linha lida e decodificada;
+  - commit: linha decodificada -> fila, gravação no executor do SQLite,
+    commit e listeners notificados (o ponto em que a interface recebe o
+    evento);
+  - total: gravação -> commit.
+
+    python benchmarks/bench_live_tail.py --lines 2000 --rate 20 --burst-size 100 --rotate-every 500
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from main import BackendCore
+from ingest_policy import IngestPolicy
+from journal_generator import JournalGenerator, SCENARIOS
+
+STAGES = ('aviso', 'leitura', 'commit', 'total')
+
+# Limites superiores (ms) das faixas dos histogramas
+HISTOGRAM_BOUNDS = (0.25, 0.5, 1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+# Texto com acentos gravado em cada linha (UTF-8 de 2 e 3 bytes), como nomes
+# de comandante e mensagens do ReceiveText
+ACCENTED_TEXT = 'Olá, comandante Ñandú — até já'
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+def histogram(values_ms: List[float]) -> List[int]:
+    counts = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+    for value in values_ms:
+        index = 0
+        while index < len(HISTOGRAM_BOUNDS) and value > HISTOGRAM_BOUNDS[index]:
+            index += 1
+        counts[index] += 1
+    return counts
+
+
+def print_histogram(title: str, values_ms: List[float], width: int = 40) -> None:
+    print(f"  {title}: p50 {percentile(values_ms, 0.50):.2f} ms  p90 {percentile(values_ms, 0.90):.2f} ms  "
+          f"p99 {percentile(values_ms, 0.99):.2f} ms  máx {max(values_ms, default=0.0):.2f} ms")
+    counts = histogram(values_ms)
+    peak = max(counts) or 1
+    labels = [f"<= {bound:g} ms" for bound in HISTOGRAM_BOUNDS] + [f"> {HISTOGRAM_BOUNDS[-1]:g} ms"]
+    for label, count in zip(labels, counts):
+        if count:
+            print(f"    {label:>11} {count:7d} {'#' * max(1, count * width // peak)}")
+
+
+class GameWriter:
+    """Grava o diário como o jogo: linhas completas ou em dois flushes, com rotação de partes."""
+
+    def __init__(self, directory: str, rng: random.Random, partial_ratio: float, rotate_every: int):
+        self.directory = directory
+        self.rng = rng
+        self.partial_ratio = partial_ratio
+        self.rotate_every = rotate_every
+        self.part = 0
+        self.lines_in_part = 0
+        self.handle = None
+        self.written: Dict[int, float] = {}
+        # Linhas cortadas entre dois flushes dentro de um caractere de vários bytes
+        self.split_characters = 0
+        self.rotate()
+
+    def rotate(self) -> None:
+        if self.handle:
+            self.handle.close()
+        self.part += 1
+        self.lines_in_part = 0
+        path = os.path.join(self.directory, f"Journal.2026-01-01T000000.{self.part:02d}.log")
+        self.handle = open(path, 'wb')
+
+    def write(self, sequence: int, event: Dict[str, Any]) -> None:
+        if self.rotate_every and self.lines_in_part >= self.rotate_every:
+            self.rotate()
+            event = {'timestamp': event['timestamp'], 'event': 'Fileheader', 'part': self.part}
+        line = (json.dumps(dict(event, BenchSeq=sequence, BenchText=ACCENTED_TEXT), ensure_ascii=False)
+                + '\n').encode('utf-8')
+        if self.rng.random() < self.partial_ratio:
+            # Parte da linha, flush, e o resto logo depois: o monitor vê a linha
+            # incompleta. Metade dos cortes cai no meio de um caractere UTF-8.
+            inside = [index for index, byte in enumerate(line) if 0x80 <= byte < 0xC0]
+            if inside and self.rng.random() < 0.5:
+                cut = self.rng.choice(inside)
+                self.split_characters += 1
+            else:
+                cut = self.rng.randrange(1, len(line) - 1)
+            self.handle.write(line[:cut])
+            self.handle.flush()
+            time.sleep(0.002)
+            line = line[cut:]
+        self.written[sequence] = time.perf_counter()
+        self.handle.write(line)
+        self.handle.flush()
+        self.lines_in_part += 1
+
+    def close(self) -> None:
+        if self.handle:
+            self.handle.close()
+
+
+def run_phase(name: str, events: List[Dict[str, Any]], args: argparse.Namespace, burst_size: int,
+              seed: int) -> Dict[str, Any]:
+    temp_dir = tempfile.mkdtemp(prefix='edlt-live-')
+    try:
+        journal_dir = os.path.join(temp_dir, 'journals')
+        os.makedirs(journal_dir)
+        writer = GameWriter(journal_dir, random.Random(seed), args.partial_ratio, args.rotate_every)
+        core = BackendCore(journal_dir, db_path=os.path.join(temp_dir, 'live.db'))
+        # Todas as linhas gravadas chegam aos listeners: sem descartar, amostrar
+        # ou agrupar eventos pela política de ingestão padrão
+        core.ingest_policy = IngestPolicy({}, core.metrics)
+
+        # Instantes de cada etapa por linha. Os avisos chegam ao tailer na
+        # thread do event loop, então o último aviso vale para todas as linhas
+        # lidas em seguida.
+        dispatch = {'time': 0.0}
+        handed: Dict[int, tuple] = {}
+        stages: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+        done = threading.Event()
+
+        def committed(event_data: Dict[str, Any]) -> None:
+            now = time.perf_counter()
+            sequence = event_data['BenchSeq']
+            written = writer.written[sequence]
+            notified, read = handed.pop(sequence)
+            # A notificação de uma gravação anterior pode já encontrar esta linha
+            stages['aviso'].append(max(notified - written, 0.0) * 1e3)
+            stages['leitura'].append((read - max(notified, written)) * 1e3)
+            stages['commit'].append((now - read) * 1e3)
+            stages['total'].append((now - written) * 1e3)
+            if len(stages['total']) >= len(events):
+                done.set()
+
+        core.add_event_listener(committed)
+        core.start_monitoring()
+        tailer = core.ingest.tailers[0]
+        notify = tailer.notify
+
+        def notified(fs_event=None):
+            dispatch['time'] = time.perf_counter()
+            notify(fs_event)
+
+        # O watchdog repassa cada aviso ao tailer no event loop da ingestão
+        tailer.notify = notified
+        monitor = tailer.monitor
+        process = monitor.event_processor_callback
+
+        def handed_over(event_data: Dict[str, Any]) -> None:
+            handed[event_data['BenchSeq']] = (dispatch['time'], time.perf_counter())
+            process(event_data)
+
+        monitor.event_processor_callback = handed_over
+
+        try:
+            start = time.perf_counter()
+            for index, event in enumerate(events):
+                if burst_size:
+                    # Rajadas: burst_size linhas seguidas, uma rajada por segundo
+                    due = start + index // burst_size
+                else:
+                    due = start + index / args.rate
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                writer.write(index, event)
+            done.wait(timeout=30)
+        finally:
+            core.stop_monitoring()
+            writer.close()
+
+        lost = len(events) - len(stages['total'])
+        print(f"{name}: {len(stages['total'])}/{len(events)} linhas, {writer.part} partes do diário, "
+              f"{writer.split_characters} cortadas dentro de um caractere, {lost} perdidas")
+        for stage in STAGES:
+            print_histogram(stage, stages[stage])
+        return {
+            'lines': len(events),
+            'lost': lost,
+            'parts': writer.part,
+            'split_characters': writer.split_characters,
+            **{stage: {'p50_ms': round(percentile(values, 0.50), 3), 'p99_ms': round(percentile(values, 0.99), 3),
+                       'histogram': histogram(values)} for stage, values in stages.items()},
+        }
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lines', type=int, default=2000, help="Linhas gravadas em cada fase")
+    parser.add_argument('--scenario', choices=SCENARIOS, default='mixed')
+    parser.add_argument('--rate', type=float, default=20.0, help="Linhas por segundo na fase em ritmo realista")
+    parser.add_argument('--burst-size', type=int, default=100, help="Linhas por rajada na fase de rajadas")
+    parser.add_argument('--partial-ratio', type=float, default=0.1, help="Fração das linhas gravadas em dois flushes")
+    parser.add_argument('--rotate-every', type=int, default=500, help="Linhas por parte do diário (0: sem rotação)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Grava os resultados neste arquivo JSON")
+    args = parser.parse_args()
+
+    events = list(JournalGenerator(args.seed, args.scenario).events(args.lines))
+    results = {'parameters': vars(args), 'histogram_bounds_ms': HISTOGRAM_BOUNDS}
+    phases = {'steady': run_phase(f"Ritmo de {args.rate:g} linhas/s", events, args, 0, args.seed)}
+    if args.burst_size:
+        phases['burst'] = run_phase(f"Rajadas de {args.burst_size} linhas/s", events, args, args.burst_size,
+                                    args.seed + 1)
+    results.update(phases)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Resultados gravados em {args.output}")
+    return 0 if all(phase['lost'] == 0 for phase in phases.values()) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,148 @@
+"""
+Manutenção do banco em segundo plano (maintenance.py): importa um histórico
+sintético gravando todos os eventos (sem a política de ingestão), converte o
+banco de auto_vacuum NONE para INCREMENTAL como faz daemon.py --convert-incremental-vacuum e
+executa os passos de DatabaseMaintenance até não haver mais o que fazer.
+Mede o tempo da conversão, a duração de cada passo (o máximo que um evento
+novo espera pelo executor do SQLite) por tarefa, as linhas apagadas pela
+retenção, as páginas devolvidas e o tamanho do banco antes e depois.
+
+Os eventos sintéticos começam em 2026-01-01: os prazos de retenção valem em
+relação à data atual.
+
+    python benchmarks/bench_maintenance.py --events 50000
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from main import BackendCore
+from ingest_policy import IngestPolicy
+from maintenance import MAINTENANCE_STEP_SECONDS, enable_incremental_vacuum
+from journal_generator import JournalGenerator, SCENARIOS
+
+TASKS = ('retention', 'vacuum', 'analyze')
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+def write_journals(directory: str, args: argparse.Namespace) -> None:
+    generator = JournalGenerator(args.seed, args.scenario)
+    per_file = max(1, args.events // args.files)
+    for part in range(args.files):
+        path = os.path.join(directory, f"Journal.2026-01-{part + 1:02d}T000000.01.log")
+        with open(path, 'w', encoding='utf-8') as f:
+            for event in generator.events(per_file):
+                f.write(json.dumps(event) + '\n')
+
+
+def checkpointed_size(conn, db_path: str) -> int:
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return os.path.getsize(db_path)
+
+
+def counter(core: BackendCore, name: str) -> float:
+    return sum(series['value'] for series in core.metrics.snapshot()['counters'] if series['name'] == name)
+
+
+def run(journal_dir: str, db_path: str) -> Dict[str, Any]:
+    core = BackendCore(journal_dir, db_path=db_path)
+    core.ingest_policy = IngestPolicy({}, core.metrics)
+    core.backfill()
+    conn = core.get_db_connection()
+    try:
+        # Banco "antigo": sem auto_vacuum
+        conn.execute("PRAGMA auto_vacuum = NONE")
+        conn.execute("VACUUM")
+        rows_before = conn.execute("SELECT COUNT(*) FROM journal_events").fetchone()[0]
+        size_before = checkpointed_size(conn, db_path)
+
+        start = time.perf_counter()
+        enable_incremental_vacuum(conn, convert=True)
+        conversion = time.perf_counter() - start
+
+        steps: Dict[str, List[float]] = {task: [] for task in TASKS}
+        start = time.perf_counter()
+        while True:
+            counts = {series['labels']['task']: series['count'] for series in core.metrics.snapshot()['histograms']
+                      if series['name'] == 'edlt_maintenance_seconds'}
+            step_start = time.perf_counter()
+            if not core.maintenance.step(conn):
+                break
+            elapsed = time.perf_counter() - step_start
+            for series in core.metrics.snapshot()['histograms']:
+                if series['name'] == 'edlt_maintenance_seconds' and series['count'] != counts.get(series['labels']['task'], 0):
+                    steps[series['labels']['task']].append(elapsed * 1e3)
+        total = time.perf_counter() - start
+        rows_after = conn.execute("SELECT COUNT(*) FROM journal_events").fetchone()[0]
+        size_after = checkpointed_size(conn, db_path)
+        free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    finally:
+        conn.close()
+
+    return {
+        'journal_rows_before': rows_before,
+        'journal_rows_after': rows_after,
+        'retention_deleted': counter(core, 'edlt_retention_deleted_total'),
+        'vacuum_pages': counter(core, 'edlt_vacuum_pages_total'),
+        'database_bytes_before': size_before,
+        'database_bytes_after': size_after,
+        'free_pages_after': free_pages,
+        'conversion_seconds': round(conversion, 3),
+        'maintenance_seconds': round(total, 3),
+        'steps': {task: {'count': len(times),
+                         'p50_ms': round(percentile(times, 0.50), 3),
+                         'p99_ms': round(percentile(times, 0.99), 3),
+                         'max_ms': round(max(times, default=0.0), 3)} for task, times in steps.items()},
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=int, default=50000, help="Eventos no histórico importado")
+    parser.add_argument('--files', type=int, default=10, help="Arquivos Journal.*.log do histórico")
+    parser.add_argument('--scenario', choices=SCENARIOS, default='mixed')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Grava os resultados neste arquivo JSON")
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp(prefix='edlt-maintenance-')
+    try:
+        journal_dir = os.path.join(temp_dir, 'journals')
+        os.makedirs(journal_dir)
+        write_journals(journal_dir, args)
+        result = run(journal_dir, os.path.join(temp_dir, 'edlt.db'))
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    print(f"  journal_events: {result['journal_rows_before']} -> {result['journal_rows_after']} linhas "
+          f"({result['retention_deleted']:.0f} apagadas pela retenção)")
+    print(f"  banco: {result['database_bytes_before'] / 1e6:.2f} MB -> {result['database_bytes_after'] / 1e6:.2f} MB "
+          f"({result['vacuum_pages']:.0f} páginas devolvidas, {result['free_pages_after']} livres)")
+    print(f"  conversão para auto_vacuum incremental: {result['conversion_seconds']} s; "
+          f"manutenção: {result['maintenance_seconds']} s")
+    for task, step in result['steps'].items():
+        print(f"  {task:<10} {step['count']:>5} passos  p50 {step['p50_ms']:.2f} ms  p99 {step['p99_ms']:.2f} ms  "
+              f"máx {step['max_ms']:.2f} ms")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'parameters': vars(args), 'target_step_ms': MAINTENANCE_STEP_SECONDS * 1e3, **result},
+                      f, indent=2)
+        print(f"Resultados gravados em {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,59 @@
+"""
+Microbenchmark do catálogo de materiais: busca por símbolo do Journal, por
+nome de exibição e por nome fora do padrão (normalizado), e listas por grau
+e categoria, comparadas com a varredura do dicionário feita antes. Confere
+que todo material do catálogo é encontrado pelo símbolo e pelo nome.
+
+    python benchmarks/bench_materials.py --number 200000
+"""
+
+import os
+import sys
+import timeit
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.material_limits import (MATERIAL_CAPACITY, MATERIAL_CATALOG, MATERIAL_TO_GRADE,
+                                     get_all_materials_by_category, get_all_materials_by_grade,
+                                     get_material, get_material_capacity)
+
+
+def legacy_materials_by_grade(grade: int):
+    """Implementação anterior: varre o dicionário inteiro a cada chamada."""
+    return [material for material, mat_grade in MATERIAL_TO_GRADE.items() if mat_grade == grade]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--number', type=int, default=200000, help="Chamadas por medição")
+    args = parser.parse_args()
+
+    infos = set(MATERIAL_CATALOG.values())
+    found = all(get_material(info.symbol) is info and get_material(info.name) is info for info in infos)
+    same_grades = all(set(get_all_materials_by_grade(grade)) == set(legacy_materials_by_grade(grade))
+                      for grade in MATERIAL_CAPACITY)
+    print(f"Catálogo: {len(infos)} materiais, {len(MATERIAL_CATALOG)} chaves; "
+          f"todos encontrados: {found}; graus iguais ao anterior: {same_grades}")
+
+    cases = [
+        ('símbolo', lambda: get_material('chemicalstorageunits')),
+        ('nome de exibição', lambda: get_material('Chemical Storage Units')),
+        ('nome normalizado', lambda: get_material('chemical storage units')),
+        ('capacidade', lambda: get_material_capacity('uncutfocuscrystals')),
+        ('desconhecido', lambda: get_material('unobtainium')),
+        ('por grau', lambda: get_all_materials_by_grade(3)),
+        ('por grau (anterior)', lambda: legacy_materials_by_grade(3)),
+        ('por categoria', lambda: get_all_materials_by_category('Encoded')),
+    ]
+    results = {}
+    for label, call in cases:
+        seconds = min(timeit.repeat(call, number=args.number, repeat=3))
+        results[label] = seconds
+        print(f"  {label:<22} {seconds / args.number * 1e9:8.1f} ns/chamada")
+    print(f"Por grau: {results['por grau (anterior)'] / results['por grau']:.0f}x mais rápido que a varredura")
+    return 0 if found and same_grades and results['por grau'] < results['por grau (anterior)'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
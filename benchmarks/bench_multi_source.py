@@ -0,0 +1,155 @@
+"""
+Várias contas monitoradas juntas: uma fonte "ocupada" grava rajadas grandes
+(como um backfill de diário colado na pasta ou uma sessão muito ativa)
+enquanto as outras gravam em ritmo de jogo. Mede a latência de gravação até
+o commit das fontes calmas, com e sem a fonte ocupada, e confere que cada
+evento foi gravado com o comandante da sua fonte (journal_events.pilot_name).
+
+    python benchmarks/bench_multi_source.py --sources 3 --burst 5000 --rate 20 --seconds 10
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import sqlite3
+import argparse
+import tempfile
+import threading
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from main import BackendCore
+from ingest_policy import IngestPolicy
+from journal_generator import JournalGenerator, SCENARIOS
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+def run(args: argparse.Namespace, busy: bool) -> Dict[str, Any]:
+    temp_dir = tempfile.mkdtemp(prefix='edlt-multi-')
+    try:
+        generators = [JournalGenerator(args.seed + index, args.scenario, commander=f"CMDR {index}")
+                      for index in range(args.sources)]
+        directories = []
+        for index in range(args.sources):
+            directory = os.path.join(temp_dir, f"conta{index}")
+            os.makedirs(directory)
+            # Diário já aberto com o login do comandante: o monitoramento o
+            # descobre lendo o arquivo antes de segui-lo pelo final
+            with open(os.path.join(directory, 'Journal.2026-01-01T000000.01.log'), 'w', encoding='utf-8') as f:
+                for event in generators[index].session_header():
+                    f.write(json.dumps(event) + '\n')
+            directories.append(directory)
+        db_path = os.path.join(temp_dir, 'multi.db')
+        core = BackendCore(directories, db_path=db_path)
+        # Todas as linhas gravadas chegam aos listeners: sem descartar, amostrar
+        # ou agrupar eventos pela política de ingestão padrão
+        core.ingest_policy = IngestPolicy({}, core.metrics)
+
+        written: Dict[tuple, float] = {}
+        latencies: List[float] = []
+        expected = {'count': 0}
+        committed_count = {'count': 0}
+        done = threading.Event()
+
+        def committed(event_data: Dict[str, Any]) -> None:
+            key = (event_data.get('BenchSource'), event_data.get('BenchSeq'))
+            if key[0] is None:
+                return
+            if key[0] != 0:
+                latencies.append(time.perf_counter() - written[key])
+            committed_count['count'] += 1
+            if committed_count['count'] >= expected['count']:
+                done.set()
+
+        core.add_event_listener(committed)
+        core.start_monitoring()
+        handles = [open(os.path.join(directory, 'Journal.2026-01-01T000000.01.log'), 'a', encoding='utf-8')
+                   for directory in directories]
+        try:
+            # Sessões longas: sem novo login no meio da medição
+            session_length = args.burst + int(args.rate * args.seconds) + 1
+            if busy:
+                # Fonte 0: uma rajada grande de uma vez, logo no início
+                burst = [json.dumps(dict(event, BenchSource=0, BenchSeq=index))
+                         for index, event in enumerate(generators[0].events(args.burst, session_length))]
+                handles[0].write('\n'.join(burst) + '\n')
+                handles[0].flush()
+                expected['count'] += len(burst)
+            calm = {source: list(generators[source].events(int(args.rate * args.seconds), session_length))
+                    for source in range(1, args.sources)}
+            expected['count'] += sum(len(events) for events in calm.values())
+            start = time.perf_counter()
+            for index in range(int(args.rate * args.seconds)):
+                delay = start + index / args.rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                for source, events in calm.items():
+                    written[(source, index)] = time.perf_counter()
+                    handles[source].write(json.dumps(dict(events[index], BenchSource=source, BenchSeq=index)) + '\n')
+                    handles[source].flush()
+            done.wait(timeout=60 + args.burst / 500)
+        finally:
+            core.stop_monitoring()
+            for handle in handles:
+                handle.close()
+
+        conn = sqlite3.connect(db_path)
+        try:
+            misattributed = 0
+            for pilot_name, event_json in conn.execute("SELECT pilot_name, event_data FROM journal_events"):
+                event_data = json.loads(event_json)
+                source = event_data.get('BenchSource')
+                # Fileheader abre a sessão antes do login: ainda sem comandante
+                if source is None or event_data['event'] == 'Fileheader':
+                    continue
+                if pilot_name != f"CMDR {source}":
+                    misattributed += 1
+        finally:
+            conn.close()
+        return {
+            'events': committed_count['count'],
+            'expected': expected['count'],
+            'misattributed': misattributed,
+            'calm_p50_ms': round(percentile(latencies, 0.50) * 1e3, 3),
+            'calm_p99_ms': round(percentile(latencies, 0.99) * 1e3, 3),
+            'calm_max_ms': round(max(latencies, default=0.0) * 1e3, 3),
+        }
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sources', type=int, default=3, help="Diretórios de diário (contas); a fonte 0 é a ocupada")
+    parser.add_argument('--burst', type=int, default=5000, help="Linhas gravadas de uma vez pela fonte ocupada")
+    parser.add_argument('--rate', type=float, default=20.0, help="Linhas por segundo de cada fonte calma")
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--scenario', choices=SCENARIOS, default='mixed')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Grava os resultados neste arquivo JSON")
+    args = parser.parse_args()
+
+    results = {'parameters': vars(args), 'alone': run(args, busy=False), 'with_busy_source': run(args, busy=True)}
+    for name in ('alone', 'with_busy_source'):
+        phase = results[name]
+        print(f"  {name:<17} {phase['events']}/{phase['expected']} eventos, {phase['misattributed']} com comandante "
+              f"errado; fontes calmas: p50 {phase['calm_p50_ms']:.2f} ms  p99 {phase['calm_p99_ms']:.2f} ms  "
+              f"máx {phase['calm_max_ms']:.2f} ms")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Resultados gravados em {args.output}")
+    ok = all(phase['events'] == phase['expected'] and phase['misattributed'] == 0
+             for phase in (results['alone'], results['with_busy_source']))
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,127 @@
+"""
+Benchmark da previsão de ranques: simula anos de sessões de jogo (eventos
+Rank e Progress no login, semente fixa) por process_event e compara a
+previsão incremental (rank_progress_state) com um recálculo que varre todo
+o histórico (que só guarda as mudanças; o estado também conta as sessões
+sem progresso, por isso os ritmos ficam próximos, não iguais). Verifica
+também que um login com Rank e Progress a um segundo de distância não
+começa o ritmo com esse intervalo curto.
+
+    python benchmarks/bench_rank_forecast.py --years 5 --sessions-per-day 3
+"""
+
+import os
+import sys
+import time
+import random
+import shutil
+import sqlite3
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from main import BackendCore
+from rank_progress import RANK_EVENT_TYPES, rank_forecasts, rank_progress_history, update_rate
+
+START = 1577836800  # 2020-01-01T00:00:00Z
+
+# Ritmo máximo aceito um dia depois do login de short_first_interval_rate
+# (o progresso real foi de 0.01 ranque em 24 h)
+SHORT_INTERVAL_MAX_RATE = 0.01
+
+
+def session_events(days: int, sessions_per_day: int, seed: int):
+    """Eventos Rank/Progress de cada login, com progresso lento e irregular."""
+    rng = random.Random(seed)
+    position = {rank_type: rng.uniform(0, 3) for rank_type in RANK_EVENT_TYPES}
+    speed = {rank_type: rng.uniform(0, 0.01) for rank_type in RANK_EVENT_TYPES}
+    for day in range(days):
+        for session in range(sessions_per_day):
+            stamp = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(
+                START + day * 86400 + session * 86400 // sessions_per_day + rng.randrange(3600)))
+            for rank_type in RANK_EVENT_TYPES:
+                if rng.random() < 0.5:
+                    position[rank_type] = min(position[rank_type] + rng.expovariate(1 / speed[rank_type])
+                                              if speed[rank_type] else position[rank_type], 8.0)
+            yield {'timestamp': stamp, 'event': 'Rank',
+                   **{rank_type: int(position[rank_type]) for rank_type in RANK_EVENT_TYPES}}
+            yield {'timestamp': stamp, 'event': 'Progress',
+                   **{rank_type: int(position[rank_type] % 1 * 100) for rank_type in RANK_EVENT_TYPES}}
+
+
+def rescan_rate(conn: sqlite3.Connection, rank_type: str):
+    """Ritmo recalculado varrendo o histórico inteiro (o que a previsão incremental evita)."""
+    rate, previous = None, None
+    for timestamp, rank, progress in rank_progress_history(conn, rank_type):
+        if previous is not None and timestamp > previous[0]:
+            rate = update_rate(rate, rank + progress - previous[1], (timestamp - previous[0]) / 3600.0)
+        previous = (timestamp, rank + progress)
+    return rate
+
+
+def short_first_interval_rate(temp_dir: str) -> float:
+    """
+    Ritmo de Combat um dia depois de um login com Rank e Progress a um
+    segundo de distância (meio ranque nesse segundo) e de mais 1% de
+    progresso no dia: deve ficar perto de 0.01 ranque/dia, não de 1800/h.
+    """
+    core = BackendCore(temp_dir, db_path=os.path.join(temp_dir, 'short.db'))
+    core.process_event({'timestamp': '2020-01-01T00:00:00Z', 'event': 'Rank', 'Combat': 3})
+    core.process_event({'timestamp': '2020-01-01T00:00:01Z', 'event': 'Progress', 'Combat': 50})
+    core.process_event({'timestamp': '2020-01-02T00:00:01Z', 'event': 'Progress', 'Combat': 51})
+    conn = sqlite3.connect(core.db_path)
+    try:
+        return rank_forecasts(conn)['Combat']['rate_per_hour'] or 0.0
+    finally:
+        conn.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--years', type=float, default=5)
+    parser.add_argument('--sessions-per-day', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp(prefix='edlt-ranks-')
+    try:
+        db_path = os.path.join(temp_dir, 'bench.db')
+        core = BackendCore(temp_dir, db_path=db_path)
+        events = list(session_events(int(args.years * 365), args.sessions_per_day, args.seed))
+        start = time.perf_counter()
+        for event in events:
+            core.process_event(event)
+        ingest = time.perf_counter() - start
+
+        conn = sqlite3.connect(db_path)
+        samples = conn.execute("SELECT COUNT(*) FROM rank_progress_history").fetchone()[0]
+        print(f"{len(events)} eventos em {ingest:.1f} s ({ingest / len(events) * 1e6:.0f} us/evento); "
+              f"{samples} amostras no histórico")
+
+        start = time.perf_counter()
+        for _ in range(100):
+            forecasts = rank_forecasts(conn)
+        incremental = (time.perf_counter() - start) / 100
+        start = time.perf_counter()
+        rescanned = {rank_type: rescan_rate(conn, rank_type) for rank_type in RANK_EVENT_TYPES}
+        rescan = time.perf_counter() - start
+        conn.close()
+
+        for rank_type, forecast in sorted(forecasts.items()):
+            hours = forecast['hours_to_target']
+            print(f"  {rank_type:<11} ritmo {forecast['rate_per_hour'] or 0:.5f}/h "
+                  f"(varredura {rescanned[rank_type] or 0:.5f}/h)  "
+                  f"{'≈ %.0f h' % hours if hours is not None else 'sem previsão'} para {forecast['target_rank']}")
+        print(f"Previsão incremental: {incremental * 1e3:.3f} ms   varredura do histórico: {rescan * 1e3:.1f} ms "
+              f"({rescan / incremental:.0f}x)")
+        short_rate = short_first_interval_rate(temp_dir)
+        print(f"Login com Rank e Progress a 1 s de distância: ritmo {short_rate:.5f}/h um dia depois")
+        return 0 if (len(forecasts) == len(RANK_EVENT_TYPES) and incremental < rescan
+                     and short_rate < SHORT_INTERVAL_MAX_RATE) else 1
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""
+Benchmark do índice de preços e do TradeRouteFinder com dezenas de milhares
+de mercados sintéticos (semente fixa) gravados em um banco temporário.
+
+Mede a carga do índice, consultas frias e em cache (melhor venda, ida e
+circuito) e verifica que uma mudança de preço só invalida as consultas que
+cobrem o mercado alterado e que uma mensagem atrasada não sobrescreve preços
+mais recentes.
+
+    python benchmarks/bench_trade_routes.py --markets 20000 --jumps 3 --range 25
+"""
+
+import os
+import sys
+import time
+import random
+import shutil
+import argparse
+import resource
+import tempfile
+import statistics
+from typing import List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from main import BackendCore
+from eddn_client import get_db_connection, write_operations
+from trade_routes import PriceIndex, TradeRouteFinder
+
+COMMODITY_NAMES = [f"commodity{i:03d}" for i in range(300)]
+TIMESTAMP = '2099-01-01T00:00:00Z'
+STALE_TIMESTAMP = '2098-01-01T00:00:00Z'
+
+
+def make_operations(markets: int, systems: int, seed: int):
+    """Lotes de operações no formato gravado pelo EDDNSubscriber."""
+    rng = random.Random(seed)
+    # Sistemas concentrados no centro, como a "bolha" habitada
+    positions = []
+    for _ in range(systems):
+        radius = 300.0 * rng.random() ** 0.5
+        theta, phi = rng.uniform(0, 6.2832), rng.uniform(-1.5708, 1.5708)
+        positions.append((radius * 0.9 * (theta - 3.1416) / 3.1416, radius * phi / 1.5708 * 0.3,
+                          radius * rng.uniform(-1, 1)))
+
+    batch = {'system': {}, 'station': {}, 'commodity': {}}
+    for index, (x, y, z) in enumerate(positions):
+        name = f"System {index}"
+        batch['system'][(index,)] = (index, name, x, y, z, TIMESTAMP)
+
+    for market_id in range(markets):
+        system_name = f"System {rng.randrange(systems)}"
+        station_name = f"Station {market_id}"
+        batch['station'][(market_id,)] = (market_id, station_name, system_name, None, None, None, TIMESTAMP)
+        for commodity in rng.sample(COMMODITY_NAMES, 100):
+            base = 1000 + COMMODITY_NAMES.index(commodity) * 30
+            if rng.random() < 0.5:
+                row = (market_id, commodity, system_name, station_name, base + rng.randrange(-500, 500), 0,
+                       base, rng.randrange(1, 5000), 0, TIMESTAMP)
+            else:
+                row = (market_id, commodity, system_name, station_name, 0, base + rng.randrange(-500, 800),
+                       base, 0, rng.randrange(1, 5000), TIMESTAMP)
+            batch['commodity'][(market_id, commodity)] = row
+        if len(batch['commodity']) >= 200000:
+            yield batch
+            batch = {'station': {}, 'commodity': {}}
+    yield batch
+
+
+def timed(call) -> float:
+    start = time.perf_counter()
+    call()
+    return (time.perf_counter() - start) * 1000
+
+
+def report(label: str, samples: List[float]) -> None:
+    print(f"  {label:<28} mediana {statistics.median(samples):8.1f} ms   máx {max(samples):8.1f} ms")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--markets', type=int, default=20000)
+    parser.add_argument('--systems', type=int, default=8000)
+    parser.add_argument('--jumps', type=int, default=3)
+    parser.add_argument('--range', type=float, default=25.0, help="Alcance de salto (anos-luz)")
+    parser.add_argument('--queries', type=int, default=20)
+    parser.add_argument('--max-query-ms', type=float, default=500.0)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp(prefix='edlt-trade-')
+    try:
+        db_path = os.path.join(temp_dir, 'bench.db')
+        BackendCore(temp_dir, db_path=db_path)
+
+        start = time.perf_counter()
+        conn = get_db_connection(db_path)
+        for batch in make_operations(args.markets, args.systems, args.seed):
+            write_operations(conn, batch)
+        conn.close()
+        print(f"Banco com {args.markets} mercados gravado em {time.perf_counter() - start:.1f} s")
+
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        index = PriceIndex(db_path)
+        load_ms = timed(index.load)
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        print(f"Carga do índice: {load_ms:.0f} ms, memória +{(rss_after - rss_before) / 1024:.0f} MB")
+
+        finder = TradeRouteFinder(index)
+        rng = random.Random(args.seed)
+        origins = rng.sample(range(args.markets), args.queries)
+        commodities = [rng.choice(COMMODITY_NAMES) for _ in origins]
+
+        queries = {
+            'melhor venda': lambda o, c: finder.best_sell(c, o, args.jumps, args.range),
+            'ida (single-hop)': lambda o, c: finder.best_hops(o, args.jumps, args.range, cargo=256),
+            'circuito A->B->A': lambda o, c: finder.best_loops(o, args.jumps, args.range, cargo=256),
+        }
+        print(f"Consultas ({args.jumps} saltos x {args.range} al, {args.queries} origens):")
+
+        worst = 0.0
+        for label, query in queries.items():
+            cold = [timed(lambda o=o, c=c: query(o, c)) for o, c in zip(origins, commodities)]
+            warm = [timed(lambda o=o, c=c: query(o, c)) for o, c in zip(origins, commodities)]
+            report(f"{label} (fria)", cold)
+            report(f"{label} (cache)", warm)
+            worst = max(worst, max(cold))
+
+        # Mudança de preço no próprio mercado de origem invalida só as consultas dele
+        origin = origins[0]
+        market = index.markets[origin]
+        commodity = next(iter(market.buys))
+        misses = finder.misses
+        index.apply_operations({'commodity': {(origin, commodity): (
+            origin, commodity, market.system_name, market.station_name, 1, 0, 1, 9999, 0, TIMESTAMP)}})
+        for o, c in zip(origins, commodities):
+            finder.best_hops(o, args.jumps, args.range, cargo=256)
+        print(f"Após mudar um preço: {finder.misses - misses} consulta(s) recalculada(s) de {len(origins)}")
+
+        # Mensagem atrasada (timestamp mais antigo): o banco a ignora, e o índice também
+        before = market.buys.get(commodity)
+        index.apply_operations({'commodity': {(origin, commodity): (
+            origin, commodity, market.system_name, market.station_name, 2, 0, 2, 5, 0, STALE_TIMESTAMP)}})
+        stale_ignored = market.buys.get(commodity) == before
+        print(f"Preço de mensagem atrasada ignorado: {stale_ignored}")
+
+        return 0 if worst <= args.max_query_ms and stale_ignored else 1
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
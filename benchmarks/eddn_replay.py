@@ -0,0 +1,226 @@
+"""
+Publicador EDDN local que substitui o relay: reenvia mensagens gravadas (ou
+sintéticas, com semente fixa, dos seis esquemas roteados e com uma fração de
+reenvios duplicados) compactadas com zlib por um socket ZeroMQ PUB, e mede se
+o EDDNSubscriber acompanha a taxa com memória limitada.
+
+    python benchmarks/eddn_replay.py --rate 200 --duration 10
+    python benchmarks/eddn_replay.py --input mensagens_gravadas.jsonl --rate 0
+
+--input aceita um arquivo JSONL com uma mensagem EDDN por linha (como
+gravadas do relay). --rate 0 publica o mais rápido possível.
+"""
+
+import os
+import sys
+import json
+import time
+import zlib
+import random
+import shutil
+import argparse
+import resource
+import tempfile
+import threading
+from typing import List, Dict, Any
+
+import zmq
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from main import BackendCore
+from eddn_client import EDDNSubscriber
+
+SCHEMA_BASE = 'https://eddn.edcd.io/schemas/'
+COMMODITY_NAMES = [f"commodity{i:03d}" for i in range(400)]
+MODULE_NAMES = [f"int_module_size{i % 8}_class{i % 5}_{i}" for i in range(300)]
+SHIP_NAMES = ['sidewinder', 'eagle', 'hauler', 'adder', 'viper', 'cobramkiii', 'type6', 'type7',
+              'asp', 'vulture', 'python', 'type9', 'anaconda', 'federation_corvette', 'cutter']
+
+# Proporção de cada esquema, aproximando o tráfego real do relay
+SCHEMA_MIX = [
+    ('commodity/3', 0.45),
+    ('journal/1', 0.30),
+    ('fsssignaldiscovered/1', 0.08),
+    ('navroute/1', 0.07),
+    ('outfitting/2', 0.06),
+    ('shipyard/2', 0.04),
+]
+
+
+def _timestamp(i: int) -> str:
+    return f"2026-01-01T{(i // 3600) % 24:02d}:{(i // 60) % 60:02d}:{i % 60:02d}Z"
+
+
+def _star_pos(rng: random.Random) -> List[float]:
+    return [round(rng.uniform(-1000, 1000), 3) for _ in range(3)]
+
+
+def _make_message_body(rng: random.Random, schema: str, i: int, markets: int) -> Dict[str, Any]:
+    market_id = 3200000000 + rng.randrange(markets)
+    system_address = 1000000 + market_id % 997
+    system_name = f"System {market_id % 997}"
+    station_name = f"Station {market_id}"
+    timestamp = _timestamp(i)
+
+    if schema == 'commodity/3':
+        return {
+            'systemName': system_name, 'stationName': station_name, 'marketId': market_id, 'timestamp': timestamp,
+            'commodities': [{
+                'name': name,
+                'meanPrice': rng.randrange(100, 10000),
+                'buyPrice': rng.randrange(0, 10000),
+                'stock': rng.randrange(0, 50000),
+                'stockBracket': rng.randrange(0, 4),
+                'sellPrice': rng.randrange(0, 10000),
+                'demand': rng.randrange(0, 50000),
+                'demandBracket': rng.randrange(0, 4),
+            } for name in rng.sample(COMMODITY_NAMES, 120)],
+        }
+    if schema == 'journal/1':
+        docked = rng.random() < 0.4
+        body = {'event': 'Docked' if docked else 'FSDJump', 'timestamp': timestamp, 'StarSystem': system_name,
+                'SystemAddress': system_address, 'StarPos': _star_pos(rng)}
+        if docked:
+            body.update({'MarketID': market_id, 'StationName': station_name, 'StationType': 'Coriolis',
+                         'DistFromStarLS': round(rng.uniform(10, 5000), 2)})
+        return body
+    if schema == 'fsssignaldiscovered/1':
+        return {'event': 'FSSSignalDiscovered', 'timestamp': timestamp, 'StarSystem': system_name,
+                'SystemAddress': system_address, 'StarPos': _star_pos(rng),
+                'signals': [{'timestamp': timestamp, 'SignalName': f"Signal {rng.randrange(50)}",
+                             'SignalType': 'FleetCarrier', 'IsStation': True} for _ in range(rng.randrange(1, 6))]}
+    if schema == 'navroute/1':
+        return {'timestamp': timestamp, 'Route': [
+            {'StarSystem': f"System {n}", 'SystemAddress': 1000000 + n, 'StarPos': _star_pos(rng), 'StarClass': 'K'}
+            for n in rng.sample(range(997), rng.randrange(2, 12))]}
+    if schema == 'outfitting/2':
+        return {'systemName': system_name, 'stationName': station_name, 'marketId': market_id,
+                'timestamp': timestamp, 'modules': rng.sample(MODULE_NAMES, 80)}
+    return {'systemName': system_name, 'stationName': station_name, 'marketId': market_id,
+            'timestamp': timestamp, 'ships': rng.sample(SHIP_NAMES, 6)}
+
+
+def make_messages(count: int, seed: int = 42, markets: int = 2000,
+                  duplicate_fraction: float = 0.05) -> List[Dict[str, Any]]:
+    """Gera mensagens dos esquemas principais com o formato das enviadas ao relay.
+
+    Uma fração delas reenvia o conteúdo de uma mensagem anterior com outro
+    cabeçalho, como acontece quando vários clientes enviam o mesmo dado.
+    """
+    rng = random.Random(seed)
+    schemas = [schema for schema, _ in SCHEMA_MIX]
+    weights = [weight for _, weight in SCHEMA_MIX]
+    messages = []
+    for i in range(count):
+        header = {'uploaderID': f"bench{rng.randrange(50)}", 'softwareName': 'EDLT replay', 'softwareVersion': '1.0'}
+        if messages and rng.random() < duplicate_fraction:
+            original = rng.choice(messages)
+            messages.append({'$schemaRef': original['$schemaRef'], 'header': header, 'message': original['message']})
+            continue
+        schema = rng.choices(schemas, weights)[0]
+        messages.append({
+            '$schemaRef': SCHEMA_BASE + schema,
+            'header': header,
+            'message': _make_message_body(rng, schema, i, markets),
+        })
+    return messages
+
+
+def load_recorded_messages(path: str) -> List[Dict[str, Any]]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class ReplayPublisher:
+    """Publica as mensagens em loop a uma taxa fixa, como o relay EDDN."""
+
+    def __init__(self, messages: List[Dict[str, Any]], bind_url: str = 'tcp://127.0.0.1:*', rate: float = 200.0):
+        self.payloads = [zlib.compress(json.dumps(m).encode('utf-8')) for m in messages]
+        self.rate = rate
+        self.context = zmq.Context()
+        self.sock = self.context.socket(zmq.PUB)
+        self.sock.setsockopt(zmq.SNDHWM, 1000)
+        self.sock.bind(bind_url)
+        self.url = self.sock.getsockopt(zmq.LAST_ENDPOINT).decode('ascii')
+        self.sent = 0
+        self.running = False
+        self.thread = None
+
+    def start(self, duration: float) -> None:
+        self.running = True
+        self.thread = threading.Thread(target=self._run, args=(duration,), daemon=True)
+        self.thread.start()
+
+    def join(self) -> None:
+        self.thread.join()
+
+    def close(self) -> None:
+        self.running = False
+        self.sock.close(linger=0)
+        self.context.term()
+
+    def _run(self, duration: float) -> None:
+        start = time.perf_counter()
+        interval = 1.0 / self.rate if self.rate > 0 else 0.0
+        while self.running and time.perf_counter() - start < duration:
+            self.sock.send(self.payloads[self.sent % len(self.payloads)])
+            self.sent += 1
+            if interval:
+                # Agenda pelo relógio para não acumular atraso
+                delay = start + self.sent * interval - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--input', help="Arquivo JSONL com mensagens EDDN gravadas")
+    parser.add_argument('--messages', type=int, default=2000, help="Mensagens sintéticas geradas")
+    parser.add_argument('--rate', type=float, default=200.0, help="Mensagens por segundo (0 = sem limite)")
+    parser.add_argument('--duration', type=float, default=10.0, help="Duração da reprodução em segundos")
+    args = parser.parse_args()
+
+    messages = load_recorded_messages(args.input) if args.input else make_messages(args.messages)
+
+    temp_dir = tempfile.mkdtemp(prefix='edlt-eddn-')
+    try:
+        db_path = os.path.join(temp_dir, 'bench.db')
+        BackendCore(temp_dir, db_path=db_path)
+
+        publisher = ReplayPublisher(messages, rate=args.rate)
+        subscriber = EDDNSubscriber(db_path, publisher.url)
+        subscriber.start()
+        # PUB/SUB: aguarda a assinatura chegar ao publicador antes de enviar
+        time.sleep(0.5)
+
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start = time.perf_counter()
+        publisher.start(args.duration)
+        publisher.join()
+        # Espera a fila esvaziar para medir a vazão de ponta a ponta
+        while subscriber.get_stats()['queued'] > 0:
+            time.sleep(0.05)
+        subscriber.stop()
+        elapsed = time.perf_counter() - start
+        publisher.close()
+
+        stats = subscriber.get_stats()
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        print(f"Publicadas:   {publisher.sent} mensagens ({publisher.sent / args.duration:.1f}/s)")
+        print(f"Decodificadas: {stats['decoded']} ({stats['decoded'] / elapsed:.1f}/s), "
+              f"inválidas: {stats['decode_errors']}, não roteadas: {stats['unrouted']}")
+        print(f"Duplicadas: {stats['duplicates']}, descartadas na recepção: {stats['dropped']}, "
+              f"descartadas pelo gravador atrasado: {stats['shed']}")
+        print(f"Linhas gravadas: {stats['rows_written']} em {stats['batches']} lotes")
+        print(f"Pico de memória: {rss_after / 1024:.1f} MB (+{(rss_after - rss_before) / 1024:.1f} MB)")
+
+        # Sem descartes, o assinante acompanhou a taxa publicada
+        kept_up = stats['dropped'] == 0 and stats['shed'] == 0 and stats['decoded'] >= publisher.sent
+        return 0 if kept_up else 1
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""
+Verifica que a exportação descreve um único instante do banco enquanto a
+ingestão continua gravando (em outro processo, como o monitor do Journal).
+
+A ingestão alterna eventos Bounty (uma linha em journal_events e uma em
+pilot_profit na mesma transação) e Materials (que também substitui o
+inventário em pilot_materials). Num conjunto coerente:
+  - o número de Bounty em journal_events.csv é igual ao de lucros BOUNTY;
+  - o inventário em pilot_materials.csv é o do último Materials exportado.
+Compara a exportação sem snapshot (uma conexão por tabela, como antes) com
+os modos 'transaction' e 'backup'.
+
+    python benchmarks/export_consistency.py --events 200000
+"""
+
+import os
+import csv
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import multiprocessing
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from main import BackendCore
+from csv_exporter import CSVExporter, EXPORT_FORMATS
+
+from bench_export import fill_database
+
+
+def make_event(i: int) -> dict:
+    now = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+    if i % 2:
+        return {'timestamp': now, 'event': 'Materials', 'Sequence': i,
+                'Raw': [{'Name': 'iron', 'Count': i % 1000}], 'Manufactured': [], 'Encoded': []}
+    return {'timestamp': now, 'event': 'Bounty', 'Reward': 1000 + i, 'VictimFaction': f"Faction {i}",
+            'Target': 'python', 'Sequence': i}
+
+
+def ingest_loop(journal_dir: str, db_path: str, stop, written) -> None:
+    """Processo filho: grava eventos pelo caminho normal de process_event até ser parado."""
+    core = BackendCore(journal_dir, initialize=False, db_path=db_path)
+    i = 0
+    while not stop.is_set():
+        core.process_event(make_event(i))
+        i += 1
+        written.value = i
+
+
+def check_consistency(output_dir: str) -> tuple:
+    """(Bounty exportados, lucros BOUNTY, inventário coincide com o último Materials?)."""
+    csv.field_size_limit(sys.maxsize)
+    bounties, last_materials = 0, None
+    with open(os.path.join(output_dir, 'journal_events.csv'), newline='', encoding='utf-8-sig') as f:
+        for row in csv.DictReader(f):
+            if row['event_type'] == 'Bounty':
+                bounties += 1
+            elif row['event_type'] == 'Materials':
+                last_materials = row['event_data']
+    with open(os.path.join(output_dir, 'pilot_profit.csv'), newline='', encoding='utf-8-sig') as f:
+        profits = sum(1 for row in csv.DictReader(f) if row['profit_type'] == 'BOUNTY')
+    with open(os.path.join(output_dir, 'pilot_materials.csv'), newline='', encoding='utf-8-sig') as f:
+        inventory = {row['material_name']: int(row['count']) for row in csv.DictReader(f)}
+    expected = {m['Name']: m['Count'] for m in json.loads(last_materials)['Raw']} if last_materials else {}
+    return bounties, profits, inventory == expected
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=int, default=200000, help="Eventos no banco antes da exportação")
+    parser.add_argument('--rounds', type=int, default=2, help="Exportações por modo")
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp(prefix='edlt-consistency-')
+    stop = multiprocessing.Event()
+    written = multiprocessing.Value('q', 0)
+    ingest = None
+    try:
+        db_path = os.path.join(temp_dir, 'bench.db')
+        BackendCore(temp_dir, db_path=db_path)
+        # Base sem Bounty/Materials: só os gravados durante o teste contam
+        fill_database(db_path, args.events, seed=7)
+        conn = CSVExporter(db_path).get_db_connection()
+        conn.execute("DELETE FROM journal_events WHERE event_type IN ('Bounty', 'Materials')")
+        conn.execute("DELETE FROM pilot_profit")
+        conn.commit()
+        conn.close()
+
+        ingest = multiprocessing.get_context('fork').Process(
+            target=ingest_loop, args=(temp_dir, db_path, stop, written), daemon=True)
+        ingest.start()
+        while written.value < 100:
+            time.sleep(0.05)
+
+        exporter = CSVExporter(db_path)
+        modes = {
+            'sem snapshot': lambda out: exporter._export_snapshot(exporter, [], out, None, False, False,
+                                                                  'csv', EXPORT_FORMATS['csv']),
+            'transaction': lambda out: exporter.export_all_data(out, snapshot='transaction'),
+            'backup': lambda out: exporter.export_all_data(out, snapshot='backup'),
+        }
+        ok = True
+        for label, export in modes.items():
+            for round_index in range(args.rounds):
+                output_dir = os.path.join(temp_dir, f"{label.replace(' ', '-')}-{round_index}")
+                os.makedirs(output_dir)
+                before = written.value
+                start = time.perf_counter()
+                export(output_dir)
+                elapsed = time.perf_counter() - start
+                bounties, profits, inventory_matches = check_consistency(output_dir)
+                coherent = bounties == profits and inventory_matches
+                print(f"  {label:<14} {elapsed:6.2f} s  gravados durante: {written.value - before:5d}  "
+                      f"Bounty/lucros: {bounties}/{profits}  inventário coincide: {inventory_matches}  "
+                      f"coerente: {coherent}")
+                if label != 'sem snapshot':
+                    ok &= coherent
+        return 0 if ok else 1
+    finally:
+        stop.set()
+        if ingest:
+            ingest.join(timeout=10)
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
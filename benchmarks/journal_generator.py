@@ -0,0 +1,218 @@
+"""
+Gerador de diários sintéticos do Elite Dangerous, reproduzível pela semente.
+
+Cada sessão começa com o cabeçalho de login (Fileheader, Commander,
+Materials, Rank, Progress, Loadout, Location...) e segue um cenário com
+frequências de eventos próximas das de diários reais:
+  - exploration: muitos Scan por salto (FSSDiscoveryScan, FSSSignalDiscovered,
+    SAAScanComplete), FuelScoop e Music;
+  - trade: ciclos Docked/Market/MarketBuy/Undocked/FSDJump/MarketSell;
+  - combat: ShipTargeted e UnderAttack frequentes, Bounty e HullDamage;
+  - mixed: blocos alternados dos três.
+
+    python benchmarks/journal_generator.py --events 100000 --scenario mixed --output /tmp/journals
+"""
+
+import os
+import sys
+import json
+import random
+import argparse
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List
+
+SCENARIOS = ('exploration', 'trade', 'combat', 'mixed')
+
+START_TIME = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+# Eventos por passo de cada cenário: (evento, peso). Os pesos seguem a
+# proporção observada em diários reais de cada atividade.
+SCENARIO_WEIGHTS: Dict[str, List[tuple]] = {
+    'exploration': [('Scan', 40), ('FSDJump', 4), ('StartJump', 4), ('FSSDiscoveryScan', 4),
+                    ('FSSSignalDiscovered', 8), ('FuelScoop', 3), ('Music', 6), ('ReceiveText', 2),
+                    ('SAAScanComplete', 1), ('ReservoirReplenished', 3)],
+    'trade': [('FSDJump', 6), ('StartJump', 6), ('SupercruiseEntry', 6), ('SupercruiseExit', 6),
+              ('Docked', 4), ('Undocked', 4), ('Market', 4), ('MarketBuy', 4), ('MarketSell', 4),
+              ('Cargo', 8), ('Music', 6), ('ReceiveText', 4), ('ReservoirReplenished', 3)],
+    'combat': [('ShipTargeted', 40), ('UnderAttack', 10), ('Bounty', 6), ('HullDamage', 3),
+               ('ReceiveText', 10), ('Music', 4), ('FactionKillBond', 2), ('ReservoirReplenished', 3),
+               ('MaterialCollected', 2)],
+}
+
+MATERIALS = {
+    'Raw': ['carbon', 'iron', 'nickel', 'sulphur', 'phosphorus', 'vanadium', 'zinc', 'germanium'],
+    'Manufactured': ['chemicalstorageunits', 'mechanicalscrap', 'gridresistors', 'wornshieldemitters'],
+    'Encoded': ['disruptedwakeechoes', 'legacyfirmware', 'encryptedfiles', 'bulkscandata'],
+}
+COMMODITIES = ['gold', 'silver', 'palladium', 'tritium', 'beryllium', 'bertrandite', 'indite']
+BODY_TYPES = ['M (Red dwarf) Star', 'Icy body', 'Rocky body', 'High metal content body', 'Gas giant with water based life']
+
+
+class JournalGenerator:
+    """Gera eventos de diário com conteúdo e horários determinados pela semente."""
+
+    def __init__(self, seed: int = 42, scenario: str = 'mixed', commander: str = 'CMDR Bench'):
+        if scenario not in SCENARIOS:
+            raise ValueError(f"Cenário desconhecido: {scenario}")
+        self.rng = random.Random(seed)
+        self.scenario = scenario
+        self.commander = commander
+        self.time = START_TIME
+        self.system_index = 0
+        self.body_index = 0
+        self.sequence = 0
+
+    # --- Estado da "viagem" ---
+
+    def _tick(self, low: float = 1.0, high: float = 20.0) -> str:
+        self.time += timedelta(seconds=self.rng.uniform(low, high))
+        return self.time.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+    def _system(self) -> str:
+        return f"Synthetic Sector {self.system_index:05d}"
+
+    def _event(self, name: str, **fields: Any) -> Dict[str, Any]:
+        self.sequence += 1
+        event = {'timestamp': self._tick(), 'event': name}
+        event.update(fields)
+        return event
+
+    def session_header(self) -> List[Dict[str, Any]]:
+        """Eventos gravados pelo jogo no login."""
+        rng = self.rng
+        self.time += timedelta(hours=rng.uniform(4, 30))
+        return [
+            self._event('Fileheader', part=1, language='English/UK', Odyssey=True, gameversion='4.0.0.1800',
+                        build='r300000/r0 '),
+            self._event('Commander', FID='F0000001', Name=self.commander),
+            self._event('Materials', **{category: [{'Name': name, 'Count': rng.randrange(300)} for name in names]
+                                        for category, names in MATERIALS.items()}),
+            self._event('Rank', Combat=3, Trade=4, Explore=5, Soldier=0, Exobiologist=0, Empire=2,
+                        Federation=3, CQC=0),
+            self._event('Progress', Combat=rng.randrange(100), Trade=rng.randrange(100),
+                        Explore=rng.randrange(100), Soldier=0, Exobiologist=0, Empire=rng.randrange(100),
+                        Federation=rng.randrange(100), CQC=0),
+            self._event('Reputation', Empire=12.5, Federation=40.2, Independent=0.0, Alliance=5.0),
+            self._event('LoadGame', FID='F0000001', Commander=self.commander, Horizons=True, Odyssey=True,
+                        Ship='Krait_MkII', ShipID=7, ShipName='Bench', ShipIdent='BN-01', FuelLevel=32.0,
+                        FuelCapacity=32.0, GameMode='Solo', Credits=rng.randrange(10 ** 9), Loan=0),
+            self._event('Loadout', Ship='krait_mkii', ShipID=7, ShipName='Bench', ShipIdent='BN-01',
+                        HullHealth=1.0, Modules=[{'Slot': f"Slot{i:02d}_Size{rng.randint(1, 6)}",
+                                                   'Item': f"int_module_{i}", 'On': True, 'Priority': 0,
+                                                   'Health': 1.0} for i in range(20)]),
+            self._event('Location', StarSystem=self._system(), SystemAddress=1000 + self.system_index,
+                        StarPos=[rng.uniform(-1000, 1000) for _ in range(3)], Docked=False),
+        ]
+
+    def scenario_event(self, scenario: str) -> Dict[str, Any]:
+        """Um evento do cenário, sorteado pelos pesos de SCENARIO_WEIGHTS."""
+        rng = self.rng
+        names, weights = zip(*SCENARIO_WEIGHTS[scenario])
+        name = rng.choices(names, weights)[0]
+        if name == 'FSDJump':
+            self.system_index += 1
+            self.body_index = 0
+            return self._event('FSDJump', StarSystem=self._system(), SystemAddress=1000 + self.system_index,
+                               StarPos=[rng.uniform(-1000, 1000) for _ in range(3)],
+                               JumpDist=rng.uniform(5, 60), FuelUsed=rng.uniform(0.5, 5), FuelLevel=rng.uniform(5, 32),
+                               SystemAllegiance='Independent', SystemEconomy='$economy_Extraction;',
+                               Population=rng.randrange(10 ** 6))
+        if name == 'Scan':
+            self.body_index += 1
+            return self._event('Scan', ScanType='Detailed', BodyName=f"{self._system()} {self.body_index}",
+                               BodyID=self.body_index, StarSystem=self._system(),
+                               SystemAddress=1000 + self.system_index, DistanceFromArrivalLS=rng.uniform(0, 5000),
+                               PlanetClass=rng.choice(BODY_TYPES), MassEM=rng.uniform(0.01, 300),
+                               Radius=rng.uniform(1e6, 7e7), SurfaceGravity=rng.uniform(0.1, 30),
+                               SurfaceTemperature=rng.uniform(20, 3000), Landable=rng.random() < 0.3,
+                               WasDiscovered=rng.random() < 0.5, WasMapped=False)
+        if name == 'FSSSignalDiscovered':
+            return self._event('FSSSignalDiscovered', SystemAddress=1000 + self.system_index,
+                               SignalName=f"Signal {rng.randrange(10 ** 6)}", IsStation=rng.random() < 0.2)
+        if name == 'MarketBuy':
+            return self._event('MarketBuy', MarketID=rng.randrange(10 ** 9), Type=rng.choice(COMMODITIES),
+                               Count=rng.randrange(1, 256), BuyPrice=rng.randrange(1000, 50000),
+                               TotalCost=rng.randrange(10 ** 7))
+        if name == 'MarketSell':
+            return self._event('MarketSell', MarketID=rng.randrange(10 ** 9), Type=rng.choice(COMMODITIES),
+                               Count=rng.randrange(1, 256), SellPrice=rng.randrange(1000, 60000),
+                               TotalSale=rng.randrange(10 ** 7), AvgPricePaid=rng.randrange(1000, 50000))
+        if name == 'Docked':
+            return self._event('Docked', StationName=f"Station {rng.randrange(1000)}", StarSystem=self._system(),
+                               MarketID=rng.randrange(10 ** 9), StationType='Coriolis')
+        if name == 'Bounty':
+            return self._event('Bounty', Target='python', VictimFaction=f"Faction {rng.randrange(100)}",
+                               TotalReward=rng.randrange(10 ** 6), Reward=rng.randrange(10 ** 6))
+        if name == 'ShipTargeted':
+            return self._event('ShipTargeted', TargetLocked=True, Ship='python', ScanStage=rng.randrange(4),
+                               PilotName=f"$npc_name_decorate:#name=Pilot {rng.randrange(10 ** 5)};",
+                               ShieldHealth=rng.uniform(0, 100), HullHealth=rng.uniform(0, 100))
+        if name == 'MaterialCollected':
+            category = rng.choice(list(MATERIALS))
+            return self._event('MaterialCollected', Category=category, Name=rng.choice(MATERIALS[category]),
+                               Count=rng.randint(1, 3))
+        if name == 'ReceiveText':
+            return self._event('ReceiveText', From=f"Pilot {rng.randrange(10 ** 5)}",
+                               Message=f"$Message_{rng.randrange(10 ** 6)};", Channel='npc')
+        if name == 'Cargo':
+            return self._event('Cargo', Vessel='Ship', Count=rng.randrange(256),
+                               Inventory=[{'Name': commodity, 'Count': rng.randrange(64)}
+                                          for commodity in rng.sample(COMMODITIES, 3)])
+        return self._event(name, Value=rng.randrange(10 ** 6))
+
+    def events(self, count: int, session_length: int = 2000) -> Iterator[Dict[str, Any]]:
+        """Gera `count` eventos, com um cabeçalho de login a cada `session_length` eventos."""
+        scenarios = ['exploration', 'trade', 'combat'] if self.scenario == 'mixed' else [self.scenario]
+        produced = 0
+        while produced < count:
+            for event in self.session_header():
+                if produced >= count:
+                    return
+                yield event
+                produced += 1
+            block = 0
+            for _ in range(session_length):
+                if produced >= count:
+                    return
+                # No cenário misto, blocos de 200 eventos de cada atividade
+                yield self.scenario_event(scenarios[(block // 200) % len(scenarios)])
+                produced += 1
+                block += 1
+
+    def write_journals(self, directory: str, count: int, session_length: int = 2000) -> List[str]:
+        """Grava os eventos em arquivos Journal.*.log (um por sessão) e retorna os caminhos."""
+        os.makedirs(directory, exist_ok=True)
+        paths: List[str] = []
+        handle = None
+        try:
+            for event in self.events(count, session_length):
+                if event['event'] == 'Fileheader':
+                    if handle:
+                        handle.close()
+                    stamp = datetime.strptime(event['timestamp'], '%Y-%m-%dT%H:%M:%SZ').strftime('%Y-%m-%dT%H%M%S')
+                    paths.append(os.path.join(directory, f"Journal.{stamp}.01.log"))
+                    handle = open(paths[-1], 'w', encoding='utf-8')
+                handle.write(json.dumps(event) + '\n')
+        finally:
+            if handle:
+                handle.close()
+        return paths
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=int, default=100000)
+    parser.add_argument('--scenario', choices=SCENARIOS, default='mixed')
+    parser.add_argument('--session-length', type=int, default=2000, help="Eventos por sessão (arquivo)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', required=True, help="Diretório dos arquivos Journal.*.log")
+    args = parser.parse_args()
+
+    paths = JournalGenerator(args.seed, args.scenario).write_journals(args.output, args.events, args.session_length)
+    size = sum(os.path.getsize(path) for path in paths)
+    print(f"{args.events} eventos em {len(paths)} arquivos ({size / 1e6:.1f} MB) em {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -6,6 +6,7 @@ Verifica se todas as dependências necessárias estão instaladas antes de inici
 
 import sys
 import subprocess
+import importlib.util
 
 
 def check_dependencies():
@@ -17,10 +18,9 @@ def check_dependencies():
 
     missing_modules = []
 
+    # find_spec só localiza o pacote, sem importá-lo (o PySide6 leva centenas de ms)
     for display_name, import_name in required_modules.items():
-        try:
-            __import__(import_name)
-        except ImportError:
+        if importlib.util.find_spec(import_name) is None:
             missing_modules.append(display_name)
 
     return missing_modules
@@ -1,8 +1,17 @@
 import csv
 import os
+import json
+import queue
+import shutil
 import logging
 import sqlite3
-from typing import Optional, List, Callable
+import tempfile
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Callable, Dict, Tuple, Any
+
+from ingest_policy import register_sql_functions
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -16,6 +25,278 @@ ALLOWED_TABLES = [
     'system_data'
 ]
 
+# Tabelas que só recebem inserções: na exportação incremental, apenas as linhas
+# com id acima da marca d'água são acrescentadas. As demais guardam estado
+# atual e são sempre regravadas por inteiro (troca atômica do arquivo).
+APPEND_ONLY_TABLES = ['journal_events', 'pilot_profit']
+
+# Marca d'água da exportação incremental, gravada no diretório de saída
+EXPORT_STATE_FILE = '.edlt_export_state.json'
+
+# Como obter um instante único do banco para todas as tabelas (ver export_all_data)
+SNAPSHOT_MODES = ('transaction', 'backup')
+
+# Linhas lidas por fetchmany e gravadas com um único writerows
+EXPORT_BATCH_ROWS = 5000
+
+# Tabelas exportadas ao mesmo tempo, cada uma com sua própria conexão de leitura
+EXPORT_WORKERS = 4
+
+# Espera máxima pelo lock de escrita usado para abrir as conexões do snapshot
+# (o gravador da ingestão o solta depois de cada transação curta)
+SNAPSHOT_LOCK_TIMEOUT = 10.0
+
+# Buffer de escrita dos arquivos exportados (bytes)
+EXPORT_WRITE_BUFFER = 1024 * 1024
+
+
+class ExportProgress:
+    """Soma as linhas exportadas por todas as tabelas e informa o percentual
+    (0-100) ao callback somente quando ele muda."""
+
+    def __init__(self, total_rows: int, callback: Optional[Callable[[int], None]] = None):
+        self.total_rows = total_rows
+        self.callback = callback
+        self.rows = 0
+        self.percent = -1
+        self.lock = threading.Lock()
+
+    def advance(self, rows: int) -> None:
+        if not self.callback:
+            return
+        with self.lock:
+            self.rows += rows
+            # Linhas inseridas depois da contagem não passam de 100%
+            percent = 100 if self.total_rows <= 0 else min(100, self.rows * 100 // self.total_rows)
+            if percent != self.percent:
+                self.percent = percent
+                # Chamado com o lock para o percentual nunca voltar entre tabelas
+                self.callback(percent)
+
+    def finish(self) -> None:
+        if not self.callback:
+            return
+        with self.lock:
+            if self.percent != 100:
+                self.percent = 100
+                self.callback(100)
+
+
+# Formatos de exportação -> extensão dos arquivos gerados
+EXPORT_FORMATS = {
+    'csv': '.csv',
+    'parquet': '.parquet',
+    'arrow': '.arrow',
+    'jsonl.gz': '.jsonl.gz',
+    'jsonl.zst': '.jsonl.zst',
+}
+
+# Formatos que aceitam acrescentar linhas a um arquivo existente (CSV, e
+# gzip/zstd por concatenação de membros/frames); os colunares recebem as
+# linhas novas da exportação incremental em arquivos datados
+APPENDABLE_FORMATS = {'csv', 'jsonl.gz', 'jsonl.zst'}
+
+# Linhas por record batch (e row group) nos formatos colunares
+COLUMNAR_BATCH_ROWS = 64 * 1024
+
+# Colunas com o JSON original do jogo: viram objetos aninhados no JSON Lines
+JSON_COLUMNS = {'event_data', 'data_json'}
+
+# Colunas com data ISO 8601 do Journal: tipadas como timestamp no Parquet/Arrow
+TIMESTAMP_COLUMNS = {'timestamp', 'last_update'}
+JOURNAL_TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+
+def _quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _column_expression(name: str) -> str:
+    """Coluna no SELECT das exportações: eventos comprimidos pela política de ingestão voltam a ser texto."""
+    column = _quote_identifier(name)
+    if name in JSON_COLUMNS:
+        return f"(CASE WHEN typeof({column}) = 'blob' THEN edlt_event_json({column}) ELSE {column} END)"
+    return column
+
+
+def select_all_query(conn: sqlite3.Connection, table_name: str) -> str:
+    """SELECT de todas as colunas (como SELECT *), com as colunas JSON em texto."""
+    columns = [_column_expression(name) for name, _ in table_columns(conn, table_name)]
+    return f"SELECT {', '.join(columns)} FROM {table_name}"
+
+
+def _csv_field(column: str) -> str:
+    # Mesmas regras do csv.writer (QUOTE_MINIMAL): aspas só quando o campo
+    # contém vírgula, aspas ou quebra de linha; NULL vira campo vazio
+    return (f"CASE WHEN {column} IS NULL THEN '' "
+            f"WHEN instr({column}, '\"') OR instr({column}, ',') OR instr({column}, char(10)) "
+            f"OR instr({column}, char(13)) THEN '\"' || replace({column}, '\"', '\"\"') || '\"' "
+            f"ELSE {column} END")
+
+
+def table_columns(conn: sqlite3.Connection, table_name: str) -> List[Tuple[str, str]]:
+    """(nome, tipo declarado em maiúsculas) das colunas, na ordem de SELECT *."""
+    return [(column[1], (column[2] or '').upper())
+            for column in conn.execute(f"PRAGMA table_info({table_name})").fetchall()]
+
+
+def csv_line_query(conn: sqlite3.Connection, table_name: str) -> Optional[str]:
+    """SELECT que devolve cada linha da tabela já formatada como CSV.
+
+    O escape dos campos roda no SQLite (em C) em vez do laço do módulo csv,
+    que domina o tempo em colunas JSON cheias de aspas. Tabelas com colunas
+    REAL retornam None: o SQLite formata floats de outro jeito que o Python.
+    """
+    columns = table_columns(conn, table_name)
+    if not columns or any('REAL' in declared for _, declared in columns):
+        return None
+    fields = []
+    for name, declared in columns:
+        if 'INT' in declared:
+            fields.append(f"ifnull({_quote_identifier(name)}, '')")
+        else:
+            fields.append(_csv_field(_column_expression(name)))
+    separator = " || ',' || "
+    return f"SELECT {separator.join(fields)} FROM {table_name}"
+
+
+def jsonl_line_query(conn: sqlite3.Connection, table_name: str) -> str:
+    """SELECT que devolve cada linha como um objeto JSON montado pelo SQLite.
+
+    As colunas de JSON_COLUMNS entram como objetos aninhados (e não como
+    texto escapado); um valor que não seja JSON válido entra como string.
+    """
+    fields = []
+    for name, _ in table_columns(conn, table_name):
+        column = _column_expression(name)
+        key = "'" + name.replace("'", "''") + "'"
+        if name in JSON_COLUMNS:
+            fields.append(f"{key}, json(CASE WHEN json_valid({column}) THEN {column} ELSE json_quote({column}) END)")
+        else:
+            fields.append(f"{key}, {column}")
+    return f"SELECT json_object({', '.join(fields)}) FROM {table_name}"
+
+
+def _write_csv(conn: sqlite3.Connection, table_name: str, where: str, params: Tuple, path: str,
+               append: bool, progress: Optional[ExportProgress]) -> int:
+    line_query = csv_line_query(conn, table_name)
+    # Agora é seguro usar f-string pois validamos contra whitelist
+    cursor = conn.execute((line_query or select_all_query(conn, table_name)) + where, params)
+
+    # FIX: UTF-8-BOM para compatibilidade com Excel no Windows
+    # (em modo 'a' o Python não repete o BOM no meio do arquivo)
+    with open(path, 'a' if append else 'w', newline='', encoding='utf-8-sig',
+              buffering=EXPORT_WRITE_BUFFER) as csvfile:
+        csv_writer = csv.writer(csvfile)
+        # Escreve o cabeçalho
+        if not append:
+            csv_writer.writerow([name for name, _ in table_columns(conn, table_name)])
+
+        # Escreve as linhas de dados em lotes
+        row_count = 0
+        while True:
+            rows = cursor.fetchmany(EXPORT_BATCH_ROWS)
+            if not rows:
+                break
+            if line_query:
+                csvfile.write('\r\n'.join([row[0] for row in rows]))
+                csvfile.write('\r\n')
+            else:
+                csv_writer.writerows(rows)
+            row_count += len(rows)
+            if progress:
+                progress.advance(len(rows))
+    return row_count
+
+
+def _open_compressed(path: str, append: bool, compression: str):
+    if compression == 'gzip':
+        import gzip
+        # Nível 6: quase o tamanho do 9 com uma fração do tempo
+        return gzip.open(path, 'ab' if append else 'wb', compresslevel=6)
+    # Import tardio: zstandard só é necessário para este formato
+    import zstandard
+    raw = open(path, 'ab' if append else 'wb')
+    return zstandard.ZstdCompressor(level=3).stream_writer(raw, closefd=True)
+
+
+def _write_jsonl(conn: sqlite3.Connection, table_name: str, where: str, params: Tuple, path: str,
+                 append: bool, progress: Optional[ExportProgress], compression: str) -> int:
+    cursor = conn.execute(jsonl_line_query(conn, table_name) + where, params)
+    row_count = 0
+    with _open_compressed(path, append, compression) as output:
+        while True:
+            rows = cursor.fetchmany(EXPORT_BATCH_ROWS)
+            if not rows:
+                break
+            output.write(('\n'.join([row[0] for row in rows]) + '\n').encode('utf-8'))
+            row_count += len(rows)
+            if progress:
+                progress.advance(len(rows))
+    return row_count
+
+
+def _arrow_schema(pa, columns: List[Tuple[str, str]]):
+    fields = []
+    for name, declared in columns:
+        if 'INT' in declared:
+            arrow_type = pa.int64()
+        elif any(token in declared for token in ('REAL', 'FLOA', 'DOUB')):
+            arrow_type = pa.float64()
+        elif name in TIMESTAMP_COLUMNS:
+            arrow_type = pa.timestamp('s', tz='UTC')
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(name, arrow_type))
+    return pa.schema(fields)
+
+
+def _arrow_batch(pa, pc, schema, rows: List[Tuple]):
+    arrays = []
+    for values, field in zip(zip(*rows), schema):
+        if pa.types.is_timestamp(field.type):
+            # Conversão vetorizada; datas fora do formato do Journal viram nulas
+            text = pa.array(values, type=pa.string())
+            arrays.append(pc.strptime(text, format=JOURNAL_TIMESTAMP_FORMAT, unit='s',
+                                      error_is_null=True).cast(field.type))
+        else:
+            arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _write_columnar(conn: sqlite3.Connection, table_name: str, where: str, params: Tuple, path: str,
+                    append: bool, progress: Optional[ExportProgress], parquet: bool) -> int:
+    # Import tardio: pyarrow só é necessário para os formatos colunares
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    schema = _arrow_schema(pa, table_columns(conn, table_name))
+    cursor = conn.execute(select_all_query(conn, table_name) + where, params)
+    if parquet:
+        import pyarrow.parquet as pq
+        writer = pq.ParquetWriter(path, schema, compression='zstd')
+        sink = None
+    else:
+        # Arrow IPC sem compressão: o arquivo pode ser mapeado em memória
+        sink = pa.OSFile(path, 'wb')
+        writer = pa.ipc.new_file(sink, schema)
+
+    row_count = 0
+    try:
+        while True:
+            rows = cursor.fetchmany(COLUMNAR_BATCH_ROWS)
+            if not rows:
+                break
+            writer.write_batch(_arrow_batch(pa, pc, schema, rows))
+            row_count += len(rows)
+            if progress:
+                progress.advance(len(rows))
+    finally:
+        writer.close()
+        if sink is not None:
+            sink.close()
+    return row_count
+
 
 class CSVExporter:
     def __init__(self, db_path: str):
@@ -26,72 +307,220 @@ class CSVExporter:
         try:
             conn = sqlite3.connect(self.DB_PATH)
             conn.row_factory = sqlite3.Row  # Permite acessar colunas por nome
+            register_sql_functions(conn)
             return conn
         except sqlite3.Error as e:
             logging.error(f"Erro ao conectar ao banco de dados SQLite: {e}")
             return None
 
-    def export_table_to_csv(self, table_name: str, output_path: str) -> bool:
+    def _connection(self, conn: Optional[sqlite3.Connection]) -> Tuple[Optional[sqlite3.Connection], bool]:
+        """(conexão, é nossa?): usa a conexão do snapshot quando fornecida."""
+        if conn is not None:
+            return conn, False
+        return self.get_db_connection(), True
+
+    def count_rows(self, id_ranges: Optional[Dict[str, Tuple[int, int]]] = None,
+                   conn: Optional[sqlite3.Connection] = None) -> Dict[str, int]:
+        """Conta as linhas de cada tabela exportável (base do progresso).
+
+        id_ranges limita a contagem de uma tabela ao intervalo (id > início, id <= fim).
+        """
+        id_ranges = id_ranges or {}
+        counts = {table_name: 0 for table_name in ALLOWED_TABLES}
+        conn, owned = self._connection(conn)
+        if not conn:
+            return counts
+        try:
+            for table_name in ALLOWED_TABLES:
+                if table_name in id_ranges:
+                    counts[table_name] = conn.execute(
+                        f"SELECT COUNT(*) FROM {table_name} WHERE id > ? AND id <= ?",
+                        id_ranges[table_name]).fetchone()[0]
+                else:
+                    counts[table_name] = conn.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
+        except sqlite3.Error as e:
+            logging.error(f"Erro ao contar as linhas para a exportação: {e}")
+        finally:
+            if owned:
+                conn.close()
+        return counts
+
+    def max_ids(self, conn: Optional[sqlite3.Connection] = None) -> Dict[str, int]:
+        """Maior id atual de cada tabela só de inserções (limite desta exportação)."""
+        conn, owned = self._connection(conn)
+        if not conn:
+            return {}
+        try:
+            return {table_name: conn.execute(f"SELECT IFNULL(MAX(id), 0) FROM {table_name}").fetchone()[0]
+                    for table_name in APPEND_ONLY_TABLES}
+        except sqlite3.Error as e:
+            logging.error(f"Erro ao ler as marcas d'água da exportação: {e}")
+            return {}
+        finally:
+            if owned:
+                conn.close()
+
+    @staticmethod
+    def _state_path(base_output_dir: str, export_format: str) -> str:
+        # Cada formato tem sua marca d'água (o CSV mantém o nome original)
+        if export_format == 'csv':
+            return os.path.join(base_output_dir, EXPORT_STATE_FILE)
+        return os.path.join(base_output_dir, EXPORT_STATE_FILE.replace('.json', f".{export_format}.json"))
+
+    @classmethod
+    def load_export_state(cls, base_output_dir: str, export_format: str = 'csv') -> Dict[str, Any]:
+        path = cls._state_path(base_output_dir, export_format)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            return state if isinstance(state, dict) else {}
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logging.warning(f"Marca d'água da exportação ilegível ({e}); exportando tudo.")
+            return {}
+
+    @classmethod
+    def save_export_state(cls, base_output_dir: str, state: Dict[str, Any], export_format: str = 'csv') -> None:
+        path = cls._state_path(base_output_dir, export_format)
+        try:
+            with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(state, f, indent=2)
+            os.replace(path + '.tmp', path)
+        except OSError as e:
+            logging.error(f"Não foi possível gravar a marca d'água da exportação: {e}")
+
+    def export_table_to_csv(self, table_name: str, output_path: str,
+                            progress: Optional[ExportProgress] = None,
+                            id_range: Optional[Tuple[int, int]] = None, append: bool = False) -> bool:
         """Exporta o conteúdo de uma tabela específica para um arquivo CSV."""
+        return self.export_table(table_name, output_path, progress, id_range, append, 'csv')
+
+    def export_table(self, table_name: str, output_path: str, progress: Optional[ExportProgress] = None,
+                     id_range: Optional[Tuple[int, int]] = None, append: bool = False,
+                     export_format: str = 'csv', conn: Optional[sqlite3.Connection] = None) -> bool:
+        """Exporta uma tabela para um arquivo no formato de EXPORT_FORMATS.
+
+        As linhas são lidas em lotes (EXPORT_BATCH_ROWS, ou COLUMNAR_BATCH_ROWS
+        nos formatos colunares). Em CSV e JSON Lines o próprio SQLite monta
+        cada linha (ver csv_line_query e jsonl_line_query); Parquet e Arrow IPC
+        recebem record batches com colunas tipadas.
+
+        Com id_range, exporta só as linhas com id > início e id <= fim. Com
+        append, acrescenta essas linhas ao arquivo existente (sem cabeçalho);
+        sem append, grava um arquivo temporário que substitui o destino de
+        forma atômica ao final, então leitores nunca veem um arquivo parcial.
+
+        Com conn, lê pela conexão (e transação) de quem chamou, sem fechá-la.
+        """
         # FIX: Validação contra SQL injection
         if table_name not in ALLOWED_TABLES:
             logging.error(f"Tabela não permitida para exportação: {table_name}")
             return False
+        if export_format not in EXPORT_FORMATS or (append and export_format not in APPENDABLE_FORMATS):
+            logging.error(f"Formato de exportação inválido: {export_format}")
+            return False
 
-        conn = self.get_db_connection()
+        conn, owned = self._connection(conn)
         if not conn:
             logging.error(f"Não foi possível exportar a tabela {table_name}: Falha na conexão com o DB.")
             return False
 
+        write_path, appended_from = None, None
         try:
-            cursor = conn.cursor()
-            # Agora é seguro usar f-string pois validamos contra whitelist
-            query = f"SELECT * FROM {table_name}"
-            cursor.execute(query)
-
-            # Obtém os nomes das colunas
-            column_names = [i[0] for i in cursor.description]
-
-            # FIX: UTF-8-BOM para compatibilidade com Excel no Windows
-            with open(output_path, 'w', newline='', encoding='utf-8-sig') as csvfile:
-                csv_writer = csv.writer(csvfile)
-                # Escreve o cabeçalho
-                csv_writer.writerow(column_names)
-
-                # Escreve as linhas de dados
-                row_count = 0
-                for row in cursor:
-                    # Converte tipos de dados não-nativos (como None) para string
-                    processed_row = [str(item) if item is not None else '' for item in row]
-                    csv_writer.writerow(processed_row)
-                    row_count += 1
+            # Tuplas simples são mais baratas que sqlite3.Row e bastam aos writers
+            conn.row_factory = None
+            where, params = '', ()
+            if id_range is not None:
+                where, params = " WHERE id > ? AND id <= ? ORDER BY id", id_range
+
+            # Na troca atômica o arquivo final só aparece completo; no modo
+            # append, uma falha devolve o arquivo ao tamanho original
+            if append:
+                appended_from = os.path.getsize(output_path)
+            write_path = output_path if append else output_path + '.tmp'
 
+            if export_format == 'csv':
+                row_count = _write_csv(conn, table_name, where, params, write_path, append, progress)
+            elif export_format in ('parquet', 'arrow'):
+                row_count = _write_columnar(conn, table_name, where, params, write_path, append, progress,
+                                            parquet=export_format == 'parquet')
+            else:
+                row_count = _write_jsonl(conn, table_name, where, params, write_path, append, progress,
+                                         'gzip' if export_format == 'jsonl.gz' else 'zstd')
+
+            if not append:
+                os.replace(write_path, output_path)
+            write_path = None
             logging.info(f"Tabela '{table_name}' exportada com sucesso: {row_count} linhas para {output_path}")
             return True
 
+        except ImportError as e:
+            logging.error(f"Formato {export_format} indisponível, dependência não instalada: {e}")
+            return False
         except sqlite3.Error as e:
             logging.error(f"Erro ao exportar a tabela {table_name}: {e}")
             return False
         except IOError as e:
-            logging.error(f"Erro de I/O ao escrever arquivo CSV: {e}")
+            logging.error(f"Erro de I/O ao escrever arquivo de exportação: {e}")
             return False
         except Exception as e:
             logging.error(f"Erro inesperado durante a exportação: {e}")
             return False
         finally:
-            if conn:
+            if write_path:
+                self._discard_partial_output(write_path, appended_from)
+            if owned:
                 conn.close()
 
-    def export_all_data(self, base_output_dir: str, progress_callback: Optional[Callable[[int], None]] = None) -> List[str]:
-        """Exporta todas as tabelas relevantes para arquivos CSV no diretório especificado.
+    @staticmethod
+    def _discard_partial_output(write_path: str, appended_from: Optional[int]) -> None:
+        try:
+            if appended_from is None:
+                os.remove(write_path)
+            else:
+                os.truncate(write_path, appended_from)
+        except OSError:
+            pass
+
+    def export_all_data(self, base_output_dir: str, progress_callback: Optional[Callable[[int], None]] = None,
+                        incremental: bool = False, delta_files: bool = False,
+                        export_format: str = 'csv', snapshot: str = 'transaction') -> List[str]:
+        """Exporta todas as tabelas relevantes para arquivos CSV (ou outro formato) no diretório especificado.
+
+        Todas as tabelas vêm do mesmo instante do banco, mesmo com o monitor
+        gravando durante a exportação: os arquivos são coerentes entre si.
 
         Args:
             base_output_dir: Diretório onde os arquivos CSV serão salvos
-            progress_callback: Função opcional que recebe o percentual de progresso (0-100)
+            progress_callback: Função opcional que recebe o percentual de progresso (0-100),
+                calculado pelas linhas exportadas; pode ser chamada de outras threads
+            incremental: Exporta das tabelas só de inserções (APPEND_ONLY_TABLES) apenas as
+                linhas novas desde a última exportação para este diretório, acrescentando-as
+                ao CSV existente. As demais tabelas são regravadas com troca atômica.
+            delta_files: Com incremental, grava as linhas novas em arquivos datados
+                (journal_events_AAAAMMDD_HHMMSS.csv) em vez de acrescentar; sempre usado
+                por Parquet e Arrow IPC, que não aceitam acréscimos
+            export_format: Uma das chaves de EXPORT_FORMATS (csv, parquet, arrow,
+                jsonl.gz, jsonl.zst); Parquet/Arrow exigem pyarrow e jsonl.zst exige zstandard
+            snapshot: 'transaction' lê as tabelas em paralelo, por conexões em
+                transações de leitura no mesmo snapshot do WAL (ver
+                snapshot_connections); 'backup' copia o banco com a API de backup e
+                exporta a cópia, também com as tabelas em paralelo
 
         Returns:
             Lista com os caminhos dos arquivos exportados com sucesso
         """
+        if export_format not in EXPORT_FORMATS:
+            logging.error(f"Formato de exportação desconhecido: {export_format}")
+            return []
+        if snapshot not in SNAPSHOT_MODES:
+            logging.error(f"Modo de snapshot desconhecido: {snapshot}")
+            return []
+        extension = EXPORT_FORMATS[export_format]
+        if export_format not in APPENDABLE_FORMATS:
+            delta_files = True
+
         if not os.path.exists(base_output_dir):
             try:
                 os.makedirs(base_output_dir, exist_ok=True)
@@ -99,20 +528,161 @@ class CSVExporter:
                 logging.error(f"Não foi possível criar diretório de saída: {e}")
                 return []
 
-        exported_files = []
-        total_tables = len(ALLOWED_TABLES)
+        snapshot_conns, backup_dir, source = [], None, self
+        try:
+            if snapshot == 'backup':
+                backup_dir, source = self.backup_copy()
+                if source is None:
+                    return []
+            else:
+                snapshot_conns = self.snapshot_connections(EXPORT_WORKERS)
+                if not snapshot_conns:
+                    return []
+            return self._export_snapshot(source, snapshot_conns, base_output_dir, progress_callback,
+                                         incremental, delta_files, export_format, extension)
+        finally:
+            for conn in snapshot_conns:
+                conn.rollback()
+                conn.close()
+            if backup_dir:
+                shutil.rmtree(backup_dir, ignore_errors=True)
+
+    def snapshot_connections(self, count: int) -> List[sqlite3.Connection]:
+        """`count` conexões em transações de leitura no mesmo snapshot do WAL.
+
+        Cada transação de leitura fixa o snapshot na primeira consulta. Para
+        que todas fixem o mesmo, elas começam enquanto outra conexão segura o
+        lock de escrita (BEGIN IMMEDIATE): a gravação espera só esses poucos
+        milissegundos, e não a exportação inteira. Cada conexão é usada por
+        uma thread de cada vez (check_same_thread=False). Lista vazia em caso
+        de erro.
+        """
+        conns: List[sqlite3.Connection] = []
+        lock_conn = None
+        try:
+            lock_conn = sqlite3.connect(self.DB_PATH, timeout=SNAPSHOT_LOCK_TIMEOUT)
+            lock_conn.execute("BEGIN IMMEDIATE")
+            for _ in range(count):
+                conn = sqlite3.connect(self.DB_PATH, check_same_thread=False)
+                conns.append(conn)
+                register_sql_functions(conn)
+                conn.execute("BEGIN")
+                conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        except sqlite3.Error as e:
+            logging.error(f"Erro ao abrir o snapshot da exportação: {e}")
+            for conn in conns:
+                conn.close()
+            conns = []
+        finally:
+            if lock_conn:
+                lock_conn.rollback()
+                lock_conn.close()
+        return conns
 
-        for index, table_name in enumerate(ALLOWED_TABLES):
-            filename = f"{table_name}.csv"
-            output_path = os.path.join(base_output_dir, filename)
+    def backup_copy(self) -> Tuple[Optional[str], Optional['CSVExporter']]:
+        """Cópia online do banco (API de backup do SQLite) em um diretório temporário.
 
-            if self.export_table_to_csv(table_name, output_path):
-                exported_files.append(output_path)
+        O backup é feito em um único passo: em WAL ele lê um snapshot só, sem
+        bloquear quem escreve (em passos menores, cada escrita de outra
+        conexão faria o backup recomeçar). Retorna (diretório, exportador da cópia).
+        """
+        backup_dir = tempfile.mkdtemp(prefix='edlt-export-')
+        copy_path = os.path.join(backup_dir, 'snapshot.db')
+        source = self.get_db_connection()
+        if not source:
+            shutil.rmtree(backup_dir, ignore_errors=True)
+            return None, None
+        try:
+            target = sqlite3.connect(copy_path)
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+        except sqlite3.Error as e:
+            logging.error(f"Erro ao copiar o banco para a exportação: {e}")
+            shutil.rmtree(backup_dir, ignore_errors=True)
+            return None, None
+        finally:
+            source.close()
+        return backup_dir, CSVExporter(copy_path)
+
+    def _export_snapshot(self, source: 'CSVExporter', conns: List[sqlite3.Connection], base_output_dir: str,
+                         progress_callback: Optional[Callable[[int], None]], incremental: bool,
+                         delta_files: bool, export_format: str, extension: str) -> List[str]:
+        # Sem conexões (modo backup), cada tabela abre a sua na cópia
+        conn = conns[0] if conns else None
+        # O limite superior é fixado antes de exportar: linhas gravadas durante
+        # a exportação ficam para a próxima, sem lacunas nem repetições
+        high_water = source.max_ids(conn)
+        state = self.load_export_state(base_output_dir, export_format) if incremental else {}
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+
+        jobs = {}  # tabela -> (caminho, intervalo de ids, append)
+        for table_name in ALLOWED_TABLES:
+            output_path = os.path.join(base_output_dir, f"{table_name}{extension}")
+            if table_name not in high_water:
+                jobs[table_name] = (output_path, None, False)
+                continue
+            id_range = (0, high_water[table_name])
+            last_id = state.get(table_name, {}).get('last_id')
+            # A marca só vale se o arquivo base existe e o banco não foi recriado
+            if (isinstance(last_id, int) and 0 <= last_id <= high_water[table_name]
+                    and os.path.exists(output_path)):
+                id_range = (last_id, high_water[table_name])
+                if delta_files:
+                    output_path = os.path.join(base_output_dir, f"{table_name}_{stamp}{extension}")
+                jobs[table_name] = (output_path, id_range, not delta_files)
+            else:
+                jobs[table_name] = (output_path, id_range, False)
+
+        counts = source.count_rows({name: job[1] for name, job in jobs.items() if job[1] is not None}, conn)
+        progress = ExportProgress(sum(counts.values()), progress_callback)
+        progress.advance(0)
+
+        unchanged = set()
+        pending = {}
+        for name in ALLOWED_TABLES:
+            output_path, id_range, append = jobs[name]
+            if id_range is not None and id_range[0] > 0 and counts[name] == 0:
+                # Nada novo: o arquivo existente continua completo
+                if append:
+                    unchanged.add(name)
+                continue
+            pending[name] = (output_path, progress, id_range, append, export_format)
+
+        # Uma conexão executa uma consulta por vez: cada tabela em andamento
+        # usa uma conexão do snapshot, devolvida ao terminar
+        free_conns: queue.Queue = queue.Queue()
+        for snapshot_conn in conns:
+            free_conns.put(snapshot_conn)
+
+        def export(name: str) -> bool:
+            table_conn = free_conns.get() if conns else None
+            try:
+                return source.export_table(name, *pending[name], conn=table_conn)
+            finally:
+                if table_conn is not None:
+                    free_conns.put(table_conn)
+
+        # As maiores tabelas começam primeiro para não ficarem sozinhas no fim
+        tables = sorted(pending, key=lambda name: counts[name], reverse=True)
+        with ThreadPoolExecutor(max_workers=max(1, min(len(conns) or EXPORT_WORKERS, len(tables))),
+                                thread_name_prefix='csv-export') as executor:
+            futures = {name: executor.submit(export, name) for name in tables}
+            results = {name: future.result() for name, future in futures.items()}
+
+        exported_files = []
+        for name in ALLOWED_TABLES:
+            if name in unchanged:
+                exported_files.append(jobs[name][0])
+            elif results.get(name):
+                exported_files.append(jobs[name][0])
+                if jobs[name][1] is not None:
+                    state[name] = {'last_id': jobs[name][1][1], 'exported_at': stamp}
 
-            # FIX: Emitir progresso após cada tabela exportada
-            if progress_callback:
-                progress_percent = int(((index + 1) / total_tables) * 100)
-                progress_callback(progress_percent)
+        if high_water:
+            self.save_export_state(base_output_dir, state, export_format)
+        progress.finish()
 
         logging.info(f"Exportação concluída: {len(exported_files)}/{len(ALLOWED_TABLES)} tabelas exportadas.")
         return exported_files
@@ -0,0 +1,141 @@
+"""
+Modo daemon (headless) do Elite Dangerous Log Tracker.
+
+Executa o BackendCore sem GUI e expõe o estado atual do piloto por uma API
+HTTP/JSON local. Uso:
+
+    python daemon.py --journal-dir "<diretório do Journal>" --port 8765
+
+Conversão única de um banco antigo para auto_vacuum incremental (com o
+aplicativo fechado; o daemon sai ao terminar):
+
+    python daemon.py --db edlt.db --convert-incremental-vacuum
+"""
+
+import sys
+import time
+import signal
+import logging
+import argparse
+
+from main import BackendCore, JOURNAL_DIR, SQLITE_DB_PATH, PLUGINS_DIR
+from maintenance import conversion_space, enable_incremental_vacuum
+from api_server import StateCache, APIServer, DEFAULT_API_HOST, DEFAULT_API_PORT
+from event_stream import EventStream
+from trade_routes import PriceIndex, TradeRouteFinder
+from eddn_client import EDDN_RELAY_URL, EDDN_UPLOAD_URL, start_eddn_monitoring, start_eddn_upload
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="EDLT em modo daemon com API HTTP/JSON local.")
+    parser.add_argument('--journal-dir', action='append',
+                        help="Diretório dos arquivos Journal (repita para várias contas; padrão: o do jogo)")
+    parser.add_argument('--db', default=SQLITE_DB_PATH, help="Caminho do banco de dados SQLite")
+    parser.add_argument('--host', default=DEFAULT_API_HOST, help="Endereço de escuta da API")
+    parser.add_argument('--port', type=int, default=DEFAULT_API_PORT, help="Porta da API")
+    parser.add_argument('--eddn', action='store_true', help="Assina o relay EDDN e grava preços de commodities")
+    parser.add_argument('--eddn-relay', default=EDDN_RELAY_URL, help="Endereço ZeroMQ do relay EDDN")
+    parser.add_argument('--eddn-upload', action='store_true', help="Envia ao EDDN os eventos do próprio Journal")
+    parser.add_argument('--eddn-upload-url', default=EDDN_UPLOAD_URL, help="Endereço do gateway de envio do EDDN")
+    parser.add_argument('--plugins-dir', default=PLUGINS_DIR, help="Diretório dos plugins de handlers de eventos")
+    parser.add_argument('--profile', type=float, metavar='SEGUNDOS',
+                        help="Perfila a ingestão por SEGUNDOS desde o início e grava o resultado")
+    parser.add_argument('--profile-output', help="Arquivo do perfil (padrão: diagnostics/ ao lado do banco)")
+    parser.add_argument('--slow-event-ms', type=float, help="Limite para registrar um evento como lento")
+    parser.add_argument('--trace-sql', action='store_true', help="Registra os comandos SQL lentos")
+    parser.add_argument('--ingest-policy', metavar='ARQUIVO',
+                        help="Política de ingestão por tipo de evento (padrão: ingest_policy.json ao lado do banco)")
+    parser.add_argument('--retention', metavar='ARQUIVO',
+                        help="Prazos de retenção por tabela e tipo de evento (padrão: retention.json ao lado do banco)")
+    parser.add_argument('--convert-incremental-vacuum', action='store_true',
+                        help="Converte o banco para auto_vacuum incremental (VACUUM completo, único) e sai")
+    return parser.parse_args(argv)
+
+
+def convert_incremental_vacuum(core: BackendCore) -> int:
+    """Conversão do banco para auto_vacuum incremental, com aviso de tempo e de espaço em disco."""
+    needed, free = conversion_space(core.db_path)
+    logging.warning(f"O VACUUM reescreve {core.db_path} por inteiro e pode levar minutos em bancos grandes; "
+                    f"ele pede até {needed / 2**20:.0f} MiB livres ({free / 2**20:.0f} MiB disponíveis). "
+                    "Feche o aplicativo e outros daemons que usem o banco antes.")
+    if free < needed:
+        logging.error("Espaço livre insuficiente para a conversão.")
+        return 1
+    conn = core.get_db_connection()
+    if not conn:
+        return 1
+    try:
+        return 0 if enable_incremental_vacuum(conn, convert=True) else 1
+    finally:
+        conn.close()
+
+
+def run_daemon(args: argparse.Namespace) -> int:
+    core = BackendCore(args.journal_dir or [JOURNAL_DIR], db_path=args.db)
+    if args.convert_incremental_vacuum:
+        return convert_incremental_vacuum(core)
+    core.load_plugins(args.plugins_dir)
+    if args.ingest_policy:
+        core.load_ingest_policy(args.ingest_policy)
+    if args.retention:
+        core.maintenance.load(args.retention)
+    core.trace_sql = args.trace_sql
+    if args.slow_event_ms is not None:
+        core.slow_events.threshold_ms = args.slow_event_ms
+    state_cache = StateCache(core)
+    state_cache.attach()
+
+    event_stream = EventStream()
+    event_stream.attach(core)
+    event_stream.start()
+
+    # Índice de preços e rotas comerciais, mantido pelo assinante EDDN
+    price_index = None
+    trade_finder = None
+    if args.eddn:
+        price_index = PriceIndex(args.db)
+        price_index.load()
+        trade_finder = TradeRouteFinder(price_index)
+
+    api_server = APIServer(state_cache, args.host, args.port, event_stream, trade_finder, core.metrics)
+    try:
+        api_server.start()
+    except OSError as e:
+        logging.error(f"Não foi possível iniciar a API em {args.host}:{args.port}: {e}")
+        event_stream.stop()
+        return 1
+
+    core.start_monitoring()
+    if args.profile:
+        core.start_profiling(args.profile, args.profile_output)
+    eddn_subscriber = None
+    if args.eddn:
+        eddn_subscriber = start_eddn_monitoring(args.db, args.eddn_relay, [price_index.apply_operations])
+    eddn_uploader = start_eddn_upload(core, args.eddn_upload_url) if args.eddn_upload else None
+
+    stop_requested = []
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop_requested.append(signum))
+
+    try:
+        while not stop_requested:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if eddn_subscriber:
+            eddn_subscriber.stop()
+        core.stop_monitoring()
+        if eddn_uploader:
+            eddn_uploader.detach()
+            eddn_uploader.stop()
+        event_stream.detach(core)
+        event_stream.stop()
+        api_server.stop()
+        state_cache.detach()
+        if core.slow_events.snapshot() or core.slow_sql.snapshot():
+            core.dump_diagnostics()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(run_daemon(parse_args()))
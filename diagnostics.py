@@ -0,0 +1,133 @@
+"""
+Ferramentas de diagnóstico da ingestão:
+  - SamplingProfiler: amostra periodicamente a pilha da thread de ingestão
+    (sys._current_frames) por uma janela de tempo e grava as funções mais
+    frequentes e as pilhas no formato "collapsed" (flamegraph.pl, speedscope);
+  - SlowLog: registro limitado dos eventos e comandos SQL que passaram de
+    um limite de tempo, com o conteúdo necessário para reproduzi-los.
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import threading
+from collections import Counter, deque
+from typing import Optional, Dict, Any, Callable, List
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Intervalo entre amostras do profiler: 5 ms custa pouco e dá 200 amostras por segundo
+PROFILE_INTERVAL = 0.005
+
+# Limites padrão dos registros de lentidão e quantas entradas cada um guarda
+SLOW_EVENT_THRESHOLD_MS = 50.0
+SLOW_SQL_THRESHOLD_MS = 20.0
+SLOW_LOG_SIZE = 200
+
+# Funções mostradas no resumo do perfil
+PROFILE_TOP_FUNCTIONS = 25
+
+
+def frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class SamplingProfiler:
+    """Profiler por amostragem de uma thread (ou de todas, se o alvo for desconhecido)."""
+
+    def __init__(self, target_thread: Callable[[], Optional[int]], interval: float = PROFILE_INTERVAL):
+        # Chamado a cada amostra: a thread de ingestão pode mudar durante a janela
+        self.target_thread = target_thread
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.started_at = 0.0
+        self.elapsed = 0.0
+        self.stop_event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self.stop_event.clear()
+        self.started_at = time.perf_counter()
+        self.thread = threading.Thread(target=self._run, name='edlt-profiler', daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.stop_event.set()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2.0)
+        self.elapsed = time.perf_counter() - self.started_at
+
+    def _run(self) -> None:
+        own_ident = threading.get_ident()
+        while not self.stop_event.wait(self.interval):
+            target = self.target_thread()
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident or (target is not None and ident != target):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame_label(frame))
+                    frame = frame.f_back
+                self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def top_functions(self, limit: int = PROFILE_TOP_FUNCTIONS) -> List[tuple]:
+        """(função, amostras próprias, amostras inclusivas), das mais frequentes às menos."""
+        own: Counter = Counter()
+        inclusive: Counter = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(';')
+            own[frames[-1]] += count
+            for label in set(frames):
+                inclusive[label] += count
+        return [(label, own[label], count) for label, count in inclusive.most_common(limit)]
+
+    def write(self, path: str) -> None:
+        """Grava o resumo e as pilhas no formato collapsed ("a;b;c contagem")."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(f"# Perfil por amostragem: {self.samples} amostras em {self.elapsed:.1f} s "
+                    f"(intervalo {self.interval * 1000:g} ms)\n")
+            f.write("# Funções mais frequentes (amostras próprias / inclusivas):\n")
+            for label, own, inclusive in self.top_functions():
+                f.write(f"#   {own:7d} {inclusive:7d}  {label}\n")
+            f.write("# Pilhas (formato collapsed, para flamegraph.pl ou speedscope):\n")
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class SlowLog:
+    """Entradas mais recentes que passaram de threshold_ms (limitadas a `size`)."""
+
+    def __init__(self, threshold_ms: float, size: int = SLOW_LOG_SIZE):
+        self.threshold_ms = threshold_ms
+        self.entries = deque(maxlen=size)
+        self.lock = threading.Lock()
+
+    def is_slow(self, seconds: float) -> bool:
+        return seconds * 1000.0 >= self.threshold_ms
+
+    def add(self, entry: Dict[str, Any]) -> None:
+        with self.lock:
+            self.entries.append(entry)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self.lock:
+            return list(self.entries)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+    def write(self, path: str) -> int:
+        """Grava as entradas em JSON Lines. Retorna quantas foram gravadas."""
+        entries = self.snapshot()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        return len(entries)
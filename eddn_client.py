@@ -1,78 +1,907 @@
 import os  # FIX: Import faltando
 import requests
 import json
+import zlib
+import queue
+import hashlib
 import logging
 import time
 import sqlite3
-from typing import Optional, Dict, Any
+import random
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from requests.adapters import HTTPAdapter
+from typing import Optional, Dict, Any, List, Tuple, Callable
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 # O caminho do DB deve ser o mesmo do main.py
 SQLITE_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'edlt.db')
 
-def get_db_connection() -> Optional[sqlite3.Connection]:
+# Relay público do EDDN (ZeroMQ PUB, mensagens JSON compactadas com zlib)
+EDDN_RELAY_URL = 'tcp://eddn.edcd.io:9500'
+
+# Mensagens compactadas aguardando decodificação. Com a fila cheia, novas
+# mensagens são descartadas (e contadas) em vez de crescer sem limite.
+RECEIVE_QUEUE_SIZE = 2000
+
+# Mensagens decodificadas aguardando o gravador. Se o banco não acompanhar,
+# o decodificador descarta mensagens (carga "derramada", contada em 'shed').
+WRITE_QUEUE_SIZE = 1000
+
+# Limite de mensagens retidas pelo próprio socket ZeroMQ
+ZMQ_RECEIVE_HWM = 1000
+
+# Upserts são agrupados: grava quando o lote atinge este número de linhas
+# ou quando o intervalo expira, o que vier primeiro
+UPSERT_BATCH_ROWS = 5000
+UPSERT_BATCH_INTERVAL = 0.5
+
+# Tempo máximo bloqueado em recv, para que stop() seja atendido
+RECEIVE_POLL_MS = 500
+
+# Hashes de conteúdo lembrados para detectar reenvios da mesma mensagem
+DEDUP_CACHE_SIZE = 20000
+
+# Intervalo mínimo entre avisos de descarte no log
+SHED_WARNING_INTERVAL = 30.0
+
+# Operação de escrita: (nome do comando, chave de coalescência, parâmetros).
+# Em todos os comandos o último parâmetro é o timestamp da mensagem.
+WriteOp = Tuple[str, Tuple, Tuple]
+
+# Comandos executados pelo gravador, nesta ordem dentro de cada lote. Upserts
+# só sobrescrevem linhas com timestamp igual ou mais antigo.
+EDDN_STATEMENTS: Dict[str, str] = {
+    'commodity': """
+        INSERT INTO commodity_prices
+            (market_id, commodity, system_name, station_name, buy_price, sell_price,
+             mean_price, stock, demand, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(market_id, commodity) DO UPDATE SET
+            system_name = excluded.system_name,
+            station_name = excluded.station_name,
+            buy_price = excluded.buy_price,
+            sell_price = excluded.sell_price,
+            mean_price = excluded.mean_price,
+            stock = excluded.stock,
+            demand = excluded.demand,
+            updated_at = excluded.updated_at
+        WHERE excluded.updated_at >= commodity_prices.updated_at
+    """,
+    'system': """
+        INSERT INTO eddn_systems (system_address, name, x, y, z, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT(system_address) DO UPDATE SET
+            name = excluded.name, x = excluded.x, y = excluded.y, z = excluded.z,
+            updated_at = excluded.updated_at
+        WHERE excluded.updated_at >= eddn_systems.updated_at
+    """,
+    # Campos ausentes na mensagem (NULL) preservam o valor já conhecido
+    'station': """
+        INSERT INTO eddn_stations
+            (market_id, station_name, system_name, system_address, station_type, distance_ls, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(market_id) DO UPDATE SET
+            station_name = excluded.station_name,
+            system_name = excluded.system_name,
+            system_address = COALESCE(excluded.system_address, eddn_stations.system_address),
+            station_type = COALESCE(excluded.station_type, eddn_stations.station_type),
+            distance_ls = COALESCE(excluded.distance_ls, eddn_stations.distance_ls),
+            updated_at = excluded.updated_at
+        WHERE excluded.updated_at >= eddn_stations.updated_at
+    """,
+    'outfitting': """
+        INSERT INTO outfitting_modules (market_id, module, updated_at) VALUES (?, ?, ?)
+        ON CONFLICT(market_id, module) DO UPDATE SET updated_at = excluded.updated_at
+        WHERE excluded.updated_at >= outfitting_modules.updated_at
+    """,
+    # A lista é completa: o que não veio na lista mais recente do mercado saiu
+    # de venda (inclusive itens inseridos por uma mensagem atrasada)
+    'outfitting_prune': """
+        DELETE FROM outfitting_modules WHERE market_id = ?1 AND updated_at <
+            MAX(?2, (SELECT MAX(updated_at) FROM outfitting_modules WHERE market_id = ?1))
+    """,
+    'shipyard': """
+        INSERT INTO shipyard_ships (market_id, ship, updated_at) VALUES (?, ?, ?)
+        ON CONFLICT(market_id, ship) DO UPDATE SET updated_at = excluded.updated_at
+        WHERE excluded.updated_at >= shipyard_ships.updated_at
+    """,
+    'shipyard_prune': """
+        DELETE FROM shipyard_ships WHERE market_id = ?1 AND updated_at <
+            MAX(?2, (SELECT MAX(updated_at) FROM shipyard_ships WHERE market_id = ?1))
+    """,
+    'signal': """
+        INSERT INTO system_signals (system_address, signal_name, signal_type, is_station, updated_at)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(system_address, signal_name) DO UPDATE SET
+            signal_type = excluded.signal_type,
+            is_station = excluded.is_station,
+            updated_at = excluded.updated_at
+        WHERE excluded.updated_at >= system_signals.updated_at
+    """,
+}
+
+def get_db_connection(db_path: Optional[str] = None) -> Optional[sqlite3.Connection]:
     """Cria e retorna uma conexão com o banco de dados SQLite."""
     try:
-        conn = sqlite3.connect(SQLITE_DB_PATH)
+        conn = sqlite3.connect(db_path or SQLITE_DB_PATH, timeout=10.0)
         conn.row_factory = sqlite3.Row  # Permite acessar colunas por nome
+        conn.execute("PRAGMA journal_mode=WAL")
         return conn
     except sqlite3.Error as e:
         logging.error(f"Erro ao conectar ao banco de dados SQLite: {e}")
         return None
 
-def process_eddn_message(message: Dict[str, Any]) -> None:
-    """Processa a mensagem EDDN e insere/atualiza dados no system_data."""
-    
-    schema_ref = message.get('$schemaRef', '')
-    
-    if 'commodity' in schema_ref:
-        process_market_data(message)
-    else:
-        logging.debug(f"Esquema EDDN desconhecido: {schema_ref}")
-
-def process_market_data(message: Dict[str, Any]) -> None:
-    """Processa dados de mercado (commodity) do EDDN e atualiza system_data."""
-    
-    conn = get_db_connection()
-    if not conn:
+def decode_eddn_message(raw: bytes) -> Dict[str, Any]:
+    """Descompacta (zlib) e decodifica uma mensagem recebida do relay."""
+    return json.loads(zlib.decompress(raw))
+
+def message_content_hash(message: Dict[str, Any]) -> str:
+    """Hash do conteúdo da mensagem, sem o cabeçalho (que muda a cada envio)."""
+    content = json.dumps(message.get('message', {}), sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+class LRUHashCache:
+    """Conjunto limitado de hashes; os menos recentes são esquecidos primeiro."""
+
+    def __init__(self, max_size: int = DEDUP_CACHE_SIZE):
+        self.max_size = max_size
+        self.entries: 'OrderedDict[str, None]' = OrderedDict()
+
+    def seen(self, digest: str) -> bool:
+        """Registra o hash e retorna True se ele já estava no cache."""
+        if digest in self.entries:
+            self.entries.move_to_end(digest)
+            return True
+        self.entries[digest] = None
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+        return False
+
+
+# --- Handlers por Esquema (mensagem -> operações de escrita) ---
+
+def _system_op(system_address, name, star_pos, timestamp) -> Optional[WriteOp]:
+    if system_address is None or not name or not star_pos or len(star_pos) != 3:
+        return None
+    return ('system', (system_address,), (system_address, name, star_pos[0], star_pos[1], star_pos[2], timestamp))
+
+def _station_op(market_id, station_name, system_name, timestamp, system_address=None,
+                station_type=None, distance_ls=None) -> Optional[WriteOp]:
+    if market_id is None or not station_name or not system_name:
+        return None
+    return ('station', (market_id,),
+            (market_id, station_name, system_name, system_address, station_type, distance_ls, timestamp))
+
+def handle_commodity(message_data: Dict[str, Any]) -> List[WriteOp]:
+    market_id = message_data.get('marketId')
+    system_name = message_data.get('systemName')
+    station_name = message_data.get('stationName')
+    timestamp = message_data.get('timestamp')
+    if market_id is None or not system_name or not station_name or not timestamp:
+        return []
+
+    ops = [_station_op(market_id, station_name, system_name, timestamp)]
+    for commodity in message_data.get('commodities', []):
+        name = commodity.get('name')
+        if not name:
+            continue
+        name = name.lower()
+        ops.append(('commodity', (market_id, name), (
+            market_id,
+            name,
+            system_name,
+            station_name,
+            commodity.get('buyPrice', 0),
+            commodity.get('sellPrice', 0),
+            commodity.get('meanPrice'),
+            commodity.get('stock', 0),
+            commodity.get('demand', 0),
+            timestamp,
+        )))
+    return ops
+
+def handle_journal(message_data: Dict[str, Any]) -> List[WriteOp]:
+    timestamp = message_data.get('timestamp')
+    if not timestamp:
+        return []
+    system_address = message_data.get('SystemAddress')
+    system_name = message_data.get('StarSystem')
+
+    ops = [_system_op(system_address, system_name, message_data.get('StarPos'), timestamp)]
+    # Docked, ou Location/CarrierJump com a nave atracada
+    if message_data.get('event') == 'Docked' or message_data.get('Docked'):
+        ops.append(_station_op(message_data.get('MarketID'), message_data.get('StationName'), system_name,
+                               timestamp, system_address, message_data.get('StationType'),
+                               message_data.get('DistFromStarLS')))
+    return [op for op in ops if op]
+
+def _handle_market_list(message_data: Dict[str, Any], list_key: str, statement: str) -> List[WriteOp]:
+    market_id = message_data.get('marketId')
+    timestamp = message_data.get('timestamp')
+    if market_id is None or not timestamp:
+        return []
+
+    ops = [_station_op(market_id, message_data.get('stationName'), message_data.get('systemName'), timestamp)]
+    for name in message_data.get(list_key, []):
+        name = name.lower()
+        ops.append((statement, (market_id, name), (market_id, name, timestamp)))
+    ops.append((f"{statement}_prune", (market_id,), (market_id, timestamp)))
+    return [op for op in ops if op]
+
+def handle_outfitting(message_data: Dict[str, Any]) -> List[WriteOp]:
+    return _handle_market_list(message_data, 'modules', 'outfitting')
+
+def handle_shipyard(message_data: Dict[str, Any]) -> List[WriteOp]:
+    return _handle_market_list(message_data, 'ships', 'shipyard')
+
+def handle_fss_signals(message_data: Dict[str, Any]) -> List[WriteOp]:
+    system_address = message_data.get('SystemAddress')
+    timestamp = message_data.get('timestamp')
+    if system_address is None or not timestamp:
+        return []
+
+    ops = [_system_op(system_address, message_data.get('StarSystem'), message_data.get('StarPos'), timestamp)]
+    for signal in message_data.get('signals', []):
+        signal_name = signal.get('SignalName')
+        if not signal_name:
+            continue
+        ops.append(('signal', (system_address, signal_name), (
+            system_address,
+            signal_name,
+            signal.get('SignalType'),
+            1 if signal.get('IsStation') else 0,
+            signal.get('timestamp', timestamp),
+        )))
+    return [op for op in ops if op]
+
+def handle_navroute(message_data: Dict[str, Any]) -> List[WriteOp]:
+    timestamp = message_data.get('timestamp')
+    if not timestamp:
+        return []
+    ops = [_system_op(hop.get('SystemAddress'), hop.get('StarSystem'), hop.get('StarPos'), timestamp)
+           for hop in message_data.get('Route', [])]
+    return [op for op in ops if op]
+
+# Esquema ($schemaRef) -> handler. Mensagens de teste ('/test') e esquemas
+# desconhecidos não são roteados.
+SCHEMA_HANDLERS: Dict[str, Callable[[Dict[str, Any]], List[WriteOp]]] = {
+    'https://eddn.edcd.io/schemas/commodity/3': handle_commodity,
+    'https://eddn.edcd.io/schemas/journal/1': handle_journal,
+    'https://eddn.edcd.io/schemas/outfitting/2': handle_outfitting,
+    'https://eddn.edcd.io/schemas/shipyard/2': handle_shipyard,
+    'https://eddn.edcd.io/schemas/fsssignaldiscovered/1': handle_fss_signals,
+    'https://eddn.edcd.io/schemas/navroute/1': handle_navroute,
+}
+
+def route_eddn_message(message: Dict[str, Any]) -> Optional[List[WriteOp]]:
+    """Converte a mensagem em operações de escrita; None se o esquema não é roteado."""
+    handler = SCHEMA_HANDLERS.get(message.get('$schemaRef', ''))
+    if handler is None:
+        return None
+    return handler(message.get('message', {}))
+
+def write_operations(conn: sqlite3.Connection, pending: Dict[str, Dict[Tuple, Tuple]]) -> int:
+    """Grava as operações agrupadas por comando em uma única transação."""
+    written = 0
+    with conn:
+        for statement, sql in EDDN_STATEMENTS.items():
+            rows = pending.get(statement)
+            if rows:
+                conn.executemany(sql, list(rows.values()))
+                written += len(rows)
+    return written
+
+def coalesce_operations(pending: Dict[str, Dict[Tuple, Tuple]], ops: List[WriteOp]) -> int:
+    """Acumula as operações no lote, mantendo só a mais recente de cada chave.
+
+    Retorna quantas chaves novas entraram no lote.
+    """
+    added = 0
+    for statement, key, params in ops:
+        rows = pending.setdefault(statement, {})
+        current = rows.get(key)
+        if current is None:
+            added += 1
+            rows[key] = params
+        elif params[-1] >= current[-1]:
+            rows[key] = params
+    return added
+
+def process_eddn_message(message: Dict[str, Any], conn: Optional[sqlite3.Connection] = None) -> None:
+    """Processa uma mensagem EDDN e grava imediatamente (sem lote)."""
+
+    ops = route_eddn_message(message)
+    if ops is None:
+        logging.debug(f"Esquema EDDN desconhecido: {message.get('$schemaRef', '')}")
+        return
+    if not ops:
         return
 
-    try:
-        cursor = conn.cursor()
-        
-        message_data = message.get('message', {})
-        
-        system_name = message_data.get('systemName')
-        station_name = message_data.get('stationName')
-        
-        if not system_name or not station_name:
+    own_conn = conn is None
+    if own_conn:
+        conn = get_db_connection()
+        if not conn:
             return
 
-        # NOTA: Processamento de preços de commodities foi adiado
-        # para manter o foco na refatoração SQLite e segurança.
-        # Esta funcionalidade requer uma tabela dedicada 'commodity_prices'
-        # que não faz parte do escopo atual.
-        
-        logging.info(f"Mensagem EDDN de mercado recebida para {station_name} em {system_name}. "
-                    f"(Processamento de preço adiado para manter o foco na refatoração SQLite)")
-
+    pending: Dict[str, Dict[Tuple, Tuple]] = {}
+    coalesce_operations(pending, ops)
+    try:
+        write_operations(conn, pending)
     except sqlite3.Error as e:
-        logging.error(f"Erro ao processar dados de mercado EDDN: {e}")
+        logging.error(f"Erro ao processar mensagem EDDN: {e}")
     finally:
-        if conn:
+        if own_conn:
             conn.close()
 
-def start_eddn_monitoring() -> None:
-    """Inicia o monitoramento do EDDN em um thread separado (simulado)."""
-    logging.info("Monitoramento EDDN iniciado (simulado).")
-    # TODO: Implementar cliente EDDN real usando websockets
-    # import websocket
-    # ws = websocket.WebSocketApp("wss://eddn.edcd.io:4430/upload/",
-    #                            on_message=on_message,
-    #                            on_error=on_error,
-    #                            on_close=on_close)
-    # ws.run_forever()
+
+class EDDNSubscriber:
+    """Assinante do relay EDDN em três estágios, cada um em sua thread.
+
+    recepção: só faz recv e enfileira os bytes compactados (fila limitada,
+        excesso descartado em 'dropped');
+    decodificação: descompacta, descarta duplicatas pelo hash do conteúdo,
+        roteia pelo esquema e entrega as operações ao gravador (fila limitada,
+        excesso descartado em 'shed' quando o banco fica para trás);
+    gravação: agrupa as operações por chave e grava em lotes com uma conexão única.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, relay_url: str = EDDN_RELAY_URL,
+                 queue_size: int = RECEIVE_QUEUE_SIZE, write_queue_size: int = WRITE_QUEUE_SIZE):
+        self.db_path = db_path or SQLITE_DB_PATH
+        self.relay_url = relay_url
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.write_queue: queue.Queue = queue.Queue(maxsize=write_queue_size)
+        self.dedup_cache = LRUHashCache()
+        # Chamados na thread de gravação com cada lote já commitado
+        self.write_listeners: List[Callable[[Dict[str, Dict[Tuple, Tuple]]], None]] = []
+        # Um sinalizador por estágio: cada um só para depois que o anterior esvaziou
+        self.running = False
+        self.decoding = False
+        self.writing = False
+        self.context = None
+        self.threads: List[threading.Thread] = []
+        self.last_shed_warning = 0.0
+        self.stats_lock = threading.Lock()
+        self.stats: Dict[str, int] = {
+            'received': 0,
+            'dropped': 0,
+            'decoded': 0,
+            'decode_errors': 0,
+            'duplicates': 0,
+            'unrouted': 0,
+            'shed': 0,
+            'rows_written': 0,
+            'batches': 0,
+        }
+
+    def start(self) -> None:
+        # Import tardio: pyzmq só é necessário quando o EDDN está ativado
+        import zmq
+
+        self.running = self.decoding = self.writing = True
+        self.context = zmq.Context()
+        self.threads = [
+            threading.Thread(target=self._writer_loop, name='edlt-eddn-writer', daemon=True),
+            threading.Thread(target=self._decoder_loop, name='edlt-eddn-decoder', daemon=True),
+            threading.Thread(target=self._receive_loop, name='edlt-eddn-recv', daemon=True),
+        ]
+        for thread in self.threads:
+            thread.start()
+        logging.info(f"Monitoramento EDDN iniciado ({self.relay_url}).")
+
+    def stop(self) -> None:
+        # Para na ordem do fluxo: cada estágio esvazia a sua fila antes de sair
+        self.running = False
+        if self.threads:
+            writer, decoder, receiver = self.threads
+            receiver.join(timeout=5.0)
+            self.decoding = False
+            decoder.join(timeout=5.0)
+            self.writing = False
+            writer.join(timeout=5.0)
+            self.threads = []
+        if self.context:
+            self.context.term()
+            self.context = None
+        logging.info(f"Monitoramento EDDN parado. Estatísticas: {self.get_stats()}")
+
+    def add_write_listener(self, callback: Callable[[Dict[str, Dict[Tuple, Tuple]]], None]) -> None:
+        """Registra um callback para os lotes gravados (ex: índice de preços)."""
+        self.write_listeners.append(callback)
+
+    def remove_write_listener(self, callback: Callable[[Dict[str, Dict[Tuple, Tuple]]], None]) -> None:
+        if callback in self.write_listeners:
+            self.write_listeners.remove(callback)
+
+    def get_stats(self) -> Dict[str, int]:
+        with self.stats_lock:
+            stats = dict(self.stats)
+        stats['queued'] = self.queue.qsize()
+        stats['write_queued'] = self.write_queue.qsize()
+        return stats
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self.stats_lock:
+            self.stats[name] += amount
+
+    def _receive_loop(self) -> None:
+        import zmq
+
+        sock = self.context.socket(zmq.SUB)
+        sock.setsockopt(zmq.SUBSCRIBE, b"")
+        sock.setsockopt(zmq.RCVHWM, ZMQ_RECEIVE_HWM)
+        sock.setsockopt(zmq.LINGER, 0)
+        sock.connect(self.relay_url)
+
+        poller = zmq.Poller()
+        poller.register(sock, zmq.POLLIN)
+        try:
+            while self.running:
+                if not poller.poll(RECEIVE_POLL_MS):
+                    continue
+                # Drena tudo o que já chegou antes de voltar ao poll
+                while True:
+                    try:
+                        raw = sock.recv(zmq.NOBLOCK)
+                    except zmq.Again:
+                        break
+                    self._count('received')
+                    try:
+                        self.queue.put_nowait(raw)
+                    except queue.Full:
+                        self._count('dropped')
+        except zmq.ZMQError as e:
+            if self.running:
+                logging.error(f"Erro no socket EDDN: {e}")
+        finally:
+            sock.close()
+
+    def _decoder_loop(self) -> None:
+        while self.decoding or not self.queue.empty():
+            try:
+                raw = self.queue.get(timeout=RECEIVE_POLL_MS / 1000)
+            except queue.Empty:
+                continue
+            ops = self._decode(raw)
+            if not ops:
+                continue
+            try:
+                self.write_queue.put_nowait(ops)
+            except queue.Full:
+                self._count('shed')
+                self._warn_shed()
+
+    def _decode(self, raw: bytes) -> Optional[List[WriteOp]]:
+        try:
+            message = decode_eddn_message(raw)
+        except (zlib.error, ValueError) as e:
+            self._count('decode_errors')
+            logging.debug(f"Mensagem EDDN inválida descartada: {e}")
+            return None
+        self._count('decoded')
+
+        if self.dedup_cache.seen(message_content_hash(message)):
+            self._count('duplicates')
+            return None
+
+        try:
+            ops = route_eddn_message(message)
+        except (AttributeError, TypeError, IndexError) as e:
+            self._count('decode_errors')
+            logging.debug(f"Mensagem EDDN fora do esquema descartada: {e}")
+            return None
+        if ops is None:
+            self._count('unrouted')
+        return ops
+
+    def _warn_shed(self) -> None:
+        now = time.monotonic()
+        if now - self.last_shed_warning >= SHED_WARNING_INTERVAL:
+            self.last_shed_warning = now
+            logging.warning(f"Gravador EDDN atrasado: {self.get_stats()['shed']} mensagens descartadas até agora.")
+
+    def _writer_loop(self) -> None:
+        conn = get_db_connection(self.db_path)
+        if not conn:
+            return
+
+        # comando -> chave -> parâmetros mais recentes no lote atual
+        pending: Dict[str, Dict[Tuple, Tuple]] = {}
+        pending_rows = 0
+        last_flush = time.monotonic()
+        try:
+            while self.writing or not self.write_queue.empty():
+                timeout = max(0.0, UPSERT_BATCH_INTERVAL - (time.monotonic() - last_flush))
+                try:
+                    ops = self.write_queue.get(timeout=timeout)
+                except queue.Empty:
+                    ops = None
+
+                if ops:
+                    pending_rows += coalesce_operations(pending, ops)
+
+                if pending_rows >= UPSERT_BATCH_ROWS or time.monotonic() - last_flush >= UPSERT_BATCH_INTERVAL:
+                    self._flush(conn, pending)
+                    pending_rows = 0
+                    last_flush = time.monotonic()
+            self._flush(conn, pending)
+        finally:
+            conn.close()
+
+    def _flush(self, conn: sqlite3.Connection, pending: Dict[str, Dict[Tuple, Tuple]]) -> None:
+        if not pending:
+            return
+        try:
+            written = write_operations(conn, pending)
+            self._count('rows_written', written)
+            self._count('batches')
+        except sqlite3.Error as e:
+            logging.error(f"Erro ao gravar dados do EDDN: {e}")
+            pending.clear()
+            return
+
+        for listener in list(self.write_listeners):
+            try:
+                listener(pending)
+            except Exception as e:
+                logging.error(f"Erro em listener de gravação do EDDN: {e}")
+        pending.clear()
+
+# --- Envio (upload) dos eventos do próprio piloto ---
+
+EDDN_UPLOAD_URL = 'https://eddn.edcd.io:4430/upload/'
+EDDN_SOFTWARE_NAME = 'Elite Dangerous Log Tracker'
+EDDN_SOFTWARE_VERSION = '1.0'
+JOURNAL_SCHEMA = 'https://eddn.edcd.io/schemas/journal/1'
+
+# Eventos do Journal aceitos pelo esquema journal/1
+EDDN_JOURNAL_EVENTS = {'Docked', 'FSDJump', 'Scan', 'Location', 'SAASignalsFound', 'CarrierJump', 'CodexEntry'}
+
+# Eventos que só atualizam o contexto do envio (localização, versão do jogo, comandante)
+UPLOAD_CONTEXT_EVENTS = {'Fileheader', 'LoadGame', 'Commander', 'SupercruiseExit'}
+
+# Campos pessoais que as regras do EDDN mandam remover antes do envio
+PERSONAL_FIELDS = {'ActiveFine', 'CockpitBreach', 'BoostUsed', 'FuelLevel', 'FuelUsed',
+                   'JumpDist', 'Latitude', 'Longitude', 'Wanted'}
+PERSONAL_FACTION_FIELDS = {'HappiestSystem', 'HomeSystem', 'MyReputation', 'SquadronFaction'}
+
+# Eventos aguardando a thread de envio. O listener nunca bloqueia a ingestão:
+# com a fila cheia, o evento não é enviado (e é contado).
+UPLOAD_QUEUE_SIZE = 1000
+
+# Janela de coalescência: após acordar, a thread espera este intervalo e grava
+# tudo o que chegou em uma única transação, sem disputar o banco a cada evento
+UPLOAD_FLUSH_INTERVAL = 1.0
+
+# Mensagens lidas da fila persistente e enviadas em paralelo por ciclo
+UPLOAD_BATCH_SIZE = 50
+UPLOAD_WORKERS = 4
+UPLOAD_TIMEOUT = 10.0
+
+# Novas tentativas com espera exponencial (com variação aleatória) por mensagem
+UPLOAD_BACKOFF_BASE = 2.0
+UPLOAD_BACKOFF_MAX = 600.0
+UPLOAD_MAX_ATTEMPTS = 20
+
+# Eventos mais antigos que isto (ex: leitura de arquivos antigos) não são enviados
+UPLOAD_MAX_EVENT_AGE = 3600
+
+def _strip_localised(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {key: _strip_localised(item) for key, item in value.items() if not key.endswith('_Localised')}
+    if isinstance(value, list):
+        return [_strip_localised(item) for item in value]
+    return value
+
+
+def strip_personal_data(event_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Cópia do evento sem o que as regras do EDDN mandam remover: campos
+    '_Localised' em todos os níveis, PERSONAL_FIELDS e, em cada facção,
+    PERSONAL_FACTION_FIELDS.
+    """
+    message = _strip_localised(event_data)
+    for field in PERSONAL_FIELDS:
+        message.pop(field, None)
+    for faction in message.get('Factions', []):
+        for field in PERSONAL_FACTION_FIELDS:
+            faction.pop(field, None)
+    return message
+
+
+class UploadContext:
+    """Estado do jogo acumulado a partir do Journal e exigido nas mensagens enviadas."""
+
+    def __init__(self):
+        self.commander: Optional[str] = None
+        self.game_version = ''
+        self.game_build = ''
+        self.horizons: Optional[bool] = None
+        self.odyssey: Optional[bool] = None
+        self.system_name: Optional[str] = None
+        self.system_address: Optional[int] = None
+        self.star_pos: Optional[List[float]] = None
+
+    def update(self, event_data: Dict[str, Any]) -> None:
+        event_type = event_data.get('event')
+        if event_type == 'Fileheader':
+            self.game_version = event_data.get('gameversion', self.game_version)
+            self.game_build = event_data.get('build', self.game_build)
+        elif event_type == 'LoadGame':
+            self.commander = event_data.get('Commander', self.commander)
+            self.horizons = event_data.get('Horizons', self.horizons)
+            self.odyssey = event_data.get('Odyssey', self.odyssey)
+            self.game_version = event_data.get('gameversion', self.game_version)
+            self.game_build = event_data.get('build', self.game_build)
+        elif event_type == 'Commander':
+            self.commander = event_data.get('Name', self.commander)
+
+        # Eventos com a posição completa definem o sistema atual
+        if event_data.get('StarPos') and event_data.get('SystemAddress') is not None:
+            self.system_name = event_data.get('StarSystem')
+            self.system_address = event_data.get('SystemAddress')
+            self.star_pos = event_data.get('StarPos')
+
+    @property
+    def is_beta(self) -> bool:
+        return 'beta' in self.game_version.lower()
+
+
+def build_journal_message(event_data: Dict[str, Any], context: UploadContext) -> Optional[Dict[str, Any]]:
+    """Monta a mensagem journal/1 a partir de um evento, ou None se ele não pode ser enviado."""
+    message = strip_personal_data(event_data)
+
+    # Todo evento precisa de StarSystem, StarPos e SystemAddress; eventos que
+    # não os trazem recebem os do sistema atual, se for o mesmo sistema
+    if context.star_pos is None:
+        return None
+    system_address = message.get('SystemAddress', context.system_address)
+    if system_address != context.system_address:
+        return None
+    message['SystemAddress'] = system_address
+    message.setdefault('StarSystem', message.get('System', context.system_name))
+    message.setdefault('StarPos', context.star_pos)
+    if context.horizons is not None:
+        message['horizons'] = context.horizons
+    if context.odyssey is not None:
+        message['odyssey'] = context.odyssey
+
+    return {
+        # Dados de versões beta vão para o esquema de teste
+        '$schemaRef': JOURNAL_SCHEMA + ('/test' if context.is_beta else ''),
+        'header': {
+            'uploaderID': context.commander or 'CMDR_Unknown',
+            'softwareName': EDDN_SOFTWARE_NAME,
+            'softwareVersion': EDDN_SOFTWARE_VERSION,
+            'gameversion': context.game_version,
+            'gamebuild': context.game_build,
+        },
+        'message': message,
+    }
+
+def _event_age_seconds(event_data: Dict[str, Any]) -> float:
+    """Idade do evento; infinita se o timestamp não pode ser lido (o evento não é enviado)."""
+    try:
+        timestamp = datetime.strptime(event_data.get('timestamp', ''), '%Y-%m-%dT%H:%M:%SZ')
+    except (TypeError, ValueError):
+        return float('inf')
+    return (datetime.now(timezone.utc) - timestamp.replace(tzinfo=timezone.utc)).total_seconds()
+
+
+class EDDNUploader:
+    """Envia ao EDDN os eventos commitados pelo BackendCore.
+
+    on_event() é o listener: filtra pelo tipo e enfileira em memória sem
+    bloquear, com o comandante da sessão do evento. A thread de envio mantém
+    um contexto do jogo por comandante (com várias contas, cada mensagem leva
+    o uploaderID, a versão e o sistema da conta que gerou o evento), monta as
+    mensagens (sem dados pessoais), grava-as na tabela eddn_outbox e envia
+    os lotes devidos em paralelo por uma sessão HTTP persistente. Mensagens
+    só saem da outbox após resposta do gateway; falhas temporárias são
+    reagendadas com espera exponencial, mesmo após reiniciar o programa.
+    """
+
+    def __init__(self, backend_core, upload_url: str = EDDN_UPLOAD_URL, db_path: Optional[str] = None):
+        self.backend_core = backend_core
+        self.upload_url = upload_url
+        self.db_path = db_path or backend_core.db_path
+        self.queue: queue.Queue = queue.Queue(maxsize=UPLOAD_QUEUE_SIZE)
+        # Comandante da sessão (BackendCore.current_commander) -> contexto do
+        # jogo. O Fileheader do início de uma sessão chega antes do LoadGame e
+        # fica no contexto de CMDR_Unknown; o LoadGame traz a versão do jogo
+        self.game_contexts: Dict[str, UploadContext] = {}
+        self.wakeup = threading.Event()
+        self.running = False
+        self.thread: Optional[threading.Thread] = None
+        self.session: Optional[requests.Session] = None
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.stats_lock = threading.Lock()
+        self.stats: Dict[str, int] = {
+            'dropped': 0,
+            'skipped': 0,
+            'outboxed': 0,
+            'sent': 0,
+            'rejected': 0,
+            'retried': 0,
+            'expired': 0,
+        }
+
+    def attach(self) -> None:
+        self.backend_core.add_event_listener(self.on_event)
+
+    def detach(self) -> None:
+        self.backend_core.remove_event_listener(self.on_event)
+
+    def start(self) -> None:
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=UPLOAD_WORKERS)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({'Content-Type': 'application/json; charset=utf-8'})
+        self.executor = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix='edlt-eddn-upload')
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name='edlt-eddn-uploader', daemon=True)
+        self.thread.start()
+        logging.info(f"Envio ao EDDN iniciado ({self.upload_url}).")
+
+    def stop(self) -> None:
+        self.running = False
+        self.wakeup.set()
+        if self.thread:
+            self.thread.join(timeout=UPLOAD_TIMEOUT + 5.0)
+            self.thread = None
+        if self.executor:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+        if self.session:
+            self.session.close()
+            self.session = None
+        logging.info(f"Envio ao EDDN parado. Estatísticas: {self.get_stats()}")
+
+    def get_stats(self) -> Dict[str, int]:
+        with self.stats_lock:
+            return dict(self.stats)
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self.stats_lock:
+            self.stats[name] += amount
+
+    def on_event(self, event_data: Dict[str, Any]) -> None:
+        """Listener de eventos (thread de ingestão): só filtra e enfileira."""
+        event_type = event_data.get('event')
+        if event_type not in EDDN_JOURNAL_EVENTS and event_type not in UPLOAD_CONTEXT_EVENTS:
+            return
+        try:
+            self.queue.put_nowait((event_data, self.backend_core.current_commander()))
+        except queue.Full:
+            self._count('dropped')
+            return
+        if not self.wakeup.is_set():
+            self.wakeup.set()
+
+    def _run(self) -> None:
+        conn = get_db_connection(self.db_path)
+        if not conn:
+            return
+        try:
+            while self.running:
+                if self.wakeup.wait(self._seconds_until_due(conn)) and self.running:
+                    time.sleep(UPLOAD_FLUSH_INTERVAL)
+                self.wakeup.clear()
+                if not self.running:
+                    break
+                self._store_queued(conn)
+                self._send_due(conn)
+            # Eventos ainda em memória vão para a outbox e são enviados na próxima execução
+            self._store_queued(conn)
+        except sqlite3.Error as e:
+            logging.error(f"Erro na fila de envio do EDDN: {e}")
+        finally:
+            conn.close()
+
+    def _seconds_until_due(self, conn: sqlite3.Connection) -> float:
+        next_attempt = conn.execute("SELECT MIN(next_attempt) FROM eddn_outbox").fetchone()[0]
+        if next_attempt is None:
+            return 60.0
+        return min(60.0, max(0.0, next_attempt - time.time()))
+
+    def _store_queued(self, conn: sqlite3.Connection) -> None:
+        rows = []
+        created_at = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        while True:
+            try:
+                event_data, commander = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            game_context = self.game_contexts.get(commander)
+            if game_context is None:
+                game_context = self.game_contexts[commander] = UploadContext()
+            game_context.update(event_data)
+            if event_data.get('event') not in EDDN_JOURNAL_EVENTS:
+                continue
+            message = None
+            if _event_age_seconds(event_data) <= UPLOAD_MAX_EVENT_AGE:
+                message = build_journal_message(event_data, game_context)
+            if message is None:
+                self._count('skipped')
+                continue
+            rows.append((message['$schemaRef'], json.dumps(message, ensure_ascii=False), created_at))
+
+        if rows:
+            with conn:
+                conn.executemany("INSERT INTO eddn_outbox (schema_ref, message, created_at) VALUES (?, ?, ?)", rows)
+            self._count('outboxed', len(rows))
+
+    def _send_due(self, conn: sqlite3.Connection) -> None:
+        while self.running:
+            due = conn.execute(
+                "SELECT id, message, attempts FROM eddn_outbox WHERE next_attempt <= ? ORDER BY id LIMIT ?",
+                (time.time(), UPLOAD_BATCH_SIZE)).fetchall()
+            if not due:
+                return
+
+            results = list(self.executor.map(self._post, [row['message'] for row in due]))
+
+            finished, retries = [], []
+            for row, result in zip(due, results):
+                if result == 'sent':
+                    finished.append((row['id'],))
+                    self._count('sent')
+                elif result == 'rejected':
+                    finished.append((row['id'],))
+                    self._count('rejected')
+                elif row['attempts'] + 1 >= UPLOAD_MAX_ATTEMPTS:
+                    finished.append((row['id'],))
+                    self._count('expired')
+                else:
+                    attempts = row['attempts'] + 1
+                    delay = min(UPLOAD_BACKOFF_MAX, UPLOAD_BACKOFF_BASE ** attempts) * random.uniform(0.5, 1.0)
+                    retries.append((attempts, time.time() + delay, row['id']))
+                    self._count('retried')
+
+            with conn:
+                conn.executemany("DELETE FROM eddn_outbox WHERE id = ?", finished)
+                conn.executemany("UPDATE eddn_outbox SET attempts = ?, next_attempt = ? WHERE id = ?", retries)
+
+            # Gateway com problemas: espera a próxima tentativa agendada
+            if retries:
+                return
+
+    def _post(self, body: str) -> str:
+        """Envia uma mensagem. Retorna 'sent', 'rejected' (não adianta repetir) ou 'retry'."""
+        try:
+            response = self.session.post(self.upload_url, data=body.encode('utf-8'), timeout=UPLOAD_TIMEOUT)
+        except requests.RequestException as e:
+            logging.debug(f"Falha ao enviar mensagem ao EDDN: {e}")
+            return 'retry'
+
+        if response.status_code == 200:
+            return 'sent'
+        if response.status_code in (408, 429) or response.status_code >= 500:
+            return 'retry'
+        logging.warning(f"Mensagem recusada pelo EDDN ({response.status_code}): {response.text[:200]}")
+        return 'rejected'
+
+def start_eddn_upload(backend_core, upload_url: str = EDDN_UPLOAD_URL) -> EDDNUploader:
+    """Passa a enviar ao EDDN os eventos commitados pelo BackendCore."""
+    uploader = EDDNUploader(backend_core, upload_url)
+    uploader.attach()
+    uploader.start()
+    return uploader
+
+def start_eddn_monitoring(db_path: Optional[str] = None, relay_url: str = EDDN_RELAY_URL,
+                          write_listeners: Optional[List[Callable]] = None) -> EDDNSubscriber:
+    """Inicia o assinante EDDN em threads próprias e o retorna para ser parado depois."""
+    subscriber = EDDNSubscriber(db_path, relay_url)
+    for listener in write_listeners or []:
+        subscriber.add_write_listener(listener)
+    subscriber.start()
+    return subscriber
 
 if __name__ == '__main__':
     pass
@@ -0,0 +1,174 @@
+import math
+import sqlite3
+import logging
+import threading
+from fractions import Fraction
+from functools import lru_cache
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Tuple
+
+from backend.blueprint_data import BLUEPRINTS
+from backend.material_limits import MATERIALS_BY_CATEGORY, get_material
+from main import ACTIVE_COMMANDER_SQL
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Proporções do Material Trader (dentro do mesmo tipo: Raw, Manufactured ou Encoded)
+TRADE_UP_RATIO = 6      # 6 do grau inferior -> 1 do grau seguinte da mesma família
+TRADE_DOWN_RATIO = 3    # 1 do grau superior -> 3 do grau anterior da mesma família
+CROSS_FAMILY_RATIO = 6  # Outra família do mesmo tipo: custo multiplicado por 6
+
+# Planos mantidos em cache (as combinações menos usadas saem primeiro)
+PLAN_CACHE_SIZE = 128
+
+# Eventos do Journal que alteram o inventário de materiais
+INVENTORY_EVENTS = {'Materials', 'MaterialCollected', 'MaterialDiscarded', 'MaterialTrade',
+                    'EngineerCraft', 'Synthesis', 'TechnologyBroker',
+                    # Início de sessão: o inventário exibido passa a ser o de outro comandante
+                    'Commander', 'LoadGame'}
+
+Target = Tuple[str, int, int]  # (blueprint, grau, rolagens)
+
+
+@lru_cache(maxsize=None)
+def conversion_ratio(source: str, target: str) -> Optional[Fraction]:
+    """
+    Unidades de `source` gastas por unidade de `target` no Material Trader,
+    ou None se a troca não existe (tipos diferentes ou material sem família).
+
+    Example:
+        >>> conversion_ratio('Carbon', 'Vanadium')     # sobe um grau
+        Fraction(6, 1)
+        >>> conversion_ratio('Vanadium', 'Carbon')     # desce um grau
+        Fraction(1, 3)
+    """
+    source_info, target_info = get_material(source), get_material(target)
+    if (source_info is None or target_info is None or source_info is target_info
+            or source_info.category != target_info.category
+            or source_info.family is None or target_info.family is None):
+        return None
+    steps = target_info.grade - source_info.grade
+    ratio = Fraction(TRADE_UP_RATIO ** steps) if steps >= 0 else Fraction(1, TRADE_DOWN_RATIO ** -steps)
+    if source_info.family != target_info.family:
+        ratio *= CROSS_FAMILY_RATIO
+    return ratio
+
+
+def material_value(material_name: str) -> int:
+    """Valor de um material em unidades de grau 1 (a troca para cima não perde valor)."""
+    return TRADE_UP_RATIO ** (get_material(material_name).grade - 1)
+
+
+def blueprint_targets(blueprint: str, max_grade: int, rolls_per_grade: int = 1) -> List[Target]:
+    """Alvos para levar um blueprint do grau 1 até `max_grade`, com `rolls_per_grade` rolagens por grau."""
+    grades = BLUEPRINTS.get(blueprint, {})
+    return [(blueprint, grade, rolls_per_grade) for grade in sorted(grades) if grade <= max_grade]
+
+
+def required_materials(targets: List[Target]) -> Dict[str, int]:
+    """Soma os materiais das receitas dos alvos (nome de exibição -> quantidade)."""
+    required: Dict[str, int] = {}
+    for blueprint, grade, rolls in targets:
+        recipe = BLUEPRINTS.get(blueprint, {}).get(grade)
+        if recipe is None:
+            logging.warning(f"Blueprint desconhecido: {blueprint} grau {grade}")
+            continue
+        for material, count in recipe.items():
+            required[material] = required.get(material, 0) + count * rolls
+    return required
+
+
+def solve_conversions(required: Dict[str, int], inventory: Dict[str, int]) -> Dict[str, Any]:
+    """
+    Cobre o que falta com trocas do Material Trader, usando só o excedente
+    (inventário além do que os próprios alvos exigem).
+
+    Guloso de custo mínimo: os déficits de grau mais alto são atendidos
+    primeiro, cada um pela fonte que consome menos valor (em unidades de
+    grau 1) por unidade recebida; no empate, pela fonte com mais excedente.
+    As trocas são feitas em lotes inteiros (ex.: 6 -> 1, 1 -> 3, 2 -> 3).
+    """
+    missing = {name: count - inventory.get(name, 0) for name, count in required.items()
+               if count > inventory.get(name, 0)}
+    surplus = {name: count - required.get(name, 0) for name, count in inventory.items()
+               if count > required.get(name, 0)}
+    trades: List[Dict[str, Any]] = []
+    unresolved: Dict[str, int] = {}
+    cost = 0
+
+    for target in sorted(missing, key=lambda name: (-get_material(name).grade, name)):
+        need = missing[target]
+        candidates = []
+        for source in MATERIALS_BY_CATEGORY.get(get_material(target).category, ()):
+            ratio = conversion_ratio(source, target)
+            if ratio is not None and surplus.get(source, 0) >= ratio.numerator:
+                candidates.append((ratio * material_value(source), -surplus[source], source, ratio))
+        for _, _, source, ratio in sorted(candidates):
+            lots = min(math.ceil(need / ratio.denominator), surplus[source] // ratio.numerator)
+            paid, received = lots * ratio.numerator, lots * ratio.denominator
+            surplus[source] -= paid
+            need -= received
+            cost += paid * material_value(source)
+            trades.append({'source': source, 'paid': paid, 'target': target, 'received': received})
+            if need <= 0:
+                break
+        if need > 0:
+            unresolved[target] = need
+
+    return {'required': required, 'missing': missing, 'trades': trades,
+            'unresolved': unresolved, 'cost': cost}
+
+
+class EngineeringPlanner:
+    """Planejador de engenharia sobre o inventário em pilot_materials.
+
+    Os planos são memorizados por (alvos, estado do inventário): enquanto o
+    inventário não muda, repetir a consulta não refaz a busca, e quando um
+    evento de material altera o inventário só o novo estado é calculado.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, cache_size: int = PLAN_CACHE_SIZE):
+        self.db_path = db_path
+        self.cache_size = cache_size
+        self.cache: 'OrderedDict[Tuple, Dict[str, Any]]' = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def load_inventory(self) -> Dict[str, int]:
+        """Lê pilot_materials (do comandante ativo) e normaliza os símbolos do Journal para nomes de exibição."""
+        inventory: Dict[str, int] = {}
+        try:
+            conn = sqlite3.connect(self.db_path, timeout=30.0)
+            try:
+                rows = conn.execute(f"SELECT material_name, count FROM pilot_materials "
+                                    f"WHERE pilot_name = {ACTIVE_COMMANDER_SQL}").fetchall()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logging.error(f"Erro ao ler inventário de materiais: {e}")
+            return inventory
+        for material_name, count in rows:
+            info = get_material(material_name)
+            if info is not None:
+                inventory[info.name] = inventory.get(info.name, 0) + count
+        return inventory
+
+    def plan(self, targets: List[Target], inventory: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+        """Plano para os alvos: materiais exigidos, faltantes, trocas sugeridas e o que continua faltando."""
+        if inventory is None:
+            inventory = self.load_inventory()
+        key = (tuple(sorted(targets)), tuple(sorted(item for item in inventory.items() if item[1] > 0)))
+        with self.lock:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.cache.move_to_end(key)
+                self.hits += 1
+                return cached
+        result = solve_conversions(required_materials(targets), dict(key[1]))
+        with self.lock:
+            self.misses += 1
+            self.cache[key] = result
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return result
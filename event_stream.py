@@ -0,0 +1,221 @@
+import json
+import time
+import socket
+import logging
+import threading
+from collections import deque
+from typing import Optional, Dict, Any, Iterable, Set, Tuple, List
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Eventos aguardando distribuição. Se o stream não acompanhar a ingestão, os
+# mais antigos são descartados aqui em vez de bloquear process_event.
+INBOX_SIZE = 10000
+
+# Janela de coalescência: após acordar, a thread espera este intervalo (50 ms,
+# imperceptível para overlays) e
+# distribui tudo o que chegou de uma vez
+FLUSH_INTERVAL = 0.05
+
+# Fila de saída de cada cliente, em bytes ainda não aceitos pelo socket.
+# Um cliente com a fila cheia perde os eventos do lote (coalescência) e
+# recebe um aviso "dropped" quando voltar a ter espaço.
+CLIENT_BUFFER_BYTES = 256 * 1024
+
+# Eventos descartados de um cliente antes de ele ser desconectado
+MAX_CLIENT_DROPS = 2000
+
+# Intervalo dos comentários keep-alive para clientes sem eventos
+SSE_KEEPALIVE_SECONDS = 15.0
+
+# (tipo do evento, quadro SSE já codificado)
+StreamItem = Tuple[Optional[str], bytes]
+
+
+def encode_sse_frame(sequence: int, event_type: Optional[str], payload: bytes) -> bytes:
+    """Codifica um evento no formato text/event-stream."""
+    return b"id: %d\nevent: %s\ndata: %s\n\n" % (sequence, str(event_type).encode('utf-8'), payload)
+
+
+class StreamClient:
+    """Cliente conectado ao stream: socket não bloqueante e fila de saída limitada."""
+
+    def __init__(self, sock: socket.socket, event_types: Optional[Set[str]]):
+        self.sock = sock
+        self.event_types = event_types
+        self.pending = bytearray()
+        self.dropped = 0          # Descartes ainda não avisados ao cliente
+        self.total_dropped = 0
+        self.closed = False
+        self.done = threading.Event()
+
+
+class EventStream:
+    """Distribui os eventos commitados para muitos clientes SSE locais.
+
+    publish() é o listener do BackendCore: só faz um append em uma fila
+    limitada e nunca bloqueia a ingestão. Uma única thread serializa cada
+    evento uma vez, agrupa os quadros por tipo e envia o mesmo buffer para
+    todos os clientes interessados por sockets não bloqueantes. O custo por
+    ciclo é O(eventos + clientes), não O(eventos x clientes), e clientes
+    lentos nunca atrasam os demais nem a ingestão.
+    """
+
+    def __init__(self, inbox_size: int = INBOX_SIZE):
+        self.inbox = deque(maxlen=inbox_size)
+        self.inbox_dropped = 0
+        self.lock = threading.Lock()
+        self.clients: List[StreamClient] = []
+        self.sequence = 0
+        self.wakeup = threading.Event()
+        self.running = False
+        self.thread: Optional[threading.Thread] = None
+
+    def attach(self, backend_core) -> None:
+        backend_core.add_event_listener(self.publish)
+
+    def detach(self, backend_core) -> None:
+        backend_core.remove_event_listener(self.publish)
+
+    def start(self) -> None:
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name='edlt-event-stream', daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.running = False
+        self.wakeup.set()
+        if self.thread:
+            self.thread.join(timeout=2.0)
+            self.thread = None
+        with self.lock:
+            clients, self.clients = self.clients, []
+        for client in clients:
+            self._close(client)
+
+    def publish(self, event_data: Dict[str, Any]) -> None:
+        """Enfileira um evento para distribuição sem nunca bloquear o chamador."""
+        if len(self.inbox) == self.inbox.maxlen:
+            self.inbox_dropped += 1
+        self.inbox.append(event_data)
+        if not self.wakeup.is_set():
+            self.wakeup.set()
+
+    def add_client(self, sock: socket.socket, event_types: Optional[Iterable[str]] = None) -> StreamClient:
+        """Passa o socket de um cliente para o stream (filtrado por tipos, se dados)."""
+        client = StreamClient(sock, set(event_types) if event_types else None)
+        sock.setblocking(False)
+        with self.lock:
+            self.clients.append(client)
+        return client
+
+    def remove_client(self, client: StreamClient) -> None:
+        with self.lock:
+            if client in self.clients:
+                self.clients.remove(client)
+        self._close(client)
+
+    def client_count(self) -> int:
+        with self.lock:
+            return len(self.clients)
+
+    def _run(self) -> None:
+        last_keepalive = time.monotonic()
+        while self.running:
+            # Cliente com bytes pendentes (socket cheio) é tentado de novo a
+            # cada FLUSH_INTERVAL, sem esperar o próximo evento ou keepalive
+            self.wakeup.wait(FLUSH_INTERVAL if self._has_pending() else SSE_KEEPALIVE_SECONDS)
+            time.sleep(FLUSH_INTERVAL)
+            self.wakeup.clear()
+
+            batch = []
+            while self.inbox:
+                batch.append(self.inbox.popleft())
+
+            now = time.monotonic()
+            keepalive = now - last_keepalive >= SSE_KEEPALIVE_SECONDS
+            if keepalive:
+                last_keepalive = now
+
+            try:
+                self._distribute(batch, keepalive)
+            except Exception as e:
+                logging.error(f"Erro ao distribuir eventos para o stream: {e}")
+
+    def _has_pending(self) -> bool:
+        with self.lock:
+            return any(client.pending and not client.closed for client in self.clients)
+
+    def _distribute(self, batch: List[Dict[str, Any]], keepalive: bool) -> None:
+        # Serializa cada evento uma única vez para todos os clientes
+        items: List[StreamItem] = []
+        for event_data in batch:
+            event_type = event_data.get('event')
+            self.sequence += 1
+            payload = json.dumps(event_data, ensure_ascii=False).encode('utf-8')
+            items.append((event_type, encode_sse_frame(self.sequence, event_type, payload)))
+
+        # Buffers compartilhados: todos os eventos e os eventos de cada tipo
+        frames_by_type: Dict[Optional[str], List[bytes]] = {}
+        for event_type, frame in items:
+            frames_by_type.setdefault(event_type, []).append(frame)
+        all_data = b"".join(frame for _, frame in items)
+        data_by_type = {event_type: b"".join(frames) for event_type, frames in frames_by_type.items()}
+        counts_by_type = {event_type: len(frames) for event_type, frames in frames_by_type.items()}
+
+        with self.lock:
+            clients = list(self.clients)
+
+        for client in clients:
+            if client.closed:
+                continue
+            data, count = self._data_for_client(client, items, all_data, data_by_type, counts_by_type)
+            if data:
+                self._enqueue(client, data, count)
+            elif keepalive and not client.pending:
+                client.pending += b": keep-alive\n\n"
+            if client.pending:
+                self._flush(client)
+            if client.closed:
+                self.remove_client(client)
+
+    def _data_for_client(self, client: StreamClient, items: List[StreamItem], all_data: bytes,
+                         data_by_type: Dict[Optional[str], bytes],
+                         counts_by_type: Dict[Optional[str], int]) -> Tuple[bytes, int]:
+        if client.event_types is None:
+            return all_data, len(items)
+        if len(client.event_types) == 1:
+            event_type = next(iter(client.event_types))
+            return data_by_type.get(event_type, b""), counts_by_type.get(event_type, 0)
+        # Vários tipos: mantém a ordem original dos eventos
+        frames = [frame for event_type, frame in items if event_type in client.event_types]
+        return b"".join(frames), len(frames)
+
+    def _enqueue(self, client: StreamClient, data: bytes, count: int) -> None:
+        if len(client.pending) + len(data) > CLIENT_BUFFER_BYTES:
+            # Cliente lento: descarta o lote em vez de crescer sem limite
+            client.dropped += count
+            client.total_dropped += count
+            if client.total_dropped > MAX_CLIENT_DROPS:
+                logging.warning(f"Cliente do stream desconectado por lentidão "
+                                f"({client.total_dropped} eventos descartados).")
+                client.closed = True
+            return
+        if client.dropped:
+            client.pending += b"event: dropped\ndata: %d\n\n" % client.dropped
+            client.dropped = 0
+        client.pending += data
+
+    def _flush(self, client: StreamClient) -> None:
+        try:
+            sent = client.sock.send(client.pending)
+            del client.pending[:sent]
+        except (BlockingIOError, InterruptedError):
+            pass
+        except OSError:
+            # Cliente desconectou
+            client.closed = True
+
+    def _close(self, client: StreamClient) -> None:
+        client.closed = True
+        client.done.set()
@@ -0,0 +1,378 @@
+import os
+import re
+import csv
+import json
+import logging
+import sqlite3
+from collections import OrderedDict
+from typing import Optional, List, Callable, Dict, Tuple, Any
+
+from csv_exporter import ExportProgress, EXPORT_BATCH_ROWS, EXPORT_WRITE_BUFFER
+from ingest_policy import decode_event_data
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Eventos de cada tipo lidos antes de fixar as colunas da sua tabela
+SCHEMA_SAMPLE_ROWS = 500
+
+# Limite de eventos retidos em amostras de todos os tipos juntos: acima dele a
+# amostra mais longa é fechada antes da hora (memória limitada)
+MAX_SAMPLED_ROWS = 50000
+
+# Linhas acumuladas por tipo antes de um writerows
+WRITE_BATCH_ROWS = 1000
+
+# Arquivos abertos ao mesmo tempo; os menos usados são fechados e reabertos
+# em modo append quando voltam a receber eventos
+MAX_OPEN_WRITERS = 64
+
+# Esquemas inferidos e marca d'água, gravados no diretório de saída
+EVENT_SCHEMA_FILE = '.edlt_event_schemas.json'
+
+# Campos fora do esquema (ou com tipo incompatível) vão para esta coluna em JSON
+EXTRA_COLUMN = '_extra'
+
+# Colunas fixas no início de toda tabela; 'event' é redundante (um arquivo por tipo)
+LEADING_COLUMNS = [('id', 'int'), ('timestamp', 'str')]
+SKIPPED_FIELDS = {'event', 'timestamp'}
+
+
+# Tipo Python que entra na célula sem conversão, por tipo de coluna
+_EXACT_TYPES = {'str': str, 'int': int, 'float': float}
+
+_JSON_ENCODER = json.JSONEncoder(separators=(',', ':'))
+
+
+def flatten_event(data: Dict[str, Any], prefix: str = '', out: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Achata objetos aninhados em colunas com pontos (Materials.Raw -> 'Materials.Raw').
+
+    Listas continuam como um único valor (gravado em JSON): o número de
+    colunas não pode depender do tamanho de uma lista.
+    """
+    if out is None:
+        out = {}
+    for key, value in data.items():
+        name = prefix + key
+        if isinstance(value, dict) and value:
+            flatten_event(value, name + '.', out)
+        else:
+            out[name] = value
+    return out
+
+
+def value_type(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return 'bool'
+    if isinstance(value, int):
+        return 'int'
+    if isinstance(value, float):
+        return 'float'
+    if isinstance(value, str):
+        return 'str'
+    return 'json'
+
+
+def merge_types(current: Optional[str], new: Optional[str]) -> Optional[str]:
+    if current is None or current == new:
+        return new
+    if new is None:
+        return current
+    if {current, new} == {'int', 'float'}:
+        return 'float'
+    return 'str'
+
+
+def format_value(value: Any, column_type: str) -> Tuple[bool, Any]:
+    """(cabe no tipo da coluna?, valor da célula)."""
+    if value is None:
+        return True, ''
+    if column_type == 'str':
+        return True, value if isinstance(value, str) else _JSON_ENCODER.encode(value)
+    if column_type == 'bool':
+        return (True, 'true' if value else 'false') if isinstance(value, bool) else (False, None)
+    if isinstance(value, bool):
+        return False, None
+    if column_type == 'int':
+        if isinstance(value, int):
+            return True, value
+        if isinstance(value, float) and value.is_integer():
+            return True, int(value)
+        return False, None
+    if column_type == 'float':
+        return (True, value) if isinstance(value, (int, float)) else (False, None)
+    if isinstance(value, (list, dict)):
+        return True, _JSON_ENCODER.encode(value)
+    return False, None
+
+
+def infer_columns(sample: List[Dict[str, Any]]) -> List[Tuple[str, str]]:
+    """Colunas na ordem em que aparecem, com o tipo que acomoda toda a amostra."""
+    types: Dict[str, Optional[str]] = {}
+    for event in sample:
+        for name, value in event.items():
+            types[name] = merge_types(types.get(name), value_type(value))
+    return [(name, column_type or 'str') for name, column_type in types.items()]
+
+
+def _safe_file_name(event_type: str) -> str:
+    return re.sub(r'[^A-Za-z0-9_-]', '_', event_type) or '_'
+
+
+class _EventTable:
+    """Estado de exportação de um tipo de evento."""
+
+    def __init__(self, event_type: str, path: str):
+        self.event_type = event_type
+        self.path = path
+        self.columns: Optional[List[Tuple[str, str]]] = None  # None enquanto amostra
+        self.column_index: Dict[str, int] = {}
+        self.exact_types: List[Optional[type]] = []
+        self.sample: List[Tuple[int, str, Dict[str, Any]]] = []
+        self.rows: List[List[Any]] = []
+        self.new_columns: Dict[str, Optional[str]] = {}
+        self.append = False
+        self.started = False
+        self.row_count = 0
+
+    def set_columns(self, columns: List[Tuple[str, str]]) -> None:
+        self.columns = [column for column in columns if column[0] not in dict(LEADING_COLUMNS)
+                        and column[0] != EXTRA_COLUMN]
+        self.column_index = {name: index for index, (name, _) in enumerate(self.columns)}
+        self.exact_types = [_EXACT_TYPES.get(column_type) for _, column_type in self.columns]
+
+    def header(self) -> List[str]:
+        return [name for name, _ in LEADING_COLUMNS] + [name for name, _ in self.columns] + [EXTRA_COLUMN]
+
+    def add(self, event_id: int, timestamp: str, event: Dict[str, Any]) -> None:
+        cells: List[Any] = [''] * len(self.columns)
+        extra = {}
+        for name, value in event.items():
+            index = self.column_index.get(name)
+            if index is None:
+                extra[name] = value
+                self.new_columns[name] = merge_types(self.new_columns.get(name), value_type(value))
+                continue
+            # Caso comum (valor já no tipo da coluna) sem passar por format_value
+            if type(value) is self.exact_types[index]:
+                cells[index] = value
+                continue
+            fits, cell = format_value(value, self.columns[index][1])
+            if fits:
+                cells[index] = cell
+            else:
+                extra[name] = value
+        self.rows.append([event_id, timestamp] + cells
+                         + [_JSON_ENCODER.encode(extra) if extra else ''])
+
+
+class EventTypeExporter:
+    """Exporta journal_events como uma tabela plana por tipo de evento.
+
+    Uma única passada lê os eventos em ordem de id. As colunas de cada tipo
+    são inferidas das primeiras SCHEMA_SAMPLE_ROWS ocorrências (objetos
+    aninhados viram colunas com pontos) e guardadas em EVENT_SCHEMA_FILE, de
+    modo que exportações seguintes, incrementais ou não, usam o mesmo
+    esquema sem amostrar de novo. Campos que aparecem depois da amostra vão
+    para a coluna _extra (em JSON) e entram no esquema na próxima exportação
+    completa. A memória fica limitada pelas amostras, pelos lotes de escrita
+    e por MAX_OPEN_WRITERS arquivos abertos.
+    """
+
+    def __init__(self, db_path: str):
+        self.DB_PATH = db_path
+
+    def get_db_connection(self) -> Optional[sqlite3.Connection]:
+        try:
+            return sqlite3.connect(self.DB_PATH)
+        except sqlite3.Error as e:
+            logging.error(f"Erro ao conectar ao banco de dados SQLite: {e}")
+            return None
+
+    @staticmethod
+    def load_schema_cache(base_output_dir: str) -> Dict[str, Any]:
+        path = os.path.join(base_output_dir, EVENT_SCHEMA_FILE)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+            return cache if isinstance(cache, dict) else {}
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logging.warning(f"Cache de esquemas ilegível ({e}); inferindo de novo.")
+            return {}
+
+    @staticmethod
+    def save_schema_cache(base_output_dir: str, cache: Dict[str, Any]) -> None:
+        path = os.path.join(base_output_dir, EVENT_SCHEMA_FILE)
+        try:
+            with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(cache, f, indent=1)
+            os.replace(path + '.tmp', path)
+        except OSError as e:
+            logging.error(f"Não foi possível gravar o cache de esquemas: {e}")
+
+    def export(self, base_output_dir: str, progress_callback: Optional[Callable[[int], None]] = None,
+               incremental: bool = False) -> List[str]:
+        """Grava <Tipo>.csv para cada tipo de evento e retorna os arquivos gravados.
+
+        Com incremental, só os eventos com id acima da última exportação para
+        este diretório são acrescentados aos arquivos existentes.
+        """
+        try:
+            os.makedirs(base_output_dir, exist_ok=True)
+        except OSError as e:
+            logging.error(f"Não foi possível criar diretório de saída: {e}")
+            return []
+
+        conn = self.get_db_connection()
+        if not conn:
+            return []
+
+        cache = self.load_schema_cache(base_output_dir)
+        schemas: Dict[str, Any] = cache.get('schemas', {}) if isinstance(cache.get('schemas'), dict) else {}
+        tables: Dict[str, _EventTable] = {}
+        writers: 'OrderedDict[str, Tuple[Any, Any]]' = OrderedDict()
+        try:
+            # Uma transação de leitura: contagem e eventos vêm do mesmo snapshot
+            conn.execute("BEGIN")
+            high_water = conn.execute("SELECT IFNULL(MAX(id), 0) FROM journal_events").fetchone()[0]
+            last_id = cache.get('last_id') if incremental else None
+            if not isinstance(last_id, int) or not 0 <= last_id <= high_water:
+                last_id = 0
+            total = conn.execute("SELECT COUNT(*) FROM journal_events WHERE id > ? AND id <= ?",
+                                 (last_id, high_water)).fetchone()[0]
+            progress = ExportProgress(total, progress_callback)
+            progress.advance(0)
+
+            cursor = conn.execute(
+                "SELECT id, timestamp, event_type, event_data FROM journal_events "
+                "WHERE id > ? AND id <= ? ORDER BY id", (last_id, high_water))
+            sampled = 0
+            while True:
+                rows = cursor.fetchmany(EXPORT_BATCH_ROWS)
+                if not rows:
+                    break
+                for event_id, timestamp, event_type, event_data in rows:
+                    table = tables.get(event_type)
+                    if table is None:
+                        table = self._open_table(base_output_dir, event_type, schemas, last_id > 0)
+                        tables[event_type] = table
+                    try:
+                        event_data = decode_event_data(event_data)
+                        event = json.loads(event_data)
+                        event = flatten_event(event) if isinstance(event, dict) else {'value': event}
+                    except ValueError:
+                        # JSON inválido é preservado como texto
+                        event = {'event_data': event_data}
+                    for name in SKIPPED_FIELDS:
+                        event.pop(name, None)
+
+                    if table.columns is not None:
+                        table.add(event_id, timestamp, event)
+                        if len(table.rows) >= WRITE_BATCH_ROWS:
+                            self._flush(table, writers)
+                        continue
+
+                    table.sample.append((event_id, timestamp, event))
+                    sampled += 1
+                    if len(table.sample) >= SCHEMA_SAMPLE_ROWS:
+                        sampled -= self._close_sample(table, writers)
+                    elif sampled > MAX_SAMPLED_ROWS:
+                        longest = max((t for t in tables.values() if t.sample), key=lambda t: len(t.sample))
+                        sampled -= self._close_sample(longest, writers)
+                progress.advance(len(rows))
+
+            for table in tables.values():
+                if table.columns is None:
+                    self._close_sample(table, writers)
+                self._flush(table, writers)
+            for output, _ in writers.values():
+                output.close()
+            writers.clear()
+
+            exported = []
+            for event_type, table in tables.items():
+                if not table.append:
+                    # Exportação completa: o arquivo do tipo só aparece pronto
+                    os.replace(table.path + '.tmp', table.path)
+                exported.append(table.path)
+                schemas[event_type] = self._schema_entry(table, schemas.get(event_type))
+
+            self.save_schema_cache(base_output_dir, {'last_id': high_water, 'schemas': schemas})
+            progress.finish()
+            logging.info(f"Eventos exportados por tipo: {total} eventos em {len(exported)} arquivos "
+                         f"para {base_output_dir}")
+            return exported
+
+        except (sqlite3.Error, OSError) as e:
+            logging.error(f"Erro ao exportar eventos por tipo: {e}")
+            return []
+        finally:
+            for output, _ in writers.values():
+                output.close()
+            for table in tables.values():
+                if not table.append and os.path.exists(table.path + '.tmp'):
+                    os.remove(table.path + '.tmp')
+            conn.rollback()
+            conn.close()
+
+    def _open_table(self, base_output_dir: str, event_type: str, schemas: Dict[str, Any],
+                    incremental: bool) -> _EventTable:
+        table = _EventTable(event_type, os.path.join(base_output_dir, f"{_safe_file_name(event_type)}.csv"))
+        cached = schemas.get(event_type)
+        if isinstance(cached, dict) and isinstance(cached.get('columns'), list):
+            columns = [tuple(column) for column in cached['columns']]
+            if incremental and os.path.exists(table.path):
+                # O cabeçalho do arquivo existente é o esquema guardado
+                table.append = True
+            else:
+                # Arquivo novo: entram também as colunas vistas depois da amostra
+                columns += [tuple(column) for column in cached.get('pending_columns', [])]
+            table.set_columns(columns)
+        return table
+
+    def _close_sample(self, table: _EventTable, writers: 'OrderedDict[str, Tuple[Any, Any]]') -> int:
+        sampled = len(table.sample)
+        table.set_columns(infer_columns([event for _, _, event in table.sample]))
+        for event_id, timestamp, event in table.sample:
+            table.add(event_id, timestamp, event)
+        table.sample = []
+        self._flush(table, writers)
+        return sampled
+
+    def _flush(self, table: _EventTable, writers: 'OrderedDict[str, Tuple[Any, Any]]') -> None:
+        if not table.rows:
+            return
+        entry = writers.get(table.event_type)
+        if entry is None:
+            if len(writers) >= MAX_OPEN_WRITERS:
+                _, (oldest, _) = writers.popitem(last=False)
+                oldest.close()
+            path = table.path if table.append else table.path + '.tmp'
+            # FIX: UTF-8-BOM para compatibilidade com Excel no Windows
+            output = open(path, 'a' if table.append or table.started else 'w', newline='',
+                          encoding='utf-8-sig', buffering=EXPORT_WRITE_BUFFER)
+            entry = (output, csv.writer(output))
+            if not table.append and not table.started:
+                entry[1].writerow(table.header())
+            table.started = True
+            writers[table.event_type] = entry
+        else:
+            writers.move_to_end(table.event_type)
+        entry[1].writerows(table.rows)
+        table.row_count += len(table.rows)
+        table.rows = []
+
+    @staticmethod
+    def _schema_entry(table: _EventTable, cached: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        pending = {}
+        if table.append and isinstance(cached, dict):
+            pending = {name: column_type for name, column_type in cached.get('pending_columns', [])}
+        for name, column_type in table.new_columns.items():
+            pending[name] = merge_types(pending.get(name), column_type) or 'str'
+        return {
+            'columns': [list(column) for column in table.columns or []],
+            'pending_columns': [[name, column_type] for name, column_type in pending.items()],
+        }
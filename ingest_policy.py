@@ -0,0 +1,248 @@
+"""
+Política de ingestão por tipo de evento, aplicada em process_event antes de
+qualquer acesso ao banco:
+  - store: grava o evento em journal_events e executa os handlers (padrão);
+  - store_compressed: grava o JSON comprimido (zlib com dicionário
+    pré-definido de trechos comuns do Journal) e executa os handlers;
+  - coalesce: guarda em memória só o último evento de cada chave dentro da
+    janela (em tempo do Journal) e o grava quando a janela fecha, ou antes
+    do próximo evento com handlers do mesmo comandante, se o seu tipo também
+    tem handlers (as tabelas derivadas recebem os eventos na ordem do Journal);
+  - sample: grava cerca de 1 a cada `every` eventos do tipo, escolhidos
+    pelo conteúdo (CRC-32 do JSON), e não pela ordem de chegada;
+  - drop: descarta o evento.
+
+Eventos não gravados também não chegam aos listeners (API, EDDN, GUI). O
+hash de duplicatas continua sendo o do JSON original, então reimportar um
+diário escolhe os mesmos eventos. Os contadores edlt_policy_* mostram quantos
+eventos e bytes de JSON cada ação evitou.
+
+A política pode ser ajustada em um arquivo JSON (ver IngestPolicy.load):
+
+    {"Music": "drop",
+     "ReceiveText": {"action": "store"},
+     "NavBeaconScan": {"action": "coalesce", "window": 600, "key": ["SystemAddress"]},
+     "ShipTargeted": {"action": "sample", "every": 20}}
+"""
+
+import json
+import time
+import zlib
+import logging
+import sqlite3
+import threading
+from typing import Optional, Dict, Any, List, NamedTuple, Tuple, Container
+
+from rank_progress import parse_timestamp
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+STORE = 'store'
+STORE_COMPRESSED = 'store_compressed'
+COALESCE = 'coalesce'
+SAMPLE = 'sample'
+DROP = 'drop'
+POLICY_ACTIONS = (STORE, STORE_COMPRESSED, COALESCE, SAMPLE, DROP)
+
+# Arquivo de política procurado ao lado do banco (ver BackendCore.__init__)
+INGEST_POLICY_FILE = 'ingest_policy.json'
+
+# Dicionário pré-definido do zlib: trechos frequentes no JSON gravado por
+# _insert_journal_event (json.dumps com os separadores padrão). Eventos
+# pequenos comprimidos sozinhos quase não encolhem sem ele. Os trechos mais
+# frequentes ficam no fim (distâncias menores). Mudar o conteúdo exige um novo
+# COMPRESSION_VERSION: os eventos já gravados guardam a versão no 1º byte.
+COMPRESSION_VERSION = 1
+COMPRESSION_DICTIONARY = (
+    '"gameversion": "4.0.0.", "build": "r", "language": "English/UK", "Odyssey": true, "part": 1'
+    '"event": "Fileheader", '
+    '"Channel": "npc"}"Channel": "local"}"Channel": "player"}"Channel": "squadron"}"Channel": "wing"}'
+    '"From": "$npc_name_decorate:#name=", "From_Localised": "'
+    '"Message": "$Commuter_"Message": "$Military_"Message": "$Pirate_"Message": "$Police_'
+    '"Message": "$STATION_"Message_Localised": "'
+    '"event": "ReceiveText", "From": "'
+    '"SystemAddress": , "SignalName": "$USS_"SignalName_Localised": "", "USSType": "$USS_Type_'
+    '"IsStation": true}"IsStation": false}"SpawningState": "", "ThreatLevel": '
+    '"event": "FSSSignalDiscovered", '
+    '"event": "NavBeaconScan", "SystemAddress": , "NumBodies": '
+    '{"timestamp": "20'
+).encode('utf-8')
+
+
+class PolicyRule(NamedTuple):
+    """Ação da política para um tipo de evento."""
+    action: str
+    # coalesce: duração da janela em segundos do Journal e campos do evento
+    # que separam as janelas (além do comandante)
+    window: float = 0.0
+    key: Tuple[str, ...] = ()
+    # sample: grava 1 a cada `every` eventos
+    every: int = 1
+
+
+# Eventos frequentes e de pouco valor. Os tipos usados pelos handlers
+# internos ficam em store, exceto FSSSignalDiscovered: o handler de
+# system_data guarda só o último sinal de cada nome, o mesmo que o coalesce
+# por (SystemAddress, SignalName) mantém.
+DEFAULT_INGEST_POLICY: Dict[str, PolicyRule] = {
+    'Music': PolicyRule(DROP),
+    'ReceiveText': PolicyRule(STORE_COMPRESSED),
+    'Fileheader': PolicyRule(STORE_COMPRESSED),
+    'NavBeaconScan': PolicyRule(COALESCE, window=300, key=('SystemAddress',)),
+    'FSSSignalDiscovered': PolicyRule(COALESCE, window=300, key=('SystemAddress', 'SignalName')),
+    'ReservoirReplenished': PolicyRule(COALESCE, window=60),
+    'ShipTargeted': PolicyRule(SAMPLE, every=10),
+}
+
+# (evento, comandante, comprimir?) a gravar
+PolicyWrite = Tuple[Dict[str, Any], Optional[str], bool]
+
+
+def compress_event_json(event_json: str) -> bytes:
+    """JSON do evento comprimido para journal_events.event_data (BLOB)."""
+    compressor = zlib.compressobj(9, zdict=COMPRESSION_DICTIONARY)
+    return bytes((COMPRESSION_VERSION,)) + compressor.compress(event_json.encode('utf-8')) + compressor.flush()
+
+
+def decode_event_data(value: Any) -> Any:
+    """Texto JSON de journal_events.event_data, comprimido (BLOB) ou não."""
+    if not isinstance(value, bytes):
+        return value
+    if value[:1] != bytes((COMPRESSION_VERSION,)):
+        raise ValueError(f"Versão de compressão desconhecida: {value[:1]!r}")
+    decompressor = zlib.decompressobj(zdict=COMPRESSION_DICTIONARY)
+    return (decompressor.decompress(value[1:]) + decompressor.flush()).decode('utf-8')
+
+
+def register_sql_functions(conn: sqlite3.Connection) -> None:
+    """edlt_event_json(event_data): o JSON em texto também para os eventos comprimidos (exportações)."""
+    conn.create_function('edlt_event_json', 1, decode_event_data, deterministic=True)
+
+
+def parse_rule(event_type: str, value: Any) -> PolicyRule:
+    """Regra a partir do arquivo de política: "drop" ou {"action": ..., "window": ..., ...}."""
+    if isinstance(value, str):
+        value = {'action': value}
+    if not isinstance(value, dict) or value.get('action') not in POLICY_ACTIONS:
+        raise ValueError(f"Regra inválida para '{event_type}': {value!r}")
+    rule = PolicyRule(value['action'], float(value.get('window', 0.0)), tuple(value.get('key', ())),
+                      int(value.get('every', 1)))
+    if rule.action == COALESCE and rule.window <= 0:
+        raise ValueError(f"coalesce de '{event_type}' precisa de window > 0")
+    if rule.action == SAMPLE and rule.every < 1:
+        raise ValueError(f"sample de '{event_type}' precisa de every >= 1")
+    return rule
+
+
+class IngestPolicy:
+    """Regras por tipo de evento e o estado de coalesce e sample (seguro entre threads)."""
+
+    def __init__(self, rules: Optional[Dict[str, PolicyRule]] = None, metrics=None):
+        # Tipos sem regra (ou com store) seguem direto para a gravação
+        self.rules: Dict[str, PolicyRule] = {}
+        self.metrics = metrics
+        self.lock = threading.Lock()
+        # (tipo, comandante, valores da chave) -> [início da janela, evento, comandante, momento em que entrou]
+        self.pending: Dict[tuple, list] = {}
+        self.update(DEFAULT_INGEST_POLICY if rules is None else rules)
+
+    def update(self, rules: Dict[str, PolicyRule]) -> None:
+        for event_type, rule in rules.items():
+            if rule.action == STORE:
+                self.rules.pop(event_type, None)
+            else:
+                self.rules[event_type] = rule
+
+    def load(self, path: str) -> bool:
+        """Aplica as regras de um arquivo JSON {tipo: regra} sobre as atuais. False se inválido."""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            rules = {event_type: parse_rule(event_type, value) for event_type, value in data.items()}
+        except (OSError, ValueError, AttributeError) as e:
+            logging.error(f"Política de ingestão ignorada ({path}): {e}")
+            return False
+        self.update(rules)
+        logging.info(f"Política de ingestão carregada de {path} ({len(rules)} regras).")
+        return True
+
+    def admit(self, event_data: Dict[str, Any], commander: Optional[str]) -> List[PolicyWrite]:
+        """Eventos a gravar agora por causa deste (chamado só para tipos com regra)."""
+        event_type = event_data.get('event')
+        rule = self.rules.get(event_type)
+        if rule is None:
+            return [(event_data, commander, False)]
+        if rule.action == STORE_COMPRESSED:
+            return [(event_data, commander, True)]
+        if rule.action == DROP:
+            self._count(rule.action, event_type, event_data)
+            return []
+        if rule.action == SAMPLE:
+            # Escolha pelo conteúdo: a mesma em qualquer importação ou sessão,
+            # então reimportar um diário não grava outro subconjunto
+            event_json = json.dumps(event_data, ensure_ascii=False)
+            if zlib.crc32(event_json.encode('utf-8')) % rule.every == 0:
+                return [(event_data, commander, False)]
+            self._count(rule.action, event_type, event_data)
+            return []
+        return self._coalesce(rule, event_data, commander)
+
+    def _coalesce(self, rule: PolicyRule, event_data: Dict[str, Any], commander: Optional[str]) -> List[PolicyWrite]:
+        event_type = event_data.get('event')
+        started = parse_timestamp(event_data.get('timestamp'))
+        if started is None:
+            return [(event_data, commander, False)]
+        key = (event_type, commander) + tuple(str(event_data.get(name)) for name in rule.key)
+        with self.lock:
+            entry = self.pending.get(key)
+            if entry is not None and 0 <= started - entry[0] < rule.window:
+                replaced = entry[1]
+                entry[1] = event_data
+                entry[2] = commander
+                released = None
+            else:
+                replaced = None
+                released = entry
+                self.pending[key] = [started, event_data, commander, time.monotonic()]
+            pending_count = len(self.pending)
+        if self.metrics:
+            self.metrics.set_gauge('edlt_policy_pending', pending_count)
+        if replaced is not None:
+            self._count(COALESCE, event_type, replaced)
+            return []
+        return [(released[1], released[2], False)] if released else []
+
+    def release(self, expired_only: bool = False, commander: Optional[str] = None,
+                event_types: Optional[Container] = None) -> List[PolicyWrite]:
+        """
+        Eventos guardados pelo coalesce, para gravação: todos (fim da
+        importação ou do monitoramento), só os guardados há mais que a janela
+        (expired_only, chamado quando a gravação está ociosa) ou só os de um
+        comandante com tipo em event_types.
+        """
+        now = time.monotonic()
+        released = []
+        with self.lock:
+            for key, entry in list(self.pending.items()):
+                if expired_only and now - entry[3] < self.rules.get(key[0], PolicyRule(COALESCE)).window:
+                    continue
+                if event_types is not None and (key[1] != commander or key[0] not in event_types):
+                    continue
+                del self.pending[key]
+                released.append(entry)
+            pending_count = len(self.pending)
+        if self.metrics and released:
+            self.metrics.set_gauge('edlt_policy_pending', pending_count)
+        # Em ordem do Journal: a gravação segue o tempo dos eventos guardados
+        # (o último de cada janela), não o início das janelas
+        released.sort(key=lambda entry: parse_timestamp(entry[1].get('timestamp')))
+        return [(entry[1], entry[2], False) for entry in released]
+
+    def has_pending(self) -> bool:
+        return bool(self.pending)
+
+    def _count(self, action: str, event_type: Optional[str], event_data: Dict[str, Any]) -> None:
+        if self.metrics:
+            self.metrics.inc('edlt_policy_events_total', action=action, event=event_type)
+            size = len(json.dumps(event_data, ensure_ascii=False).encode('utf-8'))
+            self.metrics.inc('edlt_policy_bytes_saved_total', size, action=action)
@@ -0,0 +1,368 @@
+"""
+Ingestão em um processo filho, separado da GUI.
+
+O BackendCore roda no processo filho (monitoramento e importação do
+histórico), então a decodificação do JSON, o hash e o SQLite não disputam o
+GIL com a renderização do Qt. O filho publica:
+  - o estado atual dos pilotos (PilotState) em memória compartilhada
+    (StateSnapshot), protegida por um seqlock: a GUI lê o estado sem
+    esperar o escritor e sem consultar o banco;
+  - os eventos gravados, em lotes de pares (evento, comandante), por um
+    Pipe: a GUI repassa cada um aos seus listeners com o comandante certo.
+Os comandos (iniciar/parar o monitoramento, importar o histórico, encerrar)
+vão pelo mesmo Pipe, no sentido contrário.
+"""
+
+import json
+import time
+import struct
+import logging
+import threading
+import multiprocessing
+from collections import deque
+from multiprocessing import shared_memory
+from typing import Optional, Dict, Any, List, Tuple
+
+from main import BackendCore, PILOT_STATUS_EVENTS, UNKNOWN_COMMANDER, active_commander, pilot_status_fields
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Tamanho do bloco de memória compartilhada (cabeçalho + JSON do estado)
+SNAPSHOT_SIZE = 64 * 1024
+
+# Intervalo de publicação do estado e dos eventos: um quadro a 60 Hz
+PUBLISH_INTERVAL = 1.0 / 60
+
+# Eventos retidos no filho enquanto a GUI não os lê (os mais antigos saem
+# primeiro; o banco continua com todos)
+MAX_PENDING_EVENTS = 10000
+
+# Tempo máximo de espera pelo encerramento do processo filho
+SHUTDOWN_TIMEOUT = 10.0
+
+# Cabeçalho do bloco: sequência do seqlock (8 bytes) e tamanho do JSON (4 bytes)
+_SEQUENCE = struct.Struct('<Q')
+_LENGTH = struct.Struct('<I')
+_HEADER_SIZE = _SEQUENCE.size + _LENGTH.size
+
+
+class PilotState:
+    """Estado atual de cada comandante (colunas de pilot_status), mantido em memória pelos eventos."""
+
+    def __init__(self):
+        self.commanders: Dict[str, Dict[str, Any]] = {}
+        self.active: Optional[str] = None
+        self.events = 0
+        self.last_event: Optional[str] = None
+        self.monitoring = False
+        self.backfill_running = False
+        self.dropped_events = 0
+
+    def seed(self, conn) -> None:
+        """Carrega o estado já gravado (uma consulta, antes de começar a receber eventos)."""
+        for row in conn.execute("SELECT * FROM pilot_status"):
+            status = dict(row)
+            status.pop('id', None)
+            self.commanders[status.pop('pilot_name')] = status
+        self.active = active_commander(conn)
+
+    def apply(self, event_data: Dict[str, Any], commander: str) -> None:
+        """Aplica um evento gravado, com as mesmas regras de BackendCore._update_pilot_status."""
+        self.events += 1
+        self.last_event = event_data.get('event')
+        if self.last_event not in PILOT_STATUS_EVENTS:
+            return
+        status = self.commanders.setdefault(commander, {'last_update': event_data.get('timestamp')})
+        fields = pilot_status_fields(event_data)
+        if fields:
+            fields['last_update'] = event_data.get('timestamp')
+            status.update(fields)
+        # Mesma preferência de ACTIVE_COMMANDER_SQL: CMDR_Unknown só se não houver outro
+        if commander != UNKNOWN_COMMANDER or self.active is None:
+            self.active = commander
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Cópia serializável em JSON do estado."""
+        return {
+            'active': self.active,
+            'commanders': {name: dict(status) for name, status in self.commanders.items()},
+            'events': self.events,
+            'last_event': self.last_event,
+            'monitoring': self.monitoring,
+            'backfill_running': self.backfill_running,
+            'dropped_events': self.dropped_events,
+        }
+
+
+class StateSnapshot:
+    """Estado publicado em memória compartilhada com um seqlock.
+
+    Um só escritor: torna a sequência ímpar, grava o JSON e o tamanho e a
+    torna par de novo. O leitor copia o conteúdo e só o aceita se a sequência
+    era par e não mudou durante a cópia; nenhum dos dois espera pelo outro.
+    """
+
+    def __init__(self, name: Optional[str] = None, create: bool = False, size: int = SNAPSHOT_SIZE):
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=size)
+        self.owner = create
+        self.sequence = 0
+        self.read_sequence = 0
+        if create:
+            self.shm.buf[:_HEADER_SIZE] = bytes(_HEADER_SIZE)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def write(self, state: Dict[str, Any]) -> bool:
+        payload = json.dumps(state, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        if len(payload) > self.shm.size - _HEADER_SIZE:
+            logging.error(f"Estado com {len(payload)} bytes não cabe na memória compartilhada.")
+            return False
+        buf = self.shm.buf
+        self.sequence += 1
+        _SEQUENCE.pack_into(buf, 0, self.sequence)
+        buf[_HEADER_SIZE:_HEADER_SIZE + len(payload)] = payload
+        _LENGTH.pack_into(buf, _SEQUENCE.size, len(payload))
+        self.sequence += 1
+        _SEQUENCE.pack_into(buf, 0, self.sequence)
+        return True
+
+    def read(self, only_if_changed: bool = False, attempts: int = 100) -> Optional[Dict[str, Any]]:
+        """Estado mais recente; None se nunca publicado (ou inalterado, com only_if_changed)."""
+        buf = self.shm.buf
+        for _ in range(attempts):
+            sequence = _SEQUENCE.unpack_from(buf, 0)[0]
+            if sequence & 1:
+                continue  # Escrita em andamento
+            if sequence == 0 or (only_if_changed and sequence == self.read_sequence):
+                return None
+            length = _LENGTH.unpack_from(buf, _SEQUENCE.size)[0]
+            payload = bytes(buf[_HEADER_SIZE:_HEADER_SIZE + length])
+            if _SEQUENCE.unpack_from(buf, 0)[0] != sequence:
+                continue  # Sobrescrito durante a cópia
+            self.read_sequence = sequence
+            return json.loads(payload.decode('utf-8'))
+        return None
+
+    def close(self) -> None:
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class StatePublisher:
+    """No processo filho: acumula eventos e estado e os publica a cada PUBLISH_INTERVAL."""
+
+    def __init__(self, backend_core, snapshot: StateSnapshot, conn, send_lock: threading.Lock):
+        self.backend_core = backend_core
+        self.snapshot = snapshot
+        self.conn = conn
+        self.send_lock = send_lock
+        self.lock = threading.Lock()
+        self.state = PilotState()
+        self.pending = deque(maxlen=MAX_PENDING_EVENTS)
+        self.dirty = True
+        self.stop_event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        conn = self.backend_core.get_db_connection()
+        if conn:
+            try:
+                self.state.seed(conn)
+            except Exception as e:
+                logging.error(f"Erro ao carregar o estado do piloto: {e}")
+            finally:
+                conn.close()
+        self.backend_core.add_event_listener(self.on_event)
+        self.thread = threading.Thread(target=self._run, name='edlt-state-publisher', daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.backend_core.remove_event_listener(self.on_event)
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=2.0)
+        self.publish()
+
+    def on_event(self, event_data: Dict[str, Any]) -> None:
+        """Listener de eventos (thread de gravação): só atualiza a memória."""
+        commander = self.backend_core.current_commander()
+        with self.lock:
+            if len(self.pending) == self.pending.maxlen:
+                self.state.dropped_events += 1
+            self.pending.append((event_data, commander))
+            self.state.apply(event_data, commander)
+            self.dirty = True
+
+    def update(self, **fields: Any) -> None:
+        """Altera campos de controle do estado (monitoring, backfill_running)."""
+        with self.lock:
+            for name, value in fields.items():
+                setattr(self.state, name, value)
+            self.dirty = True
+
+    def publish(self) -> None:
+        with self.lock:
+            if not self.dirty:
+                return
+            state = self.state.snapshot()
+            events = list(self.pending)
+            self.pending.clear()
+            self.dirty = False
+        self.snapshot.write(state)
+        if events:
+            with self.send_lock:
+                self.conn.send(('events', events))
+
+    def _run(self) -> None:
+        while not self.stop_event.wait(PUBLISH_INTERVAL):
+            try:
+                self.publish()
+            except (OSError, EOFError):
+                break  # GUI encerrada
+            except Exception as e:
+                logging.error(f"Erro ao publicar o estado: {e}")
+
+
+def _child_main(conn, journal_dirs: List[str], db_path: str, snapshot_name: str,
+                plugins_dir: Optional[str]) -> None:
+    """Processo filho: BackendCore, publicador de estado e laço de comandos."""
+    # O bloco pertence à GUI (quem o remove); com spawn o filho usa o mesmo
+    # resource_tracker do pai, e abri-lo aqui não muda o registro
+    snapshot = StateSnapshot(snapshot_name)
+    send_lock = threading.Lock()
+
+    def send(*message) -> None:
+        with send_lock:
+            conn.send(message)
+
+    core = BackendCore(journal_dirs, db_path=db_path)
+    core.load_plugins(plugins_dir)
+    publisher = StatePublisher(core, snapshot, conn, send_lock)
+    publisher.start()
+    backfill_thread: Optional[threading.Thread] = None
+
+    def run_backfill() -> None:
+        try:
+            imported = core.backfill()
+            publisher.update(backfill_running=False)
+            send('backfill_finished', imported)
+        except Exception as e:
+            publisher.update(backfill_running=False)
+            send('error', f"Erro na importação do histórico: {e}")
+
+    try:
+        while True:
+            try:
+                command, args = conn.recv()
+            except EOFError:
+                break  # GUI encerrada sem 'shutdown'
+            if command == 'start':
+                core.start_monitoring()
+                publisher.update(monitoring=core.is_running)
+                if not core.is_running:
+                    send('error', "Nenhum arquivo de diário encontrado para monitorar.")
+            elif command == 'stop':
+                core.stop_monitoring()
+                publisher.update(monitoring=False)
+            elif command == 'backfill':
+                if backfill_thread and backfill_thread.is_alive():
+                    continue
+                publisher.update(backfill_running=True)
+                backfill_thread = threading.Thread(target=run_backfill, name='edlt-backfill', daemon=True)
+                backfill_thread.start()
+            elif command == 'set_journal_dirs':
+                core.journal_dirs = list(args[0])
+            elif command == 'shutdown':
+                break
+    finally:
+        core.stop_monitoring()
+        if backfill_thread:
+            backfill_thread.join(timeout=SHUTDOWN_TIMEOUT)
+        try:
+            publisher.stop()
+        except (OSError, EOFError):
+            pass
+        snapshot.close()
+        conn.close()
+
+
+class IngestProcess:
+    """Lado da GUI: inicia o processo filho, envia comandos e lê estado e eventos."""
+
+    def __init__(self, journal_dirs: List[str], db_path: str, plugins_dir: Optional[str] = None):
+        self.journal_dirs = list(journal_dirs)
+        self.db_path = db_path
+        self.plugins_dir = plugins_dir
+        self.process = None
+        self.conn = None
+        self.snapshot: Optional[StateSnapshot] = None
+
+    def start(self) -> None:
+        # spawn: um fork do processo da GUI copiaria o estado das threads do Qt
+        context = multiprocessing.get_context('spawn')
+        self.snapshot = StateSnapshot(create=True)
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_child_main, name='edlt-ingest', daemon=True,
+                                       args=(child_conn, self.journal_dirs, self.db_path, self.snapshot.name,
+                                             self.plugins_dir))
+        self.process.start()
+        child_conn.close()
+        logging.info(f"Processo de ingestão iniciado (pid {self.process.pid}).")
+
+    def is_alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+    def send(self, command: str, *args: Any) -> None:
+        try:
+            self.conn.send((command, args))
+        except (OSError, AttributeError) as e:
+            logging.error(f"Processo de ingestão indisponível ({command}): {e}")
+
+    def start_monitoring(self) -> None:
+        self.send('set_journal_dirs', self.journal_dirs)
+        self.send('start')
+
+    def stop_monitoring(self) -> None:
+        self.send('stop')
+
+    def backfill(self) -> None:
+        self.send('set_journal_dirs', self.journal_dirs)
+        self.send('backfill')
+
+    def read_state(self, only_if_changed: bool = True) -> Optional[Dict[str, Any]]:
+        """Estado publicado pelo filho, sem bloquear e sem consultar o banco."""
+        return self.snapshot.read(only_if_changed) if self.snapshot else None
+
+    def poll(self) -> List[Tuple]:
+        """Mensagens recebidas do filho desde a última chamada, sem bloquear."""
+        messages = []
+        try:
+            while self.conn is not None and self.conn.poll():
+                messages.append(self.conn.recv())
+        except (OSError, EOFError):
+            pass
+        return messages
+
+    def shutdown(self, timeout: float = SHUTDOWN_TIMEOUT) -> None:
+        """Para o monitoramento (gravando os eventos já lidos) e encerra o filho."""
+        if self.process is None:
+            return
+        self.send('shutdown')
+        deadline = time.monotonic() + timeout
+        # Esvazia o Pipe enquanto espera: o filho pode estar bloqueado enviando eventos
+        while self.process.is_alive() and time.monotonic() < deadline:
+            self.poll()
+            self.process.join(timeout=0.05)
+        if self.process.is_alive():
+            logging.error("Processo de ingestão não encerrou a tempo; finalizando.")
+            self.process.terminate()
+            self.process.join(timeout=2.0)
+        self.conn.close()
+        self.conn = None
+        self.snapshot.close()
+        self.snapshot = None
+        self.process = None
+        logging.info("Processo de ingestão encerrado.")
@@ -0,0 +1,157 @@
+import os
+import json
+import time
+import logging
+from typing import Optional, Dict, Any, Callable
+from watchdog.events import FileSystemEventHandler
+
+
+def parse_journal_line(line: str) -> Optional[Dict[str, Any]]:
+    """Decodifica uma linha do Journal; None para linhas vazias ou inválidas (com log)."""
+    # FIX: Validação aprimorada de JSON
+    line = line.strip()
+    if not line:
+        return None
+
+    try:
+        event_data = json.loads(line)
+    except json.JSONDecodeError as e:
+        logging.error(f"Erro ao decodificar JSON: {e} na linha: {line[:100]}")
+        return None
+
+    # FIX: Validar estrutura básica do evento
+    if not isinstance(event_data, dict):
+        logging.warning(f"Evento não é um objeto JSON válido: {line[:50]}")
+        return None
+
+    if 'event' not in event_data or 'timestamp' not in event_data:
+        logging.warning(f"Evento sem campos obrigatórios (event/timestamp): {line[:50]}")
+        return None
+
+    return event_data
+
+
+class JournalFileMonitor(FileSystemEventHandler):
+    """Manipulador de eventos do Watchdog para monitorar a escrita no arquivo de diário."""
+    
+    def __init__(self, journal_path: str, event_processor_callback: Callable, metrics=None):
+        self.journal_path = journal_path
+        self.file_handle = None
+        self.event_processor_callback = event_processor_callback
+        # MetricsRegistry opcional (tempo de leitura/decodificação, fila, erros)
+        self.metrics = metrics
+        # Trecho final lido sem '\n': o jogo pode gravar uma linha em mais de
+        # um flush, e a linha só é processada quando chega completa. Em bytes:
+        # o flush pode cortar um caractere UTF-8 de vários bytes ao meio (nomes
+        # com acento, ReceiveText), então só linhas completas são decodificadas
+        self.partial_line = b''
+        self.open_file()
+
+    def open_file(self, from_start: bool = False) -> None:
+        """Abre o arquivo de diário e move o ponteiro para o final (ou o início, se from_start)."""
+        self.partial_line = b''
+        if self.file_handle:
+            try:
+                self.file_handle.close()
+            except:
+                pass
+        
+        # FIX: Retry logic para race conditions
+        max_retries = 3
+        for attempt in range(max_retries):
+            try:
+                self.file_handle = open(self.journal_path, 'rb')
+                if not from_start:
+                    self.file_handle.seek(0, os.SEEK_END)
+                logging.info(f"Monitorando o arquivo: {self.journal_path}")
+                return
+            except (IOError, OSError) as e:
+                if attempt < max_retries - 1:
+                    time.sleep(0.5)
+                    logging.warning(f"Tentativa {attempt + 1}/{max_retries} falhou, tentando novamente...")
+                else:
+                    logging.error(f"Não foi possível abrir após {max_retries} tentativas: {e}")
+                    self.file_handle = None
+
+    def on_modified(self, event):
+        """Chamado quando o arquivo de diário é modificado."""
+        if event.src_path == self.journal_path and not event.is_directory:
+            self.read_new_lines()
+
+    # FIX: Detectar novos arquivos de journal
+    def on_created(self, event):
+        """Chamado quando um novo arquivo é criado."""
+        if (not event.is_directory and 
+            event.src_path.endswith('.log') and 
+            'Journal.' in os.path.basename(event.src_path)):
+            
+            new_file = event.src_path
+            if os.path.getmtime(new_file) >= os.path.getmtime(self.journal_path):
+                logging.info(f"Novo arquivo de journal detectado: {new_file}")
+                # Termina o arquivo anterior e lê o novo desde o início: o jogo
+                # pode ter gravado linhas nele antes desta notificação chegar
+                self.read_new_lines()
+                if self.partial_line:
+                    logging.warning(f"Linha incompleta descartada no fim de {self.journal_path}")
+                self.journal_path = new_file
+                self.open_file(from_start=True)
+                self.read_new_lines()
+
+    def read_new_lines(self) -> None:
+        """Lê e processa as novas linhas adicionadas ao arquivo."""
+        if not self.file_handle:
+            self.open_file()
+            if not self.file_handle:
+                return
+
+        start = time.perf_counter()
+        try:
+            new_data = self.file_handle.read()
+        except (IOError, OSError) as e:
+            self._count_error(type(e).__name__)
+            logging.error(f"Erro ao ler arquivo: {e}")
+            self.open_file()
+            return
+        if self.metrics:
+            self.metrics.observe('edlt_stage_seconds', time.perf_counter() - start, stage='read')
+        if not new_data:
+            return
+
+        lines = (self.partial_line + new_data).split(b'\n')
+        self.partial_line = lines.pop()
+        for index, raw_line in enumerate(lines):
+            if self.metrics:
+                self.metrics.set_gauge('edlt_queue_depth', len(lines) - index, queue='journal_lines')
+                start = time.perf_counter()
+            try:
+                line = raw_line.decode('utf-8')
+            except UnicodeDecodeError as e:
+                self._count_error('InvalidJournalLine')
+                logging.error(f"Linha do diário com UTF-8 inválido ({e}): {raw_line[:100]!r}")
+                continue
+            event_data = parse_journal_line(line)
+            if self.metrics:
+                self.metrics.observe('edlt_stage_seconds', time.perf_counter() - start, stage='decode')
+            if event_data is None:
+                if line.strip():
+                    self._count_error('InvalidJournalLine')
+                continue
+            try:
+                self.event_processor_callback(event_data)
+            except Exception as e:
+                self._count_error(type(e).__name__)
+                logging.error(f"Erro desconhecido ao processar linha: {e}")
+        if self.metrics:
+            self.metrics.set_gauge('edlt_queue_depth', 0, queue='journal_lines')
+
+    def _count_error(self, error_type: str) -> None:
+        if self.metrics:
+            self.metrics.inc('edlt_errors_total', type=error_type)
+
+    def stop(self) -> None:
+        """Fecha o handle do arquivo."""
+        if self.file_handle:
+            try:
+                self.file_handle.close()
+            except:
+                pass
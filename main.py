@@ -5,9 +5,17 @@ import logging
 import threading
 import sqlite3
 import hashlib
-from typing import Optional, Dict, Any, Callable
-from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler
+import importlib.util
+from typing import Optional, Dict, Any, Callable, List, Iterable, NamedTuple, Tuple, Union
+
+from backend.material_limits import get_material
+from metrics import MetricsRegistry
+from maintenance import RETENTION_FILE, DatabaseMaintenance, enable_incremental_vacuum
+from diagnostics import SLOW_EVENT_THRESHOLD_MS, SLOW_SQL_THRESHOLD_MS, SamplingProfiler, SlowLog
+from ingest_policy import (INGEST_POLICY_FILE, STORE_COMPRESSED, COALESCE, IngestPolicy, compress_event_json,
+                           PolicyWrite)
+from rank_progress import (RANK_EVENTS, RANK_EVENT_TYPES, backfill_rank_history, rank_event_values,
+                           record_sample, recompute_rank_rates)
 
 # Configuração de Logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -16,6 +24,276 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 JOURNAL_DIR = os.path.expanduser('~/Saved Games/Frontier Developments/Elite Dangerous')
 SQLITE_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'edlt.db')
 
+# Versão do schema gravada em PRAGMA user_version. Bancos criados antes do
+# controle de versão (user_version = 0) equivalem à versão 1.
+SCHEMA_VERSION = 4
+
+# Piloto dos eventos gravados antes de se saber o comandante da sessão
+UNKNOWN_COMMANDER = 'CMDR_Unknown'
+
+# Comandante ativo: o de status atualizado mais recentemente, preferindo um
+# comandante conhecido. Subconsulta usada pelas visualizações, pela API e pelo
+# planejador de engenharia para filtrar as tabelas derivadas.
+ACTIVE_COMMANDER_SQL = (f"(SELECT pilot_name FROM pilot_status "
+                        f"ORDER BY pilot_name = '{UNKNOWN_COMMANDER}', last_update DESC LIMIT 1)")
+
+
+def _migrate_rank_history(conn: sqlite3.Connection) -> None:
+    """Versão 2: histórico de ranques (preenchido pela versão 3, já por comandante)."""
+    conn.executescript("""
+    CREATE TABLE IF NOT EXISTS rank_progress_history (
+        pilot_name TEXT NOT NULL,
+        rank_type TEXT NOT NULL,
+        timestamp INTEGER NOT NULL,
+        rank INTEGER NOT NULL,
+        progress REAL NOT NULL CHECK(progress >= 0.0 AND progress <= 1.0),
+        PRIMARY KEY (pilot_name, rank_type, timestamp)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS rank_progress_state (
+        pilot_name TEXT NOT NULL,
+        rank_type TEXT NOT NULL,
+        rank INTEGER NOT NULL,
+        progress REAL NOT NULL,
+        timestamp INTEGER NOT NULL,
+        rate REAL,
+        base_position REAL,
+        base_timestamp INTEGER,
+        base_rate REAL,
+        PRIMARY KEY (pilot_name, rank_type)
+    );
+    """)
+    conn.commit()
+
+
+class CommanderTracker:
+    """Comandante da sessão de jogo de uma fonte de diário.
+
+    Só Commander e LoadGame trazem o nome do comandante; ele vale para os
+    eventos seguintes até o início de uma nova sessão (Fileheader da parte 1).
+    As partes seguintes de um diário longo continuam a mesma sessão.
+    """
+
+    # Trechos das linhas que podem mudar o comandante (filtro de scan antes do json.loads)
+    LINE_MARKERS = ('"Fileheader"', '"Commander"', '"LoadGame"')
+
+    def __init__(self):
+        self.commander: Optional[str] = None
+
+    def update(self, event_data: Dict[str, Any]) -> Optional[str]:
+        """Atualiza a sessão com o evento e retorna o comandante ao qual ele pertence."""
+        event_type = event_data.get('event')
+        if event_type == 'Fileheader' and event_data.get('part', 1) == 1:
+            self.commander = None
+        elif event_type == 'Commander':
+            self.commander = event_data.get('Name') or self.commander
+        elif event_type == 'LoadGame':
+            self.commander = event_data.get('Commander') or self.commander
+        return self.commander
+
+    def scan(self, path: str) -> Optional[str]:
+        """Lê um diário já existente para saber o comandante antes de segui-lo a partir do final."""
+        from journal_monitor import parse_journal_line
+
+        try:
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                for line in f:
+                    if any(marker in line for marker in self.LINE_MARKERS):
+                        event_data = parse_journal_line(line)
+                        if event_data is not None:
+                            self.update(event_data)
+        except OSError as e:
+            logging.error(f"Erro ao ler o comandante de {path}: {e}")
+        return self.commander
+
+
+class ActiveCommanderWatch:
+    """Percebe, pelos eventos gravados, quando o comandante ativo pode ter mudado.
+
+    O comandante ativo (ACTIVE_COMMANDER_SQL) é o de pilot_status com o
+    last_update mais recente, e só os eventos de PILOT_STATUS_EVENTS o
+    alteram: com várias contas, um FSDJump de outra conta já o troca. Quem
+    guarda dados do comandante ativo (cache da API, planejador) os invalida
+    quando changed() retorna True.
+    """
+
+    def __init__(self):
+        self.commander: Optional[str] = None
+
+    def changed(self, event_data: Dict[str, Any], commander: str) -> bool:
+        """True se o evento, do comandante `commander`, pode ter trocado o comandante ativo."""
+        if event_data.get('event') not in PILOT_STATUS_EVENTS or commander == self.commander:
+            return False
+        self.commander = commander
+        return True
+
+
+def _rebuild_table(conn: sqlite3.Connection, table: str, create_sql: str, select_sql: str,
+                   params: Tuple = ()) -> None:
+    """Recria `table` com `create_sql` (chave primária nova) copiando as linhas por `select_sql`."""
+    conn.execute(f"ALTER TABLE {table} RENAME TO {table}_old")
+    conn.execute(create_sql)
+    conn.execute(f"INSERT INTO {table} {select_sql.format(old=table + '_old')}", params)
+    conn.execute(f"DROP TABLE {table}_old")
+
+
+def _migrate_commanders(conn: sqlite3.Connection) -> None:
+    """
+    Versão 3: eventos e tabelas derivadas por comandante (pilot_name). Cada
+    evento gravado recebe o comandante da sua sessão; as tabelas de estado
+    atual (materiais, módulos, sistema, status) ficam com o último comandante
+    conhecido, e o lucro com o comandante do evento que o gerou.
+    """
+    conn.execute("BEGIN TRANSACTION")
+    conn.execute("ALTER TABLE journal_events ADD COLUMN pilot_name TEXT")
+
+    # Sessões como faixas de id: (primeiro id, comandante)
+    tracker = CommanderTracker()
+    sessions: List[Tuple[int, Optional[str]]] = []
+    rows = conn.execute("SELECT id, event_data FROM journal_events "
+                        "WHERE event_type IN ('Fileheader', 'Commander', 'LoadGame') ORDER BY id").fetchall()
+    for event_id, event_json in rows:
+        try:
+            commander = tracker.update(json.loads(event_json))
+        except ValueError:
+            continue
+        if not sessions or sessions[-1][1] != commander:
+            sessions.append((event_id, commander))
+    for index, (first_id, commander) in enumerate(sessions):
+        if commander is None:
+            continue
+        if index + 1 < len(sessions):
+            conn.execute("UPDATE journal_events SET pilot_name = ? WHERE id >= ? AND id < ?",
+                         (commander, first_id, sessions[index + 1][0]))
+        else:
+            conn.execute("UPDATE journal_events SET pilot_name = ? WHERE id >= ?", (commander, first_id))
+    latest = next((commander for _, commander in reversed(sessions) if commander), UNKNOWN_COMMANDER)
+
+    _rebuild_table(conn, 'pilot_materials', """
+    CREATE TABLE pilot_materials (
+        pilot_name TEXT NOT NULL,
+        material_name TEXT NOT NULL,
+        category TEXT NOT NULL,
+        count INTEGER NOT NULL CHECK(count >= 0),
+        PRIMARY KEY (pilot_name, material_name)
+    )""", "SELECT ?, material_name, category, count FROM {old}", (latest,))
+    _rebuild_table(conn, 'ship_modules', """
+    CREATE TABLE ship_modules (
+        pilot_name TEXT NOT NULL,
+        ship_id INTEGER NOT NULL,
+        slot TEXT NOT NULL,
+        module TEXT NOT NULL,
+        health REAL NOT NULL CHECK(health >= 0.0 AND health <= 1.0),
+        PRIMARY KEY (pilot_name, ship_id, slot)
+    )""", "SELECT ?, ship_id, slot, module, health FROM {old}", (latest,))
+    _rebuild_table(conn, 'system_data', """
+    CREATE TABLE system_data (
+        pilot_name TEXT NOT NULL,
+        name TEXT NOT NULL,
+        system_name TEXT NOT NULL,
+        type TEXT NOT NULL,
+        distance_ls REAL,
+        data_json TEXT,
+        PRIMARY KEY (pilot_name, name)
+    )""", "SELECT ?, name, system_name, type, distance_ls, data_json FROM {old}", (latest,))
+
+    conn.execute(f"ALTER TABLE pilot_profit ADD COLUMN pilot_name TEXT NOT NULL DEFAULT '{UNKNOWN_COMMANDER}'")
+    placeholders = ", ".join("?" for _ in PROFIT_EVENTS)
+    conn.execute(f"""
+    UPDATE pilot_profit SET pilot_name = IFNULL((
+        SELECT e.pilot_name FROM journal_events e
+        WHERE e.timestamp = pilot_profit.timestamp AND e.event_type IN ({placeholders})
+          AND e.pilot_name IS NOT NULL LIMIT 1), ?)
+    """, tuple(PROFIT_EVENTS) + (latest,))
+
+    # Antes só os raros eventos com 'Commander' tinham nome: o resto do status
+    # estava em CMDR_Unknown
+    conn.execute("UPDATE pilot_status SET pilot_name = ? WHERE pilot_name = ? "
+                 "AND NOT EXISTS (SELECT 1 FROM pilot_status WHERE pilot_name = ?)",
+                 (latest, UNKNOWN_COMMANDER, latest))
+    conn.execute("DELETE FROM rank_progress_history")
+    conn.execute("DELETE FROM rank_progress_state")
+    samples = backfill_rank_history(conn)
+    conn.commit()
+    logging.info(f"Eventos atribuídos a {len({c for _, c in sessions if c})} comandantes; "
+                 f"histórico de ranques reconstruído: {samples} amostras.")
+
+
+def _migrate_rank_rates(conn: sqlite3.Connection) -> None:
+    """
+    Versão 4: recalcula o ritmo dos ranques a partir do histórico. As
+    versões anteriores começavam o ritmo com o primeiro intervalo, mesmo de
+    poucos segundos (Rank e Progress do login), e a previsão ficava inútil
+    por semanas (ver rank_progress.MIN_RATE_SEED_HOURS).
+    """
+    conn.execute("BEGIN TRANSACTION")
+    rates = recompute_rank_rates(conn)
+    conn.commit()
+    logging.info(f"Ritmo de progresso recalculado para {rates} ranques.")
+
+
+# Pasta padrão dos plugins (ver BackendCore.load_plugins)
+PLUGINS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'plugins')
+
+# Tipos de evento de cada handler interno de process_event
+PILOT_STATUS_EVENTS = RANK_EVENTS | {'Location', 'FSDJump', 'Loadout', 'ShipyardSwap', 'Commander', 'LoadGame'}
+PROFIT_EVENTS = {'MarketSell', 'Bounty', 'MultiSellExplorationData', 'SellOrganicData'}
+MATERIAL_CHANGE_EVENTS = {'MaterialCollected', 'MaterialDiscarded', 'MaterialTrade',
+                          'EngineerCraft', 'Synthesis', 'TechnologyBroker'}
+SYSTEM_DATA_EVENTS = {'FSDJump', 'Location', 'Scan', 'FSSSignalDiscovered'}
+
+
+class EventHandler(NamedTuple):
+    """Handler de process_event registrado para um ou mais tipos de evento."""
+    name: str
+    callback: Callable[[sqlite3.Connection, Dict[str, Any]], None]
+    # Isolado: roda em um SAVEPOINT e uma falha só desfaz o que ele gravou,
+    # sem descartar o evento (padrão dos plugins)
+    isolated: bool
+
+
+# Migrações por versão de destino: {versão: função(conn)}
+SCHEMA_MIGRATIONS: Dict[int, Callable[[sqlite3.Connection], None]] = {
+    2: _migrate_rank_history,
+    3: _migrate_commanders,
+    4: _migrate_rank_rates,
+}
+
+
+def active_commander(conn: sqlite3.Connection) -> Optional[str]:
+    """Nome do comandante ativo (ver ACTIVE_COMMANDER_SQL); None se o banco não tem status."""
+    return conn.execute(f"SELECT {ACTIVE_COMMANDER_SQL}").fetchone()[0]
+
+
+def pilot_status_fields(event_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Colunas de pilot_status alteradas pelo evento (dicionário vazio se nenhuma)."""
+    update_fields: Dict[str, Any] = {}
+    event_type = event_data.get('event')
+
+    # Ranques e progresso (Rank, Progress, Promotion) - FIX: Validação de limites
+    if event_type in RANK_EVENTS:
+        for rank_type, (rank, progress) in rank_event_values(event_data).items():
+            if rank is not None:
+                update_fields[f'rank_{rank_type.lower()}'] = rank
+            if progress is not None:
+                update_fields[f'progress_{rank_type.lower()}'] = progress
+
+    # Localização
+    elif event_type in ['Location', 'FSDJump']:
+        update_fields['system_name'] = event_data.get('StarSystem')
+        update_fields['station_name'] = event_data.get('StationName')
+
+    # Ship
+    elif event_type in ['Loadout', 'ShipyardSwap', 'LoadGame']:
+        update_fields['ship_id'] = event_data.get('ShipID')
+        update_fields['ship_name'] = event_data.get('ShipName')
+        update_fields['ship_model'] = event_data.get('Ship')
+
+    # Início de sessão: o comandante passa a ser o ativo
+    elif event_type == 'Commander':
+        update_fields['last_update'] = event_data.get('timestamp')
+    return update_fields
+
+
 # --- Funções Auxiliares de Arquivo ---
 
 def get_latest_journal_file(directory: str) -> Optional[str]:
@@ -35,117 +313,206 @@ def get_latest_journal_file(directory: str) -> Optional[str]:
         return None
 
 
-class JournalFileMonitor(FileSystemEventHandler):
-    """Manipulador de eventos do Watchdog para monitorar a escrita no arquivo de diário."""
-    
-    def __init__(self, journal_path: str, event_processor_callback: Callable):
-        self.journal_path = journal_path
-        self.file_handle = None
-        self.event_processor_callback = event_processor_callback
-        self.open_file()
-
-    def open_file(self) -> None:
-        """Abre o arquivo de diário e move o ponteiro para o final."""
-        if self.file_handle:
-            try:
-                self.file_handle.close()
-            except:
-                pass
-        
-        # FIX: Retry logic para race conditions
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                self.file_handle = open(self.journal_path, 'r', encoding='utf-8')
-                self.file_handle.seek(0, os.SEEK_END)
-                logging.info(f"Monitorando o arquivo: {self.journal_path}")
-                return
-            except (IOError, OSError) as e:
-                if attempt < max_retries - 1:
-                    time.sleep(0.5)
-                    logging.warning(f"Tentativa {attempt + 1}/{max_retries} falhou, tentando novamente...")
-                else:
-                    logging.error(f"Não foi possível abrir após {max_retries} tentativas: {e}")
-                    self.file_handle = None
-
-    def on_modified(self, event):
-        """Chamado quando o arquivo de diário é modificado."""
-        if event.src_path == self.journal_path and not event.is_directory:
-            self.read_new_lines()
-
-    # FIX: Detectar novos arquivos de journal
-    def on_created(self, event):
-        """Chamado quando um novo arquivo é criado."""
-        if (not event.is_directory and 
-            event.src_path.endswith('.log') and 
-            'Journal.' in os.path.basename(event.src_path)):
-            
-            new_file = event.src_path
-            if os.path.getmtime(new_file) > os.path.getmtime(self.journal_path):
-                logging.info(f"Novo arquivo de journal detectado: {new_file}")
-                self.journal_path = new_file
-                self.open_file()
-
-    def read_new_lines(self) -> None:
-        """Lê e processa as novas linhas adicionadas ao arquivo."""
-        if not self.file_handle:
-            self.open_file()
-            if not self.file_handle:
-                return
+def journal_sort_key(path: str) -> str:
+    """
+    Chave cronológica de um arquivo de diário. Os nomes antigos
+    ('Journal.YYMMDDHHMMSS.XX.log') são convertidos para o formato atual
+    ('Journal.YYYY-MM-DDTHHMMSS.XX.log') para que os dois ordenem juntos.
+    """
+    name = os.path.basename(path)
+    parts = name.split('.')
+    if len(parts) == 4 and len(parts[1]) == 12 and parts[1].isdigit():
+        stamp = parts[1]
+        return f"20{stamp[0:2]}-{stamp[2:4]}-{stamp[4:6]}T{stamp[6:]}.{parts[2]}"
+    return '.'.join(parts[1:-1])
 
-        try:
-            new_data = self.file_handle.readlines()
-        except (IOError, OSError) as e:
-            logging.error(f"Erro ao ler arquivo: {e}")
-            self.open_file()
-            return
-        
-        for line in new_data:
-            try:
-                # FIX: Validação aprimorada de JSON
-                line = line.strip()
-                if not line:
-                    continue
-                    
-                event_data = json.loads(line)
-                
-                # FIX: Validar estrutura básica do evento
-                if not isinstance(event_data, dict):
-                    logging.warning(f"Evento não é um objeto JSON válido: {line[:50]}")
-                    continue
-                
-                if 'event' not in event_data or 'timestamp' not in event_data:
-                    logging.warning(f"Evento sem campos obrigatórios (event/timestamp): {line[:50]}")
-                    continue
-                
-                self.event_processor_callback(event_data)
-                
-            except json.JSONDecodeError as e:
-                logging.error(f"Erro ao decodificar JSON: {e} na linha: {line[:100]}")
-            except Exception as e:
-                logging.error(f"Erro desconhecido ao processar linha: {e}")
 
-    def stop(self) -> None:
-        """Fecha o handle do arquivo."""
-        if self.file_handle:
-            try:
-                self.file_handle.close()
-            except:
-                pass
+def get_journal_files(directory: str) -> List[str]:
+    """Lista os arquivos de diário do diretório em ordem cronológica."""
+    try:
+        files = [os.path.join(directory, f) for f in os.listdir(directory)
+                 if f.startswith('Journal.') and f.endswith('.log')]
+    except OSError as e:
+        logging.error(f"Erro ao listar arquivos de diário em {directory}: {e}")
+        return []
+    return sorted(files, key=journal_sort_key)
 
 
 # --- Core do Backend ---
 
 class BackendCore:
-    def __init__(self, journal_dir: str):
-        self.JOURNAL_DIR = journal_dir
-        self.observer = None
-        self.event_handler = None
-        self.monitoring_thread = None
+    def __init__(self, journal_dir: Union[str, List[str]], initialize: bool = True, db_path: Optional[str] = None):
+        # Diretórios de diário monitorados juntos (um por conta/instalação do jogo)
+        self.journal_dirs: List[str] = [journal_dir] if isinstance(journal_dir, str) else list(journal_dir)
+        # Núcleo assíncrono da ingestão (async_ingest.IngestLoop), criado em start_monitoring
+        self.ingest = None
         self.is_running = False
-        self.db_path = SQLITE_DB_PATH
+        self.db_path = db_path or SQLITE_DB_PATH
         self.event_count = 0  # FIX: Contador para logging menos verboso
-        self.initialize_db()
+        # Comandante do evento em processamento, por thread: cada fonte grava
+        # na sua própria thread (ver current_commander)
+        self.session = threading.local()
+        # Contadores e latências por etapa (visualização Diagnóstico e /metrics)
+        self.metrics = MetricsRegistry()
+        # Eventos e comandos SQL lentos (diagnostics.SlowLog). O rastreamento de
+        # SQL (trace_sql) tem custo por comando e fica desligado por padrão.
+        self.slow_events = SlowLog(SLOW_EVENT_THRESHOLD_MS)
+        self.slow_sql = SlowLog(SLOW_SQL_THRESHOLD_MS)
+        self.trace_sql = False
+        # Tipo de evento -> handlers, na ordem de registro. Eventos sem handler
+        # são gravados só em journal_events, sem SQL nas tabelas derivadas.
+        self.event_handlers: Dict[str, Tuple[EventHandler, ...]] = {}
+        self._register_builtin_handlers()
+        # Política por tipo de evento (store, store_compressed, coalesce,
+        # sample, drop), aplicada antes do banco; ingest_policy.json ao lado
+        # do banco ajusta as regras padrão
+        self.ingest_policy = IngestPolicy(metrics=self.metrics)
+        policy_path = os.path.join(os.path.dirname(os.path.abspath(self.db_path)), INGEST_POLICY_FILE)
+        if os.path.exists(policy_path):
+            self.load_ingest_policy(policy_path)
+        # Retenção, compactação e ANALYZE em segundo plano (ver maintenance),
+        # executados pelo gravador da ingestão quando está ocioso;
+        # retention.json ao lado do banco ajusta os prazos padrão
+        self.maintenance = DatabaseMaintenance(metrics=self.metrics)
+        retention_path = os.path.join(os.path.dirname(os.path.abspath(self.db_path)), RETENTION_FILE)
+        if os.path.exists(retention_path):
+            self.maintenance.load(retention_path)
+        # Thread que executou o último process_event (alvo do profiler)
+        self.ingest_thread: Optional[int] = None
+        self.profiler: Optional[SamplingProfiler] = None
+        # Callbacks chamados com cada evento após o commit (ver add_event_listener)
+        self.event_listeners: List[Callable[[Dict[str, Any]], None]] = []
+        # A GUI passa initialize=False e chama initialize_db() em segundo plano
+        if initialize:
+            self.initialize_db()
+
+    @property
+    def JOURNAL_DIR(self) -> str:
+        """Diretório de diário principal (o primeiro de journal_dirs)."""
+        return self.journal_dirs[0]
+
+    @JOURNAL_DIR.setter
+    def JOURNAL_DIR(self, directory: str) -> None:
+        self.journal_dirs = [directory]
+
+    def current_commander(self) -> str:
+        """
+        Comandante do evento que está sendo processado nesta thread. Handlers e
+        listeners o usam para gravar nas partições (pilot_name) certas.
+        """
+        return getattr(self.session, 'commander', None) or UNKNOWN_COMMANDER
+
+    def add_event_listener(self, callback: Callable[[Dict[str, Any]], None]) -> None:
+        """Registra um callback chamado com cada evento novo após o commit.
+
+        Os callbacks rodam na thread de ingestão e devem ser rápidos
+        (apenas enfileirar ou atualizar estado em memória).
+        """
+        self.event_listeners.append(callback)
+
+    def remove_event_listener(self, callback: Callable[[Dict[str, Any]], None]) -> None:
+        """Remove um callback registrado com add_event_listener."""
+        if callback in self.event_listeners:
+            self.event_listeners.remove(callback)
+
+    def notify_event_listeners(self, event_data: Dict[str, Any], commander: Optional[str] = None) -> None:
+        """
+        Chama os listeners com um evento já gravado fora desta instância (por
+        exemplo, pelo processo de ingestão), com `commander` como comandante
+        da sessão durante os callbacks (ver current_commander).
+        """
+        previous = getattr(self.session, 'commander', None)
+        self.session.commander = commander
+        try:
+            self._notify_event_listeners(event_data)
+        finally:
+            self.session.commander = previous
+
+    def _notify_event_listeners(self, event_data: Dict[str, Any]) -> None:
+        with self.metrics.timer('edlt_stage_seconds', stage='listeners'):
+            for callback in list(self.event_listeners):
+                try:
+                    callback(event_data)
+                except Exception as e:
+                    self.metrics.inc('edlt_errors_total', type=type(e).__name__)
+                    logging.error(f"Erro em listener de eventos: {e}")
+
+    # --- Registro de Handlers ---
+
+    def register_handler(self, event_types: Iterable[str],
+                         callback: Callable[[sqlite3.Connection, Dict[str, Any]], None],
+                         name: Optional[str] = None, isolated: bool = True) -> EventHandler:
+        """
+        Registra um handler chamado por process_event, dentro da transação do
+        evento, para cada evento dos tipos informados: callback(conn, event_data).
+        Handlers isolados (o padrão, para plugins) rodam em um SAVEPOINT: se
+        lançarem exceção, só as alterações deles são desfeitas e o evento é
+        gravado normalmente. Retorna o registro, para unregister_handler.
+        """
+        handler = EventHandler(name or getattr(callback, '__name__', repr(callback)), callback, isolated)
+        for event_type in event_types:
+            # Tuplas novas a cada registro: process_event lê o registro sem lock
+            self.event_handlers[event_type] = self.event_handlers.get(event_type, ()) + (handler,)
+        return handler
+
+    def unregister_handler(self, handler: EventHandler) -> None:
+        """Remove um handler registrado com register_handler de todos os seus tipos."""
+        for event_type, handlers in list(self.event_handlers.items()):
+            remaining = tuple(h for h in handlers if h is not handler)
+            if remaining:
+                self.event_handlers[event_type] = remaining
+            else:
+                del self.event_handlers[event_type]
+
+    def _register_builtin_handlers(self) -> None:
+        # Não isolados: uma falha nas tabelas principais desfaz o evento inteiro
+        self.register_handler(PILOT_STATUS_EVENTS, self._update_pilot_status, isolated=False)
+        self.register_handler(PROFIT_EVENTS, self._update_pilot_profit, isolated=False)
+        self.register_handler({'Materials'}, self._update_pilot_materials, isolated=False)
+        self.register_handler(MATERIAL_CHANGE_EVENTS, self._apply_material_changes, isolated=False)
+        self.register_handler(SYSTEM_DATA_EVENTS, self._update_system_data, isolated=False)
+        self.register_handler({'Loadout'}, self._update_ship_modules, isolated=False)
+
+    def load_plugins(self, directory: Optional[str] = None) -> List[str]:
+        """
+        Carrega os plugins (*.py) de `directory` (padrão: PLUGINS_DIR). Cada
+        plugin define register(backend_core) e nele chama register_handler ou
+        add_event_listener. Um plugin com erro é ignorado (com log).
+        Retorna os nomes dos plugins carregados.
+        """
+        directory = directory or PLUGINS_DIR
+        try:
+            names = sorted(f for f in os.listdir(directory) if f.endswith('.py') and not f.startswith('_'))
+        except FileNotFoundError:
+            return []
+        except OSError as e:
+            logging.error(f"Erro ao listar plugins em {directory}: {e}")
+            return []
+
+        loaded = []
+        for file_name in names:
+            module_name = f"edlt_plugin_{file_name[:-3]}"
+            try:
+                spec = importlib.util.spec_from_file_location(module_name, os.path.join(directory, file_name))
+                module = importlib.util.module_from_spec(spec)
+                spec.loader.exec_module(module)
+                module.register(self)
+                loaded.append(file_name[:-3])
+            except Exception as e:
+                logging.error(f"Erro ao carregar o plugin {file_name}: {e}")
+        if loaded:
+            logging.info(f"Plugins carregados: {', '.join(loaded)}")
+        return loaded
+
+    def load_ingest_policy(self, path: str) -> bool:
+        """Aplica as regras do arquivo de política (ver ingest_policy); avisa sobre tipos com handlers."""
+        if not self.ingest_policy.load(path):
+            return False
+        for event_type, rule in self.ingest_policy.rules.items():
+            if rule.action not in (STORE_COMPRESSED, COALESCE) and event_type in self.event_handlers:
+                logging.warning(f"Política '{rule.action}' para '{event_type}': as tabelas derivadas "
+                                f"deixarão de receber parte desses eventos.")
+        return True
 
     # --- Funções de Banco de Dados (SQLite) ---
 
@@ -161,19 +528,26 @@ class BackendCore:
             logging.error(f"Erro ao conectar ao banco de dados SQLite: {e}")
             return None
 
-    def initialize_db(self) -> None:
-        """Cria as tabelas se não existirem."""
+    def initialize_db(self) -> bool:
+        """Aplica migrações pendentes e cria as tabelas se não existirem."""
         conn = self.get_db_connection()
         if not conn:
-            return
+            return False
 
         try:
             schema_path = os.path.join(os.path.dirname(__file__), 'sqlite_schema.sql')
             with open(schema_path, 'r', encoding='utf-8') as f:
                 sql_script = f.read()
+            # Antes das tabelas: num banco novo o auto_vacuum só vale se definido
+            # antes delas. Bancos existentes não são convertidos aqui (VACUUM
+            # completo; ver daemon.py --convert-incremental-vacuum)
+            enable_incremental_vacuum(conn)
+            # Migrações antes do script: índices novos podem depender de colunas migradas
+            self._apply_migrations(conn)
             conn.executescript(sql_script)
             conn.commit()
             logging.info("Banco de dados SQLite inicializado com sucesso.")
+            return True
         except FileNotFoundError:
             logging.error(f"Arquivo de schema não encontrado: {schema_path}")
         except Exception as e:
@@ -181,34 +555,72 @@ class BackendCore:
         finally:
             if conn:
                 conn.close()
+        return False
+
+    def _apply_migrations(self, conn: sqlite3.Connection) -> None:
+        """Migra bancos existentes até SCHEMA_VERSION (usa conexão existente)."""
+        current_version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if current_version >= SCHEMA_VERSION:
+            return
+
+        has_tables = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'journal_events'"
+        ).fetchone()
 
-    def _insert_journal_event(self, conn: sqlite3.Connection, event_data: Dict[str, Any]) -> Optional[int]:
-        """Insere o evento JSON bruto na tabela journal_events (usa conexão existente)."""
+        # Banco novo: o script de schema já cria a versão mais recente
+        if has_tables:
+            for version in range(max(current_version, 1) + 1, SCHEMA_VERSION + 1):
+                migration = SCHEMA_MIGRATIONS.get(version)
+                if migration:
+                    logging.info(f"Aplicando migração do banco de dados para a versão {version}...")
+                    migration(conn)
+
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+
+    def _insert_journal_event(self, conn: sqlite3.Connection, event_data: Dict[str, Any],
+                              commander: Optional[str] = None, compress: bool = False) -> Optional[int]:
+        """
+        Insere o evento JSON bruto na tabela journal_events (usa conexão
+        existente); com compress, o JSON vai comprimido (ingest_policy).
+        """
         try:
             cursor = conn.cursor()
             
             timestamp = event_data.get('timestamp')
             event_type = event_data.get('event')
-            event_json_str = json.dumps(event_data, ensure_ascii=False)
-            
-            # FIX: Hash do JSON completo para melhor detecção de duplicatas
-            unique_str = f"{timestamp}{event_type}{event_json_str}"
-            event_hash = hashlib.sha256(unique_str.encode('utf-8')).hexdigest()
+            with self.metrics.timer('edlt_stage_seconds', stage='hash'):
+                event_json_str = json.dumps(event_data, ensure_ascii=False)
+
+                # FIX: Hash do JSON completo para melhor detecção de duplicatas
+                unique_str = f"{timestamp}{event_type}{event_json_str}"
+                event_hash = hashlib.sha256(unique_str.encode('utf-8')).hexdigest()
+
+            stored_data: Union[str, bytes] = event_json_str
+            if compress:
+                stored_data = compress_event_json(event_json_str)
 
             sql = """
-            INSERT OR IGNORE INTO journal_events (timestamp, event_type, event_data, event_hash)
-            VALUES (?, ?, ?, ?)
+            INSERT OR IGNORE INTO journal_events (timestamp, event_type, event_data, event_hash, pilot_name)
+            VALUES (?, ?, ?, ?, ?)
             """
             
-            cursor.execute(sql, (timestamp, event_type, event_json_str, event_hash))
+            with self.metrics.timer('edlt_stage_seconds', stage='insert'):
+                cursor.execute(sql, (timestamp, event_type, stored_data, event_hash, commander))
             
             if cursor.rowcount > 0:
+                if compress:
+                    self.metrics.inc('edlt_policy_events_total', action=STORE_COMPRESSED, event=event_type)
+                    self.metrics.inc('edlt_policy_bytes_saved_total',
+                                     len(event_json_str.encode('utf-8')) - len(stored_data), action=STORE_COMPRESSED)
                 # FIX: Logging menos verboso
                 self.event_count += 1
+                self.metrics.inc('edlt_events_total')
                 if self.event_count % 10 == 0:
                     logging.info(f"{self.event_count} eventos processados (último: '{event_type}')")
                 return cursor.lastrowid
             else:
+                self.metrics.inc('edlt_duplicates_total')
                 return None  # Evento duplicado
 
         except sqlite3.Error as e:
@@ -220,39 +632,14 @@ class BackendCore:
         try:
             cursor = conn.cursor()
             
-            pilot_name = event_data.get('Commander', 'CMDR_Unknown')
+            pilot_name = self.current_commander()
             
             cursor.execute("INSERT OR IGNORE INTO pilot_status (pilot_name, last_update) VALUES (?, ?)", 
                           (pilot_name, event_data.get('timestamp')))
             
-            update_fields = {}
-            
+            update_fields = pilot_status_fields(event_data)
             event_type = event_data.get('event')
             
-            # Ranques
-            if event_type == 'Rank':
-                for rank_type in ['Combat', 'Trade', 'Explore', 'CQC', 'Federation', 'Empire']:
-                    if rank_type in event_data:
-                        update_fields[f'rank_{rank_type.lower()}'] = event_data[rank_type]
-            
-            # Progresso - FIX: Validação de limites
-            elif event_type == 'Progress':
-                for rank_type in ['Combat', 'Trade', 'Explore', 'CQC', 'Federation', 'Empire']:
-                    if rank_type in event_data:
-                        progress = min(max(event_data[rank_type] / 100.0, 0.0), 1.0)
-                        update_fields[f'progress_{rank_type.lower()}'] = progress
-            
-            # Localização
-            elif event_type in ['Location', 'FSDJump']:
-                update_fields['system_name'] = event_data.get('StarSystem')
-                update_fields['station_name'] = event_data.get('StationName')
-                
-            # Ship
-            elif event_type in ['Loadout', 'ShipyardSwap']:
-                update_fields['ship_id'] = event_data.get('ShipID')
-                update_fields['ship_name'] = event_data.get('ShipName')
-                update_fields['ship_model'] = event_data.get('Ship')
-            
             if update_fields:
                 update_fields['last_update'] = event_data.get('timestamp')
                 
@@ -263,10 +650,23 @@ class BackendCore:
                 sql = f"UPDATE pilot_status SET {set_clause} WHERE pilot_name = ?"
                 cursor.execute(sql, params)
 
+            if event_type in RANK_EVENTS:
+                self._record_rank_progress(conn, pilot_name, event_data)
+
         except sqlite3.Error as e:
             logging.error(f"Erro ao atualizar status do piloto: {e}")
             raise
 
+    def _record_rank_progress(self, conn: sqlite3.Connection, pilot_name: str, event_data: Dict[str, Any]) -> None:
+        """Acrescenta ao histórico os ranques alterados pelo evento (usa conexão existente)."""
+        columns = ", ".join(f"rank_{rank_type.lower()}, progress_{rank_type.lower()}" for rank_type in RANK_EVENT_TYPES)
+        row = conn.execute(f"SELECT {columns} FROM pilot_status WHERE pilot_name = ?", (pilot_name,)).fetchone()
+        if row is None:
+            return
+        for rank_type in rank_event_values(event_data):
+            index = RANK_EVENT_TYPES.index(rank_type) * 2
+            record_sample(conn, pilot_name, rank_type, event_data.get('timestamp'), row[index], row[index + 1])
+
     def _update_pilot_materials(self, conn: sqlite3.Connection, event_data: Dict[str, Any]) -> None:
         """Atualiza o inventário de materiais (usa conexão existente)."""
         if event_data.get('event') != 'Materials':
@@ -275,32 +675,81 @@ class BackendCore:
         try:
             cursor = conn.cursor()
             
-            cursor.execute("DELETE FROM pilot_materials")
+            pilot_name = self.current_commander()
+            cursor.execute("DELETE FROM pilot_materials WHERE pilot_name = ?", (pilot_name,))
             
-            materials = (event_data.get('Raw', []) + 
-                        event_data.get('Manufactured', []) + 
-                        event_data.get('Encoded', []))
-            
-            for material in materials:
-                name = material.get('Name')
-                count = material.get('Count', 0)
-                category = material.get('Category', 'Unknown')
-                
-                if name and count >= 0:
-                    sql = "INSERT INTO pilot_materials (material_name, category, count) VALUES (?, ?, ?)"
-                    cursor.execute(sql, (name, category, count))
+            # O evento agrupa os materiais por categoria; as entradas não trazem 'Category'
+            for category in ('Raw', 'Manufactured', 'Encoded'):
+                for material in event_data.get(category, []):
+                    name = material.get('Name')
+                    count = material.get('Count', 0)
+                    
+                    if name and count >= 0:
+                        sql = "INSERT INTO pilot_materials (pilot_name, material_name, category, count) VALUES (?, ?, ?, ?)"
+                        cursor.execute(sql, (pilot_name, name, category, count))
+
+        except sqlite3.Error as e:
+            logging.error(f"Erro ao atualizar inventário de materiais: {e}")
+            raise
+
+    def _apply_material_changes(self, conn: sqlite3.Connection, event_data: Dict[str, Any]) -> None:
+        """Aplica ao inventário as variações de coleta, descarte, troca e consumo (usa conexão existente)."""
+        event_type = event_data.get('event')
+        changes = []  # (símbolo, categoria informada, variação)
+        if event_type == 'MaterialCollected':
+            changes.append((event_data.get('Name'), event_data.get('Category'), event_data.get('Count', 0)))
+        elif event_type == 'MaterialDiscarded':
+            changes.append((event_data.get('Name'), event_data.get('Category'), -event_data.get('Count', 0)))
+        elif event_type == 'MaterialTrade':
+            paid, received = event_data.get('Paid', {}), event_data.get('Received', {})
+            changes.append((paid.get('Material'), paid.get('Category'), -paid.get('Quantity', 0)))
+            changes.append((received.get('Material'), received.get('Category'), received.get('Quantity', 0)))
+        elif event_type in ('EngineerCraft', 'Synthesis', 'TechnologyBroker'):
+            ingredients = event_data.get('Ingredients' if event_type == 'EngineerCraft' else 'Materials', [])
+            for material in ingredients:
+                changes.append((material.get('Name'), material.get('Category'), -material.get('Count', 0)))
+
+        try:
+            cursor = conn.cursor()
+            pilot_name = self.current_commander()
+            for name, category, delta in changes:
+                if not name or not delta:
+                    continue
+                name = name.lower()
+                info = get_material(name)
+                if info is not None:
+                    category = info.category
+                elif category not in ('Raw', 'Manufactured', 'Encoded'):
+                    category = 'Unknown'
+                cursor.execute("INSERT INTO pilot_materials (pilot_name, material_name, category, count) "
+                               "VALUES (?, ?, ?, MAX(0, ?)) "
+                               "ON CONFLICT(pilot_name, material_name) DO UPDATE SET count = MAX(0, count + ?)",
+                               (pilot_name, name, category, delta, delta))
 
         except sqlite3.Error as e:
             logging.error(f"Erro ao atualizar inventário de materiais: {e}")
             raise
 
+    def _update_pilot_profit(self, conn: sqlite3.Connection, event_data: Dict[str, Any]) -> None:
+        """Registra o lucro de vendas, recompensas e dados de exploração (usa conexão existente)."""
+        event_type = event_data.get('event')
+        if event_type == 'MarketSell':
+            profit = event_data.get('SellPrice', 0) * event_data.get('Count', 0)
+            self._insert_pilot_profit(conn, event_data, 'TRADE', profit)
+        elif event_type == 'Bounty':
+            self._insert_pilot_profit(conn, event_data, 'BOUNTY', event_data.get('Reward', 0))
+        elif event_type == 'MultiSellExplorationData':
+            self._insert_pilot_profit(conn, event_data, 'EXPLORATION', event_data.get('TotalEarnings', 0))
+        elif event_type == 'SellOrganicData':
+            self._insert_pilot_profit(conn, event_data, 'EXOBIOLOGY', event_data.get('TotalEarnings', 0))
+
     def _insert_pilot_profit(self, conn: sqlite3.Connection, event_data: Dict[str, Any], 
                             profit_type: str, amount: int) -> None:
         """Insere um registro de lucro (usa conexão existente)."""
         try:
             cursor = conn.cursor()
-            sql = "INSERT INTO pilot_profit (timestamp, profit_type, amount) VALUES (?, ?, ?)"
-            cursor.execute(sql, (event_data.get('timestamp'), profit_type, amount))
+            sql = "INSERT INTO pilot_profit (timestamp, profit_type, amount, pilot_name) VALUES (?, ?, ?, ?)"
+            cursor.execute(sql, (event_data.get('timestamp'), profit_type, amount, self.current_commander()))
 
         except sqlite3.Error as e:
             logging.error(f"Erro ao inserir lucro: {e}")
@@ -316,34 +765,36 @@ class BackendCore:
             if not system_name:
                 return
 
+            pilot_name = self.current_commander()
             if event_type == 'FSDJump':
-                cursor.execute("DELETE FROM system_data WHERE system_name != ?", (system_name,))
+                cursor.execute("DELETE FROM system_data WHERE pilot_name = ? AND system_name != ?",
+                               (pilot_name, system_name))
                 
             if event_type in ['FSDJump', 'Location'] and 'Body' in event_data:
                 star_name = event_data.get('Body')
                 star_data = json.dumps(event_data, ensure_ascii=False)
                 
-                sql = "INSERT OR REPLACE INTO system_data (name, system_name, type, distance_ls, data_json) VALUES (?, ?, ?, ?, ?)"
-                cursor.execute(sql, (star_name, system_name, 'STAR', 0.0, star_data))
+                sql = "INSERT OR REPLACE INTO system_data (pilot_name, name, system_name, type, distance_ls, data_json) VALUES (?, ?, ?, ?, ?, ?)"
+                cursor.execute(sql, (pilot_name, star_name, system_name, 'STAR', 0.0, star_data))
                 
                 if event_data.get('StationName'):
                     station_name = event_data.get('StationName')
-                    cursor.execute(sql, (station_name, system_name, 'STATION', None, star_data))
+                    cursor.execute(sql, (pilot_name, station_name, system_name, 'STATION', None, star_data))
                     
             elif event_type == 'Scan':
                 body_name = event_data.get('BodyName')
                 body_type = event_data.get('BodyType', 'Unknown')
                 distance = event_data.get('DistanceFromArrivalLS')
                 
-                sql = "INSERT OR REPLACE INTO system_data (name, system_name, type, distance_ls, data_json) VALUES (?, ?, ?, ?, ?)"
-                cursor.execute(sql, (body_name, system_name, body_type, distance, 
+                sql = "INSERT OR REPLACE INTO system_data (pilot_name, name, system_name, type, distance_ls, data_json) VALUES (?, ?, ?, ?, ?, ?)"
+                cursor.execute(sql, (pilot_name, body_name, system_name, body_type, distance, 
                                    json.dumps(event_data, ensure_ascii=False)))
                 
             elif event_type == 'FSSSignalDiscovered':
                 signal_name = event_data.get('SignalName')
                 
-                sql = "INSERT OR REPLACE INTO system_data (name, system_name, type, distance_ls, data_json) VALUES (?, ?, ?, ?, ?)"
-                cursor.execute(sql, (signal_name, system_name, 'SIGNAL', None, 
+                sql = "INSERT OR REPLACE INTO system_data (pilot_name, name, system_name, type, distance_ls, data_json) VALUES (?, ?, ?, ?, ?, ?)"
+                cursor.execute(sql, (pilot_name, signal_name, system_name, 'SIGNAL', None, 
                                    json.dumps(event_data, ensure_ascii=False)))
 
         except sqlite3.Error as e:
@@ -358,8 +809,9 @@ class BackendCore:
         try:
             cursor = conn.cursor()
             ship_id = event_data.get('ShipID')
+            pilot_name = self.current_commander()
             
-            cursor.execute("DELETE FROM ship_modules WHERE ship_id = ?", (ship_id,))
+            cursor.execute("DELETE FROM ship_modules WHERE pilot_name = ? AND ship_id = ?", (pilot_name, ship_id))
             
             modules = event_data.get('Modules', [])
             
@@ -369,107 +821,299 @@ class BackendCore:
                 health = min(max(module.get('Health', 1.0), 0.0), 1.0)  # FIX: Validar range
                 
                 if slot and item:
-                    sql = "INSERT INTO ship_modules (ship_id, slot, module, health) VALUES (?, ?, ?, ?)"
-                    cursor.execute(sql, (ship_id, slot, item, health))
+                    sql = "INSERT INTO ship_modules (pilot_name, ship_id, slot, module, health) VALUES (?, ?, ?, ?, ?)"
+                    cursor.execute(sql, (pilot_name, ship_id, slot, item, health))
 
         except sqlite3.Error as e:
             logging.error(f"Erro ao atualizar módulos da nave: {e}")
             raise
 
+    def _run_handler(self, timings: Dict[str, float], handler: EventHandler, conn: sqlite3.Connection,
+                     event_data: Dict[str, Any]) -> None:
+        """Executa um handler registrando o tempo do seu SQL (em timings e nas métricas)."""
+        start = time.perf_counter()
+        try:
+            if not handler.isolated:
+                handler.callback(conn, event_data)
+                return
+            conn.execute("SAVEPOINT edlt_handler")
+            try:
+                handler.callback(conn, event_data)
+            except Exception as e:
+                conn.execute("ROLLBACK TO edlt_handler")
+                self.metrics.inc('edlt_errors_total', type=type(e).__name__)
+                self.metrics.inc('edlt_handler_errors_total', handler=handler.name)
+                logging.error(f"Erro no handler '{handler.name}' ao processar '{event_data.get('event')}': {e}")
+            finally:
+                conn.execute("RELEASE edlt_handler")
+        finally:
+            elapsed = time.perf_counter() - start
+            timings[handler.name] = timings.get(handler.name, 0.0) + elapsed
+            self.metrics.observe('edlt_handler_seconds', elapsed, handler=handler.name)
+
+    def process_event(self, event_data: Dict[str, Any], commander: Optional[str] = None) -> None:
+        """
+        Processa um evento do diário: grava o evento bruto em journal_events e
+        chama, na mesma transação, os handlers registrados para o seu tipo.
+        `commander` é o comandante da sessão da fonte (ver CommanderTracker);
+        sem ele, o evento fica com UNKNOWN_COMMANDER. Tipos com regra na
+        política de ingestão passam antes por ela, sem tocar no banco.
+        """
+        event_type = event_data.get('event')
+        if event_type in self.ingest_policy.rules:
+            self._write_events(self.ingest_policy.admit(event_data, commander))
+            return
+        if self.ingest_policy.pending and event_type in self.event_handlers:
+            # Eventos guardados pelo coalesce que alteram tabelas derivadas vão antes deste
+            self._write_events(self.ingest_policy.release(commander=commander, event_types=self.event_handlers))
+        self._write_event(event_data, commander)
+
+    def _write_events(self, writes: List[PolicyWrite]) -> None:
+        for event_data, commander, compress in writes:
+            self._write_event(event_data, commander, compress)
+
+    def flush_ingest_policy(self, expired_only: bool = False) -> int:
+        """
+        Grava os eventos guardados pelo coalesce da política: todos, ou só os
+        de janela vencida (expired_only). Retorna quantos foram entregues.
+        """
+        writes = self.ingest_policy.release(expired_only)
+        self._write_events(writes)
+        return len(writes)
+
     # FIX: Usar uma única transação para processar eventos
-    def process_event(self, event_data: Dict[str, Any]) -> None:
-        """Processa um evento do diário e o insere no banco de dados."""
-        
+    def _write_event(self, event_data: Dict[str, Any], commander: Optional[str] = None,
+                     compress: bool = False) -> None:
         conn = self.get_db_connection()
         if not conn:
             return
 
+        self.ingest_thread = threading.get_ident()
+        self.session.commander = commander
+        timings: Dict[str, float] = {}
+        statements: Optional[List[tuple]] = None
+        if self.trace_sql:
+            # Instante de início de cada comando; a duração vai até o início do seguinte
+            statements = []
+            conn.set_trace_callback(lambda sql: statements.append((time.perf_counter(), sql)))
+
+        start = time.perf_counter()
         try:
             conn.execute("BEGIN TRANSACTION")
             
-            event_id = self._insert_journal_event(conn, event_data)
+            event_id = self._insert_journal_event(conn, event_data, commander, compress)
+            timings['_insert_journal_event'] = time.perf_counter() - start
             if event_id is None:
                 conn.rollback()
                 return  # Evento duplicado
 
-            event_type = event_data.get('event')
-
-            self._update_pilot_status(conn, event_data)
-            
-            # Processar lucros
-            if event_type == 'MarketSell':
-                profit = event_data.get('SellPrice', 0) * event_data.get('Count', 0)
-                self._insert_pilot_profit(conn, event_data, 'TRADE', profit)
-            elif event_type == 'Bounty':
-                self._insert_pilot_profit(conn, event_data, 'BOUNTY', event_data.get('Reward', 0))
-            elif event_type == 'MultiSellExplorationData':
-                self._insert_pilot_profit(conn, event_data, 'EXPLORATION', event_data.get('TotalEarnings', 0))
-            elif event_type == 'SellOrganicData':
-                self._insert_pilot_profit(conn, event_data, 'EXOBIOLOGY', event_data.get('TotalEarnings', 0))
-                
-            if event_type == 'Materials':
-                self._update_pilot_materials(conn, event_data)
-                
-            if event_type in ['FSDJump', 'Location', 'Scan', 'FSSSignalDiscovered']:
-                self._update_system_data(conn, event_data)
-                
-            if event_type == 'Loadout':
-                self._update_ship_modules(conn, event_data)
+            for handler in self.event_handlers.get(event_data.get('event'), ()):
+                self._run_handler(timings, handler, conn, event_data)
 
+            commit_start = time.perf_counter()
             conn.commit()
+            timings['commit'] = time.perf_counter() - commit_start
+            self.metrics.observe('edlt_stage_seconds', timings['commit'], stage='commit')
+            self._notify_event_listeners(event_data)
             
         except sqlite3.Error as e:
             conn.rollback()
+            self.metrics.inc('edlt_errors_total', type=type(e).__name__)
             logging.error(f"Erro ao processar evento '{event_data.get('event')}': {e}")
         except Exception as e:
             conn.rollback()
+            self.metrics.inc('edlt_errors_total', type=type(e).__name__)
             logging.error(f"Erro inesperado ao processar evento: {e}")
         finally:
+            statements_end = time.perf_counter()
             if conn:
                 conn.close()
+            elapsed = time.perf_counter() - start
+            self.metrics.observe('edlt_event_seconds', elapsed)
+            if statements:
+                self._record_slow_sql(event_data, statements, statements_end)
+            if self.slow_events.is_slow(elapsed):
+                self._record_slow_event(event_data, elapsed, timings, statements)
+
+    def _record_slow_sql(self, event_data: Dict[str, Any], statements: List[tuple], end: float) -> None:
+        for index, (started, sql) in enumerate(statements):
+            finished = statements[index + 1][0] if index + 1 < len(statements) else end
+            if self.slow_sql.is_slow(finished - started):
+                self.slow_sql.add({'event': event_data.get('event'), 'timestamp': event_data.get('timestamp'),
+                                   'ms': round((finished - started) * 1000, 3), 'sql': sql})
+
+    def _record_slow_event(self, event_data: Dict[str, Any], elapsed: float, timings: Dict[str, float],
+                           statements: Optional[List[tuple]]) -> None:
+        """Guarda o evento lento com tamanho, tempos por handler e o próprio conteúdo, para reprodução."""
+        event_json = json.dumps(event_data, ensure_ascii=False)
+        entry = {
+            'event': event_data.get('event'),
+            'timestamp': event_data.get('timestamp'),
+            'size': len(event_json.encode('utf-8')),
+            'ms': round(elapsed * 1000, 3),
+            'timings_ms': {name: round(seconds * 1000, 3) for name, seconds in timings.items()},
+            'event_data': event_data,
+        }
+        if statements:
+            entry['sql'] = [sql for _, sql in statements]
+        self.slow_events.add(entry)
+        logging.warning(f"Evento lento: '{entry['event']}' ({entry['size']} bytes) em {entry['ms']:.1f} ms")
+
+    # --- Diagnóstico ---
+
+    def diagnostics_dir(self) -> str:
+        """Pasta padrão dos arquivos de diagnóstico, ao lado do banco."""
+        return os.path.join(os.path.dirname(os.path.abspath(self.db_path)), 'diagnostics')
+
+    def start_profiling(self, seconds: float, output_path: Optional[str] = None) -> Optional[str]:
+        """
+        Perfila a thread de ingestão por `seconds` segundos em segundo plano e
+        grava o resultado em output_path (por padrão, um arquivo com data e
+        hora em diagnostics_dir()). Retorna o caminho, ou None se já houver
+        um perfil em andamento.
+        """
+        if self.profiler is not None:
+            logging.warning("Já existe um perfil em andamento.")
+            return None
+        if output_path is None:
+            output_path = os.path.join(self.diagnostics_dir(), time.strftime('profile-%Y%m%d-%H%M%S.txt'))
+
+        self.profiler = profiler = SamplingProfiler(lambda: self.ingest_thread)
+
+        def finish():
+            profiler.stop_event.wait(seconds)
+            profiler.stop()
+            try:
+                profiler.write(output_path)
+                logging.info(f"Perfil gravado em {output_path} ({profiler.samples} amostras).")
+            except OSError as e:
+                logging.error(f"Erro ao gravar o perfil: {e}")
+            finally:
+                self.profiler = None
+
+        profiler.start()
+        threading.Thread(target=finish, name='edlt-profiler-window', daemon=True).start()
+        logging.info(f"Perfilando a ingestão por {seconds:g} s...")
+        return output_path
+
+    def dump_diagnostics(self, directory: Optional[str] = None) -> List[str]:
+        """
+        Grava os registros de lentidão: slow_events.jsonl e slow_sql.jsonl, e
+        slow_events_journal.log só com os eventos, no formato do Journal, para
+        reproduzi-los com backfill(files=[...]). Retorna os arquivos gravados.
+        """
+        directory = directory or self.diagnostics_dir()
+        paths = [os.path.join(directory, name)
+                 for name in ('slow_events.jsonl', 'slow_sql.jsonl', 'slow_events_journal.log')]
+        try:
+            self.slow_events.write(paths[0])
+            self.slow_sql.write(paths[1])
+            with open(paths[2], 'w', encoding='utf-8') as f:
+                for entry in self.slow_events.snapshot():
+                    f.write(json.dumps(entry['event_data'], ensure_ascii=False) + '\n')
+        except OSError as e:
+            logging.error(f"Erro ao gravar o diagnóstico em {directory}: {e}")
+            return []
+        logging.info(f"Diagnóstico gravado em {directory}.")
+        return paths
+
+    def backfill(self, directory: Optional[str] = None, files: Optional[List[str]] = None) -> int:
+        """
+        Importa arquivos de diário inteiros (por padrão, todos os de cada
+        diretório de journal_dirs, em ordem cronológica) pelo caminho normal de
+        process_event, com o comandante de cada sessão. Eventos já gravados são
+        ignorados pelo hash, e os mais antigos que o prazo de retenção do seu
+        tipo (ver maintenance) nem chegam a process_event. Retorna o número de
+        eventos novos.
+        """
+        from journal_monitor import parse_journal_line
+
+        if files is None:
+            if directory is None:
+                return sum(self.backfill(journal_dir) for journal_dir in self.journal_dirs)
+            files = get_journal_files(directory)
+        tracker = CommanderTracker()
+        count_before = self.event_count
+        # Eventos já apagados pela retenção seriam gravados (e os handlers,
+        # executados) de novo, só para a próxima passagem apagá-los outra vez
+        cutoffs = self.maintenance.journal_cutoffs()
+        expired = 0
+        # Conexão mantida aberta durante a importação: sem ela cada process_event
+        # fecharia a última conexão ao banco e o SQLite faria checkpoint do WAL
+        # a cada evento
+        keeper = self.get_db_connection()
+        try:
+            for path in files:
+                try:
+                    # errors='replace': o diário em uso pode terminar no meio de
+                    # um caractere; a linha incompleta só falha no JSON (com log)
+                    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                        for line in f:
+                            with self.metrics.timer('edlt_stage_seconds', stage='decode'):
+                                event_data = parse_journal_line(line)
+                            if event_data is None:
+                                continue
+                            commander = tracker.update(event_data)
+                            cutoff = cutoffs.get(event_data['event'], cutoffs.get(None))
+                            if cutoff is not None and str(event_data['timestamp']) < cutoff:
+                                expired += 1
+                                continue
+                            self.process_event(event_data, commander)
+                except OSError as e:
+                    logging.error(f"Erro ao ler arquivo de diário {path}: {e}")
+            # Últimos eventos de cada janela do coalesce
+            self.flush_ingest_policy()
+        finally:
+            if keeper:
+                keeper.close()
+        imported = self.event_count - count_before
+        logging.info(f"Importação concluída: {imported} eventos novos de {len(files)} arquivos"
+                     f" ({expired} além do prazo de retenção ignorados).")
+        return imported
 
     # --- Funções de Controle ---
 
     def start_monitoring(self) -> None:
-        """Inicia o monitoramento do arquivo de diário mais recente."""
+        """
+        Inicia o monitoramento do diário mais recente de cada diretório de
+        journal_dirs (núcleo assíncrono, ver async_ingest). Cada diretório é
+        uma fonte com o seu comandante e a sua própria faixa de gravação.
+        """
         if self.is_running:
             logging.warning("Monitoramento já está em execução.")
             return
 
-        # FIX: Limpar observer anterior se existir
-        if self.observer:
-            try:
-                self.observer.stop()
-                self.observer.join(timeout=2.0)
-            except:
-                pass
-            self.observer = None
-
-        latest_file = get_latest_journal_file(self.JOURNAL_DIR)
-        if not latest_file:
+        sources = []
+        for journal_dir in self.journal_dirs:
+            latest_file = get_latest_journal_file(journal_dir)
+            if latest_file:
+                sources.append((journal_dir, latest_file))
+            else:
+                logging.warning(f"Nenhum arquivo de diário em {journal_dir}; diretório ignorado.")
+        if not sources:
             logging.error("Nenhum arquivo de diário encontrado para monitorar.")
             return
 
-        self.event_handler = JournalFileMonitor(latest_file, self.process_event)
-        self.observer = Observer()
-        self.observer.schedule(self.event_handler, os.path.dirname(latest_file), recursive=False)
-        self.observer.start()
+        # Import tardio: o watchdog só é carregado quando o monitoramento inicia
+        from async_ingest import IngestLoop
+
+        self.ingest = IngestLoop(self)
+        self.ingest.start()
+        for journal_dir, latest_file in sources:
+            self.ingest.add_source(journal_dir, latest_file)
         self.is_running = True
         self.event_count = 0  # Reset contador
-        logging.info("Monitoramento iniciado.")
+        logging.info(f"Monitoramento iniciado ({len(sources)} diretórios de diário).")
 
     def stop_monitoring(self) -> None:
-        """Para o monitoramento."""
-        if self.observer:
+        """Para o monitoramento, gravando antes os eventos já lidos."""
+        if self.ingest:
             try:
-                self.observer.stop()
-                self.observer.join(timeout=2.0)
+                self.ingest.stop()
             except Exception as e:
-                logging.error(f"Erro ao parar observer: {e}")
-            
-        if self.event_handler:
-            self.event_handler.stop()
-        
+                logging.error(f"Erro ao parar a ingestão: {e}")
+            self.ingest = None
+
         self.is_running = False
         logging.info(f"Monitoramento parado. Total de eventos processados: {self.event_count}")
 
@@ -0,0 +1,381 @@
+"""
+Manutenção do banco em segundo plano: retenção, compactação e estatísticas.
+
+O SQLite não devolve ao disco as páginas liberadas (a troca de linhas em
+system_data, os DELETE de _update_pilot_materials, as linhas apagadas pela
+retenção): o banco usa auto_vacuum=INCREMENTAL (ver enable_incremental_vacuum)
+e as páginas livres além de VACUUM_KEEP_FREE_PAGES são devolvidas aos poucos
+com PRAGMA incremental_vacuum. Bancos novos já nascem assim; um banco
+existente só é convertido a pedido (daemon.py --convert-incremental-vacuum),
+porque a conversão reescreve o arquivo inteiro com um VACUUM.
+
+DatabaseMaintenance.step() faz um passo curto de cada vez, na ordem:
+  - retenção: apaga as linhas mais antigas que o prazo de cada tabela (e de
+    cada tipo de evento em journal_events), percorrendo a tabela em faixas
+    de rowid; uma passagem completa a cada RETENTION_INTERVAL;
+  - compactação: incremental_vacuum das páginas livres em excesso;
+  - estatísticas: ANALYZE de uma tabela por passo (com analysis_limit), a
+    cada ANALYZE_INTERVAL, para o planejador de consultas acompanhar o
+    crescimento das tabelas.
+O tamanho de cada passo (linhas percorridas, páginas devolvidas) se ajusta
+para ficar perto de MAINTENANCE_STEP_SECONDS: o gravador da ingestão chama
+step() só quando está ocioso, no executor do SQLite, e um evento que chega
+espera no máximo um passo.
+
+Os prazos podem ser ajustados em um arquivo JSON (ver DatabaseMaintenance.load),
+em dias; null mantém as linhas para sempre:
+
+    {"journal_events": {"ReceiveText": 14, "Scan": null, "*": 3650},
+     "commodity_prices": 60}
+"""
+
+import os
+import json
+import time
+import shutil
+import logging
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Any, List, Tuple
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Arquivo de retenção procurado ao lado do banco (ver BackendCore.__init__)
+RETENTION_FILE = 'retention.json'
+
+# Duração alvo de um passo de manutenção (o tempo que um evento novo pode
+# esperar pelo executor do SQLite) e espera máxima por um lock do banco
+MAINTENANCE_STEP_SECONDS = 0.005
+MAINTENANCE_BUSY_TIMEOUT_MS = 20
+
+# Intervalo entre as verificações do que está pendente (maintenance_state)
+MAINTENANCE_CHECK_INTERVAL = 60.0
+
+# Passagens completas de retenção e de ANALYZE, em segundos
+RETENTION_INTERVAL = 6 * 3600
+ANALYZE_INTERVAL = 24 * 3600
+
+# Linhas examinadas por índice no ANALYZE: estatísticas aproximadas em
+# poucos milissegundos, mesmo em tabelas grandes
+ANALYSIS_LIMIT = 400
+
+# Páginas livres mantidas para novas gravações (a troca de linhas de
+# system_data e de pilot_materials as reutiliza logo em seguida)
+VACUUM_KEEP_FREE_PAGES = 256
+
+# Faixas de ajuste do tamanho dos passos: (inicial, mínimo, máximo). Ler
+# linhas é barato; apagar custa a atualização de cada índice da tabela.
+RETENTION_SCAN_ROWS = (500, 100, 20000)
+RETENTION_DELETE_ROWS = (50, 10, 5000)
+VACUUM_PAGES = (32, 4, 2048)
+
+# PRAGMA auto_vacuum
+AUTO_VACUUM_INCREMENTAL = 2
+
+# Espaço livre pedido para a conversão, em múltiplos do tamanho do banco: o
+# VACUUM grava uma cópia temporária e, com WAL, o arquivo novo passa pelo WAL
+VACUUM_SPACE_FACTOR = 2
+
+# Tabelas com retenção e a coluna de data (texto ISO 8601 em UTC) usada
+RETENTION_TABLES: Dict[str, str] = {
+    'journal_events': 'timestamp',
+    'pilot_profit': 'timestamp',
+    'commodity_prices': 'updated_at',
+    'outfitting_modules': 'updated_at',
+    'shipyard_ships': 'updated_at',
+    'system_signals': 'updated_at',
+}
+
+# (tabela, tipo de evento) -> prazo em dias. O tipo None vale para a tabela
+# inteira; em journal_events, para os tipos sem prazo próprio.
+RetentionRules = Dict[Tuple[str, Optional[str]], Optional[float]]
+
+# Eventos de pouco valor depois de processados (as tabelas derivadas já
+# guardam o que importa deles) e dados do EDDN que envelhecem: preços
+# ignorados pelas rotas de comércio após trade_routes.MAX_PRICE_AGE_DAYS,
+# porta-naves que mudam de sistema. Os demais eventos e o lucro ficam para
+# sempre.
+DEFAULT_RETENTION: RetentionRules = {
+    ('journal_events', 'Music'): 7,
+    ('journal_events', 'ReceiveText'): 30,
+    ('journal_events', 'ShipTargeted'): 30,
+    ('journal_events', 'ReservoirReplenished'): 30,
+    ('journal_events', 'NavBeaconScan'): 90,
+    ('journal_events', 'FSSSignalDiscovered'): 90,
+    ('commodity_prices', None): 30,
+    ('system_signals', None): 30,
+    ('outfitting_modules', None): 90,
+    ('shipyard_ships', None): 90,
+}
+
+
+def enable_incremental_vacuum(conn: sqlite3.Connection, convert: bool = False) -> bool:
+    """
+    Ativa auto_vacuum=INCREMENTAL. Só vale para um banco sem tabelas ou
+    depois de um VACUUM completo: sem `convert`, apenas um banco sem tabelas
+    é alterado (o VACUUM de um arquivo vazio é instantâneo). Com `convert`,
+    um banco existente é reescrito por inteiro, o que leva tempo e pede
+    espaço livre em disco (ver conversion_space). Retorna True se o banco
+    ficou com auto_vacuum incremental.
+    """
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == AUTO_VACUUM_INCREMENTAL:
+        return True
+    has_tables = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table'").fetchone()
+    if has_tables and not convert:
+        return False
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    if has_tables:
+        logging.info("Convertendo o banco para auto_vacuum incremental (VACUUM único)...")
+    start = time.perf_counter()
+    try:
+        conn.execute("VACUUM")
+    except sqlite3.Error as e:
+        logging.warning(f"Não foi possível ativar o auto_vacuum incremental: {e}")
+        return False
+    if has_tables:
+        logging.info(f"Banco convertido em {time.perf_counter() - start:.1f} s.")
+    return True
+
+
+def conversion_space(db_path: str) -> Tuple[int, int]:
+    """(espaço pedido pela conversão, espaço livre no disco do banco), em bytes."""
+    size = sum(os.path.getsize(path) for path in (db_path, db_path + '-wal') if os.path.exists(path))
+    free = shutil.disk_usage(os.path.dirname(os.path.abspath(db_path))).free
+    return size * VACUUM_SPACE_FACTOR, free
+
+
+def parse_retention(data: Dict[str, Any]) -> RetentionRules:
+    """Regras a partir do arquivo de retenção: {tabela: dias} ou, em journal_events, {tipo: dias}."""
+    rules: RetentionRules = {}
+    for table, value in data.items():
+        if table not in RETENTION_TABLES:
+            raise ValueError(f"Tabela sem suporte a retenção: '{table}'")
+        if isinstance(value, dict):
+            if table != 'journal_events':
+                raise ValueError(f"Prazos por tipo de evento só valem para journal_events, não '{table}'")
+            for event_type, days in value.items():
+                rules[(table, None if event_type == '*' else event_type)] = _parse_days(table, days)
+        else:
+            rules[(table, None)] = _parse_days(table, value)
+    return rules
+
+
+def _parse_days(table: str, value: Any) -> Optional[float]:
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+        raise ValueError(f"Prazo inválido para '{table}': {value!r}")
+    return float(value)
+
+
+def _adapt(size: int, elapsed: float, limits: Tuple[int, int, int],
+           target: float = MAINTENANCE_STEP_SECONDS) -> int:
+    """Tamanho do próximo passo: metade se passou do alvo, o dobro se ficou bem abaixo."""
+    if elapsed > target:
+        return max(limits[1], size // 2)
+    if elapsed < target / 2:
+        return min(limits[2], size * 2)
+    return size
+
+
+class DatabaseMaintenance:
+    """Prazos de retenção e o estado das passagens de manutenção (usado só pela thread do SQLite)."""
+
+    def __init__(self, retention: Optional[RetentionRules] = None, metrics=None):
+        # (tabela, tipo de evento) -> dias; sem entrada: mantido para sempre
+        self.retention: Dict[Tuple[str, Optional[str]], float] = {}
+        self.metrics = metrics
+        self.update(DEFAULT_RETENTION if retention is None else retention)
+        # Passagens em andamento: [tabela, tipo, data de corte, último rowid]
+        # e tabelas ainda sem ANALYZE
+        self.retention_pass: List[list] = []
+        self.analyze_pass: List[str] = []
+        self.scan_rows = RETENTION_SCAN_ROWS[0]
+        self.delete_rows = RETENTION_DELETE_ROWS[0]
+        self.vacuum_pages = VACUUM_PAGES[0]
+        self.next_check = 0.0
+        self.incremental: Optional[bool] = None
+
+    def update(self, rules: RetentionRules) -> None:
+        for key, days in rules.items():
+            if days is None:
+                self.retention.pop(key, None)
+            else:
+                self.retention[key] = days
+
+    def load(self, path: str) -> bool:
+        """Aplica os prazos de um arquivo JSON sobre os atuais. False se inválido."""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            rules = parse_retention(data)
+        except (OSError, ValueError, AttributeError) as e:
+            logging.error(f"Retenção ignorada ({path}): {e}")
+            return False
+        self.update(rules)
+        logging.info(f"Retenção carregada de {path} ({len(rules)} regras).")
+        return True
+
+    def step(self, conn: sqlite3.Connection) -> bool:
+        """
+        Executa um passo curto de manutenção em `conn` (sem transação aberta).
+        False quando não há nada a fazer agora (ou o banco está ocupado).
+        """
+        try:
+            # Um passo não espera pelo lock de outro escritor: tenta de novo na próxima ociosidade
+            conn.execute(f"PRAGMA busy_timeout = {MAINTENANCE_BUSY_TIMEOUT_MS}")
+            if time.monotonic() >= self.next_check:
+                self.next_check = time.monotonic() + MAINTENANCE_CHECK_INTERVAL
+                self._schedule(conn)
+            if self.retention_pass:
+                self._timed('retention', self._retention_step, conn)
+                return True
+            if self._vacuum_step(conn):
+                return True
+            if self.analyze_pass:
+                self._timed('analyze', self._analyze_step, conn)
+                return True
+        except sqlite3.OperationalError as e:
+            if conn.in_transaction:
+                conn.rollback()
+            if 'locked' not in str(e) and 'busy' not in str(e):
+                logging.error(f"Erro na manutenção do banco: {e}")
+                self._count_error(e)
+        except sqlite3.Error as e:
+            if conn.in_transaction:
+                conn.rollback()
+            logging.error(f"Erro na manutenção do banco: {e}")
+            self._count_error(e)
+        return False
+
+    def _timed(self, task: str, function, conn: sqlite3.Connection) -> None:
+        start = time.perf_counter()
+        function(conn)
+        if self.metrics:
+            self.metrics.observe('edlt_maintenance_seconds', time.perf_counter() - start, task=task)
+
+    def _count_error(self, error: Exception) -> None:
+        if self.metrics:
+            self.metrics.inc('edlt_errors_total', type=type(error).__name__)
+
+    # --- Agendamento ---
+
+    def _schedule(self, conn: sqlite3.Connection) -> None:
+        """Inicia as passagens vencidas (maintenance_state guarda a última de cada tarefa)."""
+        last_runs = dict(conn.execute("SELECT task, last_run FROM maintenance_state").fetchall())
+        now = time.time()
+        if not self.retention_pass and self.retention and now - last_runs.get('retention', 0) >= RETENTION_INTERVAL:
+            self.retention_pass = [[table, event_type, self._cutoff(days), 0]
+                                   for (table, event_type), days in sorted(self.retention.items(), key=repr)]
+        if not self.analyze_pass and now - last_runs.get('analyze', 0) >= ANALYZE_INTERVAL:
+            self.analyze_pass = [row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name")]
+
+    def journal_cutoffs(self) -> Dict[Optional[str], str]:
+        """
+        Data de corte da retenção de journal_events por tipo de evento (None:
+        prazo geral). A importação do histórico (BackendCore.backfill) não
+        regrava eventos que a retenção já apagou: o hash deles saiu do banco
+        junto com a linha.
+        """
+        return {event_type: self._cutoff(days) for (table, event_type), days in self.retention.items()
+                if table == 'journal_events'}
+
+    @staticmethod
+    def _cutoff(days: float) -> str:
+        return (datetime.now(timezone.utc) - timedelta(days=days)).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+    def _finish(self, conn: sqlite3.Connection, task: str) -> None:
+        conn.execute("INSERT OR REPLACE INTO maintenance_state (task, last_run) VALUES (?, ?)", (task, time.time()))
+        conn.commit()
+
+    # --- Tarefas ---
+
+    def _retention_step(self, conn: sqlite3.Connection) -> None:
+        """
+        Percorre até `scan_rows` linhas da regra atual e apaga até
+        `delete_rows` delas anteriores à data de corte.
+        """
+        table, event_type, cutoff, last_rowid = self.retention_pass[0]
+        column = RETENTION_TABLES[table]
+        sql = f"SELECT rowid, {column} < ? FROM {table} WHERE rowid > ?"
+        params: List[Any] = [cutoff, last_rowid]
+        if event_type is not None:
+            sql += " AND event_type = ?"
+            params.append(event_type)
+        elif table == 'journal_events':
+            # Prazo geral: os tipos com prazo próprio seguem a sua regra
+            own = [t for (tb, t) in self.retention if tb == table and t is not None]
+            if own:
+                sql += f" AND event_type NOT IN ({', '.join('?' for _ in own)})"
+                params.extend(own)
+        sql += " ORDER BY rowid LIMIT ?"
+        params.append(self.scan_rows)
+
+        start = time.perf_counter()
+        rows = conn.execute(sql, params).fetchall()
+        finished = len(rows) < params[-1]
+        # A leitura e a remoção dividem o tempo do passo. Uma leitura que
+        # chegou ao fim da regra não diz quanto custaria uma faixa cheia.
+        if not finished:
+            self.scan_rows = _adapt(self.scan_rows, time.perf_counter() - start, RETENTION_SCAN_ROWS,
+                                    MAINTENANCE_STEP_SECONDS / 2)
+        last_rowid = rows[-1][0] if rows else last_rowid
+        expired = [(row[0],) for row in rows if row[1]]
+        if len(expired) > self.delete_rows:
+            # O resto das linhas lidas fica para o próximo passo
+            expired = expired[:self.delete_rows]
+            finished = False
+            last_rowid = expired[-1][0]
+        if expired:
+            start = time.perf_counter()
+            conn.executemany(f"DELETE FROM {table} WHERE rowid = ?", expired)
+            conn.commit()
+            self.delete_rows = _adapt(self.delete_rows, time.perf_counter() - start, RETENTION_DELETE_ROWS,
+                                      MAINTENANCE_STEP_SECONDS / 2)
+            if self.metrics:
+                self.metrics.inc('edlt_retention_deleted_total', len(expired), table=table)
+
+        if finished:
+            self.retention_pass.pop(0)
+            if not self.retention_pass:
+                self._finish(conn, 'retention')
+        else:
+            self.retention_pass[0][3] = last_rowid
+
+    def _vacuum_step(self, conn: sqlite3.Connection) -> bool:
+        """Devolve ao disco parte das páginas livres em excesso. False se não há o que devolver."""
+        if self.incremental is None:
+            self.incremental = conn.execute("PRAGMA auto_vacuum").fetchone()[0] == AUTO_VACUUM_INCREMENTAL
+            if not self.incremental:
+                logging.info("Banco sem auto_vacuum incremental: as páginas livres não são devolvidas ao disco. "
+                             "Para converter (VACUUM único), use daemon.py --convert-incremental-vacuum.")
+        if not self.incremental:
+            return False
+        free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if self.metrics:
+            self.metrics.set_gauge('edlt_db_free_pages', free_pages)
+        excess = free_pages - VACUUM_KEEP_FREE_PAGES
+        if excess <= 0:
+            return False
+        pages = min(excess, self.vacuum_pages)
+        start = time.perf_counter()
+        # executescript executa o PRAGMA até o fim: com execute, o sqlite3 do
+        # Python avança a instrução uma vez só e devolve uma página por chamada
+        conn.executescript(f"PRAGMA incremental_vacuum({pages});")
+        elapsed = time.perf_counter() - start
+        self.vacuum_pages = _adapt(self.vacuum_pages, elapsed, VACUUM_PAGES)
+        if self.metrics:
+            self.metrics.observe('edlt_maintenance_seconds', elapsed, task='vacuum')
+            self.metrics.inc('edlt_vacuum_pages_total', pages)
+        return True
+
+    def _analyze_step(self, conn: sqlite3.Connection) -> None:
+        table = self.analyze_pass.pop(0)
+        conn.execute(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT}")
+        conn.execute(f'ANALYZE "{table}"')
+        conn.commit()
+        if not self.analyze_pass:
+            self._finish(conn, 'analyze')
@@ -0,0 +1,160 @@
+"""
+Registro de métricas da ingestão: contadores, valores instantâneos (gauges)
+e histogramas de latência por etapa. Exibido na visualização Diagnóstico da
+GUI e exportado no formato texto do Prometheus em /metrics (modo daemon).
+
+Os histogramas têm faixas fixas (como os do Prometheus): registrar uma
+amostra é uma busca binária e um incremento, sem guardar as amostras.
+"""
+
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, List, Tuple
+
+# Limites superiores (segundos) das faixas dos histogramas de latência
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+# Descrição de cada métrica, usada no # HELP do Prometheus e na GUI
+METRIC_HELP: Dict[str, str] = {
+    'edlt_stage_seconds': "Tempo de cada etapa da ingestão (read, decode, hash, insert, commit, listeners)",
+    'edlt_handler_seconds': "Tempo do SQL de cada handler de process_event",
+    'edlt_event_seconds': "Tempo total de process_event por evento",
+    'edlt_events_total': "Eventos novos gravados",
+    'edlt_duplicates_total': "Eventos ignorados por já estarem no banco",
+    'edlt_errors_total': "Erros por tipo",
+    'edlt_handler_errors_total': "Falhas de handlers isolados (plugins), desfeitas por SAVEPOINT",
+    'edlt_queue_depth': "Linhas lidas do diário aguardando processamento",
+    'edlt_policy_events_total': "Eventos afetados pela política de ingestão, por ação e tipo",
+    'edlt_policy_bytes_saved_total': "Bytes de JSON que a política de ingestão deixou de gravar, por ação",
+    'edlt_policy_pending': "Eventos guardados pelo coalesce aguardando o fim da janela",
+    'edlt_maintenance_seconds': "Tempo de cada passo de manutenção do banco (retention, vacuum, analyze)",
+    'edlt_retention_deleted_total': "Linhas apagadas pela retenção, por tabela",
+    'edlt_vacuum_pages_total': "Páginas devolvidas ao disco pelo incremental_vacuum",
+    'edlt_db_free_pages': "Páginas livres no arquivo do banco",
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+class Histogram:
+    """Contagem de amostras por faixa, soma e total."""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Última posição: acima da maior faixa
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, fraction: float) -> Optional[float]:
+        """Estimativa do quantil: limite superior da faixa que o contém."""
+        if not self.count:
+            return None
+        target = fraction * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return self.buckets[index] if index < len(self.buckets) else float('inf')
+        return float('inf')
+
+
+class MetricsRegistry:
+    """Métricas em memória, seguras para uso por várias threads."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters: Dict[str, Dict[LabelKey, float]] = {}
+        self.gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self.histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+
+    def inc(self, name: str, amount: float = 1, **labels: Any) -> None:
+        key = _label_key(labels)
+        with self.lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def set_gauge(self, name: str, value: float, **labels: Any) -> None:
+        with self.lock:
+            self.gauges.setdefault(name, {})[_label_key(labels)] = value
+
+    def observe(self, name: str, seconds: float, **labels: Any) -> None:
+        key = _label_key(labels)
+        with self.lock:
+            series = self.histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, name: str, **labels: Any):
+        """Registra em `name` a duração do bloco with, mesmo se ele lançar exceção."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def reset(self) -> None:
+        with self.lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.histograms.clear()
+
+    def snapshot(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Cópia das métricas para exibição: listas de séries com rótulos e valores."""
+        with self.lock:
+            counters = [{'name': name, 'labels': dict(key), 'value': value}
+                        for name, series in sorted(self.counters.items()) for key, value in sorted(series.items())]
+            gauges = [{'name': name, 'labels': dict(key), 'value': value}
+                      for name, series in sorted(self.gauges.items()) for key, value in sorted(series.items())]
+            histograms = [{'name': name, 'labels': dict(key), 'count': histogram.count, 'sum': histogram.sum,
+                           'p50': histogram.quantile(0.50), 'p99': histogram.quantile(0.99)}
+                          for name, series in sorted(self.histograms.items())
+                          for key, histogram in sorted(series.items())]
+        return {'counters': counters, 'gauges': gauges, 'histograms': histograms}
+
+    def render_prometheus(self) -> str:
+        """Métricas no formato texto de exposição do Prometheus (versão 0.0.4)."""
+        lines: List[str] = []
+        with self.lock:
+            for kind, metrics in (('counter', self.counters), ('gauge', self.gauges)):
+                for name, series in sorted(metrics.items()):
+                    lines.append(f"# HELP {name} {METRIC_HELP.get(name, name)}")
+                    lines.append(f"# TYPE {name} {kind}")
+                    for key, value in sorted(series.items()):
+                        lines.append(f"{name}{_format_labels(key)} {value:g}")
+            for name, series in sorted(self.histograms.items()):
+                lines.append(f"# HELP {name} {METRIC_HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, histogram in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_format_labels(key, ('le', f'{bound:g}'))} {cumulative}")
+                    lines.append(f"{name}_bucket{_format_labels(key, ('le', '+Inf'))} {histogram.count}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {histogram.sum:.9g}")
+                    lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+        return '\n'.join(lines) + '\n'
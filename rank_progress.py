@@ -0,0 +1,224 @@
+import json
+import time
+import sqlite3
+import logging
+import calendar
+from typing import Optional, Dict, Any, List, Tuple
+
+from backend.rank_data import RANK_NAMES, get_elite_rank_value, get_max_rank_value
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Tipos de ranque na ordem dos eventos Rank/Progress do Journal
+RANK_EVENT_TYPES = ['Combat', 'Trade', 'Explore', 'CQC', 'Federation', 'Empire']
+
+# Eventos do Journal que alteram ranque ou progresso
+RANK_EVENTS = {'Rank', 'Progress', 'Promotion'}
+
+# Previsões acima disto (10 anos) não são mostradas
+MAX_FORECAST_HOURS = 10 * 365 * 24.0
+
+# Meia-vida da média móvel do ritmo de progresso: amostras mais antigas que
+# isto pesam menos da metade na estimativa
+RATE_HALF_LIFE_HOURS = 7 * 24.0
+
+# Intervalo mínimo da primeira amostra do ritmo: ela entra com peso total, e
+# um intervalo curto (Rank e Progress do login com segundos de diferença)
+# viraria um ritmo de milhares de ranques por hora por semanas
+MIN_RATE_SEED_HOURS = 10 / 60.0
+
+JOURNAL_TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+
+def rank_event_values(event_data: Dict[str, Any]) -> Dict[str, Tuple[Optional[int], Optional[float]]]:
+    """
+    Valores de um evento Rank, Progress ou Promotion por tipo de ranque:
+    (ranque ou None, progresso de 0.0 a 1.0 ou None se o evento não o informa).
+    Promotion sobe o ranque e zera o progresso.
+    """
+    event_type = event_data.get('event')
+    values: Dict[str, Tuple[Optional[int], Optional[float]]] = {}
+    for rank_type in RANK_EVENT_TYPES:
+        if rank_type not in event_data:
+            continue
+        if event_type == 'Rank':
+            values[rank_type] = (event_data[rank_type], None)
+        elif event_type == 'Progress':
+            values[rank_type] = (None, min(max(event_data[rank_type] / 100.0, 0.0), 1.0))
+        elif event_type == 'Promotion':
+            values[rank_type] = (event_data[rank_type], 0.0)
+    return values
+
+
+def parse_timestamp(timestamp: Optional[str]) -> Optional[int]:
+    """Timestamp do Journal ('2026-01-01T12:00:00Z') em Unix time, ou None se inválido."""
+    try:
+        return calendar.timegm(time.strptime(timestamp, JOURNAL_TIMESTAMP_FORMAT))
+    except (TypeError, ValueError):
+        return None
+
+
+def update_rate(rate: Optional[float], delta: float, hours: float) -> Optional[float]:
+    """
+    Atualiza a média móvel exponencial do ritmo (ranques por hora) com uma
+    nova amostra: `delta` ranques em `hours` horas. O peso da amostra cresce
+    com o intervalo que ela cobre, então amostras irregulares (uma por sessão
+    de jogo) contam pelo tempo que representam. O ritmo só começa com um
+    intervalo de pelo menos MIN_RATE_SEED_HOURS. O(1) por amostra.
+    """
+    if hours <= 0:
+        return rate
+    sample = max(delta, 0.0) / hours
+    if rate is None:
+        return sample if hours >= MIN_RATE_SEED_HOURS else None
+    weight = 1.0 - 0.5 ** (hours / RATE_HALF_LIFE_HOURS)
+    return rate + weight * (sample - rate)
+
+
+def record_sample(conn: sqlite3.Connection, pilot_name: str, rank_type: str, timestamp: Optional[str],
+                  rank: int, progress: float) -> bool:
+    """
+    Atualiza o ritmo em rank_progress_state e grava a amostra no histórico
+    se ela mudou desde a anterior (usa conexão existente). Uma amostra igual
+    à anterior só conta como tempo sem progresso para o ritmo.
+    Retorna True se a amostra foi gravada no histórico.
+    """
+    unix_time = parse_timestamp(timestamp)
+    if unix_time is None:
+        return False
+
+    try:
+        previous = conn.execute(
+            "SELECT rank, progress, timestamp, rate, base_position, base_timestamp, base_rate "
+            "FROM rank_progress_state WHERE pilot_name = ? AND rank_type = ?",
+            (pilot_name, rank_type)
+        ).fetchone()
+        changed = previous is None or previous[0] != rank or previous[1] != progress
+        if changed:
+            # Amostras no mesmo segundo (Rank e Progress no login) se substituem
+            conn.execute("INSERT OR REPLACE INTO rank_progress_history "
+                         "(pilot_name, rank_type, timestamp, rank, progress) VALUES (?, ?, ?, ?, ?)",
+                         (pilot_name, rank_type, unix_time, rank, progress))
+
+        if previous is None:
+            base = (None, None, None)
+        elif unix_time > previous[2]:
+            # Nova amostra: a anterior vira a base do intervalo
+            base = (previous[0] + previous[1], previous[2], previous[3])
+        else:
+            # Mesmo instante (Rank seguido de Progress): refaz a última atualização a partir da mesma base
+            base = (previous[4], previous[5], previous[6])
+            unix_time = previous[2]
+        base_position, base_time, rate = base
+        if base_time is not None:
+            rate = update_rate(rate, rank + progress - base_position, (unix_time - base_time) / 3600.0)
+        conn.execute("INSERT OR REPLACE INTO rank_progress_state (pilot_name, rank_type, rank, progress, timestamp, "
+                     "rate, base_position, base_timestamp, base_rate) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                     (pilot_name, rank_type, rank, progress, unix_time, rate) + base)
+        return changed
+
+    except sqlite3.Error as e:
+        logging.error(f"Erro ao gravar progresso de ranque: {e}")
+        raise
+
+
+def backfill_rank_history(conn: sqlite3.Connection) -> int:
+    """
+    Reconstrói o histórico e o ritmo a partir dos eventos Rank, Progress e
+    Promotion já gravados em journal_events (usa conexão existente).
+    Retorna o número de amostras gravadas.
+    """
+    # Import tardio: ingest_policy importa este módulo
+    from ingest_policy import decode_event_data
+
+    current: Dict[str, Dict[str, List]] = {}
+    recorded = 0
+    cursor = conn.execute("SELECT pilot_name, event_data FROM journal_events "
+                          "WHERE event_type IN ('Rank', 'Progress', 'Promotion') ORDER BY id")
+    for pilot_name, event_json in cursor:
+        try:
+            event_data = json.loads(decode_event_data(event_json))
+        except ValueError:
+            continue
+        pilot_name = pilot_name or 'CMDR_Unknown'
+        ranks = current.setdefault(pilot_name, {rank_type: [0, 0.0] for rank_type in RANK_EVENT_TYPES})
+        for rank_type, (rank, progress) in rank_event_values(event_data).items():
+            if rank is not None:
+                ranks[rank_type][0] = rank
+            if progress is not None:
+                ranks[rank_type][1] = progress
+            recorded += record_sample(conn, pilot_name, rank_type, event_data.get('timestamp'), *ranks[rank_type])
+    return recorded
+
+
+def recompute_rank_rates(conn: sqlite3.Connection) -> int:
+    """
+    Recalcula o ritmo de cada comandante e tipo em rank_progress_state a
+    partir de rank_progress_history, com o update_rate atual (usa conexão
+    existente). Retorna o número de ritmos recalculados.
+    """
+    keys = conn.execute("SELECT pilot_name, rank_type FROM rank_progress_state").fetchall()
+    for pilot_name, rank_type in keys:
+        rate, previous = None, None
+        base: Tuple[Optional[float], Optional[int], Optional[float]] = (None, None, None)
+        for timestamp, rank, progress in rank_progress_history(conn, rank_type, pilot_name):
+            if previous is not None and timestamp > previous[0]:
+                base = (previous[1], previous[0], rate)
+                rate = update_rate(rate, rank + progress - previous[1], (timestamp - previous[0]) / 3600.0)
+            previous = (timestamp, rank + progress)
+        conn.execute("UPDATE rank_progress_state SET rate = ?, base_position = ?, base_timestamp = ?, base_rate = ? "
+                     "WHERE pilot_name = ? AND rank_type = ?", (rate,) + base + (pilot_name, rank_type))
+    return len(keys)
+
+
+def rank_progress_history(conn: sqlite3.Connection, rank_type: str, pilot_name: Optional[str] = None,
+                          since: Optional[int] = None) -> List[Tuple[int, int, float]]:
+    """Amostras (Unix time, ranque, progresso) de um tipo de ranque, em ordem cronológica."""
+    sql = "SELECT timestamp, rank, progress FROM rank_progress_history WHERE rank_type = ?"
+    params: List[Any] = [rank_type]
+    if pilot_name is not None:
+        sql += " AND pilot_name = ?"
+        params.append(pilot_name)
+    if since is not None:
+        sql += " AND timestamp >= ?"
+        params.append(since)
+    return [tuple(row) for row in conn.execute(sql + " ORDER BY timestamp", params)]
+
+
+def estimate_hours(rank: int, progress: float, rate: Optional[float], target_rank: int) -> Optional[float]:
+    """Horas até `target_rank` no ritmo atual (0 se já alcançado, None sem ritmo útil)."""
+    remaining = target_rank - (rank + progress)
+    if remaining <= 0:
+        return 0.0
+    if not rate or rate <= 0 or remaining / rate > MAX_FORECAST_HOURS:
+        return None
+    return remaining / rate
+
+
+def rank_forecasts(conn: sqlite3.Connection, pilot_name: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Previsão por tipo de ranque a partir de rank_progress_state: uma linha por
+    tipo, sem varrer o histórico. Cada entrada traz o ritmo (ranques por hora)
+    e as horas estimadas até o próximo ranque e até Elite.
+    """
+    sql = "SELECT rank_type, rank, progress, rate FROM rank_progress_state"
+    params: List[Any] = []
+    if pilot_name is not None:
+        sql += " WHERE pilot_name = ?"
+        params.append(pilot_name)
+    forecasts: Dict[str, Dict[str, Any]] = {}
+    for rank_type, rank, progress, rate in conn.execute(sql, params):
+        if rank_type not in RANK_NAMES:
+            continue
+        max_rank = get_max_rank_value(rank_type)
+        elite_rank = get_elite_rank_value(rank_type)
+        forecasts[rank_type] = {
+            'rank': rank,
+            'progress': progress,
+            'rate_per_hour': rate,
+            'next_rank': RANK_NAMES[rank_type][rank + 1] if rank < max_rank else None,
+            'hours_to_next': estimate_hours(rank, progress, rate, rank + 1) if rank < max_rank else None,
+            'target_rank': RANK_NAMES[rank_type][elite_rank],
+            'hours_to_target': estimate_hours(rank, progress, rate, elite_rank),
+        }
+    return forecasts
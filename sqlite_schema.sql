@@ -7,7 +7,8 @@ CREATE TABLE IF NOT EXISTS journal_events (
     timestamp TEXT NOT NULL,
     event_type TEXT NOT NULL,
     event_data TEXT NOT NULL, -- JSON string do evento original
-    event_hash TEXT UNIQUE NOT NULL -- Hash do timestamp + event_type + event_data completo para unicidade
+    event_hash TEXT UNIQUE NOT NULL, -- Hash do timestamp + event_type + event_data completo para unicidade
+    pilot_name TEXT -- Comandante da sessão que gravou o evento (NULL: desconhecido)
 );
 
 -- FIX: Índices para melhorar performance de queries
@@ -47,12 +48,42 @@ CREATE TABLE IF NOT EXISTS pilot_status (
 -- FIX: Índice para pilot_status
 CREATE INDEX IF NOT EXISTS idx_pilot_name ON pilot_status(pilot_name);
 
+-- Histórico compacto de ranque/progresso: uma linha só quando o valor muda
+-- (timestamp em Unix time; amostras no mesmo segundo se substituem)
+CREATE TABLE IF NOT EXISTS rank_progress_history (
+    pilot_name TEXT NOT NULL,
+    rank_type TEXT NOT NULL, -- Combat, Trade, Explore, CQC, Federation, Empire
+    timestamp INTEGER NOT NULL,
+    rank INTEGER NOT NULL,
+    progress REAL NOT NULL CHECK(progress >= 0.0 AND progress <= 1.0),
+    PRIMARY KEY (pilot_name, rank_type, timestamp)
+) WITHOUT ROWID;
+
+-- Última amostra e ritmo (média móvel exponencial, em ranques por hora) por
+-- tipo de ranque: a previsão lê uma linha por tipo, sem varrer o histórico.
+-- As colunas base_* guardam a amostra anterior, para refazer a atualização
+-- quando outra amostra chega no mesmo segundo (Rank seguido de Progress)
+CREATE TABLE IF NOT EXISTS rank_progress_state (
+    pilot_name TEXT NOT NULL,
+    rank_type TEXT NOT NULL,
+    rank INTEGER NOT NULL,
+    progress REAL NOT NULL,
+    timestamp INTEGER NOT NULL,
+    rate REAL,
+    base_position REAL,
+    base_timestamp INTEGER,
+    base_rate REAL,
+    PRIMARY KEY (pilot_name, rank_type)
+);
+
 -- Tabela para o inventário de materiais
--- Armazena o inventário atualizado pelo evento 'Materials'
+-- Armazena o inventário de cada comandante, atualizado pelo evento 'Materials'
 CREATE TABLE IF NOT EXISTS pilot_materials (
-    material_name TEXT PRIMARY KEY,
+    pilot_name TEXT NOT NULL,
+    material_name TEXT NOT NULL,
     category TEXT NOT NULL,
-    count INTEGER NOT NULL CHECK(count >= 0)
+    count INTEGER NOT NULL CHECK(count >= 0),
+    PRIMARY KEY (pilot_name, material_name)
 );
 
 -- FIX: Índice para categoria de materiais
@@ -63,38 +94,131 @@ CREATE TABLE IF NOT EXISTS pilot_profit (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     timestamp TEXT NOT NULL,
     profit_type TEXT NOT NULL, -- TRADE, BOUNTY, EXPLORATION, EXOBIOLOGY, CARTOGRAPHY
-    amount INTEGER NOT NULL
+    amount INTEGER NOT NULL,
+    pilot_name TEXT NOT NULL DEFAULT 'CMDR_Unknown'
 );
 
 -- FIX: Índices para otimizar queries de lucro
 CREATE INDEX IF NOT EXISTS idx_profit_type ON pilot_profit(profit_type);
 CREATE INDEX IF NOT EXISTS idx_profit_timestamp ON pilot_profit(timestamp);
 CREATE INDEX IF NOT EXISTS idx_profit_type_timestamp ON pilot_profit(profit_type, timestamp);
+CREATE INDEX IF NOT EXISTS idx_profit_pilot_type ON pilot_profit(pilot_name, profit_type);
 
 -- Tabela para os módulos da nave
--- Armazena o loadout atual da nave
+-- Armazena o loadout atual de cada nave de cada comandante
 CREATE TABLE IF NOT EXISTS ship_modules (
+    pilot_name TEXT NOT NULL,
     ship_id INTEGER NOT NULL,
     slot TEXT NOT NULL,
     module TEXT NOT NULL,
     health REAL NOT NULL CHECK(health >= 0.0 AND health <= 1.0),
-    PRIMARY KEY (ship_id, slot)
+    PRIMARY KEY (pilot_name, ship_id, slot)
 );
 
 -- FIX: Índice para ship_modules
 CREATE INDEX IF NOT EXISTS idx_ship_modules_ship_id ON ship_modules(ship_id);
 
 -- Tabela para os corpos celestes e estações
--- Armazena dados do sistema atual
+-- Armazena dados do sistema atual de cada comandante
 CREATE TABLE IF NOT EXISTS system_data (
-    name TEXT PRIMARY KEY, -- Nome do corpo, estação ou sinal
+    pilot_name TEXT NOT NULL,
+    name TEXT NOT NULL, -- Nome do corpo, estação ou sinal
     system_name TEXT NOT NULL,
     type TEXT NOT NULL, -- STAR, PLANET, STATION, SIGNAL
     distance_ls REAL,
-    data_json TEXT -- JSON com dados detalhados (ex: terraformable, type of station)
+    data_json TEXT, -- JSON com dados detalhados (ex: terraformable, type of station)
+    PRIMARY KEY (pilot_name, name)
 );
 
 -- FIX: Índices para system_data
 CREATE INDEX IF NOT EXISTS idx_system_name ON system_data(system_name);
 CREATE INDEX IF NOT EXISTS idx_system_type ON system_data(type);
 CREATE INDEX IF NOT EXISTS idx_system_name_type ON system_data(system_name, type);
+
+-- Tabela de preços de commodities recebidos do EDDN
+-- Uma linha por mercado e commodity, sempre com a cotação mais recente
+CREATE TABLE IF NOT EXISTS commodity_prices (
+    market_id INTEGER NOT NULL,
+    commodity TEXT NOT NULL, -- Nome interno (ex: 'gold'), em minúsculas
+    system_name TEXT NOT NULL,
+    station_name TEXT NOT NULL,
+    buy_price INTEGER NOT NULL,
+    sell_price INTEGER NOT NULL,
+    mean_price INTEGER,
+    stock INTEGER NOT NULL,
+    demand INTEGER NOT NULL,
+    updated_at TEXT NOT NULL, -- Timestamp da mensagem EDDN
+    PRIMARY KEY (market_id, commodity)
+);
+
+CREATE INDEX IF NOT EXISTS idx_commodity_prices_commodity ON commodity_prices(commodity);
+
+-- Sistemas conhecidos pelo EDDN (journal, navroute, fsssignaldiscovered), com coordenadas
+CREATE TABLE IF NOT EXISTS eddn_systems (
+    system_address INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    x REAL NOT NULL,
+    y REAL NOT NULL,
+    z REAL NOT NULL,
+    updated_at TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_eddn_systems_name ON eddn_systems(name);
+
+-- Estações (mercados) conhecidas pelo EDDN
+CREATE TABLE IF NOT EXISTS eddn_stations (
+    market_id INTEGER PRIMARY KEY,
+    station_name TEXT NOT NULL,
+    system_name TEXT NOT NULL,
+    system_address INTEGER,
+    station_type TEXT,
+    distance_ls REAL,
+    updated_at TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_eddn_stations_system ON eddn_stations(system_name);
+
+-- Módulos e naves à venda em cada estação (lista completa a cada mensagem)
+CREATE TABLE IF NOT EXISTS outfitting_modules (
+    market_id INTEGER NOT NULL,
+    module TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (market_id, module)
+);
+
+CREATE TABLE IF NOT EXISTS shipyard_ships (
+    market_id INTEGER NOT NULL,
+    ship TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (market_id, ship)
+);
+
+-- Sinais descobertos pelo FSS (porta-naves, zonas de conflito, etc.)
+CREATE TABLE IF NOT EXISTS system_signals (
+    system_address INTEGER NOT NULL,
+    signal_name TEXT NOT NULL,
+    signal_type TEXT,
+    is_station INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (system_address, signal_name)
+);
+
+-- Fila persistente de mensagens a enviar ao EDDN: sobrevive a reinícios e
+-- guarda o estado das novas tentativas de cada mensagem
+CREATE TABLE IF NOT EXISTS eddn_outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    schema_ref TEXT NOT NULL,
+    message TEXT NOT NULL, -- JSON completo pronto para envio
+    created_at TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL DEFAULT 0 -- Unix time da próxima tentativa
+);
+
+CREATE INDEX IF NOT EXISTS idx_eddn_outbox_next_attempt ON eddn_outbox(next_attempt);
+
+-- Última execução de cada tarefa de manutenção em segundo plano
+-- (maintenance.py: retention, analyze), em Unix time
+CREATE TABLE IF NOT EXISTS maintenance_state (
+    task TEXT PRIMARY KEY,
+    last_run REAL NOT NULL
+);
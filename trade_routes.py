@@ -0,0 +1,375 @@
+import sys
+import math
+import time
+import heapq
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Any, List, Tuple, Set
+
+from eddn_client import get_db_connection
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Lado das células da grade espacial usada nas buscas por raio (anos-luz)
+GRID_CELL_LY = 40.0
+
+# Preços mais antigos que isto não são carregados (já não refletem o mercado)
+MAX_PRICE_AGE_DAYS = 30
+
+# Consultas de rota mantidas em cache (as menos usadas saem primeiro)
+ROUTE_CACHE_SIZE = 256
+
+Cell = Tuple[int, int, int]
+Position = Tuple[float, float, float]
+
+
+class Market:
+    """Preços de um mercado: só commodities à venda (buys) ou com demanda (sells)."""
+
+    __slots__ = ('market_id', 'station_name', 'system_name', 'position', 'cell', 'buys', 'sells', 'updated_at',
+                 'version')
+
+    def __init__(self, market_id: int, station_name: str, system_name: str):
+        self.market_id = market_id
+        self.station_name = station_name
+        self.system_name = system_name
+        self.position: Optional[Position] = None
+        self.cell: Optional[Cell] = None
+        self.buys: Dict[str, Tuple[int, int]] = {}   # commodity -> (preço de compra, estoque)
+        self.sells: Dict[str, Tuple[int, int]] = {}  # commodity -> (preço de venda, demanda)
+        # Timestamp da mensagem de preços mais recente aplicada: cada mensagem
+        # commodity/3 traz o mercado inteiro, e as mais antigas são ignoradas,
+        # como no upsert de commodity_prices
+        self.updated_at = ''
+        self.version = 0
+
+
+def _cell_of(position: Position) -> Cell:
+    return (int(position[0] // GRID_CELL_LY), int(position[1] // GRID_CELL_LY), int(position[2] // GRID_CELL_LY))
+
+
+class PriceIndex:
+    """Índice em memória dos preços de commodities com a posição de cada mercado.
+
+    Carregado uma vez do banco e depois atualizado incrementalmente pelas
+    operações gravadas pelo EDDNSubscriber (apply_operations). Cada célula
+    da grade tem um contador de versão, usado pelo TradeRouteFinder para
+    saber se um resultado em cache ainda vale. Os preços de um mercado só
+    são substituídos por uma mensagem de timestamp igual ou mais recente,
+    então uma mensagem atrasada ou repetida não deixa o índice diferente do
+    banco.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, max_age_days: int = MAX_PRICE_AGE_DAYS):
+        self.db_path = db_path
+        self.max_age_days = max_age_days
+        self.lock = threading.RLock()
+        self.markets: Dict[int, Market] = {}
+        self.systems: Dict[str, Position] = {}
+        self.system_markets: Dict[str, Set[int]] = {}
+        self.grid: Dict[Cell, Set[int]] = {}
+        self.cell_versions: Dict[Cell, int] = {}
+        # Incrementado quando uma célula passa a existir ou fica vazia
+        self.grid_generation = 0
+
+    # --- Carga e Atualização ---
+
+    def load(self) -> bool:
+        """Carrega sistemas, estações e preços recentes do banco."""
+        conn = get_db_connection(self.db_path)
+        if not conn:
+            return False
+
+        start = time.perf_counter()
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=self.max_age_days)).strftime('%Y-%m-%dT%H:%M:%SZ')
+        try:
+            with self.lock:
+                for name, x, y, z in conn.execute("SELECT name, x, y, z FROM eddn_systems"):
+                    self.systems[name] = (x, y, z)
+                for market_id, station_name, system_name in conn.execute(
+                        "SELECT market_id, station_name, system_name FROM eddn_stations"):
+                    self._update_station(market_id, station_name, system_name)
+                # Carga em massa: tuplas simples, um mercado por vez (ordem da chave
+                # primária) e nomes de commodity internados, compartilhados por todos
+                conn.row_factory = None
+                rows = conn.execute(
+                    "SELECT market_id, commodity, system_name, station_name, buy_price, sell_price, stock, demand, "
+                    "updated_at FROM commodity_prices WHERE updated_at >= ? ORDER BY market_id", (cutoff,))
+                market = None
+                for (market_id, commodity, system_name, station_name, buy_price, sell_price, stock, demand,
+                     updated_at) in rows:
+                    if market is None or market.market_id != market_id:
+                        market = self._update_station(market_id, station_name, system_name)
+                    commodity = sys.intern(commodity)
+                    if updated_at > market.updated_at:
+                        market.updated_at = updated_at
+                    if buy_price > 0 and stock > 0:
+                        market.buys[commodity] = (buy_price, stock)
+                    if sell_price > 0 and demand > 0:
+                        market.sells[commodity] = (sell_price, demand)
+        except Exception as e:
+            logging.error(f"Erro ao carregar o índice de preços: {e}")
+            return False
+        finally:
+            conn.close()
+
+        logging.info(f"Índice de preços carregado: {len(self.markets)} mercados em "
+                     f"{(time.perf_counter() - start) * 1000:.0f} ms.")
+        return True
+
+    def apply_operations(self, pending: Dict[str, Dict[Tuple, Tuple]]) -> None:
+        """Listener de escrita do EDDNSubscriber: aplica o lote recém-gravado."""
+        with self.lock:
+            for params in pending.get('system', {}).values():
+                self._update_system(params[1], (params[2], params[3], params[4]))
+            for params in pending.get('station', {}).values():
+                self._update_station(params[0], params[1], params[2])
+            for params in pending.get('commodity', {}).values():
+                market = self.markets.get(params[0])
+                if market is not None and params[9] < market.updated_at:
+                    continue  # Mensagem atrasada ou repetida (o upsert também não a aplica)
+                market = self._update_station(params[0], params[3], params[2])
+                market.updated_at = params[9]
+                self._set_price(market, sys.intern(params[1]), params[4], params[5], params[7], params[8])
+
+    def _update_system(self, name: str, position: Position) -> None:
+        if self.systems.get(name) == position:
+            return
+        self.systems[name] = position
+        for market_id in self.system_markets.get(name, ()):
+            self._place(self.markets[market_id], position)
+
+    def _update_station(self, market_id: int, station_name: str, system_name: str) -> Market:
+        market = self.markets.get(market_id)
+        if market is None:
+            market = Market(market_id, station_name, system_name)
+            self.markets[market_id] = market
+            self.system_markets.setdefault(system_name, set()).add(market_id)
+            self._place(market, self.systems.get(system_name))
+            return market
+
+        market.station_name = station_name
+        if market.system_name != system_name:
+            # Porta-naves mudam de sistema
+            self.system_markets.get(market.system_name, set()).discard(market_id)
+            self.system_markets.setdefault(system_name, set()).add(market_id)
+            market.system_name = system_name
+            self._place(market, self.systems.get(system_name))
+        return market
+
+    def _place(self, market: Market, position: Optional[Position]) -> None:
+        if position == market.position:
+            return
+        if market.cell is not None:
+            members = self.grid[market.cell]
+            members.discard(market.market_id)
+            self._touch_cell(market.cell)
+            if not members:
+                del self.grid[market.cell]
+                self.grid_generation += 1
+
+        market.position = position
+        market.cell = _cell_of(position) if position else None
+        market.version += 1
+        if market.cell is not None:
+            if market.cell not in self.grid:
+                self.grid[market.cell] = set()
+                self.grid_generation += 1
+            self.grid[market.cell].add(market.market_id)
+            self._touch_cell(market.cell)
+
+    def _touch_cell(self, cell: Cell) -> None:
+        self.cell_versions[cell] = self.cell_versions.get(cell, 0) + 1
+
+    def _set_price(self, market: Market, commodity: str, buy_price: int, sell_price: int,
+                   stock: int, demand: int) -> None:
+        buy = (buy_price, stock) if buy_price > 0 and stock > 0 else None
+        sell = (sell_price, demand) if sell_price > 0 and demand > 0 else None
+        changed = False
+
+        if market.buys.get(commodity) != buy:
+            changed = True
+            if buy:
+                market.buys[commodity] = buy
+            else:
+                market.buys.pop(commodity, None)
+
+        if market.sells.get(commodity) != sell:
+            changed = True
+            if sell:
+                market.sells[commodity] = sell
+            else:
+                market.sells.pop(commodity, None)
+
+        if changed:
+            market.version += 1
+            if market.cell is not None:
+                self._touch_cell(market.cell)
+
+    # --- Consultas ---
+
+    def cells_within(self, position: Position, radius: float) -> List[Cell]:
+        """Células ocupadas que podem conter mercados a até `radius` anos-luz."""
+        low = _cell_of((position[0] - radius, position[1] - radius, position[2] - radius))
+        high = _cell_of((position[0] + radius, position[1] + radius, position[2] + radius))
+        span = (high[0] - low[0] + 1) * (high[1] - low[1] + 1) * (high[2] - low[2] + 1)
+        if span > len(self.grid):
+            return [cell for cell in self.grid
+                    if all(low[axis] <= cell[axis] <= high[axis] for axis in range(3))]
+        return [(cx, cy, cz)
+                for cx in range(low[0], high[0] + 1)
+                for cy in range(low[1], high[1] + 1)
+                for cz in range(low[2], high[2] + 1)
+                if (cx, cy, cz) in self.grid]
+
+    def markets_within(self, position: Position, radius: float,
+                       cells: Optional[List[Cell]] = None) -> List[Tuple[Market, float]]:
+        """Mercados a até `radius` anos-luz da posição, com a distância de cada um."""
+        found = []
+        for cell in cells if cells is not None else self.cells_within(position, radius):
+            for market_id in self.grid[cell]:
+                market = self.markets[market_id]
+                distance = math.dist(position, market.position)
+                if distance <= radius:
+                    found.append((market, distance))
+        return found
+
+
+def _best_trade(origin: Market, destination: Market, cargo: int) -> Optional[Dict[str, Any]]:
+    """Commodity de maior lucro comprada em origin e vendida em destination."""
+    best = None
+    buys, sells = origin.buys, destination.sells
+    if len(sells) < len(buys):
+        candidates = [c for c in sells if c in buys]
+    else:
+        candidates = [c for c in buys if c in sells]
+    for commodity in candidates:
+        buy_price, stock = buys[commodity]
+        sell_price, demand = sells[commodity]
+        margin = sell_price - buy_price
+        if margin <= 0:
+            continue
+        units = min(cargo, stock, demand)
+        if best is None or margin * units > best['profit']:
+            best = {
+                'commodity': commodity,
+                'buy_price': buy_price,
+                'sell_price': sell_price,
+                'profit_per_unit': margin,
+                'units': units,
+                'profit': margin * units,
+            }
+    return best
+
+
+class TradeRouteFinder:
+    """Consultas de rotas comerciais sobre o PriceIndex, com cache.
+
+    Um resultado em cache guarda a versão do mercado de origem e das células
+    consultadas; ele é reaproveitado até algum preço ou posição nelas mudar.
+    """
+
+    def __init__(self, index: PriceIndex, cache_size: int = ROUTE_CACHE_SIZE):
+        self.index = index
+        self.cache_size = cache_size
+        self.cache: 'OrderedDict[Tuple, Tuple[Tuple, Any]]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def best_sell(self, commodity: str, origin_market_id: int, max_jumps: int, jump_range_ly: float,
+                  limit: int = 10) -> List[Dict[str, Any]]:
+        """Melhores mercados para vender a commodity a até N saltos da origem."""
+        return self._cached(('sell', commodity, origin_market_id, max_jumps, jump_range_ly, limit),
+                            origin_market_id, max_jumps * jump_range_ly,
+                            lambda origin, nearby: self._best_sell(commodity, nearby, limit))
+
+    def best_hops(self, origin_market_id: int, max_jumps: int, jump_range_ly: float,
+                  cargo: int = 1, limit: int = 10) -> List[Dict[str, Any]]:
+        """Melhores viagens de ida (origem -> destino) a até N saltos."""
+        return self._cached(('hop', origin_market_id, max_jumps, jump_range_ly, cargo, limit),
+                            origin_market_id, max_jumps * jump_range_ly,
+                            lambda origin, nearby: self._best_hops(origin, nearby, cargo, limit))
+
+    def best_loops(self, origin_market_id: int, max_jumps: int, jump_range_ly: float,
+                   cargo: int = 1, limit: int = 10) -> List[Dict[str, Any]]:
+        """Melhores circuitos origem -> destino -> origem a até N saltos."""
+        return self._cached(('loop', origin_market_id, max_jumps, jump_range_ly, cargo, limit),
+                            origin_market_id, max_jumps * jump_range_ly,
+                            lambda origin, nearby: self._best_loops(origin, nearby, cargo, limit))
+
+    def _cached(self, key: Tuple, origin_market_id: int, radius: float, compute) -> List[Dict[str, Any]]:
+        index = self.index
+        with index.lock:
+            origin = index.markets.get(origin_market_id)
+            if origin is None or origin.position is None:
+                return []
+
+            cells = index.cells_within(origin.position, radius)
+            deps = (origin.version, index.grid_generation,
+                    tuple(index.cell_versions.get(cell, 0) for cell in cells))
+            cached = self.cache.get(key)
+            if cached and cached[0] == deps:
+                self.cache.move_to_end(key)
+                self.hits += 1
+                return cached[1]
+
+            self.misses += 1
+            nearby = [(market, distance)
+                      for market, distance in index.markets_within(origin.position, radius, cells)
+                      if market.market_id != origin_market_id]
+            result = compute(origin, nearby)
+
+            self.cache[key] = (deps, result)
+            self.cache.move_to_end(key)
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+            return result
+
+    @staticmethod
+    def _describe(market: Market, distance: float) -> Dict[str, Any]:
+        return {
+            'market_id': market.market_id,
+            'station_name': market.station_name,
+            'system_name': market.system_name,
+            'distance_ly': round(distance, 2),
+        }
+
+    def _best_sell(self, commodity: str, nearby: List[Tuple[Market, float]], limit: int) -> List[Dict[str, Any]]:
+        candidates = [(market.sells[commodity], market, distance)
+                      for market, distance in nearby if commodity in market.sells]
+        results = []
+        for (price, demand), market, distance in heapq.nlargest(limit, candidates, key=lambda c: c[0][0]):
+            entry = self._describe(market, distance)
+            entry.update({'sell_price': price, 'demand': demand})
+            results.append(entry)
+        return results
+
+    def _best_hops(self, origin: Market, nearby: List[Tuple[Market, float]], cargo: int,
+                   limit: int) -> List[Dict[str, Any]]:
+        results = []
+        for market, distance in nearby:
+            trade = _best_trade(origin, market, cargo)
+            if trade:
+                entry = self._describe(market, distance)
+                entry.update(trade)
+                results.append(entry)
+        return heapq.nlargest(limit, results, key=lambda r: r['profit'])
+
+    def _best_loops(self, origin: Market, nearby: List[Tuple[Market, float]], cargo: int,
+                    limit: int) -> List[Dict[str, Any]]:
+        results = []
+        for market, distance in nearby:
+            outbound = _best_trade(origin, market, cargo)
+            inbound = _best_trade(market, origin, cargo)
+            if not outbound and not inbound:
+                continue
+            entry = self._describe(market, distance)
+            entry.update({
+                'outbound': outbound,
+                'return': inbound,
+                'profit': (outbound['profit'] if outbound else 0) + (inbound['profit'] if inbound else 0),
+            })
+            results.append(entry)
+        return heapq.nlargest(limit, results, key=lambda r: r['profit'])